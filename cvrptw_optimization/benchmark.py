@@ -0,0 +1,308 @@
+'''
+Benchmark suite
+Runs every solver mode over the bundled and Solomon format instances and compares against a stored baseline
+
+python -m cvrptw_optimization.benchmark --solomon path/to/instances --baseline baseline.json
+'''
+import io
+import os
+import sys
+import glob
+import json
+import argparse
+import platform
+import contextlib
+
+import numpy as np
+import pandas as pd
+import pulp
+
+from cvrptw_optimization.data import data as dat
+from cvrptw_optimization.src import instances as inst
+from cvrptw_optimization.src.instrumentation import RunInstrumentation
+from cvrptw_optimization.src import lower_bounds as lb
+from cvrptw_optimization import single_depot_general_model_pulp as general_model
+from cvrptw_optimization import single_depot_column_generation_pulp as column_generation
+
+# number of vehicles used for the bundled data sets, the general model uses every vehicle it is given
+BUNDLED_INSTANCES = {'unit_test': 2,
+                     'customers0': 4,
+                     'customers1': 10}
+
+DEFAULT_BASELINE_FILE = os.path.join(os.path.dirname(dat.__file__), 'benchmark_baseline.json')
+
+
+def load_bundled_instances(names=None):
+    '''
+    Function to load the bundled data sets
+    :param names: subset of BUNDLED_INSTANCES
+    :return: dictionary of instance name to (depots, customers, transportation_matrix, vehicles)
+    '''
+    instances = {}
+    for name, number_of_vehicles in BUNDLED_INSTANCES.items():
+        if names is not None and name not in names:
+            continue
+        suffix = '_unit_test' if name == 'unit_test' else name[-1]
+        instances[name] = (getattr(dat, 'depots' + suffix),
+                           getattr(dat, 'customers' + suffix),
+                           getattr(dat, 'transportation_matrix' + suffix),
+                           getattr(dat, 'vehicles' + suffix).head(number_of_vehicles))
+    return instances
+
+
+def load_solomon_instances(paths, number_of_vehicles=None):
+    '''
+    Function to load Solomon format instances
+    :param paths: files or directories, directories are searched for *.txt files
+    :param number_of_vehicles: overrides the fleet size in the files
+    :return: dictionary of instance name to (depots, customers, transportation_matrix, vehicles)
+    '''
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, '*.txt'))))
+        else:
+            files.append(path)
+
+    instances = {}
+    for file_name in files:
+        name = os.path.splitext(os.path.basename(file_name))[0]
+        instances[name] = inst.read_solomon_instance(file_name, number_of_vehicles)
+    return instances
+
+
+def generate_instances(sizes, seed=0, **kwargs):
+    '''
+    Function to generate seeded random instances for scaling runs
+    :param sizes: numbers of customers
+    :param seed:
+    :param kwargs: passed to instances.generate_instance
+    :return: dictionary of instance name to (depots, customers, transportation_matrix, vehicles)
+    '''
+    return {'generated_{}_{}'.format(size, seed): inst.generate_instance(size, seed=seed, **kwargs) for size in sizes}
+
+
+def _run_general_model(depots, customers, transportation_matrix, vehicles, solver_time_limit_minutes, mip_gap,
+                       instrumentation):
+    objective, solution_path = general_model.run_single_depot_general_model(
+        depots, customers, transportation_matrix, vehicles,
+        mip_gap=mip_gap,
+        solver_time_limit_minutes=solver_time_limit_minutes,
+        enable_solution_messaging=0,
+        instrumentation=instrumentation)
+    return {'OBJECTIVE': objective,
+            'LOWER_BOUND': np.nan,
+            'ITERATIONS': np.nan,
+            'COLUMNS_GENERATED': np.nan,
+            'NUMBER_OF_ROUTES': solution_path['VEHICLE'].nunique()}
+
+
+def _run_column_generation(depots, customers, transportation_matrix, vehicles, solver_time_limit_minutes, mip_gap,
+                           instrumentation, pricing='mip'):
+    solution, solution_statistics = column_generation.run_single_depot_column_generation(
+        depots, customers, transportation_matrix, vehicles,
+        capacity=vehicles['CAPACITY'].max(),
+        mip_gap=mip_gap,
+        solver_time_limit_minutes=solver_time_limit_minutes,
+        enable_solution_messaging=0,
+        instrumentation=instrumentation,
+        pricing=pricing)
+    # the gap is only measured when column generation converged
+    lower_bound = lb.column_generation_lower_bound(solution_statistics)
+    return {'OBJECTIVE': solution['OBJECTIVE'].iloc[0],
+            'LOWER_BOUND': np.nan if lower_bound is None else lower_bound,
+            'ITERATIONS': len(solution_statistics),
+            'COLUMNS_GENERATED': solution_statistics[-1]['NUMBER_OF_PATHS'] - len(customers),
+            'NUMBER_OF_ROUTES': solution['PATH_NAME'].nunique()}
+
+
+def _run_column_generation_ng_route(depots, customers, transportation_matrix, vehicles, solver_time_limit_minutes,
+                                    mip_gap, instrumentation):
+    return _run_column_generation(depots, customers, transportation_matrix, vehicles, solver_time_limit_minutes,
+                                  mip_gap, instrumentation, pricing='ng_route')
+
+
+SOLVER_MODES = {'general_model': _run_general_model,
+                'column_generation': _run_column_generation,
+                'column_generation_ng_route': _run_column_generation_ng_route}
+
+
+def run_benchmark(instances,
+                  modes=None,
+                  solver_time_limit_minutes=1,
+                  mip_gap=0.001,
+                  repeats=1,
+                  verbose=False):
+    '''
+    Function to run the benchmark
+    :param instances: dictionary of instance name to (depots, customers, transportation_matrix, vehicles)
+    :param modes: subset of SOLVER_MODES, all modes if None
+    :param solver_time_limit_minutes:
+    :param mip_gap:
+    :param repeats:
+    :param verbose: show solver output
+    :return: results data frame, one row per instance, mode and repeat
+    '''
+    if modes is None:
+        modes = list(SOLVER_MODES.keys())
+
+    results = []
+    for instance_name, (depots, customers, transportation_matrix, vehicles) in instances.items():
+        for mode in modes:
+            for repeat in range(repeats):
+                print('Benchmark {} {} {}'.format(instance_name, mode, repeat))
+                instrumentation = RunInstrumentation(run_name='{} {}'.format(instance_name, mode))
+                result = {'INSTANCE': instance_name,
+                          'MODE': mode,
+                          'REPEAT': repeat,
+                          'NUMBER_OF_CUSTOMERS': len(customers),
+                          'NUMBER_OF_VEHICLES': len(vehicles),
+                          'STATUS': 'OK',
+                          'ERROR': None}
+
+                output = None if verbose else io.StringIO()
+                try:
+                    with contextlib.redirect_stdout(output or sys.stdout):
+                        with instrumentation.phase('run'):
+                            result.update(SOLVER_MODES[mode](depots, customers, transportation_matrix, vehicles,
+                                                             solver_time_limit_minutes, mip_gap, instrumentation))
+                except Exception as exception:
+                    result['STATUS'] = 'FAILED'
+                    result['ERROR'] = str(exception)
+
+                run_record = instrumentation.records[-1]
+                result['RUNTIME_SECONDS'] = run_record['WALL_SECONDS']
+                result['CPU_SECONDS'] = run_record['CPU_SECONDS']
+                result['SOLVER_CPU_SECONDS'] = run_record['SOLVER_CPU_SECONDS']
+                results.append(result)
+
+    results = pd.DataFrame(results)
+    for column in ['OBJECTIVE', 'LOWER_BOUND']:
+        if column not in results.columns:
+            results[column] = np.nan
+    results['GAP'] = (results['OBJECTIVE'] - results['LOWER_BOUND']) / results['OBJECTIVE'].abs()
+    return results
+
+
+def environment_metadata():
+    '''
+    Versions and platform the benchmark ran on
+    :return:
+    '''
+    return {'PYTHON': platform.python_version(),
+            'PLATFORM': platform.platform(),
+            'PANDAS': pd.__version__,
+            'NUMPY': np.__version__,
+            'PULP': getattr(pulp, '__version__', None)}
+
+
+def summarize_results(results):
+    '''
+    Median over repeats
+    :param results:
+    :return:
+    '''
+    return results.groupby(['INSTANCE', 'MODE']).agg(STATUS=('STATUS', 'first'),
+                                                     OBJECTIVE=('OBJECTIVE', 'median'),
+                                                     GAP=('GAP', 'median'),
+                                                     ITERATIONS=('ITERATIONS', 'median'),
+                                                     COLUMNS_GENERATED=('COLUMNS_GENERATED', 'median'),
+                                                     RUNTIME_SECONDS=('RUNTIME_SECONDS', 'median')).reset_index()
+
+
+def save_baseline(results, file_name=DEFAULT_BASELINE_FILE):
+    '''
+    Function to store benchmark results as the baseline
+    :param results:
+    :param file_name:
+    :return:
+    '''
+    summary = summarize_results(results)
+    summary = summary.astype(object).where(summary.notnull(), None)
+    with open(file_name, 'w') as baseline_file:
+        json.dump({'METADATA': environment_metadata(),
+                   'RESULTS': summary.to_dict(orient='records')}, baseline_file, indent=2)
+
+
+def compare_with_baseline(results,
+                          file_name=DEFAULT_BASELINE_FILE,
+                          objective_tolerance=0.0001,
+                          runtime_tolerance=0.5):
+    '''
+    Function to compare benchmark results against the baseline
+    :param results:
+    :param file_name:
+    :param objective_tolerance: allowed relative objective increase
+    :param runtime_tolerance: allowed relative runtime increase
+    :return: comparison data frame with a REGRESSION column
+    '''
+    with open(file_name) as baseline_file:
+        baseline = pd.DataFrame(json.load(baseline_file)['RESULTS'])
+
+    comparison = summarize_results(results).merge(baseline, how='left', on=['INSTANCE', 'MODE'],
+                                                  suffixes=('', '_BASELINE'))
+    comparison['OBJECTIVE_CHANGE'] = (comparison['OBJECTIVE'] - comparison['OBJECTIVE_BASELINE'].astype(float)) \
+        / comparison['OBJECTIVE_BASELINE'].astype(float).abs()
+    comparison['RUNTIME_RATIO'] = comparison['RUNTIME_SECONDS'] / comparison['RUNTIME_SECONDS_BASELINE'].astype(float)
+
+    comparison['OBJECTIVE_REGRESSION'] = comparison['OBJECTIVE_CHANGE'] > objective_tolerance
+    comparison['RUNTIME_REGRESSION'] = comparison['RUNTIME_RATIO'] > 1 + runtime_tolerance
+    comparison['STATUS_REGRESSION'] = (comparison['STATUS'] != 'OK') & (comparison['STATUS_BASELINE'] == 'OK')
+    comparison['REGRESSION'] = comparison['OBJECTIVE_REGRESSION'] | comparison['RUNTIME_REGRESSION'] | \
+        comparison['STATUS_REGRESSION']
+    return comparison
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='CVRPTW solver benchmark')
+    parser.add_argument('--bundled', nargs='*', default=list(BUNDLED_INSTANCES.keys()),
+                        help='bundled data sets to run')
+    parser.add_argument('--solomon', nargs='*', default=[dat.solomon_unit_test_file],
+                        help='Solomon format files or directories')
+    parser.add_argument('--solomon-vehicles', type=int, default=None,
+                        help='number of vehicles for the Solomon instances')
+    parser.add_argument('--generated', nargs='*', type=int, default=[],
+                        help='numbers of customers for seeded random instances')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--clustering', type=float, default=0.0)
+    parser.add_argument('--time-window-tightness', type=float, default=0.25)
+    parser.add_argument('--modes', nargs='*', default=list(SOLVER_MODES.keys()))
+    parser.add_argument('--time-limit', type=float, default=1, help='solver time limit in minutes')
+    parser.add_argument('--mip-gap', type=float, default=0.001)
+    parser.add_argument('--repeats', type=int, default=1)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE_FILE)
+    parser.add_argument('--update-baseline', action='store_true')
+    parser.add_argument('--objective-tolerance', type=float, default=0.0001)
+    parser.add_argument('--runtime-tolerance', type=float, default=0.5)
+    parser.add_argument('--output', default=None, help='csv file for the raw results')
+    arguments = parser.parse_args(argv)
+
+    instances = load_bundled_instances(arguments.bundled)
+    instances.update(load_solomon_instances(arguments.solomon, arguments.solomon_vehicles))
+    instances.update(generate_instances(arguments.generated,
+                                        seed=arguments.seed,
+                                        clustering=arguments.clustering,
+                                        time_window_tightness=arguments.time_window_tightness))
+
+    results = run_benchmark(instances,
+                            modes=arguments.modes,
+                            solver_time_limit_minutes=arguments.time_limit,
+                            mip_gap=arguments.mip_gap,
+                            repeats=arguments.repeats)
+    if arguments.output is not None:
+        results.to_csv(arguments.output, index=False)
+
+    if arguments.update_baseline:
+        save_baseline(results, arguments.baseline)
+        print(summarize_results(results).to_string())
+        return 0
+
+    comparison = compare_with_baseline(results, arguments.baseline, arguments.objective_tolerance,
+                                       arguments.runtime_tolerance)
+    print(comparison[['INSTANCE', 'MODE', 'STATUS', 'OBJECTIVE', 'OBJECTIVE_CHANGE', 'RUNTIME_SECONDS',
+                      'RUNTIME_RATIO', 'REGRESSION']].to_string())
+    return int(comparison['REGRESSION'].any())
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,302 @@
+'''
+Command line interface
+Solves every instance of the given files and directories in parallel worker processes and writes one route table
+per instance and a json statistics summary
+
+cvrptw-optimization instances/ --output-dir results/ --solver column_generation --time-budget 2 --workers 4
+
+An instance is a Solomon format .txt file or a directory with depots, customers, transportation_matrix and vehicles
+.csv or .parquet files. Parquet needs pyarrow or fastparquet.
+'''
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import contextlib
+import importlib.util
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import pandas as pd
+
+from cvrptw_optimization import benchmark
+from cvrptw_optimization.src import instances as inst
+from cvrptw_optimization.src import lower_bounds as lb
+from cvrptw_optimization.src.instrumentation import RunInstrumentation
+from cvrptw_optimization import single_depot_general_model_pulp as general_model
+from cvrptw_optimization import single_depot_column_generation_pulp as column_generation
+
+INSTANCE_TABLES = ['depots', 'customers', 'transportation_matrix', 'vehicles']
+
+TABLE_FORMATS = ('.csv', '.parquet')
+
+SOLVERS = ['general_model', 'column_generation', 'column_generation_ng_route']
+
+# worker processes are replaced after this many instances so their memory does not grow over long batches
+WORKER_MAX_INSTANCES = 50
+
+
+def _table_file(directory, table):
+    for extension in TABLE_FORMATS:
+        file_name = os.path.join(directory, table + extension)
+        if os.path.isfile(file_name):
+            return file_name
+    return None
+
+
+def _is_table_instance(directory):
+    return all(_table_file(directory, table) is not None for table in INSTANCE_TABLES)
+
+
+def find_instances(paths):
+    '''
+    Function to list the instances of files and directories, directories are searched one level deep
+    :param paths:
+    :return: list of instance name and path, sorted by name
+    '''
+    instances = {}
+    for path in paths:
+        if os.path.isfile(path) or _is_table_instance(path):
+            candidates = [path]
+        elif os.path.isdir(path):
+            with os.scandir(path) as entries:
+                candidates = [entry.path for entry in entries
+                              if (entry.is_file() and entry.name.lower().endswith('.txt')) or
+                              (entry.is_dir() and _is_table_instance(entry.path))]
+        else:
+            raise Exception('Instance path {} does not exist'.format(path))
+
+        for candidate in candidates:
+            name = os.path.splitext(os.path.basename(os.path.normpath(candidate)))[0]
+            if name in instances and instances[name] != candidate:
+                raise Exception('Instances {} and {} have the same name'.format(instances[name], candidate))
+            instances[name] = candidate
+    return sorted(instances.items())
+
+
+def _read_table(file_name):
+    if file_name.endswith('.parquet'):
+        return pd.read_parquet(file_name)
+    return pd.read_csv(file_name)
+
+
+def read_instance(path, number_of_vehicles=None):
+    '''
+    Function to read an instance
+    :param path: Solomon format file or directory with the instance tables
+    :param number_of_vehicles: use the first vehicles, overrides the fleet size of Solomon files
+    :return: depots, customers, transportation_matrix, vehicles
+    '''
+    if os.path.isfile(path):
+        return inst.read_solomon_instance(path, number_of_vehicles)
+
+    depots, customers, transportation_matrix, vehicles = [_read_table(_table_file(path, table))
+                                                          for table in INSTANCE_TABLES]
+    if number_of_vehicles is not None:
+        vehicles = vehicles.head(number_of_vehicles)
+    return depots, customers, transportation_matrix, vehicles
+
+
+def parquet_available():
+    return any(importlib.util.find_spec(engine) is not None for engine in ('pyarrow', 'fastparquet'))
+
+
+def solve_instance(name, path, solver, output_dir, output_format='csv', number_of_vehicles=None,
+                   time_budget_minutes=None, solver_time_limit_minutes=10, mip_gap=0.001, verbose=False,
+                   profile_dir=None):
+    '''
+    Function to solve an instance and write its route table, runs in the worker processes
+    :param name: instance name
+    :param path: instance path
+    :param solver: one of SOLVERS
+    :param output_dir:
+    :param output_format: csv or parquet
+    :param number_of_vehicles:
+    :param time_budget_minutes:
+    :param solver_time_limit_minutes:
+    :param mip_gap:
+    :param verbose: show the solver messages
+    :param profile_dir: directory of the cProfile files and hot functions summary of the instance, None to not profile
+    :return: statistics of the instance
+    '''
+    statistics = {'INSTANCE': name,
+                  'PATH': path,
+                  'SOLVER': solver,
+                  'STATUS': 'OK',
+                  'ERROR': None,
+                  'NUMBER_OF_CUSTOMERS': None,
+                  'NUMBER_OF_VEHICLES': None,
+                  'OBJECTIVE': None,
+                  'LOWER_BOUND': None,
+                  'NUMBER_OF_ROUTES': None,
+                  'ITERATIONS': None,
+                  'ROUTES_FILE': None}
+    start = time.perf_counter()
+    instrumentation = RunInstrumentation(run_name=name, profile=True) if profile_dir is not None else None
+    output = None if verbose else io.StringIO()
+    try:
+        with contextlib.redirect_stdout(output or sys.stdout):
+            depots, customers, transportation_matrix, vehicles = read_instance(path, number_of_vehicles)
+            statistics['NUMBER_OF_CUSTOMERS'] = len(customers)
+            statistics['NUMBER_OF_VEHICLES'] = len(vehicles)
+
+            if solver == 'general_model':
+                objective, routes = general_model.run_single_depot_general_model(
+                    depots, customers, transportation_matrix, vehicles,
+                    mip_gap=mip_gap,
+                    solver_time_limit_minutes=solver_time_limit_minutes,
+                    enable_solution_messaging=0,
+                    time_budget_minutes=time_budget_minutes,
+                    instrumentation=instrumentation)
+                statistics['OBJECTIVE'] = objective
+                statistics['NUMBER_OF_ROUTES'] = routes['VEHICLE'].nunique() if len(routes) else 0
+            else:
+                routes, solution_statistics = column_generation.run_single_depot_column_generation(
+                    depots, customers, transportation_matrix, vehicles,
+                    mip_gap=mip_gap,
+                    solver_time_limit_minutes=solver_time_limit_minutes,
+                    enable_solution_messaging=0,
+                    pricing='ng_route' if solver == 'column_generation_ng_route' else 'mip',
+                    time_budget_minutes=time_budget_minutes,
+                    instrumentation=instrumentation)
+                # the path lists are already given by the stops
+                routes = routes.drop(columns=['PATH'])
+                statistics['OBJECTIVE'] = float(routes['OBJECTIVE'].iloc[0])
+                statistics['LOWER_BOUND'] = lb.column_generation_lower_bound(solution_statistics)
+                statistics['NUMBER_OF_ROUTES'] = routes['PATH_NAME'].nunique()
+                statistics['ITERATIONS'] = len(solution_statistics)
+
+        routes_file = os.path.join(output_dir, '{}_routes.{}'.format(name, output_format))
+        if output_format == 'parquet':
+            routes.to_parquet(routes_file, index=False)
+        else:
+            routes.to_csv(routes_file, index=False)
+        statistics['ROUTES_FILE'] = routes_file
+    except Exception as exception:
+        statistics['STATUS'] = 'FAILED'
+        statistics['ERROR'] = '{}: {}'.format(type(exception).__name__, exception)
+
+    if instrumentation is not None:
+        # the profiles of failed runs show where they failed
+        statistics['PROFILE_FILES'] = instrumentation.write_profiles(profile_dir)
+
+    statistics['RUNTIME_SECONDS'] = time.perf_counter() - start
+    return statistics
+
+
+def run_batch(instances, output_dir, solver='column_generation', workers=1, output_format='csv',
+              skip_existing=False, summary_file=None, **solve_arguments):
+    '''
+    Function to solve instances in parallel. At most two instances per worker are read or solved at a time and only
+    the statistics of the instances are kept, so memory does not grow with the number of instances
+    :param instances: list of instance name and path
+    :param output_dir:
+    :param solver: one of SOLVERS
+    :param workers: number of worker processes, 1 solves in this process
+    :param output_format: csv or parquet
+    :param skip_existing: skip instances whose route table exists
+    :param summary_file: json summary, defaults to summary.json in output_dir
+    :param solve_arguments: number_of_vehicles, time_budget_minutes, solver_time_limit_minutes, mip_gap, verbose and
+    profile_dir
+    :return: statistics of every instance
+    '''
+    if solver not in SOLVERS:
+        raise Exception('Unknown solver {}, use one of {}'.format(solver, SOLVERS))
+    if output_format not in ('csv', 'parquet'):
+        raise Exception('Unknown output format {}'.format(output_format))
+    if output_format == 'parquet' and not parquet_available():
+        raise Exception('Parquet output needs pyarrow or fastparquet')
+
+    os.makedirs(output_dir, exist_ok=True)
+    if summary_file is None:
+        summary_file = os.path.join(output_dir, 'summary.json')
+
+    pending = []
+    for name, path in instances:
+        if skip_existing and os.path.isfile(os.path.join(output_dir, '{}_routes.{}'.format(name, output_format))):
+            print('Skipping {}'.format(name))
+            continue
+        pending.append((name, path))
+
+    results = []
+
+    def report(statistics):
+        results.append(statistics)
+        print('{}/{} {} {} objective {} in {:.1f} seconds'.format(len(results), len(pending),
+                                                                 statistics['INSTANCE'], statistics['STATUS'],
+                                                                 statistics['OBJECTIVE'],
+                                                                 statistics['RUNTIME_SECONDS']))
+
+    start = time.perf_counter()
+    if workers <= 1:
+        for name, path in pending:
+            report(solve_instance(name, path, solver, output_dir, output_format, **solve_arguments))
+    else:
+        executor_arguments = {}
+        if sys.version_info >= (3, 11):
+            executor_arguments['max_tasks_per_child'] = WORKER_MAX_INSTANCES
+        with ProcessPoolExecutor(max_workers=workers, **executor_arguments) as executor:
+            running = set()
+            for name, path in pending:
+                if len(running) >= 2 * workers:
+                    finished, running = wait(running, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        report(future.result())
+                running.add(executor.submit(solve_instance, name, path, solver, output_dir, output_format,
+                                            **solve_arguments))
+            for future in wait(running)[0]:
+                report(future.result())
+
+    results.sort(key=lambda statistics: statistics['INSTANCE'])
+    runtime = time.perf_counter() - start
+    summary = {'METADATA': benchmark.environment_metadata(),
+               'PARAMETERS': dict(solve_arguments, SOLVER=solver, WORKERS=workers, OUTPUT_FORMAT=output_format),
+               'NUMBER_OF_INSTANCES': len(results),
+               'FAILED_INSTANCES': sum(statistics['STATUS'] != 'OK' for statistics in results),
+               'SKIPPED_INSTANCES': len(instances) - len(pending),
+               'RUNTIME_SECONDS': runtime,
+               'RESULTS': results}
+    with open(summary_file, 'w') as json_file:
+        json.dump(summary, json_file, indent=2, default=str)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='cvrptw-optimization', description='Solve CVRPTW instances from files')
+    parser.add_argument('instances', nargs='+',
+                        help='Solomon format files, instance directories or directories of instances')
+    parser.add_argument('--output-dir', default='.', help='directory of the route tables and the summary')
+    parser.add_argument('--solver', choices=SOLVERS, default='column_generation')
+    parser.add_argument('--workers', type=int, default=1, help='number of instances solved in parallel')
+    parser.add_argument('--time-budget', type=float, default=None, help='time budget per instance in minutes')
+    parser.add_argument('--time-limit', type=float, default=10, help='solver time limit in minutes')
+    parser.add_argument('--mip-gap', type=float, default=0.001)
+    parser.add_argument('--vehicles', type=int, default=None,
+                        help='number of vehicles, overrides the fleet size of Solomon files')
+    parser.add_argument('--format', choices=['csv', 'parquet'], default='csv', help='route table format')
+    parser.add_argument('--summary', default=None, help='json summary file, defaults to OUTPUT_DIR/summary.json')
+    parser.add_argument('--skip-existing', action='store_true', help='skip instances with a route table')
+    parser.add_argument('--verbose', action='store_true', help='show the solver messages')
+    parser.add_argument('--profile-dir', default=None,
+                        help='profile the solver phases of every instance and write the cProfile files here')
+    arguments = parser.parse_args(argv)
+
+    results = run_batch(find_instances(arguments.instances),
+                        arguments.output_dir,
+                        solver=arguments.solver,
+                        workers=arguments.workers,
+                        output_format=arguments.format,
+                        skip_existing=arguments.skip_existing,
+                        summary_file=arguments.summary,
+                        number_of_vehicles=arguments.vehicles,
+                        time_budget_minutes=arguments.time_budget,
+                        solver_time_limit_minutes=arguments.time_limit,
+                        mip_gap=arguments.mip_gap,
+                        verbose=arguments.verbose,
+                        profile_dir=arguments.profile_dir)
+    return int(any(statistics['STATUS'] != 'OK' for statistics in results))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
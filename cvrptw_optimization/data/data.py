@@ -19,3 +19,6 @@ customers1 = pd.read_pickle(os.path.join(current_dir, 'customers1.pkl'))
 depots1 = pd.read_pickle(os.path.join(current_dir, 'depots1.pkl'))
 transportation_matrix1 = pd.read_pickle(os.path.join(current_dir, 'transportation_matrix1.pkl'))
 vehicles1 = pd.read_pickle(os.path.join(current_dir, 'vehicles1.pkl'))
+
+# solomon format test instance
+solomon_unit_test_file = os.path.join(current_dir, 'solomon_unit_test.txt')
@@ -0,0 +1,711 @@
+'''
+Solve service
+Local asyncio HTTP server with a job queue and a pool of warm worker processes. Workers keep the package imported
+and the parsed instances cached between jobs, clients submit instances, poll the status, stream the progress and
+cancel jobs
+
+python -m cvrptw_optimization.service --port 8765 --workers 2
+
+POST   /jobs                   submit {"SOLVER": ..., "INSTANCE": ..., "PARAMETERS": {...}, "TIME_BUDGET_MINUTES": ...}
+GET    /jobs                   status of every job
+GET    /jobs/<id>              status and result of a job
+GET    /jobs/<id>/progress     progress lines from ?offset=, newline delimited json until the job ends with &stream=1
+DELETE /jobs/<id>              cancel a queued or running job
+GET    /health                 number of workers, queued and running jobs
+'''
+import io
+import sys
+import json
+import time
+import uuid
+import asyncio
+import hashlib
+import argparse
+import threading
+import contextlib
+import multiprocessing
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import OrderedDict
+
+import pandas as pd
+
+from cvrptw_optimization import benchmark
+from cvrptw_optimization.src import instances as inst
+from cvrptw_optimization.src import lower_bounds as lb
+from cvrptw_optimization import single_depot_general_model_pulp as general_model
+from cvrptw_optimization import single_depot_column_generation_pulp as column_generation
+
+DEFAULT_PORT = 8765
+
+# parsed instances kept by every worker
+INSTANCE_CACHE_SIZE = 16
+
+INSTANCE_TABLES = ['DEPOTS', 'CUSTOMERS', 'TRANSPORTATION_MATRIX', 'VEHICLES']
+
+FINISHED_STATUSES = ('done', 'failed', 'cancelled', 'timeout')
+
+
+def _records(data_frame):
+    # to_json converts numpy types and missing values
+    return json.loads(data_frame.to_json(orient='records'))
+
+
+def instance_payload(depots, customers, transportation_matrix, vehicles):
+    '''
+    Function to convert the input data frames to the INSTANCE of a job
+    :param depots:
+    :param customers:
+    :param transportation_matrix:
+    :param vehicles:
+    :return:
+    '''
+    return {table: _records(data_frame) for table, data_frame in zip(INSTANCE_TABLES,
+                                                                     [depots, customers, transportation_matrix,
+                                                                      vehicles])}
+
+
+def load_instance(instance, instance_cache=None):
+    '''
+    Function to get the input data frames of a job instance
+    :param instance: {"BUNDLED": name} for a bundled data set, {"SOLOMON": file, "NUMBER_OF_VEHICLES": n} for a
+    Solomon format file or the DEPOTS, CUSTOMERS, TRANSPORTATION_MATRIX and VEHICLES records
+    :param instance_cache: OrderedDict of parsed instances, None to parse every time
+    :return: depots, customers, transportation_matrix, vehicles
+    '''
+    key = hashlib.sha1(json.dumps(instance, sort_keys=True).encode()).hexdigest()
+    if instance_cache is not None and key in instance_cache:
+        instance_cache.move_to_end(key)
+        return instance_cache[key]
+
+    if 'BUNDLED' in instance:
+        if instance['BUNDLED'] not in benchmark.BUNDLED_INSTANCES:
+            raise Exception('Unknown bundled instance {}'.format(instance['BUNDLED']))
+        tables = benchmark.load_bundled_instances([instance['BUNDLED']])[instance['BUNDLED']]
+    elif 'SOLOMON' in instance:
+        tables = inst.read_solomon_instance(instance['SOLOMON'], instance.get('NUMBER_OF_VEHICLES'))
+    else:
+        missing = [table for table in INSTANCE_TABLES if table not in instance]
+        if missing:
+            raise Exception('Instance is missing {}'.format(', '.join(missing)))
+        tables = tuple(pd.DataFrame(instance[table]) for table in INSTANCE_TABLES)
+
+    if instance_cache is not None:
+        instance_cache[key] = tables
+        while len(instance_cache) > INSTANCE_CACHE_SIZE:
+            instance_cache.popitem(last=False)
+    return tables
+
+
+def _solve_general_model(depots, customers, transportation_matrix, vehicles, parameters):
+    objective, solution_path = general_model.run_single_depot_general_model(depots,
+                                                                            customers,
+                                                                            transportation_matrix,
+                                                                            vehicles,
+                                                                            **parameters)
+    return {'OBJECTIVE': objective,
+            'LOWER_BOUND': None,
+            'SOLUTION': _records(solution_path),
+            'STATISTICS': []}
+
+
+def _solve_column_generation(depots, customers, transportation_matrix, vehicles, parameters):
+    solution, solution_statistics = column_generation.run_single_depot_column_generation(depots,
+                                                                                         customers,
+                                                                                         transportation_matrix,
+                                                                                         vehicles,
+                                                                                         **parameters)
+    return {'OBJECTIVE': float(solution['OBJECTIVE'].iloc[0]),
+            'LOWER_BOUND': lb.column_generation_lower_bound(solution_statistics),
+            'SOLUTION': _records(solution),
+            'STATISTICS': _records(pd.DataFrame(solution_statistics))}
+
+
+SOLVERS = {'general_model': _solve_general_model,
+           'column_generation': _solve_column_generation}
+
+
+def solve_request(request, instance_cache=None):
+    '''
+    Function to solve a job request
+    :param request: SOLVER, INSTANCE and PARAMETERS, the keyword arguments of the solver
+    :param instance_cache:
+    :return: OBJECTIVE, LOWER_BOUND, SOLUTION records and STATISTICS records
+    '''
+    depots, customers, transportation_matrix, vehicles = load_instance(request['INSTANCE'], instance_cache)
+    parameters = dict(request.get('PARAMETERS') or {})
+    parameters.setdefault('enable_solution_messaging', 0)
+    return SOLVERS[request['SOLVER']](depots, customers, transportation_matrix, vehicles, parameters)
+
+
+class _ProgressWriter(io.TextIOBase):
+    '''
+    Standard output of a worker, every line is sent to the service as progress of the job
+    '''
+
+    def __init__(self, connection, job_id):
+        self.connection = connection
+        self.job_id = job_id
+        self.buffer = ''
+
+    def write(self, text):
+        self.buffer += text
+        *lines, self.buffer = self.buffer.split('\n')
+        for line in lines:
+            if line.strip():
+                self.connection.send(('progress', self.job_id, line))
+        return len(text)
+
+    def flush(self):
+        if self.buffer.strip():
+            self.connection.send(('progress', self.job_id, self.buffer))
+        self.buffer = ''
+
+
+def _worker_main(connection):
+    '''
+    Worker process loop, solves one job at a time until it receives None
+    :param connection: pipe to the service
+    :return:
+    '''
+    instance_cache = OrderedDict()
+    while True:
+        try:
+            message = connection.recv()
+        except EOFError:
+            return
+        if message is None:
+            return
+
+        job_id, request = message
+        progress_writer = _ProgressWriter(connection, job_id)
+        try:
+            with contextlib.redirect_stdout(progress_writer):
+                result = solve_request(request, instance_cache)
+            progress_writer.flush()
+            connection.send(('done', job_id, result))
+        except Exception as exception:
+            progress_writer.flush()
+            connection.send(('failed', job_id, '{}: {}'.format(type(exception).__name__, exception)))
+
+
+class _WorkerProcess:
+    '''
+    Worker process with the pipe to it, a reader thread hands its messages to the event loop
+    '''
+
+    def __init__(self, service):
+        self.service = service
+        self.job = None
+        self.exited = False
+        self.process = None
+        self.connection = None
+
+    def start(self):
+        context = multiprocessing.get_context('spawn')
+        connection, child_connection = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_connection,), daemon=True)
+        self.process.start()
+        child_connection.close()
+        self.connection = connection
+        self.exited = False
+        threading.Thread(target=self._read, args=(connection,), daemon=True).start()
+
+    def _read(self, connection):
+        while True:
+            try:
+                message = connection.recv()
+            except (EOFError, OSError):
+                message = ('exited', None, None)
+            try:
+                self.service.loop.call_soon_threadsafe(self.service._on_message, self, connection, message)
+            except RuntimeError:
+                # event loop closed
+                message = ('exited', None, None)
+            if message[0] == 'exited':
+                connection.close()
+                return
+
+    def stop(self, terminate=False):
+        '''
+        Stop the worker process, a running job is killed with terminate
+        :param terminate:
+        :return:
+        '''
+        if not terminate and self.process.is_alive():
+            try:
+                self.connection.send(None)
+                self.process.join(5)
+            except (BrokenPipeError, OSError):
+                pass
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join(5)
+
+    def restart(self):
+        self.stop(terminate=True)
+        self.start()
+
+
+class Job:
+    '''
+    Solve job, its progress lines and result
+    '''
+
+    def __init__(self, request, timeout_seconds=None):
+        self.job_id = uuid.uuid4().hex
+        self.request = request
+        self.timeout_seconds = timeout_seconds
+        self.status = 'queued'
+        self.progress = []
+        self.result = None
+        self.error = None
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.finished_event = asyncio.Event()
+        self._changed = asyncio.Event()
+
+    def _notify(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def start(self):
+        self.status = 'running'
+        self.started = time.time()
+        self._notify()
+
+    def add_progress(self, line):
+        self.progress.append({'SECONDS': round(time.time() - self.started, 3), 'MESSAGE': line})
+        self._notify()
+
+    def finish(self, status, result=None, error=None):
+        self.status = status
+        self.result = result
+        self.error = error
+        self.finished = time.time()
+        self.finished_event.set()
+        self._notify()
+
+    @property
+    def done(self):
+        return self.status in FINISHED_STATUSES
+
+    async def wait_for_progress(self, offset):
+        '''
+        Wait until the job has more than offset progress lines or ends
+        :param offset:
+        :return:
+        '''
+        while len(self.progress) <= offset and not self.done:
+            await self._changed.wait()
+
+    def to_dict(self, include_result=True):
+        job = {'JOB_ID': self.job_id,
+               'SOLVER': self.request['SOLVER'],
+               'STATUS': self.status,
+               'ERROR': self.error,
+               'SUBMITTED': self.submitted,
+               'STARTED': self.started,
+               'FINISHED': self.finished,
+               'PROGRESS_LINES': len(self.progress),
+               'TIME_BUDGET_MINUTES': self.request['PARAMETERS'].get('time_budget_minutes')}
+        if include_result:
+            job['RESULT'] = self.result
+        return job
+
+
+_REASONS = {200: 'OK', 202: 'Accepted', 400: 'Bad Request', 404: 'Not Found', 429: 'Too Many Requests',
+            500: 'Internal Server Error'}
+
+
+class ServiceError(Exception):
+
+    def __init__(self, status_code, message):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class SolveService:
+    '''
+    Job queue served by a pool of worker processes. At most workers jobs run at the same time and at most
+    max_queued_jobs wait, further submissions are rejected. The time budget of a job is passed to the solver as
+    time_budget_minutes, a job still running job_timeout_grace_seconds after its budget is killed
+    '''
+
+    def __init__(self,
+                 workers=2,
+                 max_queued_jobs=100,
+                 default_time_budget_minutes=None,
+                 max_time_budget_minutes=None,
+                 job_timeout_grace_seconds=30):
+        '''
+        :param workers: number of worker processes
+        :param max_queued_jobs: maximum number of jobs waiting for a worker
+        :param default_time_budget_minutes: time budget of jobs submitted without one, None for no limit
+        :param max_time_budget_minutes: upper limit of the job time budgets
+        :param job_timeout_grace_seconds: time after the budget before a job is killed
+        '''
+        self.workers = workers
+        self.max_queued_jobs = max_queued_jobs
+        self.default_time_budget_minutes = default_time_budget_minutes
+        self.max_time_budget_minutes = max_time_budget_minutes
+        self.job_timeout_grace_seconds = job_timeout_grace_seconds
+
+        self.jobs = OrderedDict()
+        self.loop = None
+        self.port = None
+        self._queue = None
+        self._server = None
+        self._worker_processes = []
+        self._worker_tasks = []
+        self._thread = None
+
+    async def start(self, host='127.0.0.1', port=DEFAULT_PORT):
+        '''
+        Start the worker processes and listen on host and port, port 0 picks a free port
+        :param host:
+        :param port:
+        :return:
+        '''
+        self.loop = asyncio.get_event_loop()
+        self._queue = asyncio.Queue()
+        for _ in range(self.workers):
+            worker = _WorkerProcess(self)
+            worker.start()
+            self._worker_processes.append(worker)
+            self._worker_tasks.append(self.loop.create_task(self._run_worker(worker)))
+        self._server = await asyncio.start_server(self._handle_connection, host, port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        print('Solve service on {}:{} with {} workers'.format(host, self.port, self.workers))
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+        for task in self._worker_tasks:
+            task.cancel()
+        for job in self.jobs.values():
+            if not job.done:
+                job.finish('cancelled', error='Service stopped')
+        for worker in self._worker_processes:
+            await self.loop.run_in_executor(None, worker.stop, worker.job is not None)
+
+    def start_in_thread(self, host='127.0.0.1', port=0):
+        '''
+        Run the service on an event loop in a background thread
+        :param host:
+        :param port:
+        :return: port
+        '''
+        ready = threading.Event()
+        errors = []
+
+        def run():
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            try:
+                loop.run_until_complete(self.start(host, port))
+            except Exception as exception:
+                errors.append(exception)
+                ready.set()
+                return
+            ready.set()
+            loop.run_forever()
+            loop.run_until_complete(self.stop())
+            loop.close()
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+        ready.wait()
+        if errors:
+            raise errors[0]
+        return self.port
+
+    def stop_thread(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+
+    def submit(self, request):
+        '''
+        Queue a job
+        :param request: SOLVER, INSTANCE, PARAMETERS and TIME_BUDGET_MINUTES
+        :return: Job
+        '''
+        if request.get('SOLVER') not in SOLVERS:
+            raise ServiceError(400, 'Unknown solver {}, use one of {}'.format(request.get('SOLVER'), list(SOLVERS)))
+        if not isinstance(request.get('INSTANCE'), dict):
+            raise ServiceError(400, 'Missing INSTANCE')
+        queued_jobs = sum(job.status == 'queued' for job in self.jobs.values())
+        if queued_jobs >= self.max_queued_jobs:
+            raise ServiceError(429, 'Queue is full with {} jobs'.format(queued_jobs))
+
+        parameters = dict(request.get('PARAMETERS') or {})
+        time_budget_minutes = request.get('TIME_BUDGET_MINUTES', parameters.get('time_budget_minutes'))
+        if time_budget_minutes is None:
+            time_budget_minutes = self.default_time_budget_minutes
+        if self.max_time_budget_minutes is not None and (time_budget_minutes is None or
+                                                         time_budget_minutes > self.max_time_budget_minutes):
+            time_budget_minutes = self.max_time_budget_minutes
+        parameters['time_budget_minutes'] = time_budget_minutes
+        timeout_seconds = None
+        if time_budget_minutes is not None:
+            timeout_seconds = 60.0 * time_budget_minutes + self.job_timeout_grace_seconds
+
+        job = Job({'SOLVER': request['SOLVER'], 'INSTANCE': request['INSTANCE'], 'PARAMETERS': parameters},
+                  timeout_seconds)
+        self.jobs[job.job_id] = job
+        self._queue.put_nowait(job)
+        return job
+
+    def cancel(self, job_id):
+        '''
+        Cancel a job, the worker process of a running job is restarted
+        :param job_id:
+        :return: Job
+        '''
+        job = self.get_job(job_id)
+        if not job.done:
+            job.finish('cancelled')
+        return job
+
+    def get_job(self, job_id):
+        if job_id not in self.jobs:
+            raise ServiceError(404, 'Unknown job {}'.format(job_id))
+        return self.jobs[job_id]
+
+    async def _run_worker(self, worker):
+        while True:
+            job = await self._queue.get()
+            if job.done:
+                # cancelled while queued
+                continue
+
+            job.start()
+            worker.job = job
+            try:
+                worker.connection.send((job.job_id, job.request))
+                await asyncio.wait_for(job.finished_event.wait(), job.timeout_seconds)
+            except asyncio.TimeoutError:
+                job.finish('timeout', error='Job exceeded its time budget by {} seconds'.format(
+                    self.job_timeout_grace_seconds))
+            except (BrokenPipeError, OSError):
+                job.finish('failed', error='Worker process exited')
+            worker.job = None
+
+            if job.status in ('cancelled', 'timeout') or worker.exited:
+                await self.loop.run_in_executor(None, worker.restart)
+
+    def _on_message(self, worker, connection, message):
+        if connection is not worker.connection:
+            # message of a restarted worker
+            return
+
+        kind, job_id, payload = message
+        if kind == 'exited':
+            worker.exited = True
+            if worker.job is not None and not worker.job.done:
+                worker.job.finish('failed', error='Worker process exited')
+            return
+
+        job = self.jobs.get(job_id)
+        if job is None or job.done:
+            return
+        if kind == 'progress':
+            job.add_progress(payload)
+        elif kind == 'done':
+            job.finish('done', result=payload)
+        elif kind == 'failed':
+            job.finish('failed', error=payload)
+
+    def health(self):
+        return {'STATUS': 'ok',
+                'WORKERS': self.workers,
+                'QUEUED_JOBS': sum(job.status == 'queued' for job in self.jobs.values()),
+                'RUNNING_JOBS': sum(job.status == 'running' for job in self.jobs.values())}
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            request_line = (await reader.readline()).decode('latin-1').split()
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                key, value = line.decode('latin-1').split(':', 1)
+                headers[key.strip().lower()] = value.strip()
+            body = await reader.readexactly(int(headers.get('content-length', 0)))
+
+            if len(request_line) < 2:
+                raise ServiceError(400, 'Invalid request')
+            url = urllib.parse.urlsplit(request_line[1])
+            query = dict(urllib.parse.parse_qsl(url.query))
+            await self._route(request_line[0].upper(), url.path.strip('/').split('/'), query, body, writer)
+        except ServiceError as exception:
+            self._respond(writer, exception.status_code, {'ERROR': str(exception)})
+        except Exception as exception:
+            self._respond(writer, 500, {'ERROR': '{}: {}'.format(type(exception).__name__, exception)})
+        finally:
+            try:
+                await writer.drain()
+            except ConnectionError:
+                pass
+            writer.close()
+
+    async def _route(self, method, path, query, body, writer):
+        if path == ['health'] and method == 'GET':
+            self._respond(writer, 200, self.health())
+        elif path == ['jobs'] and method == 'GET':
+            self._respond(writer, 200, [job.to_dict(include_result=False) for job in self.jobs.values()])
+        elif path == ['jobs'] and method == 'POST':
+            try:
+                request = json.loads(body.decode() or '{}')
+            except ValueError:
+                raise ServiceError(400, 'Invalid json')
+            self._respond(writer, 202, self.submit(request).to_dict(include_result=False))
+        elif len(path) == 2 and path[0] == 'jobs' and method == 'GET':
+            self._respond(writer, 200, self.get_job(path[1]).to_dict())
+        elif len(path) == 2 and path[0] == 'jobs' and method == 'DELETE':
+            self._respond(writer, 200, self.cancel(path[1]).to_dict(include_result=False))
+        elif len(path) == 3 and path[0] == 'jobs' and path[2] == 'progress' and method == 'GET':
+            job = self.get_job(path[1])
+            offset = int(query.get('offset', 0))
+            if query.get('stream') in ('1', 'true'):
+                await self._stream_progress(job, offset, writer)
+            else:
+                self._respond(writer, 200, {'STATUS': job.status,
+                                            'PROGRESS': job.progress[offset:],
+                                            'NEXT_OFFSET': len(job.progress)})
+        else:
+            raise ServiceError(404, 'Unknown path /{}'.format('/'.join(path)))
+
+    @staticmethod
+    def _respond(writer, status_code, content):
+        body = json.dumps(content, default=str).encode()
+        writer.write('HTTP/1.1 {} {}\r\nContent-Type: application/json\r\nContent-Length: {}\r\n'
+                     'Connection: close\r\n\r\n'.format(status_code, _REASONS.get(status_code, ''),
+                                                        len(body)).encode())
+        writer.write(body)
+
+    @staticmethod
+    async def _stream_progress(job, offset, writer):
+        # newline delimited json until the job ends, the response ends with the connection
+        writer.write(b'HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\nConnection: close\r\n\r\n')
+        while True:
+            await job.wait_for_progress(offset)
+            for line in job.progress[offset:]:
+                writer.write(json.dumps(line).encode() + b'\n')
+            offset = len(job.progress)
+            await writer.drain()
+            if job.done and offset == len(job.progress):
+                writer.write(json.dumps({'STATUS': job.status}).encode() + b'\n')
+                return
+
+
+class ServiceClient:
+    '''
+    Client of a solve service
+    '''
+
+    def __init__(self, host='127.0.0.1', port=DEFAULT_PORT):
+        self.url = 'http://{}:{}'.format(host, port)
+
+    def _request(self, method, path, content=None):
+        data = None if content is None else json.dumps(content).encode()
+        request = urllib.request.Request(self.url + path, data=data, method=method,
+                                         headers={'Content-Type': 'application/json'})
+        try:
+            with urllib.request.urlopen(request) as response:
+                return json.loads(response.read().decode())
+        except urllib.error.HTTPError as exception:
+            raise Exception('Service error {}: {}'.format(exception.code, exception.read().decode()))
+
+    def submit(self, solver, instance, parameters=None, time_budget_minutes=None):
+        '''
+        Submit a job
+        :param solver: general_model or column_generation
+        :param instance: {"BUNDLED": name}, {"SOLOMON": file} or instance_payload of the input data frames
+        :param parameters: keyword arguments of the solver
+        :param time_budget_minutes:
+        :return: job id
+        '''
+        return self._request('POST', '/jobs', {'SOLVER': solver,
+                                               'INSTANCE': instance,
+                                               'PARAMETERS': parameters or {},
+                                               'TIME_BUDGET_MINUTES': time_budget_minutes})['JOB_ID']
+
+    def status(self, job_id):
+        return self._request('GET', '/jobs/{}'.format(job_id))
+
+    def jobs(self):
+        return self._request('GET', '/jobs')
+
+    def health(self):
+        return self._request('GET', '/health')
+
+    def progress(self, job_id, offset=0):
+        return self._request('GET', '/jobs/{}/progress?offset={}'.format(job_id, offset))
+
+    def stream_progress(self, job_id, offset=0):
+        '''
+        Progress lines as they are produced, the last line has the STATUS of the job
+        :param job_id:
+        :param offset:
+        :return: generator
+        '''
+        url = self.url + '/jobs/{}/progress?offset={}&stream=1'.format(job_id, offset)
+        with urllib.request.urlopen(url) as response:
+            for line in response:
+                yield json.loads(line.decode())
+
+    def cancel(self, job_id):
+        return self._request('DELETE', '/jobs/{}'.format(job_id))
+
+    def wait(self, job_id, poll_seconds=0.2, timeout_seconds=None):
+        '''
+        Poll the job until it ends
+        :param job_id:
+        :param poll_seconds:
+        :param timeout_seconds:
+        :return: job status with its RESULT
+        '''
+        start = time.perf_counter()
+        while True:
+            job = self.status(job_id)
+            if job['STATUS'] in FINISHED_STATUSES:
+                return job
+            if timeout_seconds is not None and time.perf_counter() - start > timeout_seconds:
+                raise Exception('Job {} still {} after {} seconds'.format(job_id, job['STATUS'], timeout_seconds))
+            time.sleep(poll_seconds)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='CVRPTW solve service')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--workers', type=int, default=2, help='number of worker processes')
+    parser.add_argument('--max-queued-jobs', type=int, default=100)
+    parser.add_argument('--default-time-budget', type=float, default=None, help='job time budget in minutes')
+    parser.add_argument('--max-time-budget', type=float, default=None, help='maximum job time budget in minutes')
+    parser.add_argument('--grace-seconds', type=float, default=30,
+                        help='time after the budget before a job is killed')
+    arguments = parser.parse_args(argv)
+
+    service = SolveService(workers=arguments.workers,
+                           max_queued_jobs=arguments.max_queued_jobs,
+                           default_time_budget_minutes=arguments.default_time_budget,
+                           max_time_budget_minutes=arguments.max_time_budget,
+                           job_timeout_grace_seconds=arguments.grace_seconds)
+    loop = asyncio.get_event_loop()
+    loop.run_until_complete(service.start(arguments.host, arguments.port))
+    try:
+        loop.run_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        loop.run_until_complete(service.stop())
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,14 +1,26 @@
 import pandas as pd
+import pulp
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 
 from cvrptw_optimization.src import single_depot_column_generation_pulp_inputs as inputs
 from cvrptw_optimization.src import single_depot_column_generation_pulp_problem_formulation as formulation
+from cvrptw_optimization.src.instrumentation import RunInstrumentation, track_phase
+from cvrptw_optimization.src.route_evaluation import RouteEvaluator
+from cvrptw_optimization.src.column_pool import ColumnPool
+from cvrptw_optimization.src.ng_route_pricing import NgRoutePricing
+from cvrptw_optimization.src.heuristic_pricing import HeuristicPricing
+from cvrptw_optimization.src import cutting_planes as cp
+from cvrptw_optimization.src import input_validation
+from cvrptw_optimization.src.time_budget import TimeBudget
+from cvrptw_optimization.src.route_solution import RouteSolution
 
 
 def initiate_single_depot_column_generation(depots,
                                             customers,
                                             transportation_matrix,
-                                            vehicles
+                                            vehicles,
+                                            instrumentation=None
                                             ):
     '''
     Function to initiate column generation algorithm
@@ -16,14 +28,16 @@ def initiate_single_depot_column_generation(depots,
     :param customers:
     :param transportation_matrix:
     :param vehicles:
+    :param instrumentation:
     :return:
     '''
 
     print('Initiating Single Depot Column Generation Model')
 
     print('Getting model inputs')
-    model_inputs = inputs.ModelInputs(transportation_matrix, customers, depots, vehicles)
-    model_inputs.create_initial_paths()
+    with track_phase(instrumentation, 'model_inputs'):
+        model_inputs = inputs.ModelInputs(transportation_matrix, customers, depots, vehicles)
+        model_inputs.create_initial_paths()
 
     print('Column generation formuation')
     depot_name = model_inputs.depot_names[0]
@@ -82,16 +96,365 @@ def process_paths(master_path, transit_dict, customers_dict, vertices_dict):
     return solution
 
 
+def time_window_schedule(solution, route_evaluator):
+    '''
+    Function to add the service start, lateness and earliness of every stop with soft time windows
+    :param solution: processed paths
+    :param route_evaluator:
+    :return: solution, customers served late or after waiting
+    '''
+    paths = solution.groupby('PATH_NAME', sort=False)['LOCATION_NAME'].apply(list)
+    evaluation = route_evaluator.evaluate(paths.tolist())
+    route_idx = solution['PATH_NAME'].map({path_name: idx for idx, path_name in enumerate(paths.index)}).values
+    positions = solution['STOP_NUMBER'].values - 1
+    solution['START_TIME'] = evaluation.start_time[route_idx, positions]
+    solution['LATENESS'] = np.nan_to_num(evaluation.lateness[route_idx, positions])
+    solution['EARLINESS'] = np.nan_to_num(evaluation.earliness[route_idx, positions])
+
+    violations = route_evaluator.time_window_violations(evaluation, paths.index)
+    print('Time window violations: ', violations[['PATH_NAME', 'LOCATION_NAME', 'LATENESS', 'EARLINESS']].to_dict(
+        'records'))
+    return solution, violations
+
+
+def pricing_lower_bound(price, customers_dict, capacity, fixed_cost=0, vehicle_type_price=0, elementary=True):
+    '''
+    Lower bound on the reduced cost of any path of a vehicle type, assuming non negative transportation costs.
+    The duals a path can collect are bounded by a fractional knapsack over the customers that fit the vehicle
+    :param price: customer duals
+    :param customers_dict:
+    :param capacity: vehicle capacity
+    :param fixed_cost: vehicle fixed cost
+    :param vehicle_type_price: dual of the vehicle type availability constraint
+    :param elementary: False if paths may visit a customer more than once, as ng-routes
+    :return:
+    '''
+    profitable = sorted(((price[customer], float(demand)) for customer, demand in customers_dict['DEMAND'].items()
+                         if price[customer] > 0 and demand <= capacity),
+                        key=lambda item: item[0] / item[1] if item[1] > 0 else float('inf'), reverse=True)
+    collected = 0.0
+    remaining = float(capacity)
+    if not elementary and profitable:
+        # the best ratio customer repeated
+        customer_price, demand = profitable[0]
+        return float(fixed_cost) - float(vehicle_type_price) - (
+            customer_price * remaining / demand if demand > 0 else float('inf'))
+    for customer_price, demand in profitable:
+        if demand <= remaining:
+            collected += customer_price
+            remaining -= demand
+        else:
+            collected += customer_price * remaining / demand
+            break
+    return float(fixed_cost) - float(vehicle_type_price) - collected
+
+
+def pricing_waves(vehicle_types_dict, vehicle_type_price):
+    '''
+    Split vehicle types into two pricing waves. A type is dominated by a type with at least its capacity and at most
+    its fixed cost net of the availability dual, every path of the dominated type is at least as expensive
+    for the dominating type, so the dominated type is only priced once all its dominating types found a column
+    :param vehicle_types_dict:
+    :param vehicle_type_price:
+    :return: types priced first, dominated types with their dominating types
+    '''
+    vehicle_types = list(vehicle_types_dict['CAPACITY'].keys())
+    net_fixed_cost = {vehicle_type: vehicle_types_dict['VEHICLE_FIXED_COST'][vehicle_type] -
+                      vehicle_type_price.get(vehicle_type, 0.0) for vehicle_type in vehicle_types}
+
+    def dominates(first, second):
+        capacity_first = vehicle_types_dict['CAPACITY'][first]
+        capacity_second = vehicle_types_dict['CAPACITY'][second]
+        if capacity_first < capacity_second or net_fixed_cost[first] > net_fixed_cost[second]:
+            return False
+        if capacity_first == capacity_second and net_fixed_cost[first] == net_fixed_cost[second]:
+            # equal types, the first one listed dominates
+            return vehicle_types.index(first) < vehicle_types.index(second)
+        return True
+
+    first_wave = []
+    dominated = {}
+    for vehicle_type in vehicle_types:
+        dominating_types = [other for other in vehicle_types if other != vehicle_type and dominates(other, vehicle_type)]
+        if dominating_types:
+            dominated[vehicle_type] = dominating_types
+        else:
+            first_wave.append(vehicle_type)
+    return first_wave, dominated
+
+
+def solve_pricing(price,
+                  model_formulation,
+                  capacity,
+                  fixed_cost=0,
+                  vehicle_type_price=0,
+                  model_name='PRICING',
+                  cuts=(),
+                  heuristic_pricing=None,
+                  seed_paths=(),
+                  seed=None,
+                  ng_route_pricing=None,
+                  pricing_columns=10,
+                  mip_gap=0.001,
+                  solver_time_limit_minutes=10,
+                  enable_solution_messaging=0,
+                  solver_type='PULP_CBC_CMD',
+                  soft_time_windows=False,
+                  lateness_penalty=1,
+                  earliness_penalty=0,
+                  time_budget=None,
+                  reserve_seconds=0,
+                  instrumentation=None):
+    '''
+    Pricing cascade of a vehicle type, the heuristic stages, ng-route labeling and the sub-problem formulation.
+    The first stage finding columns returns them, ng-route labeling falls back to the sub-problem formulation
+    when the label limit is reached without a column
+    :param price: customer duals
+    :param model_formulation: ModelFormulation with the cut duals of the last master problem
+    :param capacity: vehicle capacity
+    :param fixed_cost: vehicle fixed cost
+    :param vehicle_type_price: dual of the vehicle type availability constraint
+    :param model_name: sub-problem name
+    :param cuts: cuts of the master problem
+    :param heuristic_pricing: HeuristicPricing run first, None prices exactly
+    :param seed_paths: existing columns improved by the heuristic local search
+    :param seed: seed of the randomized heuristic constructions
+    :param ng_route_pricing: NgRoutePricing, None solves the sub-problem formulation
+    :param pricing_columns: maximum number of columns of the heuristic and ng-route pricing
+    :param mip_gap:
+    :param solver_time_limit_minutes:
+    :param enable_solution_messaging:
+    :param solver_type:
+    :param soft_time_windows:
+    :param lateness_penalty:
+    :param earliness_penalty:
+    :param time_budget: TimeBudget limiting the sub-problem solve, None for no limit
+    :param reserve_seconds: seconds of the time budget kept for the final master problem
+    :param instrumentation: RunInstrumentation or None
+    :return: reduced cost, paths, stage, True if the reduced cost is proven to be the smallest one
+    '''
+    if heuristic_pricing is not None:
+        with track_phase(instrumentation, 'heuristic_pricing'):
+            stage, columns = heuristic_pricing.solve(price, capacity, fixed_cost, vehicle_type_price,
+                                                     seed_paths=seed_paths,
+                                                     max_columns=pricing_columns, cuts=cuts,
+                                                     cut_price=model_formulation.cut_price,
+                                                     seed=seed)
+        if stage is not None:
+            return columns[0][0], [path for reduced_cost, path in columns], stage, False
+
+    if ng_route_pricing is not None:
+        with track_phase(instrumentation, 'ng_route_pricing'):
+            columns, truncated = ng_route_pricing.solve(price, capacity, fixed_cost, vehicle_type_price,
+                                                        max_columns=pricing_columns, cuts=cuts,
+                                                        cut_price=model_formulation.cut_price)
+        if columns or not truncated:
+            return min([reduced_cost for reduced_cost, path in columns] + [0]), \
+                [path for reduced_cost, path in columns], 'ng_route', True
+        print('Label limit reached, solving the sub-problem formulation')
+
+    if time_budget is not None:
+        solver_time_limit_minutes = time_budget.solve_minutes(solver_time_limit_minutes, reserve_seconds)
+    try:
+        objective, solution_path, sub_model = model_formulation.formulate_and_solve_subproblem(
+            price,
+            capacity,
+            model_name,
+            lp_file_name=None,
+            bigm=1000000,
+            mip_gap=mip_gap,
+            solver_time_limit_minutes=solver_time_limit_minutes,
+            enable_solution_messaging=enable_solution_messaging,
+            solver_type=solver_type,
+            instrumentation=instrumentation,
+            fixed_cost=fixed_cost,
+            vehicle_type_price=vehicle_type_price,
+            cuts=cuts,
+            soft_time_windows=soft_time_windows,
+            lateness_penalty=lateness_penalty,
+            earliness_penalty=earliness_penalty
+        )
+    except Exception:
+        if time_budget is None or not time_budget.exhausted(reserve_seconds):
+            raise
+        print('Time budget reached before the sub-problem found a path')
+        return 0, [], 'mip', False
+    # a solve stopped by the time limit also reports status 1 with its best path
+    return objective, [solution_path['LOCATION_NAME'].tolist()], 'mip', \
+        sub_model.sol_status == pulp.LpSolutionOptimal
+
+
+def price_vehicle_types(solve, price, first_wave, dominated=None, bound=None, pricing_workers=None,
+                        instrumentation=None):
+    '''
+    Price the vehicle types of the pricing waves, a dominated type is priced once all its dominating types of the
+    first wave found a column with a reduced cost below -1. The types of a wave are priced in parallel, unless the
+    instrumentation profiles its phases since cProfile only sees the calling thread
+    :param solve: function of a vehicle type, the customer duals and a RunInstrumentation or None returning
+    reduced cost, paths, stage and exactness
+    :param price: customer duals
+    :param first_wave: types priced first
+    :param dominated: dominated types with their dominating types
+    :param bound: function of a vehicle type and the customer duals returning a lower bound of its reduced cost,
+    a type whose bound is above -1 is skipped. None prices every type
+    :param pricing_workers: number of vehicle types priced in parallel, defaults to the number of vehicle types
+    :param instrumentation: RunInstrumentation of the pricing when the types are priced one after the other
+    :return: pricing results by vehicle type, skipped vehicle types
+    '''
+    dominated = dominated or {}
+    pricing_results = {}
+    skipped_types = []
+    for wave in (first_wave, list(dominated.keys())):
+        priced_types = []
+        for vehicle_type in wave:
+            improving_dominators = all(pricing_results.get(dominating_type, (0,))[0] <= -1
+                                       for dominating_type in dominated.get(vehicle_type, [])
+                                       if dominating_type in first_wave)
+            if not improving_dominators or (bound is not None and bound(vehicle_type, price) > -1):
+                skipped_types.append(vehicle_type)
+            else:
+                priced_types.append(vehicle_type)
+        if not priced_types:
+            continue
+        profiled = instrumentation is not None and instrumentation.profile_phases is not None
+        if len(priced_types) == 1 or pricing_workers == 1 or profiled:
+            pricing_results.update({vehicle_type: solve(vehicle_type, price, instrumentation)
+                                    for vehicle_type in priced_types})
+            continue
+        # the instrumentation phase stack is not shared between threads
+        workers = len(priced_types) if pricing_workers is None else pricing_workers
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {vehicle_type: executor.submit(solve, vehicle_type, price, None) for vehicle_type in priced_types}
+            pricing_results.update({vehicle_type: future.result() for vehicle_type, future in futures.items()})
+    return pricing_results, skipped_types
+
+
+def add_pricing_columns(pricing_results, column_pool, path_stages, route_evaluator, lateness_penalty=None,
+                        earliness_penalty=0, vehicle_types_dict=None):
+    '''
+    Add the columns of the vehicle types priced below -1 to the column pool
+    :param pricing_results: reduced cost, paths, stage and exactness by vehicle type
+    :param column_pool:
+    :param path_stages: pricing stage by path name, updated with the added columns
+    :param route_evaluator:
+    :param lateness_penalty: soft time window penalty of the column costs, None for hard time windows
+    :param earliness_penalty:
+    :param vehicle_types_dict: vehicle types of a heterogeneous fleet, the column costs include their fixed cost
+    :return: True if a column was added to the pool or changed
+    '''
+    changed = False
+    for vehicle_type, (type_objective, paths, stage, exact) in pricing_results.items():
+        if type_objective > -1:
+            continue
+        fixed_cost = 0 if vehicle_type is None else vehicle_types_dict['VEHICLE_FIXED_COST'][vehicle_type]
+        for path in paths:
+            path_cost = route_evaluator.path_costs({'PATH': path}, lateness_penalty, earliness_penalty)['PATH'] + \
+                fixed_cost
+            path_name, path_changed = column_pool.add(path, path_cost, vehicle_type=vehicle_type)
+            if path_changed:
+                path_stages[path_name] = stage
+            changed = changed or path_changed
+    return changed
+
+
+def separate_cuts(solution_master_path, customers_dict, capacity, cuts, cut_types=('capacity', 'subset_row'),
+                  max_cuts_per_round=10, limited_memory=False):
+    '''
+    Separate cuts on a fractional master solution and add them to the cuts of the master problem
+    :param solution_master_path: master solution
+    :param customers_dict:
+    :param capacity: vehicle capacity of the rounded capacity cuts
+    :param cuts: cuts of the master problem, the new cuts are appended
+    :param cut_types: 'capacity' and or 'subset_row'
+    :param max_cuts_per_round: maximum number of cuts of every type
+    :param limited_memory: subset row cuts with a limited memory, which keeps the labeling of ng-route pricing
+    cheaper. The sub-problem formulation prices the cuts with their memory
+    :return: new cuts
+    '''
+    new_cuts = []
+    if 'capacity' in cut_types:
+        new_cuts += cp.separate_capacity_cuts(solution_master_path,
+                                              customers_dict,
+                                              capacity,
+                                              max_cuts=max_cuts_per_round,
+                                              existing_cuts=cuts)
+    if 'subset_row' in cut_types:
+        new_cuts += cp.separate_subset_row_cuts(solution_master_path,
+                                                customers_dict,
+                                                max_cuts=max_cuts_per_round,
+                                                limited_memory=limited_memory,
+                                                existing_cuts=cuts)
+    for cut in new_cuts:
+        # short row names for the LP files
+        cut.name = 'Cut' + str(len(cuts))
+        cuts.append(cut)
+    return new_cuts
+
+
+def compile_solution(final_solution_master_path, model_inputs, route_evaluator, soft_time_windows=False,
+                     compact_solution=False):
+    '''
+    Function to build the solution of the final master problem paths
+    :param final_solution_master_path:
+    :param model_inputs:
+    :param route_evaluator:
+    :param soft_time_windows: add the START_TIME, LATENESS and EARLINESS of every stop
+    :param compact_solution: return the solution as RouteSolution
+    :return: solution
+    '''
+    if compact_solution:
+        solution = RouteSolution.from_master_path(final_solution_master_path, route_evaluator)
+        if soft_time_windows:
+            evaluation = route_evaluator.evaluate(solution.routes())
+            solution.set_stop_column('START_TIME', evaluation.start_time)
+            solution.set_stop_column('LATENESS', np.nan_to_num(evaluation.lateness))
+            solution.set_stop_column('EARLINESS', np.nan_to_num(evaluation.earliness))
+        return solution
+
+    solution = process_paths(final_solution_master_path,
+                             model_inputs.transit_dict,
+                             model_inputs.customers_dict,
+                             model_inputs.vertices_dict)
+    if soft_time_windows:
+        # the customers served late or after waiting are printed
+        solution = time_window_schedule(solution, route_evaluator)[0]
+    return solution
+
+
 def run_single_depot_column_generation(depots,
                                        customers,
                                        transportation_matrix,
                                        vehicles,
-                                       capacity,
+                                       capacity=None,
                                        mip_gap=0.001,
                                        solver_time_limit_minutes=10,
                                        enable_solution_messaging=0,
                                        solver_type='PULP_CBC_CMD',
-                                       max_iteration=50):
+                                       max_iteration=50,
+                                       instrumentation=None,
+                                       column_max_age=None,
+                                       max_active_columns=None,
+                                       heterogeneous_fleet=False,
+                                       pricing_workers=None,
+                                       pricing='mip',
+                                       ng_neighbourhood_size=8,
+                                       ng_bidirectional=False,
+                                       ng_completion_bounds=True,
+                                       pricing_columns=10,
+                                       cutting_planes=False,
+                                       cut_types=('capacity', 'subset_row'),
+                                       max_cut_rounds=5,
+                                       max_cuts_per_round=10,
+                                       pricing_cascade=False,
+                                       cascade_nearest_neighbours=5,
+                                       soft_time_windows=False,
+                                       lateness_penalty=1,
+                                       earliness_penalty=0,
+                                       validate_inputs=False,
+                                       drop_infeasible_customers=False,
+                                       time_budget_minutes=None,
+                                       final_master_share=0.2,
+                                       compact_solution=False):
 
     '''
     Function to run the column generation algorithm
@@ -99,98 +462,423 @@ def run_single_depot_column_generation(depots,
     :param customers:
     :param transportation_matrix:
     :param vehicles:
-    :param capacity:
+    :param capacity: vehicle capacity, defaults to the largest capacity in vehicles
     :param mip_gap:
     :param solver_time_limit_minutes:
     :param enable_solution_messaging:
     :param solver_type:
     :param max_iteration:
-    :return: solution, algorithm master problem and subproblem objectives
+    :param instrumentation: RunInstrumentation collecting per phase wall time, cpu time and memory, pass one to
+    keep the phase records. If None an internal one only times the iterations reported in the statistics
+    :param column_max_age: retire columns whose reduced cost stayed positive for more iterations, None keeps all
+    :param max_active_columns: maximum number of columns in the master problem, None for no limit
+    :param heterogeneous_fleet: price one sub-problem per vehicle type (distinct CAPACITY and VEHICLE_FIXED_COST),
+    column costs include the vehicle fixed cost and the master limits the paths of each type to its number of vehicles
+    :param pricing_workers: number of vehicle types priced in parallel, defaults to the number of vehicle types. The
+    types are priced one after the other when the instrumentation profiles its phases
+    :param pricing: 'mip' solves the sub-problem formulation, 'ng_route' uses ng-route labeling and falls back to
+    the sub-problem formulation when the label limit is reached without a column
+    :param ng_neighbourhood_size: number of nearest customers a route can not revisit before leaving them
+    :param ng_bidirectional: extend labels from both depot vertices up to the middle of the depot time window
+    :param ng_completion_bounds: prune labels with a capacity bound on the reduced cost to the depot
+    :param pricing_columns: maximum number of columns per vehicle type and iteration for ng_route pricing
+    :param cutting_planes: once column generation converges, separate cuts on the fractional master solution,
+    add them to the master problem and continue pricing with their duals
+    :param cut_types: 'capacity' for rounded capacity cuts, 'subset_row' for subset row cuts over three customers,
+    with ng_route pricing the subset row cuts have a limited memory
+    :param max_cut_rounds: maximum number of separation rounds
+    :param max_cuts_per_round: maximum number of cuts of every type added by a separation round
+    :param pricing_cascade: try greedy construction, local search on the best columns and labeling restricted to
+    the nearest customers before the exact pricing, the stage that produced every column is reported
+    :param cascade_nearest_neighbours: number of nearest customers of the restricted labeling
+    :param soft_time_windows: customers may be served late, column costs include lateness_penalty per minute of
+    lateness and earliness_penalty per minute of waiting, the solution reports the START_TIME, LATENESS and
+    EARLINESS of every stop. The depot time windows stay hard and the heuristic pricing stages only build routes
+    within the time windows
+    :param lateness_penalty: cost per minute of lateness
+    :param earliness_penalty: cost per minute of waiting for a customer time window start
+    :param validate_inputs: check the inputs before solving and raise with a diagnostic report when a customer can
+    not be served
+    :param drop_infeasible_customers: with validate_inputs, drop the customers no vehicle can serve and solve the rest
+    :param time_budget_minutes: wall clock budget of the whole run, every solve is limited to the budget left and
+    column generation stops when the next iteration would not fit. The best integer solution found so far is
+    returned if the final master problem finds none in time
+    :param final_master_share: share of the time budget reserved for the final master problem, at least three times
+    the longest master problem solve
+    :param compact_solution: return the solution as RouteSolution, built from the paths without the per stop table,
+    RouteSolution.to_dataframe gives the solution table
+    :return: solution, algorithm master problem and subproblem objectives with per iteration timings and the
+    DROPPED_CUSTOMERS of the input validation
     '''
 
+    if instrumentation is None:
+        instrumentation = RunInstrumentation()
+
+    time_budget = TimeBudget(time_budget_minutes) if time_budget_minutes is not None else None
+
+    if pricing not in ('mip', 'ng_route'):
+        raise Exception('Unknown pricing {}'.format(pricing))
+
+    for cut_type in cut_types:
+        if cut_type not in ('capacity', 'subset_row'):
+            raise Exception('Unknown cut type {}'.format(cut_type))
+
+    if capacity is None:
+        capacity = vehicles['CAPACITY'].max()
+
+    dropped_customers = []
+    if validate_inputs:
+        # only the vehicle types of a heterogeneous fleet limit the number of paths
+        with track_phase(instrumentation, 'input_validation'):
+            customers, transportation_matrix, diagnostics = input_validation.validate_inputs(
+                depots,
+                customers,
+                transportation_matrix,
+                vehicles,
+                drop_infeasible_customers=drop_infeasible_customers,
+                capacity=capacity,
+                soft_time_windows=soft_time_windows,
+                fleet_limit=heterogeneous_fleet)
+        dropped_customers = diagnostics.offending_customers
+
     model_inputs, model_formulation = initiate_single_depot_column_generation(depots,
                                                                               customers,
                                                                               transportation_matrix,
-                                                                              vehicles)
-
-    paths_dict = model_inputs.paths_dict.copy()
-
+                                                                              vehicles,
+                                                                              instrumentation)
+
+    route_evaluator = RouteEvaluator.from_model_inputs(model_inputs)
+    column_pool = ColumnPool(list(model_inputs.customers_dict['DEMAND'].keys()),
+                             max_age=column_max_age,
+                             max_active_columns=max_active_columns)
+    # the soft time window penalty is part of the column costs
+    column_lateness_penalty = lateness_penalty if soft_time_windows else None
+    initial_paths_cost_dict = route_evaluator.path_costs(model_inputs.paths_dict, column_lateness_penalty,
+                                                         earliness_penalty)
+
+    ng_route_pricing = None
+    if pricing == 'ng_route':
+        ng_route_pricing = NgRoutePricing(route_evaluator,
+                                          neighbourhood_size=ng_neighbourhood_size,
+                                          bidirectional=ng_bidirectional,
+                                          completion_bounds=ng_completion_bounds,
+                                          lateness_penalty=column_lateness_penalty,
+                                          earliness_penalty=earliness_penalty)
+
+    heuristic_pricing = None
+    if pricing_cascade:
+        heuristic_pricing = HeuristicPricing(route_evaluator,
+                                             nearest_neighbours=cascade_nearest_neighbours,
+                                             neighbourhood_size=ng_neighbourhood_size,
+                                             lateness_penalty=column_lateness_penalty,
+                                             earliness_penalty=earliness_penalty)
+    exact_stage = 'ng_route' if ng_route_pricing is not None else 'mip'
+
+    if heterogeneous_fleet:
+        vehicle_types_dict = model_inputs.vehicle_types_dict
+        vehicle_types = list(vehicle_types_dict['CAPACITY'].keys())
+        print('Vehicle types: ', model_inputs.vehicle_types.to_dict('records'))
+        # the single customer paths are untyped artificial columns with a penalty above any solution of
+        # single customer paths, they keep the master feasible whatever the number of vehicles
+        artificial_cost = sum(initial_paths_cost_dict.values()) + \
+            len(initial_paths_cost_dict) * max(vehicle_types_dict['VEHICLE_FIXED_COST'].values())
+        for path_name in initial_paths_cost_dict.keys():
+            initial_paths_cost_dict[path_name] += artificial_cost
+        # the knapsack bound assumes non negative costs
+        skip_by_bound = min(model_inputs.transit_dict['TRANSPORTATION_COST'].values()) >= 0
+    else:
+        vehicle_types_dict = None
+        vehicle_types = [None]
+        skip_by_bound = False
+
+    path_stages = {}
+    for path_name, path in model_inputs.paths_dict.items():
+        column_pool.add(path, initial_paths_cost_dict[path_name], path_name, protected=True)
+        path_stages[path_name] = 'initial'
+
+    # best integer solution, the single customer paths until a master solution is integral
+    incumbent = pd.DataFrame({'PATH_NAME': list(model_inputs.paths_dict.keys()),
+                              'VALUE': 1.0,
+                              'PATH': list(model_inputs.paths_dict.values())})
+    if heterogeneous_fleet:
+        incumbent['VEHICLE_TYPE'] = None
+    incumbent['OBJECTIVE'] = sum(initial_paths_cost_dict.values())
+    longest_master_seconds = 0
+
+    def solve_minutes(reserve=True):
+        if time_budget is None:
+            return solver_time_limit_minutes
+        return time_budget.solve_minutes(solver_time_limit_minutes, final_reserve_seconds() if reserve else 0)
+
+    def final_reserve_seconds():
+        return max(final_master_share * time_budget.seconds, 3 * longest_master_seconds)
+
+    def vehicle_type_parameters(vehicle_type):
+        if vehicle_type is None:
+            return capacity, 0, 0
+        return (vehicle_types_dict['CAPACITY'][vehicle_type],
+                vehicle_types_dict['VEHICLE_FIXED_COST'][vehicle_type],
+                model_formulation.vehicle_type_price.get(vehicle_type, 0.0))
+
+    def seed_paths(vehicle_type):
+        # the columns of the vehicle type with the smallest reduced costs
+        path_names = sorted((path_name for path_name, path_type in column_pool.types.items()
+                             if path_type == vehicle_type),
+                            key=lambda path_name: column_pool.reduced_costs.get(path_name, 0.0))
+        return [column_pool.paths[path_name] for path_name in path_names[:pricing_columns]]
+
+    def solve_vehicle_type(vehicle_type, price, pricing_instrumentation):
+        type_capacity, fixed_cost, vehicle_type_price = vehicle_type_parameters(vehicle_type)
+        heuristic = heuristic_pricing is not None and not exact_pricing_only
+        return solve_pricing(price,
+                             model_formulation,
+                             type_capacity,
+                             fixed_cost=fixed_cost,
+                             vehicle_type_price=vehicle_type_price,
+                             model_name='PRICING' if vehicle_type is None else vehicle_type,
+                             cuts=cuts,
+                             heuristic_pricing=heuristic_pricing if heuristic else None,
+                             seed_paths=seed_paths(vehicle_type) if heuristic else (),
+                             # one seed per iteration and vehicle type, the vehicle types may be priced in parallel
+                             seed=iteration * len(vehicle_types) + vehicle_types.index(vehicle_type),
+                             ng_route_pricing=ng_route_pricing,
+                             pricing_columns=pricing_columns,
+                             mip_gap=mip_gap,
+                             solver_time_limit_minutes=solver_time_limit_minutes,
+                             enable_solution_messaging=enable_solution_messaging,
+                             solver_type=solver_type,
+                             soft_time_windows=soft_time_windows,
+                             lateness_penalty=lateness_penalty,
+                             earliness_penalty=earliness_penalty,
+                             time_budget=time_budget,
+                             reserve_seconds=final_reserve_seconds() if time_budget is not None else 0,
+                             instrumentation=pricing_instrumentation)
+
+    def bound_vehicle_type(vehicle_type, price):
+        return pricing_lower_bound(price, model_inputs.customers_dict, *vehicle_type_parameters(vehicle_type),
+                                   elementary=ng_route_pricing is None)
+
+    exact_pricing_only = False
+    cuts = []
+    cut_round = 0
+    root_bound = None
     iteration = 0
     solution_statistics = []
     while True:
 
         print("Column Generation Iteration: ", iteration)
+        iteration_start_seconds = time_budget.elapsed_seconds() if time_budget is not None else 0
+        with instrumentation.phase('iteration', ITERATION=iteration) as iteration_phase:
+            # solve master problem
+            print('Solving master problem')
+            with instrumentation.phase('path_costs'):
+                column_pool.enforce_limit()
+                paths_dict = column_pool.paths_dict()
+                paths_cost_dict = column_pool.paths_cost_dict()
+                paths_customers_dict = column_pool.paths_customers_dict()
+                paths_type_dict = column_pool.paths_type_dict() if heterogeneous_fleet else None
+
+            model_name = str(iteration) + 'MASP'
+            with instrumentation.phase('master_problem') as master_phase:
+                price, solution_master_model_objective, solution_master_path = model_formulation.formulate_and_solve_master_problem(
+                    paths_dict,
+                    paths_cost_dict,
+                    paths_customers_dict,
+                    binary_model=False,
+                    lp_file_name=None,
+                    mip_gap=mip_gap,
+                    solver_time_limit_minutes=solve_minutes(),
+                    enable_solution_messaging=enable_solution_messaging,
+                    solver_type=solver_type,
+                    instrumentation=instrumentation,
+                    paths_type_dict=paths_type_dict,
+                    vehicle_types_dict=vehicle_types_dict,
+                    cuts=cuts
+                )
+
+            longest_master_seconds = max(longest_master_seconds, master_phase.record['WALL_SECONDS'])
+            if (solution_master_path['VALUE'] > 1 - 0.000001).all() and \
+                    solution_master_model_objective < incumbent['OBJECTIVE'].iloc[0] - 0.000001:
+                print('Integral master solution, new incumbent')
+                incumbent = solution_master_path.copy()
+
+            print("Dual values: ", price)
+            if heterogeneous_fleet:
+                print("Vehicle type dual values: ", model_formulation.vehicle_type_price)
+            if cuts:
+                print("Cut dual values: ", model_formulation.cut_price)
+            with instrumentation.phase('column_pool'):
+                column_pool.update(price, solution_master_path['PATH_NAME'], model_formulation.vehicle_type_price)
+
+            if ng_route_pricing is not None:
+                # columns with cycles in the master solution enlarge the ng neighbourhoods
+                for path in solution_master_path['PATH']:
+                    ng_route_pricing.augment_neighbourhoods(path)
+
+            # solve sub-problems
+            print('Solving sub-problem')
+            model_name = str(iteration) + 'SUBP'
+            with instrumentation.phase('sub_problem') as sub_phase:
+                if heterogeneous_fleet:
+                    first_wave, dominated = pricing_waves(vehicle_types_dict, model_formulation.vehicle_type_price)
+                else:
+                    first_wave, dominated = vehicle_types, {}
+                pricing_results, skipped_types = price_vehicle_types(
+                    solve_vehicle_type,
+                    price,
+                    first_wave,
+                    dominated,
+                    # the knapsack bound ignores the cut duals
+                    bound=bound_vehicle_type if skip_by_bound and not cuts else None,
+                    pricing_workers=pricing_workers,
+                    instrumentation=instrumentation)
+
+            if skipped_types:
+                print("Skipped vehicle types: ", skipped_types)
+            solution_objective = min([result[0] for result in pricing_results.values()]) if pricing_results else 0
+
+            print("Master LP problem objective value: ", solution_master_model_objective)
+            print("Sub-problem Objective value: ", solution_objective)
+
+            pricing_stages = [stage for stage in ('greedy', 'local_search', 'restricted_labeling', exact_stage)
+                              if stage in [result[2] for result in pricing_results.values()]]
+            if heuristic_pricing is not None:
+                print("Pricing stages: ", pricing_stages)
+
+            # check if
+            stop = (solution_objective > -1) or iteration == max_iteration
+            heuristic_columns = any(stage in HeuristicPricing.stages for stage in pricing_stages)
+            exact_pricing_only = False
+            if not stop:
+                changed = add_pricing_columns(pricing_results, column_pool, path_stages, route_evaluator,
+                                              lateness_penalty=column_lateness_penalty,
+                                              earliness_penalty=earliness_penalty,
+                                              vehicle_types_dict=vehicle_types_dict)
+                if not changed and heuristic_columns:
+                    # the heuristic columns are in the pool, the next iteration prices exactly
+                    print('Heuristic path is already in the column pool')
+                    exact_pricing_only = True
+                elif not changed:
+                    # pricing returned columns of the pool, the master duals can not be improved
+                    print('Sub-problem path is already in the column pool')
+                    stop = True
+
+            separation_seconds = 0
+            if stop and cutting_planes and iteration < max_iteration and cut_round < max_cut_rounds:
+                # column generation converged, the master objective is a lower bound
+                if root_bound is None:
+                    root_bound = solution_master_model_objective
+                print('Separating cuts')
+                with instrumentation.phase('cut_separation') as separation_phase:
+                    new_cuts = separate_cuts(solution_master_path,
+                                             model_inputs.customers_dict,
+                                             capacity,
+                                             cuts,
+                                             cut_types=cut_types,
+                                             max_cuts_per_round=max_cuts_per_round,
+                                             limited_memory=ng_route_pricing is not None)
+                separation_seconds = separation_phase.record['WALL_SECONDS']
+                if new_cuts:
+                    print('Adding cuts: ', [sorted(cut.customers) for cut in new_cuts])
+                    cut_round += 1
+                    stop = False
+
+            if not stop and time_budget is not None and \
+                    not time_budget.allows(time_budget.elapsed_seconds() - iteration_start_seconds,
+                                           final_reserve_seconds()):
+                # the next iteration is expected to take as long as this one
+                print('Time budget reached, stopping column generation')
+                stop = True
 
-        # solve master problem
-        print('Solving master problem')
-        paths_cost_dict = model_inputs.calculate_path_costs(paths_dict, model_inputs.transit_dict)
-        paths_customers_dict = model_inputs.calculate_path_customer_allocation(paths_dict, list(
-            model_inputs.customers_dict['DEMAND'].keys()))
-
-        model_name = str(iteration) + 'MASP'
-        price, solution_master_model_objective, solution_master_path = model_formulation.formulate_and_solve_master_problem(
-            paths_dict,
-            paths_cost_dict,
-            paths_customers_dict,
-            binary_model=False,
-            lp_file_name=None,
-            mip_gap=mip_gap,
-            solver_time_limit_minutes=solver_time_limit_minutes,
-            enable_solution_messaging=enable_solution_messaging,
-            solver_type=solver_type
-        )
-
-        print("Dual values: ", price)
-
-        # solve sub-problem
-        print('Solving sub-problem')
-        path_name = 'PATH ' + str(len(paths_dict))
-        model_name = str(iteration) + 'SUBP'
-        solution_objective, solution_path, sub_model = model_formulation.formulate_and_solve_subproblem(price,
-                                                                                                        capacity,
-                                                                                                        path_name,
-                                                                                                        lp_file_name=None,
-                                                                                                        bigm=1000000,
-                                                                                                        mip_gap=mip_gap,
-                                                                                                        solver_time_limit_minutes=solver_time_limit_minutes,
-                                                                                                        enable_solution_messaging=enable_solution_messaging,
-                                                                                                        solver_type=solver_type
-                                                                                                        )
-
-        print("Master LP problem objective value: ", solution_master_model_objective)
-        print("Sub-problem Objective value: ", solution_objective)
         solution_statistics.append({'ITERATION': iteration,
                                     'MASTER_PROBLEM_OBJECTIVE': solution_master_model_objective,
-                                    'SUB_PROBLEM_OBJECTIVE': solution_objective})
-
-        # check if
-        if (solution_objective > -1) or iteration == max_iteration:
+                                    'SUB_PROBLEM_OBJECTIVE': solution_objective,
+                                    'NUMBER_OF_PATHS': column_pool.number_of_added,
+                                    'NUMBER_OF_ACTIVE_PATHS': len(paths_dict),
+                                    'RETIRED_PATHS': column_pool.number_of_retired,
+                                    'DUPLICATE_PATHS': column_pool.number_of_duplicates,
+                                    'PRICED_VEHICLE_TYPES': len(pricing_results),
+                                    'SKIPPED_VEHICLE_TYPES': len(skipped_types),
+                                    'PRICING_STAGE': ','.join(pricing_stages),
+                                    'EXACT_PRICING': all(result[3] for result in pricing_results.values()),
+                                    'NG_AUGMENTATIONS': 0 if ng_route_pricing is None
+                                    else ng_route_pricing.number_of_augmentations,
+                                    'CUTS': len(cuts),
+                                    'CAPACITY_CUTS': sum(isinstance(cut, cp.CapacityCut) for cut in cuts),
+                                    'SUBSET_ROW_CUTS': sum(isinstance(cut, cp.SubsetRowCut) for cut in cuts),
+                                    'SEPARATION_SECONDS': separation_seconds,
+                                    'BOUND_IMPROVEMENT': 0 if root_bound is None
+                                    else solution_master_model_objective - root_bound,
+                                    'INCUMBENT_OBJECTIVE': incumbent['OBJECTIVE'].iloc[0],
+                                    'BUDGET_REMAINING_SECONDS': None if time_budget is None
+                                    else time_budget.remaining_seconds(),
+                                    'ITERATION_WALL_SECONDS': iteration_phase.record['WALL_SECONDS'],
+                                    'MASTER_PROBLEM_WALL_SECONDS': master_phase.record['WALL_SECONDS'],
+                                    'MASTER_PROBLEM_CPU_SECONDS': master_phase.record['CPU_SECONDS'],
+                                    'MASTER_PROBLEM_SOLVER_CPU_SECONDS': master_phase.record['SOLVER_CPU_SECONDS'],
+                                    'SUB_PROBLEM_WALL_SECONDS': sub_phase.record['WALL_SECONDS'],
+                                    'SUB_PROBLEM_CPU_SECONDS': sub_phase.record['CPU_SECONDS'],
+                                    'SUB_PROBLEM_SOLVER_CPU_SECONDS': sub_phase.record['SOLVER_CPU_SECONDS'],
+                                    'PEAK_MEMORY_MB': iteration_phase.record['PEAK_MEMORY_MB'],
+                                    'MAX_RSS_MB': iteration_phase.record['MAX_RSS_MB'],
+                                    'DROPPED_CUSTOMERS': dropped_customers})
+
+        if stop:
             break
-        else:
-            paths_dict[path_name] = solution_path['LOCATION_NAME'].tolist()
 
         iteration += 1
 
     # Setup all variables to integers and solve the master problem
     print("Setup all variables to integers and solve the master problem")
-    final_price, final_solution_master_model_objective, final_solution_master_path = model_formulation.formulate_and_solve_master_problem(
-        paths_dict,
-        paths_cost_dict,
-        paths_customers_dict,
-        binary_model=True,
-        lp_file_name=None,
-        mip_gap=mip_gap,
-        solver_time_limit_minutes=solver_time_limit_minutes,
-        enable_solution_messaging=enable_solution_messaging,
-        solver_type=solver_type
-    )
+    paths_dict = column_pool.paths_dict()
+    paths_cost_dict = column_pool.paths_cost_dict()
+    paths_customers_dict = column_pool.paths_customers_dict()
+    paths_type_dict = column_pool.paths_type_dict() if heterogeneous_fleet else None
+    with instrumentation.phase('final_master_problem'):
+        try:
+            final_price, final_solution_master_model_objective, final_solution_master_path = model_formulation.formulate_and_solve_master_problem(
+                paths_dict,
+                paths_cost_dict,
+                paths_customers_dict,
+                binary_model=True,
+                lp_file_name=None,
+                mip_gap=mip_gap,
+                solver_time_limit_minutes=solve_minutes(reserve=False),
+                enable_solution_messaging=enable_solution_messaging,
+                solver_type=solver_type,
+                instrumentation=instrumentation,
+                paths_type_dict=paths_type_dict,
+                vehicle_types_dict=vehicle_types_dict,
+                cuts=cuts
+            )
+        except Exception:
+            if time_budget is None:
+                raise
+            print('Time budget reached before the master problem found an integer solution')
+            final_solution_master_model_objective = None
+
+    if final_solution_master_model_objective is None or \
+            final_solution_master_model_objective > incumbent['OBJECTIVE'].iloc[0] + 0.000001:
+        print('Returning the incumbent')
+        final_solution_master_model_objective = incumbent['OBJECTIVE'].iloc[0]
+        final_solution_master_path = incumbent
 
     print("Master Binary problem objective value: ", final_solution_master_model_objective)
 
+    if heuristic_pricing is not None:
+        final_solution_master_path['PRICING_STAGE'] = final_solution_master_path['PATH_NAME'].map(path_stages)
+
+    if heterogeneous_fleet:
+        if final_solution_master_path['VEHICLE_TYPE'].isnull().any():
+            print('Warning: the solution uses artificial single customer paths, the fleet can not serve all customers')
+        final_solution_master_path['VEHICLE_CAPACITY'] = final_solution_master_path['VEHICLE_TYPE'].map(
+            vehicle_types_dict['CAPACITY'])
+        final_solution_master_path['VEHICLE_FIXED_COST'] = final_solution_master_path['VEHICLE_TYPE'].map(
+            vehicle_types_dict['VEHICLE_FIXED_COST'])
+
     print("Compiling solution")
-    solution = process_paths(final_solution_master_path,
-                             model_inputs.transit_dict,
-                             model_inputs.customers_dict,
-                             model_inputs.vertices_dict)
+    with instrumentation.phase('process_paths'):
+        solution = compile_solution(final_solution_master_path, model_inputs, route_evaluator,
+                                    soft_time_windows=soft_time_windows, compact_solution=compact_solution)
 
     return solution, solution_statistics
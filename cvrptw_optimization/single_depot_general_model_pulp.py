@@ -1,5 +1,12 @@
+import os
+
 from cvrptw_optimization.src import single_depot_general_model_pulp_inputs as inputs
 from cvrptw_optimization.src import single_depot_general_model_pulp_formulation as formulation
+from cvrptw_optimization.src.instrumentation import track_phase
+from cvrptw_optimization.src import input_validation
+from cvrptw_optimization.src.time_budget import TimeBudget
+from cvrptw_optimization.src import model_cache
+from cvrptw_optimization.src.route_solution import RouteSolution
 
 
 def run_single_depot_general_model(depots,
@@ -10,7 +17,21 @@ def run_single_depot_general_model(depots,
                                    mip_gap=0.001,
                                    solver_time_limit_minutes=10,
                                    enable_solution_messaging=1,
-                                   solver_type='PULP_CBC_CMD'
+                                   solver_type='PULP_CBC_CMD',
+                                   instrumentation=None,
+                                   optional_vehicles=False,
+                                   fleet_objective='weighted',
+                                   fleet_size_weight=0,
+                                   valid_inequalities=True,
+                                   soft_time_windows=False,
+                                   lateness_penalty=1,
+                                   earliness_penalty=0,
+                                   validate_inputs=False,
+                                   drop_infeasible_customers=False,
+                                   time_budget_minutes=None,
+                                   model_cache_dir=None,
+                                   compact_solution=False,
+                                   capacity_formulation='arc'
                                    ):
     '''
     Run single depot general model
@@ -23,12 +44,51 @@ def run_single_depot_general_model(depots,
     :param solver_time_limit_minutes:
     :param enable_solution_messaging:
     :param solver_type:
-    :return:
+    :param instrumentation: RunInstrumentation collecting per phase wall time, cpu time and memory, pass one to
+    keep the phase records. If None the phases are not timed
+    :param optional_vehicles: if True only the needed vehicles are used and each pays its VEHICLE_FIXED_COST,
+    otherwise every vehicle in vehicles serves at least one customer
+    :param fleet_objective: 'weighted' or 'hierarchical' (fewest vehicles first, then cost, the time limit applies
+    to each stage)
+    :param fleet_size_weight: cost of every used vehicle in the weighted objective
+    :param valid_inequalities: add vehicle count, capacity cover, vehicle use, arc elimination and symmetry breaking
+    constraints
+    :param soft_time_windows: customers may be served late at lateness_penalty per minute, the solution reports the
+    LATENESS and EARLINESS of every stop, the depot time windows stay hard
+    :param lateness_penalty: cost per minute of lateness
+    :param earliness_penalty: cost per minute of waiting for a customer time window start
+    :param validate_inputs: check the inputs before solving and raise with a diagnostic report when a customer or
+    the fleet can not be served
+    :param drop_infeasible_customers: with validate_inputs, drop the customers no vehicle can serve and solve the rest
+    :param time_budget_minutes: wall clock budget of the whole run, the solver gets the budget left after building
+    the model and returns its best solution when the budget runs out. The objective is None if it found none
+    :param model_cache_dir: directory of formulated models, a model is written as compressed MPS the first time an
+    instance is solved with the same parameters and loaded instead of formulated afterwards. The hierarchical fleet
+    objective is not cached
+    :param compact_solution: return the solution path as RouteSolution
+    :param capacity_formulation: 'arc' or 'node', node adds the customer visits of every vehicle so its capacity
+    constraint has one term per customer and the model has fewer non-zeros
+    :return: objective, solution path with the DROPPED_CUSTOMERS of the input validation in its attrs
     '''
     print('Running Single Depot General Model')
+    time_budget = TimeBudget(time_budget_minutes) if time_budget_minutes is not None else None
+
+    dropped_customers = []
+    if validate_inputs:
+        with track_phase(instrumentation, 'input_validation'):
+            customers, transportation_matrix, diagnostics = input_validation.validate_inputs(
+                depots,
+                customers,
+                transportation_matrix,
+                vehicles,
+                drop_infeasible_customers=drop_infeasible_customers,
+                soft_time_windows=soft_time_windows,
+                every_vehicle_used=not optional_vehicles)
+        dropped_customers = diagnostics.offending_customers
 
     print('Getting model inputs')
-    model_inputs = inputs.ModelInputs(transportation_matrix, customers, depots, vehicles)
+    with track_phase(instrumentation, 'model_inputs'):
+        model_inputs = inputs.ModelInputs(transportation_matrix, customers, depots, vehicles)
 
     print('Model')
     model = formulation.ModelFormulation(model_inputs.time_variables_dict,
@@ -40,16 +100,53 @@ def run_single_depot_general_model(depots,
                                          model_inputs.transit_starting_customers_dict,
                                          depots['LOCATION_NAME'].iloc[0]
                                          )
-    print('Formulating the problem')
-    model.formulate_problem(bigm)
+    formulation_parameters = {'bigm': bigm,
+                              'optional_vehicles': optional_vehicles,
+                              'fleet_objective': fleet_objective,
+                              'fleet_size_weight': fleet_size_weight,
+                              'valid_inequalities': valid_inequalities,
+                              'soft_time_windows': soft_time_windows,
+                              'lateness_penalty': lateness_penalty,
+                              'earliness_penalty': earliness_penalty,
+                              'capacity_formulation': capacity_formulation}
+
+    cache_directory = None
+    if model_cache_dir is not None:
+        if optional_vehicles and fleet_objective == 'hierarchical':
+            print('Models with the hierarchical fleet objective are not cached')
+        else:
+            cache_directory = os.path.join(model_cache_dir, model_cache.model_key(depots,
+                                                                                  customers,
+                                                                                  transportation_matrix,
+                                                                                  vehicles,
+                                                                                  **formulation_parameters))
+
+    if cache_directory is not None and model_cache.ModelExport.exists(cache_directory):
+        print('Loading the formulated model from {}'.format(cache_directory))
+        with track_phase(instrumentation, 'load_model'):
+            model.load_model(cache_directory)
+    else:
+        print('Formulating the problem')
+        with track_phase(instrumentation, 'formulate_problem'):
+            model.formulate_problem(**formulation_parameters)
+
+        if cache_directory is not None:
+            print('Exporting the model to {}'.format(cache_directory))
+            with track_phase(instrumentation, 'export_model'):
+                model.export_model(cache_directory, formulation_parameters)
 
     print('Solving the model')
-    model.solve_model(mip_gap,
-                      solver_time_limit_minutes,
-                      enable_solution_messaging,
-                      solver_type)
+    with track_phase(instrumentation, 'solve_model'):
+        model.solve_model(mip_gap,
+                          solver_time_limit_minutes,
+                          enable_solution_messaging,
+                          solver_type,
+                          time_budget=time_budget)
 
     print('Getting model results')
-    model.get_model_solution()
+    with track_phase(instrumentation, 'get_model_solution'):
+        model.get_model_solution(time_budget=time_budget)
 
-    return model.solution_objective, model.solution_path
+    solution_path = RouteSolution.from_dataframe(model.solution_path) if compact_solution else model.solution_path
+    solution_path.attrs['DROPPED_CUSTOMERS'] = dropped_customers
+    return model.solution_objective, solution_path
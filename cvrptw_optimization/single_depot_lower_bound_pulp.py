@@ -0,0 +1,216 @@
+import time
+import pulp
+
+from cvrptw_optimization.single_depot_column_generation_pulp import initiate_single_depot_column_generation
+from cvrptw_optimization.src.instrumentation import RunInstrumentation, track_phase
+from cvrptw_optimization.src.route_evaluation import RouteEvaluator
+from cvrptw_optimization.src.column_pool import ColumnPool
+from cvrptw_optimization.src.ng_route_pricing import NgRoutePricing
+from cvrptw_optimization.src.time_budget import TimeBudget
+from cvrptw_optimization.src import lower_bounds as lb
+
+
+def run_single_depot_lower_bound(depots,
+                                 customers,
+                                 transportation_matrix,
+                                 vehicles,
+                                 plan=None,
+                                 capacity=None,
+                                 max_routes=None,
+                                 bound_gap=0.005,
+                                 target_gap=None,
+                                 trivial_only=False,
+                                 max_iteration=200,
+                                 ng_neighbourhood_size=8,
+                                 pricing_columns=10,
+                                 solver_time_limit_minutes=10,
+                                 enable_solution_messaging=0,
+                                 solver_type='PULP_CBC_CMD',
+                                 time_budget_minutes=None,
+                                 instrumentation=None):
+    '''
+    Function to bound the transportation cost of an instance without solving it, e.g. to measure the gap of a plan.
+    The trivial capacity and time bound is computed first. Column generation then solves the root relaxation with
+    ng-route pricing, every exact pricing gives a Lagrangian bound and the master objective is the bound once no
+    column has a negative reduced cost. The run stops early once the Lagrangian bound is within bound_gap of the
+    master objective, the plan is within target_gap of the bound or the time budget is used, and returns the best
+    bound found. The bound holds for plans without vehicle fixed costs and with at most max_routes routes
+    :param depots:
+    :param customers:
+    :param transportation_matrix:
+    :param vehicles:
+    :param plan: plan to measure, a solver output table, RouteSolution or list of routes
+    :param capacity: vehicle capacity, defaults to the largest capacity in vehicles
+    :param max_routes: number of routes a plan has at most, defaults to the number of customers. The number of
+    vehicles tightens the Lagrangian bounds of plans using each vehicle once
+    :param bound_gap: relative gap between the Lagrangian bound and the master objective that stops the run
+    :param target_gap: relative gap of the plan to the bound that stops the run, None to bound to the end
+    :param trivial_only: only compute the trivial bound
+    :param max_iteration:
+    :param ng_neighbourhood_size: number of nearest customers a route can not revisit before leaving them
+    :param pricing_columns: maximum number of columns per iteration
+    :param solver_time_limit_minutes:
+    :param enable_solution_messaging:
+    :param solver_type:
+    :param time_budget_minutes: wall clock budget of the run, None for no limit
+    :param instrumentation: RunInstrumentation collecting per phase wall time, cpu time and memory, pass one to
+    keep the phase records. If None an internal one only times the iterations reported in the statistics
+    :return: bound with LOWER_BOUND, BOUND_TYPE (trivial, lagrangian or column_generation) and the GAP of the plan,
+    per iteration statistics
+    '''
+    start_time = time.perf_counter()
+    if instrumentation is None:
+        instrumentation = RunInstrumentation()
+    time_budget = TimeBudget(time_budget_minutes) if time_budget_minutes is not None else None
+
+    if capacity is None:
+        capacity = vehicles['CAPACITY'].max()
+
+    model_inputs, model_formulation = initiate_single_depot_column_generation(depots,
+                                                                              customers,
+                                                                              transportation_matrix,
+                                                                              vehicles,
+                                                                              instrumentation)
+    route_evaluator = RouteEvaluator.from_model_inputs(model_inputs)
+    customer_names = list(model_inputs.customers_dict['DEMAND'].keys())
+    if max_routes is None:
+        max_routes = len(customer_names)
+
+    with track_phase(instrumentation, 'trivial_bound'):
+        trivial_bound = lb.trivial_lower_bound(route_evaluator, capacity)
+    print('Trivial lower bound: ', trivial_bound)
+
+    bound = {'LOWER_BOUND': trivial_bound['BOUND'],
+             'BOUND_TYPE': 'trivial',
+             'TRIVIAL_BOUND': trivial_bound['BOUND'],
+             'MINIMUM_ROUTES': trivial_bound['MINIMUM_ROUTES'],
+             'LAGRANGIAN_BOUND': None,
+             'MASTER_PROBLEM_OBJECTIVE': None,
+             'CONVERGED': False,
+             'ITERATIONS': 0,
+             'PLAN_COST': None,
+             'PLAN_FEASIBLE': None,
+             'GAP': None}
+
+    if plan is not None:
+        with track_phase(instrumentation, 'plan_cost'):
+            plan_evaluation = lb.plan_cost(lb.plan_routes(plan, model_inputs.depot_names[0]), route_evaluator,
+                                           capacity)
+        bound['PLAN_COST'] = plan_evaluation['COST']
+        bound['PLAN_FEASIBLE'] = plan_evaluation['FEASIBLE']
+        if not plan_evaluation['FEASIBLE']:
+            print('Warning: the plan misses customers or violates capacity or time windows')
+
+    def update_bound(value, bound_type):
+        if value is not None and (bound['LOWER_BOUND'] is None or value > bound['LOWER_BOUND']):
+            bound['LOWER_BOUND'] = value
+            bound['BOUND_TYPE'] = bound_type
+        if bound['PLAN_COST'] is not None and bound['LOWER_BOUND'] is not None:
+            bound['GAP'] = (bound['PLAN_COST'] - bound['LOWER_BOUND']) / abs(bound['PLAN_COST']) \
+                if bound['PLAN_COST'] else 0.0
+
+    def target_reached():
+        return target_gap is not None and bound['GAP'] is not None and bound['GAP'] <= target_gap
+
+    update_bound(None, None)
+    solution_statistics = []
+    if trivial_only or target_reached():
+        bound['RUNTIME_SECONDS'] = time.perf_counter() - start_time
+        return bound, solution_statistics
+
+    column_pool = ColumnPool(customer_names)
+    initial_paths_cost_dict = route_evaluator.path_costs(model_inputs.paths_dict)
+    for path_name, path in model_inputs.paths_dict.items():
+        column_pool.add(path, initial_paths_cost_dict[path_name], path_name, protected=True)
+    ng_route_pricing = NgRoutePricing(route_evaluator, neighbourhood_size=ng_neighbourhood_size)
+
+    def solve_minutes():
+        if time_budget is None:
+            return solver_time_limit_minutes
+        return time_budget.solve_minutes(solver_time_limit_minutes)
+
+    iteration = 0
+    while True:
+
+        print("Lower Bound Iteration: ", iteration)
+        with instrumentation.phase('iteration', ITERATION=iteration) as iteration_phase:
+            with instrumentation.phase('master_problem'):
+                price, solution_master_model_objective, solution_master_path = \
+                    model_formulation.formulate_and_solve_master_problem(column_pool.paths_dict(),
+                                                                         column_pool.paths_cost_dict(),
+                                                                         column_pool.paths_customers_dict(),
+                                                                         binary_model=False,
+                                                                         lp_file_name=None,
+                                                                         solver_time_limit_minutes=solve_minutes(),
+                                                                         enable_solution_messaging=enable_solution_messaging,
+                                                                         solver_type=solver_type,
+                                                                         instrumentation=instrumentation)
+            bound['MASTER_PROBLEM_OBJECTIVE'] = solution_master_model_objective
+            for path in solution_master_path['PATH']:
+                ng_route_pricing.augment_neighbourhoods(path)
+
+            with instrumentation.phase('sub_problem'):
+                with track_phase(instrumentation, 'ng_route_pricing'):
+                    columns, truncated = ng_route_pricing.solve(price, capacity, max_columns=pricing_columns)
+                exact = not truncated
+                if truncated and not columns:
+                    print('Label limit reached, solving the sub-problem formulation')
+                    objective, solution_path, sub_model = model_formulation.formulate_and_solve_subproblem(
+                        price,
+                        capacity,
+                        'PRICING',
+                        mip_gap=0,
+                        solver_time_limit_minutes=solve_minutes(),
+                        enable_solution_messaging=enable_solution_messaging,
+                        solver_type=solver_type,
+                        instrumentation=instrumentation)
+                    # the elementary sub-problem is exact when proven optimal, PuLP also reports status 1 for the
+                    # integer solution of a solve stopped by the time limit
+                    exact = sub_model.sol_status == pulp.LpSolutionOptimal
+                    columns = [(objective, solution_path['LOCATION_NAME'].tolist())]
+            min_reduced_cost = min([reduced_cost for reduced_cost, path in columns] + [0.0])
+
+            if exact:
+                lagrangian_bound = lb.lagrangian_lower_bound(solution_master_model_objective, min_reduced_cost,
+                                                             max_routes)
+                bound['LAGRANGIAN_BOUND'] = lagrangian_bound if bound['LAGRANGIAN_BOUND'] is None else \
+                    max(bound['LAGRANGIAN_BOUND'], lagrangian_bound)
+                if min_reduced_cost >= -ng_route_pricing.reduced_cost_tolerance:
+                    bound['CONVERGED'] = True
+                    update_bound(solution_master_model_objective, 'column_generation')
+                else:
+                    update_bound(lagrangian_bound, 'lagrangian')
+
+            print("Master LP problem objective value: ", solution_master_model_objective)
+            print("Sub-problem Objective value: ", min_reduced_cost)
+            print("Lower bound: ", bound['LOWER_BOUND'])
+
+            changed = False
+            for reduced_cost, path in columns:
+                if reduced_cost < -ng_route_pricing.reduced_cost_tolerance:
+                    path_cost = route_evaluator.path_costs({'PATH': path})['PATH']
+                    changed = column_pool.add(path, path_cost)[1] or changed
+
+            bound_within_gap = bound['LAGRANGIAN_BOUND'] is not None and \
+                solution_master_model_objective - bound['LAGRANGIAN_BOUND'] <= \
+                bound_gap * abs(solution_master_model_objective)
+            stop = bound['CONVERGED'] or bound_within_gap or target_reached() or not changed or \
+                iteration == max_iteration or (time_budget is not None and time_budget.exhausted())
+
+        solution_statistics.append({'ITERATION': iteration,
+                                    'MASTER_PROBLEM_OBJECTIVE': solution_master_model_objective,
+                                    'SUB_PROBLEM_OBJECTIVE': min_reduced_cost,
+                                    'EXACT_PRICING': exact,
+                                    'LAGRANGIAN_BOUND': bound['LAGRANGIAN_BOUND'],
+                                    'LOWER_BOUND': bound['LOWER_BOUND'],
+                                    'GAP': bound['GAP'],
+                                    'NUMBER_OF_PATHS': column_pool.number_of_added,
+                                    'ITERATION_WALL_SECONDS': iteration_phase.record['WALL_SECONDS']})
+        if stop:
+            break
+        iteration += 1
+
+    bound['ITERATIONS'] = len(solution_statistics)
+    bound['RUNTIME_SECONDS'] = time.perf_counter() - start_time
+    print('Lower bound: {} ({}), plan gap: {}'.format(bound['LOWER_BOUND'], bound['BOUND_TYPE'], bound['GAP']))
+    return bound, solution_statistics
@@ -0,0 +1,249 @@
+import pandas as pd
+
+from cvrptw_optimization.single_depot_column_generation_pulp import initiate_single_depot_column_generation, \
+    process_paths
+from cvrptw_optimization.src.instrumentation import RunInstrumentation, track_phase
+from cvrptw_optimization.src.route_evaluation import RouteEvaluator
+from cvrptw_optimization.src.multi_trip import shift_classes, TripScheduler, MultiTripFormulation
+
+
+def run_single_depot_multi_trip_column_generation(depots,
+                                                  customers,
+                                                  transportation_matrix,
+                                                  vehicles,
+                                                  reload_minutes=0,
+                                                  max_trips=None,
+                                                  mip_gap=0.001,
+                                                  solver_time_limit_minutes=10,
+                                                  enable_solution_messaging=0,
+                                                  solver_type='PULP_CBC_CMD',
+                                                  max_iteration=50,
+                                                  instrumentation=None):
+    '''
+    Function to run column generation where every vehicle makes several trips during its shift. The columns are
+    trips, a trip found for a shift class (vehicles with the same SHIFT_START, SHIFT_END and CAPACITY) is shared by
+    all its vehicles and by the other classes whose shift it fits. The master problem assigns trips to vehicles, the
+    trip durations plus the reload time between trips fit the shift of every vehicle. The sub-problem prices the
+    trip duration with the shift duals, one sub-problem per class and distinct vehicle duals.
+    Vehicle fixed costs are not part of the objective
+    :param depots:
+    :param customers:
+    :param transportation_matrix:
+    :param vehicles: vehicles with optional SHIFT_START and SHIFT_END, defaulting to the depot time window
+    :param reload_minutes: time at the depot between two trips of a vehicle
+    :param max_trips: maximum number of trips per vehicle, None for no limit
+    :param mip_gap:
+    :param solver_time_limit_minutes:
+    :param enable_solution_messaging:
+    :param solver_type:
+    :param max_iteration:
+    :param instrumentation: RunInstrumentation collecting per phase wall time, cpu time and memory, pass one to
+    keep the phase records. If None an internal one only times the iterations reported in the statistics
+    :return: solution with the VEHICLE_NAME, TRIP_NUMBER, DEPARTURE_TIME and RETURN_TIME of every trip and the
+    START_TIME of every stop, algorithm master problem and subproblem objectives
+    '''
+
+    if instrumentation is None:
+        instrumentation = RunInstrumentation()
+
+    model_inputs, model_formulation = initiate_single_depot_column_generation(depots,
+                                                                              customers,
+                                                                              transportation_matrix,
+                                                                              vehicles,
+                                                                              instrumentation)
+    route_evaluator = RouteEvaluator.from_model_inputs(model_inputs)
+    trip_scheduler = TripScheduler(route_evaluator)
+    master_formulation = MultiTripFormulation(model_inputs.customers_dict)
+
+    vehicles, classes = shift_classes(vehicles,
+                                      model_inputs.vertices_dict['TIME_WINDOW_START'][route_evaluator.depot_leave],
+                                      model_inputs.vertices_dict['TIME_WINDOW_END'][route_evaluator.depot_enter])
+    print('Shift classes: ', classes.to_dict('records'))
+    vehicles_dict = vehicles.set_index('VEHICLE_NAME')[['SHIFT_START', 'SHIFT_END', 'SHIFT_CLASS',
+                                                        'CAPACITY']].to_dict()
+    classes_dict = classes.set_index('SHIFT_CLASS')[['SHIFT_START', 'SHIFT_END', 'CAPACITY']].to_dict()
+    class_vehicles = vehicles.groupby('SHIFT_CLASS')['VEHICLE_NAME'].apply(list).to_dict()
+
+    trips_dict = {}
+    trips_cost_dict = {}
+    trips_duration_dict = {}
+    class_trips = {shift_class: [] for shift_class in classes_dict['CAPACITY'].keys()}
+    trip_names = {}
+
+    def add_trip(trip, trip_name=None):
+        # a new trip is shared by every shift class it fits
+        if tuple(trip) in trip_names:
+            return False
+        trip_name = trip_name or 'TRIP ' + str(len(trips_dict))
+        trip_names[tuple(trip)] = trip_name
+        trips_dict[trip_name] = list(trip)
+        trips_cost_dict[trip_name] = route_evaluator.path_costs({'TRIP': trip})['TRIP']
+        for shift_class in class_trips.keys():
+            schedule = trip_scheduler.schedule(trip,
+                                               classes_dict['SHIFT_START'][shift_class],
+                                               classes_dict['SHIFT_END'][shift_class],
+                                               classes_dict['CAPACITY'][shift_class])
+            if schedule is not None:
+                trips_duration_dict[trip_name, shift_class] = schedule['DURATION']
+                class_trips[shift_class].append(trip_name)
+        return True
+
+    # the single customer paths are artificial trips without a vehicle, with a penalty above any solution of
+    # single customer trips, and trips of every shift class they fit
+    initial_paths_cost_dict = route_evaluator.path_costs(model_inputs.paths_dict)
+    artificial_cost = sum(initial_paths_cost_dict.values())
+    artificial_dict = {'ARTIFICIAL ' + path_name: path for path_name, path in model_inputs.paths_dict.items()}
+    artificial_cost_dict = {'ARTIFICIAL ' + path_name: cost + artificial_cost
+                            for path_name, cost in initial_paths_cost_dict.items()}
+    for path_name, path in model_inputs.paths_dict.items():
+        add_trip(path)
+
+    def solve_master(binary_model, forbidden_trips=None):
+        vehicle_trips_dict = {vehicle: class_trips[vehicles_dict['SHIFT_CLASS'][vehicle]]
+                              for vehicle in vehicles_dict['SHIFT_CLASS'].keys()}
+        return master_formulation.formulate_and_solve_master_problem(trips_dict,
+                                                                     trips_cost_dict,
+                                                                     trips_duration_dict,
+                                                                     vehicle_trips_dict,
+                                                                     vehicles_dict,
+                                                                     artificial_dict=artificial_dict,
+                                                                     artificial_cost_dict=artificial_cost_dict,
+                                                                     reload_minutes=reload_minutes,
+                                                                     max_trips=max_trips,
+                                                                     forbidden_trips=forbidden_trips,
+                                                                     binary_model=binary_model,
+                                                                     lp_file_name=None,
+                                                                     mip_gap=mip_gap,
+                                                                     solver_time_limit_minutes=solver_time_limit_minutes,
+                                                                     enable_solution_messaging=enable_solution_messaging,
+                                                                     solver_type=solver_type,
+                                                                     instrumentation=instrumentation)
+
+    def pricing_duals(shift_class):
+        # vehicles of a class with the same duals share one sub-problem
+        duals = set()
+        for vehicle in class_vehicles[shift_class]:
+            duals.add((round(master_formulation.shift_price[vehicle], 9),
+                       round(master_formulation.trips_price[vehicle], 9)))
+        return sorted(duals)
+
+    iteration = 0
+    solution_statistics = []
+    while True:
+
+        print("Column Generation Iteration: ", iteration)
+        with instrumentation.phase('iteration', ITERATION=iteration) as iteration_phase:
+            print('Solving master problem')
+            with instrumentation.phase('master_problem') as master_phase:
+                price, solution_master_model_objective, solution_master_path = solve_master(binary_model=False)
+
+            print("Dual values: ", price)
+            print("Shift dual values: ", master_formulation.shift_price)
+
+            print('Solving sub-problem')
+            pricing_results = []
+            with instrumentation.phase('sub_problem') as sub_phase:
+                for shift_class in class_trips.keys():
+                    for shift_price, trips_price in pricing_duals(shift_class):
+                        objective, solution_path, sub_model = model_formulation.formulate_and_solve_subproblem(
+                            price,
+                            classes_dict['CAPACITY'][shift_class],
+                            shift_class,
+                            lp_file_name=None,
+                            bigm=1000000,
+                            mip_gap=mip_gap,
+                            solver_time_limit_minutes=solver_time_limit_minutes,
+                            enable_solution_messaging=enable_solution_messaging,
+                            solver_type=solver_type,
+                            instrumentation=instrumentation,
+                            vehicle_type_price=shift_price * reload_minutes + trips_price,
+                            duration_price=-shift_price,
+                            depot_time_window=(classes_dict['SHIFT_START'][shift_class],
+                                               classes_dict['SHIFT_END'][shift_class]))
+                        pricing_results.append((objective, solution_path['LOCATION_NAME'].tolist()))
+
+            solution_objective = min(objective for objective, trip in pricing_results)
+            print("Master LP problem objective value: ", solution_master_model_objective)
+            print("Sub-problem Objective value: ", solution_objective)
+
+            stop = (solution_objective > -1) or iteration == max_iteration
+            if not stop:
+                changed = False
+                for objective, trip in pricing_results:
+                    if objective <= -1:
+                        changed = add_trip(trip) or changed
+                if not changed:
+                    print('Sub-problem trip is already in the master problem')
+                    stop = True
+
+        solution_statistics.append({'ITERATION': iteration,
+                                    'MASTER_PROBLEM_OBJECTIVE': solution_master_model_objective,
+                                    'SUB_PROBLEM_OBJECTIVE': solution_objective,
+                                    'NUMBER_OF_TRIPS': len(trips_dict),
+                                    'NUMBER_OF_SUB_PROBLEMS': len(pricing_results),
+                                    'ITERATION_WALL_SECONDS': iteration_phase.record['WALL_SECONDS'],
+                                    'MASTER_PROBLEM_WALL_SECONDS': master_phase.record['WALL_SECONDS'],
+                                    'SUB_PROBLEM_WALL_SECONDS': sub_phase.record['WALL_SECONDS']})
+
+        if stop:
+            break
+
+        iteration += 1
+
+    # the sequencing may find no order for the trips of a vehicle, its trip set is forbidden and the binary master
+    # solved again until every vehicle makes its trips one after another. The artificial trips keep it feasible
+    forbidden_trips = []
+    while True:
+        print("Setup all variables to integers and solve the master problem")
+        with instrumentation.phase('final_master_problem'):
+            final_price, final_solution_master_model_objective, final_solution_master_path = solve_master(
+                binary_model=True, forbidden_trips=forbidden_trips)
+        print("Master Binary problem objective value: ", final_solution_master_model_objective)
+
+        print("Sequencing the trips of every vehicle")
+        with track_phase(instrumentation, 'trip_sequencing'):
+            trip_schedules = []
+            infeasible_vehicles = []
+            for vehicle, vehicle_trips in final_solution_master_path.groupby('VEHICLE_NAME', sort=False):
+                schedules, feasible = trip_scheduler.sequence(vehicle_trips['PATH'].tolist(),
+                                                              vehicles_dict['SHIFT_START'][vehicle],
+                                                              vehicles_dict['SHIFT_END'][vehicle],
+                                                              vehicles_dict['CAPACITY'][vehicle],
+                                                              reload_minutes)
+                if not feasible:
+                    infeasible_vehicles.append(vehicle)
+                    forbidden_trips.append((vehicle, vehicle_trips['PATH_NAME'].tolist()))
+                for trip_number, schedule in enumerate(schedules, 1):
+                    trip_schedules.append({'PATH_NAME': vehicle_trips['PATH_NAME'].iloc[schedule['TRIP']],
+                                           'TRIP_NUMBER': trip_number,
+                                           'DEPARTURE_TIME': schedule['DEPARTURE'],
+                                           'RETURN_TIME': schedule['RETURN'],
+                                           'START_TIME': schedule['START_TIME']})
+            trip_schedules = pd.DataFrame(trip_schedules, columns=['PATH_NAME', 'TRIP_NUMBER', 'DEPARTURE_TIME',
+                                                                   'RETURN_TIME', 'START_TIME'])
+
+        if not infeasible_vehicles:
+            break
+        print('Forbidding the trips of {}, they do not fit the shift one after another'.format(infeasible_vehicles))
+
+    if final_solution_master_path['VEHICLE_NAME'].isnull().any():
+        print('Warning: the solution uses artificial single customer trips, the fleet can not serve all customers')
+
+    print("Compiling solution")
+    with instrumentation.phase('process_paths'):
+        final_solution_master_path = final_solution_master_path.merge(trip_schedules, on='PATH_NAME', how='left')
+        final_solution_master_path.sort_values(['VEHICLE_NAME', 'TRIP_NUMBER'], inplace=True)
+        # artificial trips keep the time window start
+        start_times = [start_time
+                       for path, trip_start_times in zip(final_solution_master_path['PATH'],
+                                                         final_solution_master_path['START_TIME'])
+                       for start_time in (trip_start_times if isinstance(trip_start_times, list)
+                                          else [None] * len(path))]
+        solution = process_paths(final_solution_master_path.drop(columns=['START_TIME']),
+                                 model_inputs.transit_dict,
+                                 model_inputs.customers_dict,
+                                 model_inputs.vertices_dict)
+        solution['START_TIME'] = [window_start if start_time is None else start_time
+                                  for start_time, window_start in zip(start_times, solution['TIME_WINDOW_START'])]
+
+    return solution, solution_statistics
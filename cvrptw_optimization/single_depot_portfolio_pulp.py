@@ -0,0 +1,287 @@
+import os
+import time
+import signal
+import contextlib
+import multiprocessing
+import multiprocessing.connection
+
+import pandas as pd
+
+from cvrptw_optimization.src import single_depot_column_generation_pulp_inputs as inputs
+from cvrptw_optimization.src.route_evaluation import RouteEvaluator
+from cvrptw_optimization.src.route_solution import RouteSolution
+from cvrptw_optimization.src.local_search import LocalSearch
+from cvrptw_optimization.src.feasibility_tables import FeasibilityTables
+from cvrptw_optimization.src.time_budget import TimeBudget
+from cvrptw_optimization.src import lower_bounds as lb
+
+STRATEGIES = ('heuristic', 'lower_bound', 'column_generation', 'general_model')
+
+# keyword arguments of every strategy, overridden by strategy_parameters
+DEFAULT_STRATEGY_PARAMETERS = {'heuristic': {'time_limit_seconds': 2, 'max_segment_length': 3},
+                               'lower_bound': {},
+                               'column_generation': {'pricing': 'ng_route'},
+                               'general_model': {}}
+
+
+def _heuristic(tables, capacity, connection, parameters):
+    '''
+    Local search from single customer routes, then polishing of every incumbent the other strategies find. A
+    polished incumbent is sent with the strategy that found it
+    '''
+    depots, customers, transportation_matrix, vehicles = tables
+    route_evaluator = RouteEvaluator.from_model_inputs(inputs.ModelInputs(transportation_matrix, customers,
+                                                                          depots, vehicles))
+    feasibility_tables = FeasibilityTables(route_evaluator, capacity)
+
+    def improve(routes):
+        local_search = LocalSearch(route_evaluator, allow_empty_routes=True, feasibility_tables=feasibility_tables,
+                                   **parameters)
+        improved_routes = local_search.improve(
+            [[route_evaluator.location_index[location] for location in route] for route in routes],
+            [capacity] * len(routes))
+        return [[route_evaluator.location_names[vertex] for vertex in route] for route in improved_routes
+                if len(route) > 2]
+
+    customer_names = route_evaluator.location_names[2:]
+    connection.send(('incumbent', improve([[route_evaluator.depot_leave, customer, route_evaluator.depot_enter]
+                                           for customer in customer_names])))
+    while True:
+        message = connection.recv()
+        if message is None:
+            return
+        origin, routes = message
+        connection.send(('polished', (origin, improve(routes))))
+
+
+def _lower_bound(tables, capacity, connection, parameters):
+    from cvrptw_optimization import single_depot_lower_bound_pulp as lower_bound
+
+    bound, solution_statistics = lower_bound.run_single_depot_lower_bound(*tables, capacity=capacity, **parameters)
+    connection.send(('bound', bound['LOWER_BOUND']))
+
+
+def _column_generation(tables, capacity, connection, parameters):
+    from cvrptw_optimization import single_depot_column_generation_pulp as column_generation
+    from cvrptw_optimization.solution_polishing import solution_routes
+
+    solution, solution_statistics = column_generation.run_single_depot_column_generation(*tables,
+                                                                                         capacity=capacity,
+                                                                                         **parameters)
+    connection.send(('incumbent', solution_routes(solution, tables[0]['LOCATION_NAME'].iloc[0])[2]))
+
+
+def _general_model(tables, capacity, connection, parameters):
+    from cvrptw_optimization import single_depot_general_model_pulp as general_model
+    from cvrptw_optimization.solution_polishing import solution_routes
+
+    objective, solution_path = general_model.run_single_depot_general_model(*tables, **parameters)
+    if objective is not None:
+        connection.send(('incumbent', solution_routes(solution_path, tables[0]['LOCATION_NAME'].iloc[0])[2]))
+
+
+STRATEGY_FUNCTIONS = {'heuristic': _heuristic,
+                      'lower_bound': _lower_bound,
+                      'column_generation': _column_generation,
+                      'general_model': _general_model}
+
+
+def _strategy_main(strategy, connection, tables, capacity, parameters):
+    if hasattr(os, 'setpgrp'):
+        # the solver processes of the strategy join its process group and are stopped with it
+        os.setpgrp()
+    try:
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            STRATEGY_FUNCTIONS[strategy](tables, capacity, connection, parameters)
+        connection.send(('done', None))
+    except Exception as exception:
+        connection.send(('failed', '{}: {}'.format(type(exception).__name__, exception)))
+    finally:
+        connection.close()
+
+
+class _Strategy:
+    '''
+    Strategy process with the pipe to it
+    '''
+
+    def __init__(self, name, context, tables, capacity, parameters):
+        self.name = name
+        self.status = 'running'
+        self.connection, child_connection = context.Pipe()
+        self.process = context.Process(target=_strategy_main,
+                                       args=(name, child_connection, tables, capacity, parameters),
+                                       daemon=True)
+        self.process.start()
+        child_connection.close()
+
+    def send(self, message):
+        try:
+            self.connection.send(message)
+        except (BrokenPipeError, OSError):
+            pass
+
+    def stop(self):
+        if self.process.is_alive():
+            if hasattr(os, 'killpg'):
+                with contextlib.suppress(OSError):
+                    os.killpg(self.process.pid, signal.SIGTERM)
+            else:
+                self.process.terminate()
+        self.process.join(5)
+        self.connection.close()
+        if self.status == 'running':
+            self.status = 'stopped'
+
+
+def run_single_depot_portfolio(depots,
+                               customers,
+                               transportation_matrix,
+                               vehicles,
+                               strategies=STRATEGIES,
+                               target_gap=0.001,
+                               capacity=None,
+                               time_budget_minutes=None,
+                               strategy_parameters=None):
+    '''
+    Function to race several strategies on an instance in parallel processes, for when it is not known in advance
+    whether the general model or column generation is faster. The strategies report their plans and bounds through
+    a pipe, every new best plan is sent to the heuristic to polish and the race stops as soon as the best plan is
+    within target_gap of the best lower bound, every strategy has finished or the time budget is used. The lower
+    bounds only stop the race and the other strategies do not start from the best plan.
+    Plans are compared by their transportation cost, vehicle fixed costs are not part of the race. As in column
+    generation, the plans of the heuristic and column generation may use more routes than there are vehicles
+    :param depots:
+    :param customers:
+    :param transportation_matrix:
+    :param vehicles:
+    :param strategies: heuristic (local search from single customer routes and polishing of the incumbents),
+    lower_bound (run_single_depot_lower_bound), column_generation (run_single_depot_column_generation with ng-route
+    pricing) and general_model (run_single_depot_general_model)
+    :param target_gap: relative gap of the best plan to the best lower bound that stops the race
+    :param capacity: vehicle capacity, defaults to the largest capacity in vehicles
+    :param time_budget_minutes: wall clock budget of the race, passed on to the solvers, None for no limit
+    :param strategy_parameters: keyword arguments of the strategies by strategy name
+    :return: solution of the best plan with the STRATEGY that found it and the ORIGIN strategy whose plan it
+    polished, race summary with the WINNER, its ORIGIN, OBJECTIVE, LOWER_BOUND, GAP, the STATUS of every strategy and
+    the EVENTS of the race
+    '''
+    start_time = time.perf_counter()
+    unknown = [strategy for strategy in strategies if strategy not in STRATEGY_FUNCTIONS]
+    if unknown:
+        raise Exception('Unknown strategies {}'.format(', '.join(unknown)))
+    time_budget = TimeBudget(time_budget_minutes) if time_budget_minutes is not None else None
+    if capacity is None:
+        capacity = vehicles['CAPACITY'].max()
+
+    model_inputs = inputs.ModelInputs(transportation_matrix, customers, depots, vehicles)
+    route_evaluator = RouteEvaluator.from_model_inputs(model_inputs)
+    tables = (depots, customers, transportation_matrix, vehicles)
+
+    context = multiprocessing.get_context('spawn')
+    running = {}
+    for strategy in strategies:
+        parameters = dict(DEFAULT_STRATEGY_PARAMETERS[strategy])
+        parameters.update((strategy_parameters or {}).get(strategy, {}))
+        if strategy != 'heuristic':
+            parameters.setdefault('enable_solution_messaging', 0)
+            if time_budget_minutes is not None:
+                parameters.setdefault('time_budget_minutes', time_budget_minutes)
+        print('Starting strategy {}'.format(strategy))
+        running[strategy] = _Strategy(strategy, context, tables, capacity, parameters)
+
+    race = {'WINNER': None,
+            'ORIGIN': None,
+            'OBJECTIVE': None,
+            'LOWER_BOUND': None,
+            'GAP': None,
+            'TARGET_REACHED': False,
+            'EVENTS': []}
+    best_routes = None
+
+    def record(strategy, event, value, origin=None):
+        race['EVENTS'].append({'STRATEGY': strategy,
+                               'EVENT': event,
+                               'VALUE': value,
+                               'ORIGIN': origin,
+                               'SECONDS': time.perf_counter() - start_time})
+
+    def on_message(strategy, message):
+        nonlocal best_routes
+        event, value = message
+        if event in ('incumbent', 'polished'):
+            # a polished incumbent is the plan of another strategy improved by the heuristic
+            origin, value = value if event == 'polished' else (strategy, value)
+            plan = lb.plan_cost(lb.plan_routes(value, model_inputs.depot_names[0]), route_evaluator, capacity)
+            if not plan['FEASIBLE']:
+                record(strategy, 'infeasible_plan', plan['COST'], origin)
+            elif race['OBJECTIVE'] is None or plan['COST'] < race['OBJECTIVE'] - 0.000001:
+                print('New best plan of {} from the plan of {}: {}'.format(strategy, origin, plan['COST']))
+                record(strategy, 'incumbent', plan['COST'], origin)
+                race['WINNER'] = strategy
+                race['ORIGIN'] = origin
+                race['OBJECTIVE'] = plan['COST']
+                best_routes = value
+                if strategy != 'heuristic' and 'heuristic' in running:
+                    running['heuristic'].send((strategy, value))
+        elif event == 'bound':
+            if value is not None and (race['LOWER_BOUND'] is None or value > race['LOWER_BOUND']):
+                print('New lower bound of {}: {}'.format(strategy, value))
+                record(strategy, 'bound', value)
+                race['LOWER_BOUND'] = value
+        else:
+            running[strategy].status = event
+            record(strategy, event, value)
+            if event == 'failed':
+                print('Strategy {} failed: {}'.format(strategy, value))
+
+    heuristic_stopped = False
+    try:
+        while any(strategy.status == 'running' for strategy in running.values()):
+            solvers_running = [strategy for strategy in running.values()
+                               if strategy.status == 'running' and strategy.name != 'heuristic']
+            if not solvers_running and 'heuristic' in running and not heuristic_stopped:
+                # the heuristic polishes the last incumbent before it stops
+                running['heuristic'].send(None)
+                heuristic_stopped = True
+
+            timeout = None if time_budget is None else time_budget.remaining_seconds()
+            connections = {strategy.connection: strategy for strategy in running.values()
+                           if strategy.status == 'running'}
+            for connection in multiprocessing.connection.wait(list(connections.keys()), timeout):
+                strategy = connections[connection]
+                try:
+                    on_message(strategy.name, connection.recv())
+                except (EOFError, OSError):
+                    on_message(strategy.name, ('failed', 'Strategy process exited'))
+
+            if race['OBJECTIVE'] is not None and race['LOWER_BOUND'] is not None:
+                race['GAP'] = (race['OBJECTIVE'] - race['LOWER_BOUND']) / abs(race['OBJECTIVE']) \
+                    if race['OBJECTIVE'] else 0.0
+                if race['GAP'] <= target_gap:
+                    print('Target gap reached: {}'.format(race['GAP']))
+                    race['TARGET_REACHED'] = True
+                    break
+            if time_budget is not None and time_budget.exhausted():
+                print('Time budget used')
+                break
+    finally:
+        for strategy in running.values():
+            strategy.stop()
+
+    race['STATUS'] = {name: strategy.status for name, strategy in running.items()}
+    race['RUNTIME_SECONDS'] = time.perf_counter() - start_time
+    print('Portfolio winner: {}, objective: {}, lower bound: {}'.format(race['WINNER'], race['OBJECTIVE'],
+                                                                       race['LOWER_BOUND']))
+    if best_routes is None:
+        return None, race
+
+    routes = lb.plan_routes(best_routes, model_inputs.depot_names[0])
+    master_path = pd.DataFrame({'PATH_NAME': ['PATH ' + str(idx) for idx in range(len(routes))],
+                                'PATH': routes})
+    master_path['STRATEGY'] = race['WINNER']
+    master_path['ORIGIN'] = race['ORIGIN']
+    master_path['OBJECTIVE'] = race['OBJECTIVE']
+    solution = RouteSolution.from_master_path(master_path, route_evaluator)
+    solution.set_stop_column('START_TIME', route_evaluator.evaluate(routes, capacity).start_time)
+    return solution.to_dataframe(), race
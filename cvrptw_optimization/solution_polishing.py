@@ -0,0 +1,155 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+from cvrptw_optimization.src import single_depot_column_generation_pulp_inputs as inputs
+from cvrptw_optimization.src.route_evaluation import RouteEvaluator
+from cvrptw_optimization.src.local_search import LocalSearch
+
+
+# columns recomputed for every stop, the other columns are kept per route
+STOP_COLUMNS = ['STOP_NUMBER', 'LOCATION_NAME', 'PREVIOUS_LOCATION_NAME', 'ORIGINAL_LOCATION_NAME', 'PATH',
+                'DRIVE_MINUTES', 'TRANSPORTATION_COST', 'TIME_WINDOW_START', 'TIME_WINDOW_END', 'STOP_TIME',
+                'DEMAND', 'START_TIME', 'END_TIME']
+
+
+def solution_routes(solution, depot_name):
+    '''
+    Function to get the routes of a solver output
+    :param solution: column generation solution (one route per PATH_NAME) or general model solution_path
+    (one route per VEHICLE)
+    :param depot_name:
+    :return: route column, route names, routes as location name lists
+    '''
+    route_column = 'PATH_NAME' if 'PATH_NAME' in solution.columns else 'VEHICLE'
+    route_names = []
+    routes = []
+    for route_name, route in solution.sort_values([route_column, 'STOP_NUMBER']).groupby(route_column, sort=False):
+        locations = route['LOCATION_NAME'].tolist()
+        # the general model skips the depot leave vertex when its start time is zero
+        if locations[0] != depot_name + '_LEAVE':
+            locations = [depot_name + '_LEAVE'] + locations
+        if locations[-1] != depot_name + '_ENTER':
+            locations = locations + [depot_name + '_ENTER']
+        route_names.append(route_name)
+        routes.append(locations)
+    return route_column, route_names, routes
+
+
+def polish_solution(solution,
+                    depots,
+                    customers,
+                    transportation_matrix,
+                    vehicles,
+                    capacity=None,
+                    time_limit_seconds=2,
+                    max_segment_length=3,
+                    allow_empty_routes=True):
+    '''
+    Function to improve the routes of a solver output with local search, intra route 2-opt and or-opt and
+    inter route relocate, swap and 2-opt*. Time windows are hard, solutions with soft time windows are not polished
+    :param solution: output of run_single_depot_column_generation or run_single_depot_general_model
+    :param depots:
+    :param customers:
+    :param transportation_matrix:
+    :param vehicles:
+    :param capacity: capacity of the routes without a VEHICLE_CAPACITY, the capacity column generation was run with,
+    defaults to the largest capacity in vehicles
+    :param time_limit_seconds: time budget of the local search
+    :param max_segment_length: longest segment moved by or-opt
+    :param allow_empty_routes: routes may lose all their customers and are then removed from the solution
+    :return: solution with the same columns, polishing statistics
+    '''
+    start_time = time.perf_counter()
+    if 'LATENESS' in solution.columns or 'EARLINESS' in solution.columns:
+        raise Exception('Solutions with soft time windows can not be polished')
+    if capacity is None:
+        capacity = vehicles['CAPACITY'].max()
+
+    model_inputs = inputs.ModelInputs(transportation_matrix, customers, depots, vehicles)
+    depot_name = model_inputs.depot_names[0]
+    route_evaluator = RouteEvaluator.from_model_inputs(model_inputs)
+
+    route_column, route_names, routes = solution_routes(solution, depot_name)
+    if 'VEHICLE_CAPACITY' in solution.columns:
+        capacities = solution.groupby(route_column)['VEHICLE_CAPACITY'].first()[route_names].tolist()
+    else:
+        capacities = [capacity] * len(routes)
+
+    stops, lengths = route_evaluator.encode_routes(routes)
+    initial_cost = route_evaluator.evaluate(stops, lengths=lengths).cost.sum()
+
+    local_search = LocalSearch(route_evaluator,
+                               time_limit_seconds=time_limit_seconds,
+                               max_segment_length=max_segment_length,
+                               allow_empty_routes=allow_empty_routes)
+    index_routes = [[route_evaluator.location_index[location] for location in route] for route in routes]
+    improved_routes = local_search.improve(index_routes, capacities)
+
+    # every route keeps the name and vehicle of its input route, emptied routes are dropped
+    named_routes = [(route_idx, [route_evaluator.location_names[vertex] for vertex in improved_route])
+                    for route_idx, improved_route in enumerate(improved_routes) if len(improved_route) > 2]
+
+    evaluation = route_evaluator.evaluate([route for idx, route in named_routes])
+    polished = _solution_frame(solution, route_column, route_names, named_routes, evaluation, route_evaluator,
+                               model_inputs)
+
+    if 'OBJECTIVE' in solution.columns:
+        # the column generation objective of the solution, less the saved cost and fixed costs of emptied routes
+        saving = initial_cost - evaluation.cost.sum()
+        if 'VEHICLE_FIXED_COST' in solution.columns:
+            kept_names = set(route_names[route_idx] for route_idx, route in named_routes)
+            fixed_costs = solution.groupby(route_column)['VEHICLE_FIXED_COST'].first()
+            saving += fixed_costs[[name for name in route_names if name not in kept_names]].fillna(0).sum()
+        polished['OBJECTIVE'] = solution['OBJECTIVE'].iloc[0] - saving
+
+    statistics = {'INITIAL_COST': initial_cost,
+                  'FINAL_COST': evaluation.cost.sum(),
+                  'NUMBER_OF_ROUTES': len(named_routes),
+                  'POLISHING_SECONDS': time.perf_counter() - start_time}
+    for operator, number_of_moves in local_search.number_of_moves.items():
+        statistics[operator.upper() + '_MOVES'] = number_of_moves
+    print('Polishing cost: {} -> {}'.format(statistics['INITIAL_COST'], statistics['FINAL_COST']))
+    return polished, statistics
+
+
+def _solution_frame(solution, route_column, route_names, named_routes, evaluation, route_evaluator, model_inputs):
+    '''
+    Rebuild the solution rows of the polished routes, stop columns are recomputed and route columns copied
+    '''
+    first_stop_number = solution['STOP_NUMBER'].min()
+    route_rows = solution.groupby(route_column, sort=False).first()
+    constant_columns = solution.groupby(route_column, sort=False).nunique(dropna=False).max() <= 1
+    route_columns = [column for column in solution.columns
+                     if column not in STOP_COLUMNS and column != route_column and constant_columns.get(column, False)]
+
+    frames = []
+    for route_position, (route_idx, route) in enumerate(named_routes):
+        length = len(route)
+        frame = pd.DataFrame({route_column: [route_names[route_idx]] * length})
+        frame['STOP_NUMBER'] = np.arange(length) + first_stop_number
+        frame['LOCATION_NAME'] = route
+        frame['PREVIOUS_LOCATION_NAME'] = [None] + route[:-1]
+        frame['ORIGINAL_LOCATION_NAME'] = frame['LOCATION_NAME'].str.replace('_ENTER', '').str.replace('_LEAVE', '')
+        frame['PATH'] = route
+        frame['DRIVE_MINUTES'] = [np.nan] + [model_inputs.transit_dict['DRIVE_MINUTES'][arc]
+                                             for arc in zip(route[:-1], route[1:])]
+        frame['TRANSPORTATION_COST'] = [np.nan] + [model_inputs.transit_dict['TRANSPORTATION_COST'][arc]
+                                                   for arc in zip(route[:-1], route[1:])]
+        vertices = [route_evaluator.location_index[location] for location in route]
+        frame['TIME_WINDOW_START'] = route_evaluator.time_window_start[vertices]
+        frame['TIME_WINDOW_END'] = route_evaluator.time_window_end[vertices]
+        frame['STOP_TIME'] = route_evaluator.stop_time[vertices]
+        frame['DEMAND'] = route_evaluator.demand[vertices]
+        frame['START_TIME'] = evaluation.start_time[route_position, :length]
+        frame['END_TIME'] = frame['START_TIME'] + frame['STOP_TIME']
+        for column in route_columns:
+            frame[column] = route_rows.loc[route_names[route_idx], column]
+        frames.append(frame)
+
+    polished = pd.concat(frames, ignore_index=True)
+    for column in solution.columns:
+        if column not in polished.columns:
+            polished[column] = np.nan
+    return polished[list(solution.columns)]
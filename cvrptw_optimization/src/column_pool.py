@@ -0,0 +1,171 @@
+'''
+Column pool
+Deduplicated master problem columns with aging and a size limit
+'''
+
+
+class ColumnPool:
+    '''
+    Stores the paths of the column generation master problem.
+
+    Columns are indexed by their sorted customer tuple, so two paths covering the same customers are one column
+    and only the cheaper path is kept. A column ages while its reduced cost stays positive and it is not used by
+    the master solution, and is retired when it is older than max_age. Protected columns (the initial paths that
+    keep the master feasible) never retire.
+    With a heterogeneous fleet every column has a vehicle type, the same customers served by two vehicle types
+    are two columns.
+    '''
+
+    def __init__(self, customer_names, max_age=None, max_active_columns=None, reduced_cost_tolerance=0.000001):
+        self.customer_index = {customer: idx for idx, customer in enumerate(customer_names)}
+        self.max_age = max_age
+        self.max_active_columns = max_active_columns
+        self.reduced_cost_tolerance = reduced_cost_tolerance
+
+        self.paths = {}
+        self.costs = {}
+        self.keys = {}
+        self.types = {}
+        self.ages = {}
+        self.reduced_costs = {}
+        self.protected = set()
+        self.used_paths = set()
+        self.key_index = {}
+
+        self.number_of_added = 0
+        self.number_of_duplicates = 0
+        self.number_of_retired = 0
+
+    def __len__(self):
+        return len(self.paths)
+
+    def __contains__(self, path):
+        return (None, self.column_key(path)) in self.key_index
+
+    def column_key(self, path):
+        '''
+        Canonical column key, the sorted customer indices of the path
+        :param path: location names
+        :return:
+        '''
+        customer_index = self.customer_index
+        return tuple(sorted(customer_index[location] for location in path if location in customer_index))
+
+    def next_path_name(self):
+        return 'PATH ' + str(self.number_of_added)
+
+    def add(self, path, cost, path_name=None, protected=False, vehicle_type=None):
+        '''
+        Add a path if its customers are not covered by an existing column, a cheaper duplicate replaces the path
+        :param path:
+        :param cost:
+        :param path_name:
+        :param protected:
+        :param vehicle_type: vehicle type serving the path, None for untyped columns
+        :return: path name of the column, whether the pool changed (new column or cheaper path)
+        '''
+        key = self.column_key(path)
+        if (vehicle_type, key) in self.key_index:
+            self.number_of_duplicates += 1
+            existing_name = self.key_index[vehicle_type, key]
+            if cost < self.costs[existing_name] - self.reduced_cost_tolerance:
+                self.paths[existing_name] = list(path)
+                self.costs[existing_name] = cost
+                return existing_name, True
+            return existing_name, False
+
+        if path_name is None:
+            path_name = self.next_path_name()
+        self.number_of_added += 1
+        self.paths[path_name] = list(path)
+        self.costs[path_name] = cost
+        self.keys[path_name] = key
+        self.types[path_name] = vehicle_type
+        self.ages[path_name] = 0
+        self.key_index[vehicle_type, key] = path_name
+        if protected:
+            self.protected.add(path_name)
+        return path_name, True
+
+    def remove(self, path_name):
+        del self.key_index[self.types[path_name], self.keys[path_name]]
+        for attribute in (self.paths, self.costs, self.keys, self.types, self.ages):
+            del attribute[path_name]
+        self.reduced_costs.pop(path_name, None)
+        self.number_of_retired += 1
+
+    def update(self, price, used_paths=(), vehicle_type_price=None):
+        '''
+        Age columns with the master duals and retire old and surplus columns
+        :param price: customer duals
+        :param used_paths: paths with a positive value in the master solution
+        :param vehicle_type_price: vehicle type availability duals
+        :return: retired path names
+        '''
+        if vehicle_type_price is None:
+            vehicle_type_price = {}
+        self.used_paths = set(used_paths)
+        prices = [0.0] * len(self.customer_index)
+        for customer, idx in self.customer_index.items():
+            prices[idx] = price.get(customer, 0.0)
+
+        for path_name, key in self.keys.items():
+            reduced_cost = self.costs[path_name] - sum(prices[idx] for idx in key) - \
+                vehicle_type_price.get(self.types[path_name], 0.0)
+            self.reduced_costs[path_name] = reduced_cost
+            if reduced_cost > self.reduced_cost_tolerance and path_name not in self.used_paths:
+                self.ages[path_name] += 1
+            else:
+                self.ages[path_name] = 0
+
+        retired = []
+        if self.max_age is not None:
+            retired = [path_name for path_name in self._removable() if self.ages[path_name] > self.max_age]
+            for path_name in retired:
+                self.remove(path_name)
+
+        return retired + self.enforce_limit()
+
+    def enforce_limit(self):
+        '''
+        Retire the columns with the largest reduced costs above max_active_columns,
+        columns added since the last update are kept
+        :return: retired path names
+        '''
+        if self.max_active_columns is None or len(self.paths) <= self.max_active_columns:
+            return []
+
+        surplus = len(self.paths) - self.max_active_columns
+        candidates = sorted(self._removable(),
+                            key=lambda path_name: self.reduced_costs.get(path_name, -float('inf')), reverse=True)
+        retired = candidates[:surplus]
+        for path_name in retired:
+            self.remove(path_name)
+        return retired
+
+    def _removable(self):
+        return [path_name for path_name in self.paths
+                if path_name not in self.protected and path_name not in self.used_paths]
+
+    def paths_dict(self):
+        return dict(self.paths)
+
+    def paths_cost_dict(self):
+        return dict(self.costs)
+
+    def paths_type_dict(self):
+        return dict(self.types)
+
+    def paths_customers_dict(self):
+        '''
+        Customer allocation of the active columns, the number of visits of every customer on every path
+        :return:
+        '''
+        customer_names = list(self.customer_index.keys())
+        paths_customers_dict = {}
+        for path_name, key in self.keys.items():
+            for customer in customer_names:
+                paths_customers_dict[path_name, customer] = 0
+            for idx in key:
+                paths_customers_dict[path_name, customer_names[idx]] += 1
+        return paths_customers_dict
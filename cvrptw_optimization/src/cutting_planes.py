@@ -0,0 +1,195 @@
+'''
+Cutting planes
+Rounded capacity and limited memory subset row cuts for the column generation master problem
+'''
+import math
+from itertools import combinations
+
+import numpy as np
+
+
+class CapacityCut:
+    '''
+    Rounded capacity cut, paths enter the customer set at least ceil(demand of the set / capacity) times
+    '''
+
+    sense = '>='
+
+    def __init__(self, customers, rhs):
+        self.customers = frozenset(customers)
+        self.rhs = rhs
+        self.name = 'CapacityCut' + '_'.join(sorted(str(customer) for customer in customers)).replace(' ', '_')
+
+    def coefficient(self, path):
+        '''
+        Number of times the path enters the customer set
+        :param path: location names
+        :return:
+        '''
+        customers = self.customers
+        return sum(1 for from_loc, to_loc in zip(path[:-1], path[1:])
+                   if from_loc not in customers and to_loc in customers)
+
+
+class SubsetRowCut:
+    '''
+    Limited memory subset row cut over three customers, a path counts once for every two visits to the customers
+    as long as it does not leave the memory in between. With the memory covering all customers this is the
+    usual subset row cut, floor(visits / 2)
+    '''
+
+    sense = '<='
+    rhs = 1
+
+    def __init__(self, customers, memory=None):
+        self.customers = frozenset(customers)
+        self.memory = None if memory is None else frozenset(memory) | self.customers
+        self.name = 'SubsetRowCut' + '_'.join(sorted(str(customer) for customer in customers)).replace(' ', '_')
+
+    def coefficient(self, path):
+        '''
+        Cut coefficient of a path
+        :param path: location names
+        :return:
+        '''
+        state = 0
+        coefficient = 0
+        for location in path:
+            if self.memory is not None and location not in self.memory:
+                state = 0
+            if location in self.customers:
+                state += 1
+                if state == 2:
+                    coefficient += 1
+                    state = 0
+        return coefficient
+
+
+def _positive_paths(solution_master_path, tolerance=0.000001):
+    solution_master_path = solution_master_path[solution_master_path['VALUE'] > tolerance]
+    return list(solution_master_path['PATH']), solution_master_path['VALUE'].to_numpy(dtype=float)
+
+
+def separate_capacity_cuts(solution_master_path, customers_dict, capacity, max_cuts=10, min_violation=0.01,
+                           existing_cuts=()):
+    '''
+    Greedy rounded capacity cut separation. Customer sets grow from every customer by the customer with the
+    largest flow to the set and are kept when their inflow is below the vehicles they need
+    :param solution_master_path: master solution with PATH and VALUE
+    :param customers_dict:
+    :param capacity: largest vehicle capacity
+    :param max_cuts:
+    :param min_violation:
+    :param existing_cuts: cuts already in the master
+    :return: list of CapacityCut, most violated first
+    '''
+    paths, values = _positive_paths(solution_master_path)
+    demand = customers_dict['DEMAND']
+
+    flow = {}
+    for path, value in zip(paths, values):
+        for from_loc, to_loc in zip(path[:-1], path[1:]):
+            flow[from_loc, to_loc] = flow.get((from_loc, to_loc), 0.0) + value
+
+    neighbours = {customer: {} for customer in demand.keys()}
+    inflow_customer = {customer: 0.0 for customer in demand.keys()}
+    for (from_loc, to_loc), value in flow.items():
+        if to_loc in inflow_customer:
+            inflow_customer[to_loc] += value
+        if from_loc in neighbours and to_loc in neighbours:
+            neighbours[from_loc][to_loc] = neighbours[from_loc].get(to_loc, 0.0) + value
+            neighbours[to_loc][from_loc] = neighbours[to_loc].get(from_loc, 0.0) + value
+
+    existing = set(cut.customers for cut in existing_cuts if isinstance(cut, CapacityCut))
+    violated = {}
+    for seed in demand.keys():
+        customer_set = {seed}
+        set_demand = float(demand[seed])
+        # flow into the set, internal arcs are removed as customers join
+        inflow = inflow_customer[seed]
+        connection = dict(neighbours[seed])
+        while connection:
+            customer = max(connection, key=lambda candidate: (connection[candidate], str(candidate)))
+            internal_flow = connection.pop(customer)
+            customer_set.add(customer)
+            set_demand += float(demand[customer])
+            inflow += inflow_customer[customer] - sum(flow.get((member, customer), 0.0) for member in customer_set) - \
+                sum(flow.get((customer, member), 0.0) for member in customer_set if member != customer)
+            for neighbour, value in neighbours[customer].items():
+                if neighbour not in customer_set:
+                    connection[neighbour] = connection.get(neighbour, 0.0) + value
+            if internal_flow <= 0:
+                continue
+            rhs = math.ceil(set_demand / float(capacity) - 0.000001)
+            key = frozenset(customer_set)
+            if rhs - inflow >= min_violation and key not in existing:
+                violated[key] = (rhs - inflow, rhs)
+
+    cuts = sorted(violated.items(), key=lambda item: -item[1][0])[:max_cuts]
+    return [CapacityCut(customers, rhs) for customers, (violation, rhs) in cuts]
+
+
+def separate_subset_row_cuts(solution_master_path, customers_dict, max_cuts=10, min_violation=0.01,
+                             limited_memory=True, existing_cuts=()):
+    '''
+    Subset row cut separation by enumeration of customer triplets of the fractional paths
+    :param solution_master_path: master solution with PATH and VALUE
+    :param customers_dict:
+    :param max_cuts:
+    :param min_violation:
+    :param limited_memory: keep only the customers between paired visits of the positive paths in the memory
+    :param existing_cuts: cuts already in the master
+    :return: list of SubsetRowCut, most violated first
+    '''
+    paths, values = _positive_paths(solution_master_path)
+    fractional = (values < 1 - 0.000001)
+    candidates = sorted(set(location for path, is_fractional in zip(paths, fractional) if is_fractional
+                            for location in path if location in customers_dict['DEMAND']), key=str)
+    if len(candidates) < 3:
+        return []
+
+    customer_index = {customer: idx for idx, customer in enumerate(candidates)}
+    visits = np.zeros((len(paths), len(candidates)))
+    for path_idx, path in enumerate(paths):
+        for location in path:
+            if location in customer_index:
+                visits[path_idx, customer_index[location]] += 1
+
+    triplets = np.array(list(combinations(range(len(candidates)), 3)))
+    lhs = np.zeros(len(triplets))
+    # chunks keep the paths x triplets array small
+    chunk_size = 20000
+    for start in range(0, len(triplets), chunk_size):
+        chunk = triplets[start:start + chunk_size]
+        counts = visits[:, chunk].sum(axis=2)
+        lhs[start:start + chunk_size] = values @ np.floor(counts / 2)
+
+    existing = set(cut.customers for cut in existing_cuts if isinstance(cut, SubsetRowCut))
+    order = np.argsort(-lhs, kind='stable')
+    cuts = []
+    for triplet_idx in order:
+        if lhs[triplet_idx] - 1 < min_violation or len(cuts) >= max_cuts:
+            break
+        customers = frozenset(candidates[idx] for idx in triplets[triplet_idx])
+        if customers in existing:
+            continue
+        memory = None
+        if limited_memory:
+            memory = _subset_row_memory(customers, paths)
+        cuts.append(SubsetRowCut(customers, memory))
+    return cuts
+
+
+def _subset_row_memory(customers, paths):
+    '''
+    Smallest memory that keeps the coefficients of the paths, the customers visited between paired visits
+    :param customers:
+    :param paths:
+    :return:
+    '''
+    memory = set(customers)
+    for path in paths:
+        visit_positions = [position for position, location in enumerate(path) if location in customers]
+        for first, second in zip(visit_positions[0::2], visit_positions[1::2]):
+            memory.update(path[first + 1:second])
+    return memory
@@ -0,0 +1,217 @@
+'''
+Feasibility tables
+Precomputed arc and customer pair compatibility, earliest arrival and latest departure times for constant time
+feasibility checks of routes and insertions
+'''
+import numpy as np
+
+from cvrptw_optimization.src.route_evaluation import RouteEvaluator
+
+
+class RouteSlack:
+    '''
+    Schedule of a route. earliest is the service start at every position when leaving the depot at its time window
+    start, latest the latest service start keeping the rest of the route feasible. forward_slack is how much the
+    service at a position can be delayed, backward_slack how much earlier it can start without waiting
+    '''
+
+    def __init__(self, stops, earliest, latest, cumulative_load, time_window_start):
+        self.stops = stops
+        self.earliest = earliest
+        self.latest = latest
+        self.cumulative_load = cumulative_load
+        self.load = cumulative_load[-1] if len(cumulative_load) else 0.0
+        self.forward_slack = latest - earliest
+        self.backward_slack = earliest - time_window_start
+        self.feasible = bool((self.forward_slack >= 0).all())
+
+
+class FeasibilityTables:
+    '''
+    Tables over the RouteEvaluator indices, 0 is the depot leave vertex, 1 the depot enter vertex.
+
+    earliest_arrival[i, j]: service start at j when serving i at its time window start and driving to j
+    latest_departure[i, j]: latest service start at i to reach j before its time window end
+    arc_compatibility: packed bits, j can follow i if the earliest arrival meets the time window of j
+    pair_compatibility: packed bits, customers i and j fit one vehicle in at least one order
+    Bit rows are also kept as python integers (successor_bits, compatible_pair_bits) for bit set operations
+    '''
+
+    def __init__(self, route_evaluator, capacity=np.inf):
+        self.route_evaluator = route_evaluator
+        self.capacity = capacity
+        self.number_of_vertices = len(route_evaluator.location_names)
+
+        drive_minutes = np.where(np.isnan(route_evaluator.drive_minutes), np.inf, route_evaluator.drive_minutes)
+        np.fill_diagonal(drive_minutes, np.inf)
+        self.drive_minutes = drive_minutes
+        self.demand = route_evaluator.demand
+        self.stop_time = route_evaluator.stop_time
+        self.time_window_start = route_evaluator.time_window_start
+        self.time_window_end = route_evaluator.time_window_end
+
+        self.earliest_arrival = np.maximum(self.time_window_start[:, None] + self.stop_time[:, None] + drive_minutes,
+                                           self.time_window_start[None, :])
+        self.latest_departure = np.minimum(self.time_window_end[None, :] - drive_minutes - self.stop_time[:, None],
+                                           self.time_window_end[:, None])
+
+        compatible = self.earliest_arrival <= self.time_window_end[None, :]
+        compatible[:, 0] = False
+        compatible[1, :] = False
+        compatible[0, 1] = False
+        self.arc_compatibility = np.packbits(compatible, axis=1)
+
+        pair_compatible = (compatible | compatible.T) & \
+            (self.demand[:, None] + self.demand[None, :] <= capacity)
+        pair_compatible[:2, :] = False
+        pair_compatible[:, :2] = False
+        self.pair_compatibility = np.packbits(pair_compatible, axis=1)
+
+        self.successor_bits = [_row_bits(row) for row in compatible]
+        self.compatible_pair_bits = [_row_bits(row) for row in pair_compatible]
+
+    @classmethod
+    def from_model_inputs(cls, model_inputs, capacity=None):
+        '''
+        Create the tables from column generation or general model inputs
+        :param model_inputs:
+        :param capacity: vehicle capacity of the pair compatibility, defaults to the largest vehicle capacity
+        :return:
+        '''
+        if capacity is None:
+            capacity = max(model_inputs.vehicles_dict['CAPACITY'].values())
+        return cls(RouteEvaluator.from_model_inputs(model_inputs), capacity)
+
+    def memory_bytes(self):
+        '''
+        Memory used by the tables
+        :return: bytes per table
+        '''
+        bit_rows = sum(bits.__sizeof__() for bits in self.successor_bits + self.compatible_pair_bits)
+        return {'EARLIEST_ARRIVAL': self.earliest_arrival.nbytes,
+                'LATEST_DEPARTURE': self.latest_departure.nbytes,
+                'ARC_COMPATIBILITY': self.arc_compatibility.nbytes,
+                'PAIR_COMPATIBILITY': self.pair_compatibility.nbytes,
+                'BIT_ROWS': bit_rows}
+
+    def can_follow(self, from_idx, to_idx):
+        return bool(self.successor_bits[from_idx] >> to_idx & 1)
+
+    def compatible_pair(self, first_idx, second_idx):
+        return bool(self.compatible_pair_bits[first_idx] >> second_idx & 1)
+
+    def route_slack(self, stops):
+        '''
+        Forward and backward schedule of a route
+        :param stops: vertex indices from the depot leave to the depot enter vertex
+        :return: RouteSlack
+        '''
+        stops = np.asarray(stops, dtype=np.int64)
+        earliest = np.zeros(len(stops))
+        latest = np.zeros(len(stops))
+        earliest[0] = self.time_window_start[stops[0]]
+        for position in range(1, len(stops)):
+            previous = stops[position - 1]
+            earliest[position] = max(earliest[position - 1] + self.stop_time[previous] +
+                                     self.drive_minutes[previous, stops[position]],
+                                     self.time_window_start[stops[position]])
+        latest[-1] = self.time_window_end[stops[-1]]
+        for position in range(len(stops) - 2, -1, -1):
+            latest[position] = min(self.time_window_end[stops[position]],
+                                   latest[position + 1] - self.drive_minutes[stops[position], stops[position + 1]] -
+                                   self.stop_time[stops[position]])
+        return RouteSlack(stops, earliest, latest, np.cumsum(self.demand[stops]), self.time_window_start[stops])
+
+    def can_insert(self, route_slack, position, vertex, capacity=None):
+        '''
+        Whether vertex can be inserted after the given position of a feasible route, in constant time
+        :param route_slack: RouteSlack of the route
+        :param position: position of the vertex before the insertion
+        :param vertex:
+        :param capacity: vehicle capacity, defaults to the table capacity
+        :return:
+        '''
+        if capacity is None:
+            capacity = self.capacity
+        if route_slack.load + self.demand[vertex] > capacity:
+            return False
+        previous = route_slack.stops[position]
+        following = route_slack.stops[position + 1]
+        if not (self.successor_bits[previous] >> vertex & 1 and self.successor_bits[vertex] >> following & 1):
+            return False
+        service_start = max(route_slack.earliest[position] + self.stop_time[previous] +
+                            self.drive_minutes[previous, vertex], self.time_window_start[vertex])
+        if service_start > self.time_window_end[vertex]:
+            return False
+        return service_start + self.stop_time[vertex] + self.drive_minutes[vertex, following] <= \
+            route_slack.latest[position + 1]
+
+    def can_remove(self, route_slack, position):
+        '''
+        Whether the vertex at the given position can be removed from a feasible route, in constant time
+        :param route_slack: RouteSlack of the route
+        :param position: position of a customer
+        :return:
+        '''
+        previous = route_slack.stops[position - 1]
+        following = route_slack.stops[position + 1]
+        if not self.successor_bits[previous] >> following & 1:
+            return False
+        return route_slack.earliest[position - 1] + self.stop_time[previous] + \
+            self.drive_minutes[previous, following] <= route_slack.latest[position + 1]
+
+    def can_replace(self, route_slack, position, vertex, capacity=None):
+        '''
+        Whether the vertex at the given position of a feasible route can be replaced by vertex, in constant time
+        :param route_slack: RouteSlack of the route
+        :param position: position of a customer
+        :param vertex:
+        :param capacity: vehicle capacity, defaults to the table capacity
+        :return:
+        '''
+        if capacity is None:
+            capacity = self.capacity
+        previous = route_slack.stops[position - 1]
+        following = route_slack.stops[position + 1]
+        if route_slack.load - self.demand[route_slack.stops[position]] + self.demand[vertex] > capacity:
+            return False
+        if not (self.successor_bits[previous] >> vertex & 1 and self.successor_bits[vertex] >> following & 1):
+            return False
+        service_start = max(route_slack.earliest[position - 1] + self.stop_time[previous] +
+                            self.drive_minutes[previous, vertex], self.time_window_start[vertex])
+        if service_start > self.time_window_end[vertex]:
+            return False
+        return service_start + self.stop_time[vertex] + self.drive_minutes[vertex, following] <= \
+            route_slack.latest[position + 1]
+
+    def insertion_positions(self, route_slack, vertex, capacity=None):
+        '''
+        All positions after which vertex can be inserted
+        :param route_slack:
+        :param vertex:
+        :param capacity:
+        :return: positions
+        '''
+        return [position for position in range(len(route_slack.stops) - 1)
+                if self.can_insert(route_slack, position, vertex, capacity)]
+
+
+def create_feasibility_tables(model_inputs, capacity=None):
+    '''
+    Function to create the feasibility tables of column generation or general model inputs, they grow with the
+    square of the number of locations so they are only built on request
+    :param model_inputs:
+    :param capacity: vehicle capacity of the customer pair compatibility, defaults to the largest capacity
+    :return: FeasibilityTables
+    '''
+    feasibility_tables = FeasibilityTables.from_model_inputs(model_inputs, capacity)
+    memory_bytes = feasibility_tables.memory_bytes()
+    print('Feasibility tables memory (MB): ', round(sum(memory_bytes.values()) / 1024 ** 2, 3))
+    return feasibility_tables
+
+
+def _row_bits(row):
+    bits = 0
+    for idx in np.flatnonzero(row):
+        bits |= 1 << int(idx)
+    return bits
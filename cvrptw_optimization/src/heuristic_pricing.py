@@ -0,0 +1,246 @@
+'''
+Heuristic pricing
+Greedy construction, local search and restricted labeling stages run before the exact pricing
+'''
+import numpy as np
+
+from cvrptw_optimization.src.ng_route_pricing import NgRoutePricing
+from cvrptw_optimization.src.feasibility_tables import FeasibilityTables
+
+
+class HeuristicPricing:
+    '''
+    Pricing cascade of heuristics, the first stage finding a route with a reduced cost below the threshold
+    returns its routes. The stages are
+    greedy: routes built from the customers with the largest duals, adding the successor with the cheapest
+    reduced cost while it improves the route, followed by randomized constructions choosing among the best successors
+    local_search: remove, insert and swap moves on existing columns
+    restricted_labeling: ng-route labeling over the arcs to the nearest customers
+
+    The search works on transportation costs minus customer duals, the returned reduced costs include all duals
+    so cut duals only affect which routes are kept. With a lateness_penalty the customer time windows are soft, the
+    construction and local search still build routes serving every customer on time, the returned reduced costs
+    include the lateness and waiting penalties of the route evaluation and the restricted labeling prices them.
+    Vertices use the RouteEvaluator indices, 0 is the depot leave vertex, 1 the depot enter vertex.
+    '''
+
+    stages = ('greedy', 'local_search', 'restricted_labeling')
+
+    def __init__(self, route_evaluator, nearest_neighbours=5, greedy_constructions=10, randomized_constructions=10,
+                 neighbourhood_size=8, random_seed=0, reduced_cost_tolerance=0.000001, lateness_penalty=None,
+                 earliness_penalty=0):
+        self.route_evaluator = route_evaluator
+        self.lateness_penalty = lateness_penalty
+        self.earliness_penalty = earliness_penalty
+        self.greedy_constructions = greedy_constructions
+        self.randomized_constructions = randomized_constructions
+        self.random_seed = random_seed
+        self.reduced_cost_tolerance = reduced_cost_tolerance
+        self.number_of_calls = 0
+
+        self.feasibility_tables = FeasibilityTables(route_evaluator)
+        self.number_of_vertices = len(route_evaluator.location_names)
+        self.customers = list(range(2, self.number_of_vertices))
+        self.demand = self.feasibility_tables.demand.tolist()
+        self.stop_time = self.feasibility_tables.stop_time.tolist()
+        self.time_window_start = self.feasibility_tables.time_window_start.tolist()
+        self.time_window_end = self.feasibility_tables.time_window_end.tolist()
+        self.drive_minutes = self.feasibility_tables.drive_minutes.tolist()
+
+        self.restricted_labeling = NgRoutePricing(route_evaluator,
+                                                  neighbourhood_size=neighbourhood_size,
+                                                  nearest_successors=nearest_neighbours,
+                                                  lateness_penalty=lateness_penalty,
+                                                  earliness_penalty=earliness_penalty)
+
+    def solve(self, price, capacity, fixed_cost=0, vehicle_type_price=0, seed_paths=(), max_columns=10,
+              cuts=None, cut_price=None, reduced_cost_threshold=-1, seed=None):
+        '''
+        Run the stages in order until one finds routes
+        :param price: customer duals
+        :param capacity: vehicle capacity
+        :param fixed_cost: vehicle fixed cost
+        :param vehicle_type_price: dual of the vehicle type availability constraint
+        :param seed_paths: existing columns improved by the local search
+        :param max_columns: maximum number of routes returned
+        :param cuts: cuts of the master problem
+        :param cut_price: cut duals by cut name
+        :param reduced_cost_threshold: a stage succeeds with a route below the threshold
+        :param seed: seed of the randomized constructions added to random_seed, callers pricing from several threads
+        pass one per call to stay deterministic. None uses the number of calls
+        :return: stage name or None, list of (reduced cost, path) sorted by reduced cost
+        '''
+        if seed is None:
+            self.number_of_calls += 1
+            seed = self.number_of_calls
+        random_state = np.random.RandomState(self.random_seed + seed)
+        duals = [0.0, 0.0] + [price.get(customer, 0.0) for customer in self.route_evaluator.customer_names]
+        arc_reduced_cost = (self.route_evaluator.transportation_cost - np.array(duals)[None, :])
+        arc_reduced_cost = np.where(np.isnan(arc_reduced_cost), np.inf, arc_reduced_cost).tolist()
+        constant = float(fixed_cost) - float(vehicle_type_price)
+        capacity = float(capacity)
+        location_index = self.route_evaluator.location_index
+
+        for stage in self.stages:
+            if stage == 'greedy':
+                routes = self._construct_routes(duals, arc_reduced_cost, capacity, random_state)
+            elif stage == 'local_search':
+                routes = [self._local_search([location_index[location] for location in path], arc_reduced_cost,
+                                             capacity) for path in seed_paths]
+            else:
+                columns, truncated = self.restricted_labeling.solve(price, capacity, fixed_cost, vehicle_type_price,
+                                                                    max_columns=max_columns, cuts=cuts,
+                                                                    cut_price=cut_price)
+                routes = [[location_index[location] for location in path] for reduced_cost, path in columns]
+
+            columns = self._columns(routes, price, constant, cuts, cut_price, max_columns)
+            if columns and columns[0][0] <= reduced_cost_threshold:
+                return stage, columns
+        return None, []
+
+    def _columns(self, routes, price, constant, cuts, cut_price, max_columns):
+        '''
+        Distinct routes with a negative reduced cost including the cut duals and the soft time window penalties
+        :return: list of (reduced cost, path) sorted by reduced cost
+        '''
+        location_names = self.route_evaluator.location_names
+        paths = {}
+        for route in routes:
+            if route is None or len(route) <= 2:
+                continue
+            path = [location_names[vertex] for vertex in route]
+            paths[tuple(path)] = path
+        if not paths:
+            return []
+
+        paths = list(paths.values())
+        evaluation = self.route_evaluator.evaluate(paths)
+        if self.lateness_penalty is None:
+            costs = evaluation.cost
+            feasible_paths = evaluation.feasible
+        else:
+            costs = evaluation.cost + evaluation.time_window_penalty(self.lateness_penalty, self.earliness_penalty)
+            feasible_paths = evaluation.soft_feasible
+        columns = []
+        for path, cost, feasible in zip(paths, costs, feasible_paths):
+            if not feasible:
+                # seed columns breaking a time window, with soft time windows the depot time window
+                continue
+            reduced_cost = cost + constant - sum(price.get(location, 0.0) for location in path)
+            for cut in cuts or []:
+                reduced_cost -= (cut_price or {}).get(cut.name, 0.0) * cut.coefficient(path)
+            if reduced_cost < -self.reduced_cost_tolerance:
+                columns.append((reduced_cost, path))
+        columns.sort(key=lambda column: column[0])
+        return columns[:max_columns]
+
+    def _feasible(self, route, capacity):
+        '''
+        Capacity and time window feasibility of an elementary route
+        :param route: vertex indices from the depot leave to the depot enter vertex
+        :param capacity:
+        :return:
+        '''
+        if sum(self.demand[vertex] for vertex in route) > capacity:
+            return False
+        successor_bits = self.feasibility_tables.successor_bits
+        if not all(successor_bits[from_idx] >> to_idx & 1 for from_idx, to_idx in zip(route[:-1], route[1:])):
+            return False
+        time = self.time_window_start[route[0]]
+        for from_idx, to_idx in zip(route[:-1], route[1:]):
+            time = max(time + self.stop_time[from_idx] + self.drive_minutes[from_idx][to_idx],
+                       self.time_window_start[to_idx])
+            if time > self.time_window_end[to_idx]:
+                return False
+        return True
+
+    def _construct_routes(self, duals, arc_reduced_cost, capacity, random_state):
+        '''
+        Greedy routes from the customers with the largest duals and randomized routes from random customers
+        :return: routes
+        '''
+        customers = sorted(self.customers, key=lambda customer: -duals[customer])
+        starts = [(customer, False) for customer in customers[:self.greedy_constructions]]
+        starts += [(customer, True) for customer in random_state.choice(self.customers,
+                                                                        size=self.randomized_constructions)]
+        return [self._construct([0, start, 1], arc_reduced_cost, capacity, random_state if randomized else None)
+                for start, randomized in starts]
+
+    def _construct(self, route, arc_reduced_cost, capacity, random_state=None):
+        '''
+        Extend a route before its depot enter vertex while the reduced cost improves
+        :param route: starting route
+        :param random_state: choose at random among the three best successors if given
+        :return: route or None if the starting route is infeasible
+        '''
+        if not self._feasible(route, capacity):
+            return None
+        visited = set(route)
+        load = sum(self.demand[vertex] for vertex in route)
+        route_slack = self.feasibility_tables.route_slack(route)
+        while True:
+            last = route[-2]
+            candidates = []
+            for customer in self.customers:
+                if customer in visited or load + self.demand[customer] > capacity:
+                    continue
+                delta = arc_reduced_cost[last][customer] + arc_reduced_cost[customer][1] - arc_reduced_cost[last][1]
+                if delta < -self.reduced_cost_tolerance:
+                    candidates.append((delta, customer))
+            candidates.sort()
+            if random_state is not None and len(candidates) > 1:
+                candidates = [candidates[random_state.randint(min(3, len(candidates)))]] + candidates
+            extended = False
+            for delta, customer in candidates:
+                # the customer is inserted before the depot enter vertex
+                if self.feasibility_tables.can_insert(route_slack, len(route) - 2, customer, capacity):
+                    route = route[:-1] + [customer, 1]
+                    route_slack = self.feasibility_tables.route_slack(route)
+                    visited.add(customer)
+                    load += self.demand[customer]
+                    extended = True
+                    break
+            if not extended:
+                return route
+
+    def _local_search(self, route, arc_reduced_cost, capacity):
+        '''
+        Best improvement descent with remove, insert and swap moves. The moves are checked in constant time against
+        the route slack, which is refreshed after every accepted move
+        :param route: vertex indices from the depot leave to the depot enter vertex
+        :return: improved route, an infeasible route is returned as it is
+        '''
+        if not self._feasible(route, capacity):
+            return route
+        feasibility_tables = self.feasibility_tables
+        while True:
+            route_slack = feasibility_tables.route_slack(route)
+            visited = set(route)
+            unvisited = [customer for customer in self.customers if customer not in visited]
+
+            best_route = None
+            best_delta = -self.reduced_cost_tolerance
+            for position in range(1, len(route) - 1):
+                previous, vertex, following = route[position - 1], route[position], route[position + 1]
+                removed_arcs = arc_reduced_cost[previous][vertex] + arc_reduced_cost[vertex][following]
+                delta = arc_reduced_cost[previous][following] - removed_arcs
+                if delta < best_delta and feasibility_tables.can_remove(route_slack, position):
+                    best_route = route[:position] + route[position + 1:]
+                    best_delta = delta
+                for customer in unvisited:
+                    delta = arc_reduced_cost[previous][customer] + arc_reduced_cost[customer][following] - removed_arcs
+                    if delta < best_delta and feasibility_tables.can_replace(route_slack, position, customer, capacity):
+                        best_route = route[:position] + [customer] + route[position + 1:]
+                        best_delta = delta
+            for position in range(1, len(route)):
+                before, after = route[position - 1], route[position]
+                for customer in unvisited:
+                    delta = arc_reduced_cost[before][customer] + arc_reduced_cost[customer][after] - \
+                        arc_reduced_cost[before][after]
+                    if delta < best_delta and feasibility_tables.can_insert(route_slack, position - 1, customer,
+                                                                            capacity):
+                        best_route = route[:position] + [customer] + route[position:]
+                        best_delta = delta
+            if best_route is None:
+                return route
+            route = best_route
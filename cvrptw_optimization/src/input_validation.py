@@ -0,0 +1,172 @@
+'''
+Input validation
+Pre-solve checks of the model inputs for customers no vehicle can serve and instances no fleet can serve
+'''
+import numpy as np
+import pandas as pd
+
+from cvrptw_optimization.src import single_depot_column_generation_pulp_inputs as inputs
+from cvrptw_optimization.src.route_evaluation import RouteEvaluator
+
+
+class InputDiagnostics:
+    '''
+    Diagnostic report, one row per issue with its ISSUE, SEVERITY, LOCATION_NAME and DETAIL.
+    Errors make the instance infeasible, errors of a customer are removed by dropping the customer, errors without a
+    LOCATION_NAME concern the whole instance. Warnings, as missing arcs between two customers, only restrict routes.
+    '''
+
+    columns = ['ISSUE', 'SEVERITY', 'LOCATION_NAME', 'DETAIL']
+
+    def __init__(self, issues):
+        self.issues = pd.DataFrame(issues, columns=self.columns)
+        errors = self.issues[self.issues['SEVERITY'] == 'error']
+        self.offending_customers = errors['LOCATION_NAME'].dropna().unique().tolist()
+        self.instance_errors = errors[errors['LOCATION_NAME'].isnull()]
+        self.feasible = len(errors) == 0
+
+    def __len__(self):
+        return len(self.issues)
+
+    def to_dataframe(self):
+        return self.issues.copy()
+
+    def print_report(self):
+        if not len(self.issues):
+            print('Input validation: no issues')
+            return
+        print('Input validation issues:')
+        for issue in self.issues.itertuples(index=False):
+            print('    {} {} {}: {}'.format(issue.SEVERITY.upper(), issue.ISSUE,
+                                            '' if issue.LOCATION_NAME is None else issue.LOCATION_NAME, issue.DETAIL))
+
+    def drop_customers(self, customers, transportation_matrix):
+        '''
+        Remove the offending customers from the inputs
+        :param customers:
+        :param transportation_matrix:
+        :return: customers, transportation matrix
+        '''
+        dropped = self.offending_customers
+        customers = customers[~customers['LOCATION_NAME'].isin(dropped)]
+        transportation_matrix = transportation_matrix[~transportation_matrix['FROM_LOCATION_NAME'].isin(dropped) &
+                                                      ~transportation_matrix['TO_LOCATION_NAME'].isin(dropped)]
+        return customers, transportation_matrix
+
+
+def validate_model_inputs(model_inputs, capacity=None, soft_time_windows=False, fleet_limit=True,
+                          every_vehicle_used=False):
+    '''
+    Vectorized feasibility checks of every customer and of the fleet
+    :param model_inputs: column generation or general model inputs
+    :param capacity: vehicle capacity, defaults to the largest capacity in vehicles
+    :param soft_time_windows: customers may be served after their time window end until the depot closes
+    :param fleet_limit: the number of vehicles is limited, the fleet capacity has to cover the demand
+    :param every_vehicle_used: every vehicle serves at least one customer
+    :return: InputDiagnostics
+    '''
+    route_evaluator = RouteEvaluator.from_model_inputs(model_inputs)
+    customer_names = np.array(route_evaluator.customer_names, dtype=object)
+    customers = np.arange(2, len(route_evaluator.location_names))
+    if capacity is None:
+        capacity = max(model_inputs.vehicles_dict['CAPACITY'].values())
+
+    demand = route_evaluator.demand[customers]
+    stop_time = route_evaluator.stop_time[customers]
+    window_start = route_evaluator.time_window_start[customers]
+    window_end = route_evaluator.time_window_end[customers]
+    depot_open = route_evaluator.time_window_start[0]
+    depot_close = route_evaluator.time_window_end[1]
+    drive_minutes = route_evaluator.drive_minutes
+    drive_out = drive_minutes[0, customers]
+    drive_back = drive_minutes[customers, 1]
+
+    issues = []
+
+    def add_customer_issues(mask, issue, severity, details):
+        for customer, detail in zip(customer_names[mask], np.asarray(details, dtype=object)[mask]):
+            issues.append({'ISSUE': issue, 'SEVERITY': severity, 'LOCATION_NAME': customer, 'DETAIL': detail})
+
+    if depot_open > depot_close:
+        issues.append({'ISSUE': 'INVALID_DEPOT_TIME_WINDOW', 'SEVERITY': 'error', 'LOCATION_NAME': None,
+                       'DETAIL': 'depot opens at {} after closing at {}'.format(depot_open, depot_close)})
+
+    add_customer_issues(demand > capacity, 'DEMAND_ABOVE_CAPACITY', 'error',
+                        ['demand {} above the largest vehicle capacity {}'.format(value, capacity) for value in demand])
+    add_customer_issues(window_start > window_end, 'INVALID_TIME_WINDOW', 'error',
+                        ['time window starts at {} after its end {}'.format(start, end)
+                         for start, end in zip(window_start, window_end)])
+
+    missing_out = np.isnan(drive_out)
+    missing_back = np.isnan(drive_back)
+    reachable = ~(missing_out | missing_back)
+    add_customer_issues(~reachable, 'MISSING_DEPOT_ARC', 'error',
+                        ['no matrix pair {}'.format(' and '.join(
+                            direction for direction, missing in (('from the depot', out), ('to the depot', back))
+                            if missing)) for out, back in zip(missing_out, missing_back)])
+
+    # service starts in time and the vehicle is back before the depot closes on the direct route
+    arrival = depot_open + np.nan_to_num(drive_out)
+    late = reachable & (arrival > window_end) & (not soft_time_windows)
+    add_customer_issues(late, 'UNREACHABLE_TIME_WINDOW', 'error',
+                        ['earliest arrival {} after the time window end {}'.format(round(value, 2), end)
+                         for value, end in zip(arrival, window_end)])
+    depot_return = np.maximum(arrival, window_start) + stop_time + np.nan_to_num(drive_back)
+    add_customer_issues(reachable & ~late & (depot_return > depot_close), 'DEPOT_CLOSED', 'error',
+                        ['earliest return {} after the depot closes at {}'.format(round(value, 2), depot_close)
+                         for value in depot_return])
+
+    # missing pairs between customers only restrict the routes
+    customer_drive = drive_minutes[np.ix_(customers, customers)]
+    missing_pairs = np.isnan(customer_drive).sum(axis=1) - 1
+    add_customer_issues(missing_pairs > 0, 'MISSING_CUSTOMER_ARCS', 'warning',
+                        ['no matrix pair to {} customers'.format(value) for value in missing_pairs])
+
+    servable = ~np.isin(customer_names, [issue['LOCATION_NAME'] for issue in issues if issue['SEVERITY'] == 'error'])
+    if fleet_limit:
+        fleet_capacity = float(sum(model_inputs.vehicles_dict['CAPACITY'].values()))
+        if demand[servable].sum() > fleet_capacity:
+            issues.append({'ISSUE': 'FLEET_CAPACITY', 'SEVERITY': 'error', 'LOCATION_NAME': None,
+                           'DETAIL': 'demand {} of the servable customers above the fleet capacity {}'.format(
+                               demand[servable].sum(), fleet_capacity)})
+    if every_vehicle_used and len(model_inputs.vehicles_dict['CAPACITY']) > servable.sum():
+        issues.append({'ISSUE': 'FLEET_SIZE', 'SEVERITY': 'error', 'LOCATION_NAME': None,
+                       'DETAIL': '{} vehicles have to serve {} servable customers'.format(
+                           len(model_inputs.vehicles_dict['CAPACITY']), servable.sum())})
+
+    return InputDiagnostics(issues)
+
+
+def validate_inputs(depots, customers, transportation_matrix, vehicles, drop_infeasible_customers=False,
+                    capacity=None, soft_time_windows=False, fleet_limit=True, every_vehicle_used=False):
+    '''
+    Function to check the inputs before solving, print the diagnostic report and drop the offending customers
+    :param depots:
+    :param customers:
+    :param transportation_matrix:
+    :param vehicles:
+    :param drop_infeasible_customers: remove the customers no vehicle can serve, otherwise raise
+    :param capacity:
+    :param soft_time_windows:
+    :param fleet_limit:
+    :param every_vehicle_used:
+    :return: customers, transportation matrix, InputDiagnostics
+    '''
+    model_inputs = inputs.ModelInputs(transportation_matrix, customers, depots, vehicles)
+    diagnostics = validate_model_inputs(model_inputs,
+                                        capacity=capacity,
+                                        soft_time_windows=soft_time_windows,
+                                        fleet_limit=fleet_limit,
+                                        every_vehicle_used=every_vehicle_used)
+    diagnostics.print_report()
+    if diagnostics.feasible:
+        return customers, transportation_matrix, diagnostics
+
+    if not drop_infeasible_customers or len(diagnostics.instance_errors):
+        raise Exception('Infeasible inputs: {}'.format('; '.join(
+            issue.ISSUE + ('' if issue.LOCATION_NAME is None else ' ' + issue.LOCATION_NAME)
+            for issue in diagnostics.issues.itertuples() if issue.SEVERITY == 'error')))
+
+    print('Dropping customers: ', diagnostics.offending_customers)
+    customers, transportation_matrix = diagnostics.drop_customers(customers, transportation_matrix)
+    return customers, transportation_matrix, diagnostics
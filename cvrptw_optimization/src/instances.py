@@ -0,0 +1,194 @@
+'''
+Instance readers and generator
+Solomon and Gehring-Homberger text files and seeded random instances
+into the depots, customers, transportation matrix and vehicles data frames
+'''
+import numpy as np
+import pandas as pd
+
+
+def create_transportation_matrix(locations, cost_per_minute=1.0, distance_decimals=None):
+    '''
+    Create the transportation matrix from planar coordinates, travel time equals euclidean distance
+    :param locations: data frame with LOCATION_NAME, LATITUDE, LONGITUDE
+    :param cost_per_minute:
+    :param distance_decimals: truncate distances to this many decimals, e.g. 1 for the usual Solomon convention
+    :return:
+    '''
+    names = locations['LOCATION_NAME'].to_numpy()
+    x = locations['LONGITUDE'].to_numpy(dtype=float)
+    y = locations['LATITUDE'].to_numpy(dtype=float)
+    number_of_locations = len(names)
+
+    distance = np.sqrt((x[:, None] - x[None, :]) ** 2 + (y[:, None] - y[None, :]) ** 2)
+    if distance_decimals is not None:
+        distance = np.floor(distance * 10 ** distance_decimals) / 10 ** distance_decimals
+
+    from_idx = np.repeat(np.arange(number_of_locations), number_of_locations)
+    to_idx = np.tile(np.arange(number_of_locations), number_of_locations)
+    distance = distance.ravel()
+
+    return pd.DataFrame({'FROM_LOCATION_NAME': names[from_idx],
+                         'TO_LOCATION_NAME': names[to_idx],
+                         'FROM_LATITUDE': y[from_idx],
+                         'FROM_LONGITUDE': x[from_idx],
+                         'TO_LATITUDE': y[to_idx],
+                         'TO_LONGITUDE': x[to_idx],
+                         'DRIVE_MINUTES': distance,
+                         'HAVERSINE_DISTANCE_MILES': distance,
+                         'TRANSPORTATION_COST': distance * cost_per_minute})
+
+
+def _create_depots(x, y, time_window_start, time_window_end, maximum_capacity):
+    return pd.DataFrame({'LOCATION_NAME': ['DEPOT'],
+                         'LATITUDE': [y],
+                         'LONGITUDE': [x],
+                         'TIME_WINDOW_START': [time_window_start],
+                         'TIME_WINDOW_END': [time_window_end],
+                         'MAXIMUM_CAPACITY': [maximum_capacity]})
+
+
+def _create_vehicles(number_of_vehicles, capacity, vehicle_fixed_cost):
+    return pd.DataFrame({'VEHICLE_NAME': ['VEHICLE {}'.format(vehicle) for vehicle in range(number_of_vehicles)],
+                         'CAPACITY': capacity,
+                         'VEHICLE_FIXED_COST': vehicle_fixed_cost})
+
+
+def read_solomon_instance(file_name,
+                          number_of_vehicles=None,
+                          vehicle_fixed_cost=0,
+                          number_of_customers=None,
+                          distance_decimals=None):
+    '''
+    Read a Solomon or Gehring-Homberger instance file, both use the same layout.
+    Node 0 is the depot, coordinates are stored as LONGITUDE (x) and LATITUDE (y)
+    :param file_name:
+    :param number_of_vehicles: overrides the fleet size in the file
+    :param vehicle_fixed_cost:
+    :param number_of_customers: keep only the first customers, e.g. 25 or 50 for the reduced Solomon sets
+    :param distance_decimals: truncate distances to this many decimals
+    :return: depots, customers, transportation_matrix, vehicles
+    '''
+    with open(file_name) as instance_file:
+        lines = [line.split() for line in instance_file if line.strip()]
+
+    vehicle_line = None
+    nodes = []
+    for idx, line in enumerate(lines):
+        if line[0].upper() == 'VEHICLE':
+            vehicle_line = lines[idx + 2]
+        if len(line) == 7:
+            try:
+                nodes.append([float(value) for value in line])
+            except ValueError:
+                continue
+
+    if vehicle_line is None or len(nodes) < 2:
+        raise Exception('{} is not a Solomon format instance'.format(file_name))
+
+    nodes = pd.DataFrame(nodes, columns=['NODE', 'LONGITUDE', 'LATITUDE', 'DEMAND', 'TIME_WINDOW_START',
+                                         'TIME_WINDOW_END', 'STOP_TIME'])
+    nodes['NODE'] = nodes['NODE'].astype(int)
+    depot = nodes[nodes['NODE'] == 0]
+    customers = nodes[nodes['NODE'] != 0].copy()
+    if number_of_customers is not None:
+        customers = customers.head(number_of_customers)
+
+    if number_of_vehicles is None:
+        number_of_vehicles = int(vehicle_line[0])
+    capacity = float(vehicle_line[1])
+
+    depots = _create_depots(depot['LONGITUDE'].iloc[0],
+                            depot['LATITUDE'].iloc[0],
+                            depot['TIME_WINDOW_START'].iloc[0],
+                            depot['TIME_WINDOW_END'].iloc[0],
+                            capacity * number_of_vehicles)
+
+    customers['LOCATION_NAME'] = 'CUSTOMER ' + customers['NODE'].astype(str)
+    customers = customers[['LOCATION_NAME', 'LATITUDE', 'LONGITUDE', 'STOP_TIME', 'TIME_WINDOW_START',
+                           'TIME_WINDOW_END', 'DEMAND']].reset_index(drop=True)
+
+    transportation_matrix = create_transportation_matrix(
+        depots[['LOCATION_NAME', 'LATITUDE', 'LONGITUDE']].append(customers[['LOCATION_NAME', 'LATITUDE', 'LONGITUDE']]),
+        distance_decimals=distance_decimals)
+
+    vehicles = _create_vehicles(number_of_vehicles, capacity, vehicle_fixed_cost)
+
+    return depots, customers, transportation_matrix, vehicles
+
+
+def generate_instance(number_of_customers,
+                      seed=0,
+                      clustering=0.0,
+                      number_of_clusters=5,
+                      cluster_spread=5.0,
+                      time_window_tightness=0.25,
+                      horizon=1000,
+                      grid_size=100,
+                      stop_time=10,
+                      demand_range=(5, 30),
+                      capacity=200,
+                      number_of_vehicles=None,
+                      vehicle_fixed_cost=0):
+    '''
+    Generate a seeded random instance in the style of the Solomon R, C and RC sets.
+    Every customer gets a time window that can be reached from the depot and still return before the horizon
+    :param number_of_customers:
+    :param seed:
+    :param clustering: share of customers placed around cluster centres, 0 is random (R), 1 is clustered (C)
+    :param number_of_clusters:
+    :param cluster_spread: standard deviation of customer coordinates around a cluster centre
+    :param time_window_tightness: time window width as a share of the horizon, 1 removes time windows
+    :param horizon: depot time window end
+    :param grid_size: coordinates are drawn from [0, grid_size]
+    :param stop_time: service time at every customer
+    :param demand_range: inclusive integer demand range
+    :param capacity: vehicle capacity
+    :param number_of_vehicles: defaults to twice the capacity lower bound
+    :param vehicle_fixed_cost:
+    :return: depots, customers, transportation_matrix, vehicles
+    '''
+    random_state = np.random.RandomState(seed)
+    depot_x = depot_y = grid_size / 2
+
+    number_of_clustered = int(round(clustering * number_of_customers))
+    centres = random_state.uniform(0, grid_size, size=(number_of_clusters, 2))
+    cluster_idx = random_state.randint(0, number_of_clusters, size=number_of_clustered)
+    clustered = centres[cluster_idx] + random_state.normal(0, cluster_spread, size=(number_of_clustered, 2))
+    uniform = random_state.uniform(0, grid_size, size=(number_of_customers - number_of_clustered, 2))
+    coordinates = np.clip(np.vstack([clustered, uniform]), 0, grid_size)
+    coordinates = coordinates[random_state.permutation(number_of_customers)]
+
+    demand = random_state.randint(demand_range[0], demand_range[1] + 1, size=number_of_customers)
+
+    depot_distance = np.sqrt((coordinates[:, 0] - depot_x) ** 2 + (coordinates[:, 1] - depot_y) ** 2)
+    earliest = np.ceil(depot_distance)
+    latest = np.floor(horizon - stop_time - depot_distance)
+    if (latest < earliest).any():
+        raise Exception('Horizon {} is too short for a grid of size {}'.format(horizon, grid_size))
+
+    centre = random_state.uniform(earliest, latest)
+    half_width = time_window_tightness * horizon / 2
+    time_window_start = np.floor(np.maximum(earliest, centre - half_width))
+    time_window_end = np.ceil(np.minimum(latest, centre + half_width))
+
+    if number_of_vehicles is None:
+        number_of_vehicles = int(2 * np.ceil(demand.sum() / capacity))
+
+    depots = _create_depots(depot_x, depot_y, 0, horizon, capacity * number_of_vehicles)
+
+    customers = pd.DataFrame({'LOCATION_NAME': ['CUSTOMER {}'.format(customer + 1)
+                                                for customer in range(number_of_customers)],
+                              'LATITUDE': coordinates[:, 1],
+                              'LONGITUDE': coordinates[:, 0],
+                              'STOP_TIME': stop_time,
+                              'TIME_WINDOW_START': time_window_start.astype(int),
+                              'TIME_WINDOW_END': time_window_end.astype(int),
+                              'DEMAND': demand})
+
+    transportation_matrix = create_transportation_matrix(
+        depots[['LOCATION_NAME', 'LATITUDE', 'LONGITUDE']].append(customers[['LOCATION_NAME', 'LATITUDE', 'LONGITUDE']]))
+
+    vehicles = _create_vehicles(number_of_vehicles, capacity, vehicle_fixed_cost)
+
+    return depots, customers, transportation_matrix, vehicles
@@ -0,0 +1,279 @@
+'''
+Run instrumentation
+Wall time, CPU time and peak memory per solver phase, with optional cProfile profiles of the phases
+'''
+import os
+import re
+import sys
+import time
+import json
+import pstats
+import cProfile
+import tracemalloc
+import pandas as pd
+
+try:
+    import resource
+except ImportError:
+    # not available on windows
+    resource = None
+
+
+# phases building the model inputs, formulating and solving the models and extracting the solutions
+PROFILED_PHASES = ('model_inputs', 'formulate_problem', 'solve_model', 'get_model_solution', 'master_problem',
+                   'final_master_problem', 'sub_problem', 'process_paths')
+
+
+class _NullPhase:
+    '''
+    No-op phase used when instrumentation is disabled
+    '''
+
+    record = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NULL_PHASE = _NullPhase()
+
+
+def track_phase(instrumentation, name, **tags):
+    '''
+    Function to time a phase if instrumentation is given
+    :param instrumentation: RunInstrumentation or None
+    :param name: phase name
+    :param tags: extra columns stored with the record, e.g. ITERATION
+    :return: context manager
+    '''
+    if instrumentation is None:
+        return _NULL_PHASE
+    return instrumentation.phase(name, **tags)
+
+
+def _max_rss_mb(who):
+    '''
+    Function to get the peak resident set size in MB
+    :param who: resource.RUSAGE_SELF or resource.RUSAGE_CHILDREN
+    :return:
+    '''
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(who).ru_maxrss
+    # linux reports kilobytes, mac os bytes
+    if sys.platform == 'darwin':
+        return max_rss / (1024 * 1024)
+    return max_rss / 1024
+
+
+class _Phase:
+
+    def __init__(self, instrumentation, name, tags):
+        self.instrumentation = instrumentation
+        self.name = name
+        self.tags = tags
+        self.record = None
+        self.peak_memory = 0
+
+        self._wall_start = None
+        self._cpu_start = None
+        self._child_cpu_start = None
+
+    def __enter__(self):
+        self.instrumentation._enter(self)
+        times = os.times()
+        self._child_cpu_start = times.children_user + times.children_system
+        self._cpu_start = time.process_time()
+        self._wall_start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        wall_seconds = time.perf_counter() - self._wall_start
+        cpu_seconds = time.process_time() - self._cpu_start
+        times = os.times()
+        child_cpu_seconds = times.children_user + times.children_system - self._child_cpu_start
+
+        self.record = {'PHASE': self.name,
+                       'WALL_SECONDS': wall_seconds,
+                       'CPU_SECONDS': cpu_seconds,
+                       'SOLVER_CPU_SECONDS': child_cpu_seconds,
+                       'PEAK_MEMORY_MB': None,
+                       'MAX_RSS_MB': _max_rss_mb(resource.RUSAGE_SELF) if resource else None,
+                       'SOLVER_MAX_RSS_MB': _max_rss_mb(resource.RUSAGE_CHILDREN) if resource else None,
+                       'FAILED': exc_type is not None}
+        self.instrumentation._exit(self)
+        return False
+
+
+class RunInstrumentation:
+    '''
+    Records wall time, CPU time and memory for each phase of a solver run.
+
+    CPU_SECONDS is the python process, SOLVER_CPU_SECONDS the solver subprocess (CBC).
+    PEAK_MEMORY_MB is the peak python heap during the phase and is only recorded with trace_memory=True,
+    since tracemalloc slows down model building noticeably.
+
+    With profile=True every phase in profile_phases runs under cProfile, one profile per phase name accumulated
+    over its calls. A profiled phase inside another one is part of the outer profile. Time spent waiting for the
+    solver subprocess shows up as the subprocess wait of PuLP.
+    '''
+
+    def __init__(self, trace_memory=False, run_name=None, profile=False, profile_phases=PROFILED_PHASES):
+        self.trace_memory = trace_memory
+        self.run_name = run_name
+        self.records = []
+        self.profile_phases = set(profile_phases) if profile else None
+        self.profiles = {}
+
+        self._profiled_phase = None
+        self._stack = []
+        self._started_tracemalloc = False
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+
+    def phase(self, name, **tags):
+        '''
+        Context manager timing a phase
+        :param name: phase name
+        :param tags: extra columns stored with the record
+        :return:
+        '''
+        return _Phase(self, name, tags)
+
+    def _enter(self, phase):
+        if self._stack:
+            # nested phases inherit tags such as ITERATION
+            tags = dict(self._stack[-1].tags)
+            tags.update(phase.tags)
+            phase.tags = tags
+        if self.trace_memory and tracemalloc.is_tracing():
+            peak = tracemalloc.get_traced_memory()[1]
+            if self._stack:
+                self._stack[-1].peak_memory = max(self._stack[-1].peak_memory, peak)
+            if hasattr(tracemalloc, 'reset_peak'):
+                tracemalloc.reset_peak()
+        self._stack.append(phase)
+        if self.profile_phases is not None and self._profiled_phase is None and phase.name in self.profile_phases:
+            self._start_profile(phase)
+
+    def _start_profile(self, phase):
+        profiler = self.profiles.get(phase.name) or cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # another profiler is active, e.g. the run itself is profiled
+            print('Profiling of phase {} skipped, another profiler is active'.format(phase.name))
+            return
+        self.profiles[phase.name] = profiler
+        self._profiled_phase = phase
+
+    def _exit(self, phase):
+        if phase is self._profiled_phase:
+            self.profiles[phase.name].disable()
+            self._profiled_phase = None
+        self._stack.pop()
+        phase.record.update(phase.tags)
+        if self.trace_memory and tracemalloc.is_tracing():
+            peak = max(phase.peak_memory, tracemalloc.get_traced_memory()[1])
+            if hasattr(tracemalloc, 'reset_peak'):
+                tracemalloc.reset_peak()
+            if self._stack:
+                self._stack[-1].peak_memory = max(self._stack[-1].peak_memory, peak)
+            phase.record['PEAK_MEMORY_MB'] = peak / (1024 * 1024)
+        phase.record['DEPTH'] = len(self._stack)
+        if self.run_name is not None:
+            phase.record['RUN_NAME'] = self.run_name
+        self.records.append(phase.record)
+
+    def stop(self):
+        '''
+        Stop memory tracing if it was started by this object
+        :return:
+        '''
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def to_dataframe(self):
+        '''
+        Get records as a data frame
+        :return:
+        '''
+        return pd.DataFrame(self.records)
+
+    def summary(self):
+        '''
+        Total time per phase
+        :return:
+        '''
+        records = self.to_dataframe()
+        if records.empty:
+            return records
+        return records.groupby('PHASE').agg(COUNT=('WALL_SECONDS', 'size'),
+                                            WALL_SECONDS=('WALL_SECONDS', 'sum'),
+                                            CPU_SECONDS=('CPU_SECONDS', 'sum'),
+                                            SOLVER_CPU_SECONDS=('SOLVER_CPU_SECONDS', 'sum'),
+                                            MAX_RSS_MB=('MAX_RSS_MB', 'max')).reset_index()
+
+    def to_json(self, file_name=None):
+        '''
+        Export records as json
+        :param file_name: if None the json string is returned
+        :return:
+        '''
+        json_records = json.dumps({'RUN_NAME': self.run_name, 'PHASES': self.records}, indent=2, default=str)
+        if file_name is None:
+            return json_records
+        with open(file_name, 'w') as json_file:
+            json_file.write(json_records)
+
+    def profile_summary(self, top=20):
+        '''
+        Hot functions of the profiled phases
+        :param top: number of functions per phase with the most own time
+        :return: data frame with the PHASE, FUNCTION, CALLS, TOTAL_SECONDS spent in the function itself and
+        CUMULATIVE_SECONDS including its callees
+        '''
+        rows = []
+        for phase, profiler in self.profiles.items():
+            stats = pstats.Stats(profiler).stats
+            functions = sorted(stats.items(), key=lambda item: item[1][2], reverse=True)[:top]
+            for (file_name, line, function_name), (calls, primitive_calls, total, cumulative, callers) in functions:
+                rows.append({'PHASE': phase,
+                             'FUNCTION': '{}:{}({})'.format(file_name, line, function_name),
+                             'CALLS': calls,
+                             'TOTAL_SECONDS': total,
+                             'CUMULATIVE_SECONDS': cumulative})
+        return pd.DataFrame(rows, columns=['PHASE', 'FUNCTION', 'CALLS', 'TOTAL_SECONDS', 'CUMULATIVE_SECONDS'])
+
+    def write_profiles(self, directory, top=20):
+        '''
+        Write one cProfile file per profiled phase and the hot functions summary, the files are named after the run.
+        The .prof files load with pstats and render as flame graphs with tools such as snakeviz or flameprof
+        :param directory:
+        :param top: number of functions per phase in the summary
+        :return: list of written files
+        '''
+        os.makedirs(directory, exist_ok=True)
+        prefix = re.sub(r'[^\w.-]+', '_', self.run_name) + '_' if self.run_name else ''
+        file_names = []
+        for phase, profiler in self.profiles.items():
+            file_name = os.path.join(directory, '{}{}.prof'.format(prefix, phase))
+            profiler.dump_stats(file_name)
+            file_names.append(file_name)
+        summary_file = os.path.join(directory, '{}profile_summary.csv'.format(prefix))
+        self.profile_summary(top).to_csv(summary_file, index=False)
+        file_names.append(summary_file)
+        return file_names
+
+    def to_csv(self, file_name):
+        '''
+        Export records as csv
+        :param file_name:
+        :return:
+        '''
+        self.to_dataframe().to_csv(file_name, index=False)
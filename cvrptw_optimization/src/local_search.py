@@ -0,0 +1,302 @@
+'''
+Local search
+Intra route 2-opt and or-opt, inter route relocate, swap and 2-opt* moves for solution polishing
+'''
+import time
+
+import numpy as np
+
+from cvrptw_optimization.src.feasibility_tables import FeasibilityTables
+
+
+class _Route:
+    '''
+    Route with its RouteSlack. earliest is the service start at every position, latest the latest service start
+    keeping the rest of the route feasible, so an arrival t at a position is feasible if t <= latest
+    '''
+
+    __slots__ = ('stops', 'capacity', 'load', 'cost', 'slack', 'earliest', 'latest')
+
+    def __init__(self, stops, capacity):
+        self.stops = stops
+        self.capacity = capacity
+
+
+class LocalSearch:
+    '''
+    First improvement descent over the routes of a solution within a time limit.
+
+    Inter route moves and the feasibility of their time windows are evaluated in constant time with the route
+    slack of the feasibility tables, the earliest and latest service start of every position. Intra route moves are
+    priced in constant time and only an improving move has its schedule checked, from the first to the last changed
+    position.
+    Routes use the RouteEvaluator indices and start at the depot leave vertex 0 and end at the depot enter vertex 1.
+    '''
+
+    operators = ('two_opt', 'or_opt', 'relocate', 'swap', 'two_opt_star')
+
+    def __init__(self, route_evaluator, time_limit_seconds=2, max_segment_length=3, allow_empty_routes=True,
+                 tolerance=0.000001, feasibility_tables=None):
+        '''
+        :param route_evaluator:
+        :param time_limit_seconds:
+        :param max_segment_length: longest segment moved by or-opt
+        :param allow_empty_routes:
+        :param tolerance:
+        :param feasibility_tables: FeasibilityTables of the route evaluator, built if None
+        '''
+        self.route_evaluator = route_evaluator
+        self.feasibility_tables = FeasibilityTables(route_evaluator) if feasibility_tables is None \
+            else feasibility_tables
+        self.time_limit_seconds = time_limit_seconds
+        self.max_segment_length = max_segment_length
+        self.allow_empty_routes = allow_empty_routes
+        self.tolerance = tolerance
+
+        self.demand = route_evaluator.demand.tolist()
+        self.stop_time = route_evaluator.stop_time.tolist()
+        self.time_window_start = route_evaluator.time_window_start.tolist()
+        self.time_window_end = route_evaluator.time_window_end.tolist()
+        self.drive_minutes = np.where(np.isnan(route_evaluator.drive_minutes), np.inf,
+                                      route_evaluator.drive_minutes).tolist()
+        self.cost = np.where(np.isnan(route_evaluator.transportation_cost), np.inf,
+                             route_evaluator.transportation_cost).tolist()
+        # a route without customers is free
+        self.cost[0][1] = 0.0
+        self.drive_minutes[0][1] = 0.0
+
+        self.number_of_moves = {operator: 0 for operator in self.operators}
+        self.deadline = None
+
+    def improve(self, routes, capacities):
+        '''
+        Improve routes until no move improves the cost or the time limit is reached
+        :param routes: lists of vertex indices
+        :param capacities: capacity of every route
+        :return: improved routes in the input order, a route left without customers is [0, 1]
+        '''
+        self.deadline = time.perf_counter() + self.time_limit_seconds
+        routes = [_Route(list(stops), capacity) for stops, capacity in zip(routes, capacities)]
+        for route in routes:
+            self._update(route)
+
+        improved = True
+        while improved and not self._timeout():
+            improved = False
+            for operator in self.operators:
+                if self._timeout():
+                    break
+                if getattr(self, '_' + operator)(routes):
+                    self.number_of_moves[operator] += 1
+                    improved = True
+
+        return [route.stops for route in routes]
+
+    def _timeout(self):
+        return time.perf_counter() > self.deadline
+
+    def _update(self, route):
+        route.slack = self.feasibility_tables.route_slack(route.stops)
+        route.earliest = route.slack.earliest.tolist()
+        route.latest = route.slack.latest.tolist()
+        route.load = float(route.slack.load)
+        route.cost = self._cost(route.stops)
+
+    def _cost(self, stops):
+        return sum(self.cost[from_idx][to_idx] for from_idx, to_idx in zip(stops[:-1], stops[1:]))
+
+    def _feasible(self, route, stops, first, last):
+        '''
+        Whether stops, the route changed from the first to the last position, are feasible. The schedule before the
+        first position is the one of the route and the rest after the last position stays feasible if its first
+        vertex is reached before its latest service start
+        '''
+        service_start = route.earliest[first - 1]
+        for position in range(first, last + 1):
+            from_idx, to_idx = stops[position - 1], stops[position]
+            service_start = max(service_start + self.stop_time[from_idx] + self.drive_minutes[from_idx][to_idx],
+                                self.time_window_start[to_idx])
+            if service_start > self.time_window_end[to_idx]:
+                return False
+        from_idx = stops[last]
+        return service_start + self.stop_time[from_idx] + self.drive_minutes[from_idx][stops[last + 1]] <= \
+            route.latest[last + 1]
+
+    def _arrival(self, route, position, vertex):
+        '''
+        Service start at vertex visited right after the given position of the route
+        '''
+        from_idx = route.stops[position]
+        return max(route.earliest[position] + self.stop_time[from_idx] + self.drive_minutes[from_idx][vertex],
+                   self.time_window_start[vertex])
+
+    def _fits_between(self, route, position, vertex, next_position):
+        '''
+        Whether vertex can follow the given position of the route and precede next_position
+        '''
+        service_start = self._arrival(route, position, vertex)
+        if service_start > self.time_window_end[vertex]:
+            return False
+        next_vertex = route.stops[next_position]
+        return service_start + self.stop_time[vertex] + self.drive_minutes[vertex][next_vertex] <= \
+            route.latest[next_position]
+
+    def _two_opt(self, routes):
+        cost = self.cost
+        for route in routes:
+            stops = route.stops
+            if not route.slack.feasible:
+                continue
+            for first in range(1, len(stops) - 2):
+                if self._timeout():
+                    return False
+                previous = stops[first - 1]
+                # cost of the reversed segment arcs driven forward and backward
+                forward_cost = backward_cost = 0.0
+                for last in range(first + 1, len(stops) - 1):
+                    following = stops[last + 1]
+                    forward_cost += cost[stops[last - 1]][stops[last]]
+                    backward_cost += cost[stops[last]][stops[last - 1]]
+                    delta = cost[previous][stops[last]] + cost[stops[first]][following] - \
+                        cost[previous][stops[first]] - cost[stops[last]][following] + backward_cost - forward_cost
+                    if delta < -self.tolerance:
+                        candidate = stops[:first] + stops[first:last + 1][::-1] + stops[last + 1:]
+                        if self._feasible(route, candidate, first, last):
+                            route.stops = candidate
+                            self._update(route)
+                            return True
+        return False
+
+    def _or_opt(self, routes):
+        cost = self.cost
+        for route in routes:
+            stops = route.stops
+            if not route.slack.feasible:
+                continue
+            for length in range(1, self.max_segment_length + 1):
+                for first in range(1, len(stops) - length):
+                    if self._timeout():
+                        return False
+                    segment = stops[first:first + length]
+                    rest = stops[:first] + stops[first + length:]
+                    previous, following = stops[first - 1], stops[first + length]
+                    removal = cost[previous][following] - cost[previous][segment[0]] - cost[segment[-1]][following]
+                    for position in range(1, len(rest)):
+                        if position == first:
+                            continue
+                        before, after = rest[position - 1], rest[position]
+                        delta = removal + cost[before][segment[0]] + cost[segment[-1]][after] - cost[before][after]
+                        if delta < -self.tolerance:
+                            candidate = rest[:position] + segment + rest[position:]
+                            if position < first:
+                                feasible = self._feasible(route, candidate, position, first + length - 1)
+                            else:
+                                feasible = self._feasible(route, candidate, first, position + length - 1)
+                            if feasible:
+                                route.stops = candidate
+                                self._update(route)
+                                return True
+        return False
+
+    def _relocate(self, routes):
+        cost = self.cost
+        for route in routes:
+            stops = route.stops
+            if len(stops) == 3 and not self.allow_empty_routes:
+                continue
+            for position in range(1, len(stops) - 1):
+                if self._timeout():
+                    return False
+                customer = stops[position]
+                previous, following = stops[position - 1], stops[position + 1]
+                removal = cost[previous][following] - cost[previous][customer] - cost[customer][following]
+                if route.earliest[position - 1] + self.stop_time[previous] + \
+                        self.drive_minutes[previous][following] > route.latest[position + 1]:
+                    continue
+                for other in routes:
+                    if other is route or other.load + self.demand[customer] > other.capacity:
+                        continue
+                    other_stops = other.stops
+                    for other_position in range(1, len(other_stops)):
+                        before, after = other_stops[other_position - 1], other_stops[other_position]
+                        delta = removal + cost[before][customer] + cost[customer][after] - cost[before][after]
+                        if delta < -self.tolerance and \
+                                self.feasibility_tables.can_insert(other.slack, other_position - 1, customer,
+                                                                   other.capacity):
+                            route.stops = stops[:position] + stops[position + 1:]
+                            other.stops = other_stops[:other_position] + [customer] + other_stops[other_position:]
+                            self._update(route)
+                            self._update(other)
+                            return True
+        return False
+
+    def _swap(self, routes):
+        cost = self.cost
+        for route_idx, route in enumerate(routes):
+            stops = route.stops
+            for position in range(1, len(stops) - 1):
+                if self._timeout():
+                    return False
+                customer = stops[position]
+                previous, following = stops[position - 1], stops[position + 1]
+                for other in routes[route_idx + 1:]:
+                    other_stops = other.stops
+                    for other_position in range(1, len(other_stops) - 1):
+                        other_customer = other_stops[other_position]
+                        demand_change = self.demand[other_customer] - self.demand[customer]
+                        if route.load + demand_change > route.capacity or \
+                                other.load - demand_change > other.capacity:
+                            continue
+                        before, after = other_stops[other_position - 1], other_stops[other_position + 1]
+                        delta = cost[previous][other_customer] + cost[other_customer][following] - \
+                            cost[previous][customer] - cost[customer][following] + \
+                            cost[before][customer] + cost[customer][after] - \
+                            cost[before][other_customer] - cost[other_customer][after]
+                        if delta < -self.tolerance and \
+                                self._fits_between(route, position - 1, other_customer, position + 1) and \
+                                self._fits_between(other, other_position - 1, customer, other_position + 1):
+                            route.stops = stops[:position] + [other_customer] + stops[position + 1:]
+                            other.stops = other_stops[:other_position] + [customer] + other_stops[other_position + 1:]
+                            self._update(route)
+                            self._update(other)
+                            return True
+        return False
+
+    def _two_opt_star(self, routes):
+        '''
+        Exchange the route ends after a position of each route
+        '''
+        cost = self.cost
+        for route_idx, route in enumerate(routes):
+            stops = route.stops
+            prefix_load = np.cumsum([self.demand[stop] for stop in stops]).tolist()
+            for position in range(len(stops) - 1):
+                if self._timeout():
+                    return False
+                vertex, following = stops[position], stops[position + 1]
+                for other in routes[route_idx + 1:]:
+                    other_stops = other.stops
+                    other_prefix_load = np.cumsum([self.demand[stop] for stop in other_stops]).tolist()
+                    for other_position in range(len(other_stops) - 1):
+                        if position == 0 and other_position == 0:
+                            continue
+                        other_vertex, other_following = other_stops[other_position], other_stops[other_position + 1]
+                        if not self.allow_empty_routes and \
+                                ((position == 0 and other_position == len(other_stops) - 2) or
+                                 (other_position == 0 and position == len(stops) - 2)):
+                            continue
+                        load = prefix_load[position] + other.load - other_prefix_load[other_position]
+                        other_load = other_prefix_load[other_position] + route.load - prefix_load[position]
+                        if load > route.capacity or other_load > other.capacity:
+                            continue
+                        delta = cost[vertex][other_following] + cost[other_vertex][following] - \
+                            cost[vertex][following] - cost[other_vertex][other_following]
+                        if delta < -self.tolerance and \
+                                self._arrival(route, position, other_following) <= other.latest[other_position + 1] and \
+                                self._arrival(other, other_position, following) <= route.latest[position + 1]:
+                            route.stops = stops[:position + 1] + other_stops[other_position + 1:]
+                            other.stops = other_stops[:other_position + 1] + stops[position + 1:]
+                            self._update(route)
+                            self._update(other)
+                            return True
+        return False
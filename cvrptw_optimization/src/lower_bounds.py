@@ -0,0 +1,120 @@
+'''
+Lower bounds
+Trivial capacity and time bounds, Lagrangian bounds of the column generation master problem, the bound proven by a
+column generation run and the cost of a plan to measure against them
+'''
+import math
+
+import numpy as np
+
+from cvrptw_optimization.src.route_solution import RouteSolution
+
+
+def trivial_lower_bound(route_evaluator, capacity):
+    '''
+    Function to bound the transportation cost without solving anything. Every customer is entered by one arc and
+    left by one arc, and every route enters the depot once. The number of routes is at least the total demand over
+    the capacity and the service and shortest drive time of the customers over the depot time window
+    :param route_evaluator:
+    :param capacity: vehicle capacity, the largest one of a heterogeneous fleet
+    :return: dictionary with BOUND, MINIMUM_ROUTES, CAPACITY_ROUTES and TIME_ROUTES
+    '''
+    customers = np.arange(2, len(route_evaluator.location_names))
+    if not len(customers):
+        return {'BOUND': 0.0, 'MINIMUM_ROUTES': 0, 'CAPACITY_ROUTES': 0, 'TIME_ROUTES': 0}
+
+    cost = np.where(np.isnan(route_evaluator.transportation_cost), np.inf, route_evaluator.transportation_cost)
+    drive = np.where(np.isnan(route_evaluator.drive_minutes), np.inf, route_evaluator.drive_minutes)
+    np.fill_diagonal(cost, np.inf)
+    np.fill_diagonal(drive, np.inf)
+    predecessors = np.concatenate([[0], customers])
+    successors = np.concatenate([customers, [1]])
+
+    cheapest_entry = cost[predecessors][:, customers].min(axis=0)
+    cheapest_exit = cost[customers][:, successors].min(axis=1)
+    shortest_entry = drive[predecessors][:, customers].min(axis=0)
+
+    capacity_routes = int(math.ceil(route_evaluator.demand[customers].sum() / float(capacity) - 0.000001))
+    horizon = route_evaluator.time_window_end[1] - route_evaluator.time_window_start[0]
+    service_minutes = (route_evaluator.stop_time[customers] + shortest_entry).sum()
+    time_routes = int(math.ceil(service_minutes / horizon - 0.000001)) if horizon > 0 else len(customers)
+    minimum_routes = max(capacity_routes, time_routes, 1)
+
+    def route_term(cheapest_depot_arc):
+        # with negative depot arcs every customer may have its own route
+        return minimum_routes * cheapest_depot_arc if cheapest_depot_arc >= 0 else len(customers) * cheapest_depot_arc
+
+    bound = max(cheapest_entry.sum() + route_term(cost[customers, 1].min()),
+                cheapest_exit.sum() + route_term(cost[0, customers].min()))
+    return {'BOUND': float(bound) if np.isfinite(bound) else None,
+            'MINIMUM_ROUTES': minimum_routes,
+            'CAPACITY_ROUTES': capacity_routes,
+            'TIME_ROUTES': time_routes}
+
+
+def lagrangian_lower_bound(master_objective, min_reduced_cost, max_routes):
+    '''
+    Function to bound the master problem over all columns from a restricted master problem. The customer duals
+    priced by the restricted master are a Lagrangian multiplier, the bound is the master objective plus the most
+    negative reduced cost of every route of a solution
+    :param master_objective: restricted master problem objective, the sum of the customer duals
+    :param min_reduced_cost: smallest reduced cost over all columns, from an exact pricing
+    :param max_routes: number of routes any solution has at most
+    :return:
+    '''
+    return master_objective + max_routes * min(0.0, min_reduced_cost)
+
+
+def column_generation_lower_bound(solution_statistics, reduced_cost_tolerance=0.00001):
+    '''
+    Function to get the lower bound proven by a column generation run. The last master objective is a bound once the
+    last pricing priced every vehicle type exactly, without heuristics and with every sub-problem solved to
+    optimality, and found no column with a negative reduced cost. A run stopped by max_iteration, the time budget or
+    a solver time limit proves none
+    :param solution_statistics: per iteration statistics of run_single_depot_column_generation
+    :param reduced_cost_tolerance:
+    :return: bound, None if column generation did not converge
+    '''
+    if not solution_statistics:
+        return None
+    statistics = solution_statistics[-1]
+    if statistics['SUB_PROBLEM_OBJECTIVE'] < -reduced_cost_tolerance or statistics.get('SKIPPED_VEHICLE_TYPES') or \
+            not statistics.get('EXACT_PRICING', False):
+        return None
+    return statistics['MASTER_PROBLEM_OBJECTIVE']
+
+
+def plan_routes(plan, depot_name):
+    '''
+    Function to get the routes of a plan
+    :param plan: solver output table, RouteSolution or list of location name lists
+    :param depot_name:
+    :return: routes as location name lists from the depot leave to the depot enter vertex
+    '''
+    if isinstance(plan, RouteSolution):
+        routes = plan.routes()
+    elif hasattr(plan, 'columns'):
+        route_column = 'PATH_NAME' if 'PATH_NAME' in plan.columns else 'VEHICLE'
+        routes = plan.sort_values([route_column, 'STOP_NUMBER']).groupby(route_column, sort=False)[
+            'LOCATION_NAME'].apply(list).tolist()
+    else:
+        routes = [list(route) for route in plan]
+    # the general model skips the depot leave vertex when its start time is zero
+    return [([depot_name + '_LEAVE'] if route[0] != depot_name + '_LEAVE' else []) + route +
+            ([depot_name + '_ENTER'] if route[-1] != depot_name + '_ENTER' else []) for route in routes]
+
+
+def plan_cost(routes, route_evaluator, capacity):
+    '''
+    Function to evaluate a plan
+    :param routes: location name lists
+    :param route_evaluator:
+    :param capacity:
+    :return: dictionary with the plan COST, NUMBER_OF_ROUTES and FEASIBLE, feasible plans serve every customer
+    once within the capacity and time windows
+    '''
+    evaluation = route_evaluator.evaluate(routes, capacity)
+    visits = np.bincount(evaluation.stops[evaluation.stops >= 2], minlength=len(route_evaluator.location_names))
+    return {'COST': float(evaluation.cost.sum()),
+            'NUMBER_OF_ROUTES': len(routes),
+            'FEASIBLE': bool(evaluation.feasible.all() and (visits[2:] == 1).all())}
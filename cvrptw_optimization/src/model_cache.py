@@ -0,0 +1,201 @@
+'''
+Model cache
+Formulated general models written once as compressed MPS with the index of their variables. Identical instances are
+solved from the file without formulating the model again, the MPS file can be read by any MIP solver
+'''
+import os
+import json
+import gzip
+import shutil
+import hashlib
+import tempfile
+import subprocess
+
+import pandas as pd
+import pulp
+
+FORMAT_VERSION = 1
+
+MODEL_FILE = 'model.mps.gz'
+INDEX_FILE = 'index.json'
+
+# CBC solution file status, the same mapping as PuLP
+CBC_STATUS = {'Optimal': (pulp.LpStatusOptimal, pulp.LpSolutionOptimal),
+              'Infeasible': (pulp.LpStatusInfeasible, pulp.LpSolutionInfeasible),
+              'Integer': (pulp.LpStatusInfeasible, pulp.LpSolutionInfeasible),
+              'Unbounded': (pulp.LpStatusUnbounded, pulp.LpSolutionUnbounded),
+              'Stopped': (pulp.LpStatusNotSolved, pulp.LpSolutionNoSolutionFound)}
+
+
+def model_key(depots, customers, transportation_matrix, vehicles, **formulation_parameters):
+    '''
+    Function to get the cache key of an instance and its formulation parameters
+    :param depots:
+    :param customers:
+    :param transportation_matrix:
+    :param vehicles:
+    :param formulation_parameters: parameters of formulate_problem
+    :return:
+    '''
+    digest = hashlib.sha1(str(FORMAT_VERSION).encode())
+    for data_frame in (depots, customers, transportation_matrix, vehicles):
+        digest.update(','.join(map(str, data_frame.columns)).encode())
+        digest.update(pd.util.hash_pandas_object(data_frame, index=False).values.tobytes())
+    digest.update(json.dumps(formulation_parameters, sort_keys=True, default=str).encode())
+    return digest.hexdigest()
+
+
+def _json_value(value):
+    # numpy scalars of the input data frames
+    return value.item() if hasattr(value, 'item') else value
+
+
+def _json_key(key):
+    if isinstance(key, tuple):
+        return [_json_value(element) for element in key]
+    return _json_value(key)
+
+
+class ModelExport:
+    '''
+    Model written as compressed MPS with normalised names and an index from every MPS column to its variable group
+    and key, e.g. assignment_var and (from location, to location, vehicle)
+    '''
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, INDEX_FILE)) as index_file:
+            self.index = json.load(index_file)
+        self.model_file = os.path.join(directory, MODEL_FILE)
+        self.objective = None
+
+    @staticmethod
+    def exists(directory):
+        return os.path.isfile(os.path.join(directory, INDEX_FILE))
+
+    @classmethod
+    def write(cls, model, variable_groups, directory, parameters=None):
+        '''
+        Write a model, the files are moved to the directory once complete so runs sharing the cache never read a
+        partial model
+        :param model: formulated LpProblem
+        :param variable_groups: dictionary of group name to variable dictionary, None groups are skipped
+        :param directory:
+        :param parameters: formulation parameters stored with the index
+        :return: ModelExport
+        '''
+        parent_directory = os.path.dirname(os.path.abspath(directory))
+        os.makedirs(parent_directory, exist_ok=True)
+        temporary_directory = tempfile.mkdtemp(dir=parent_directory)
+        try:
+            mps_file = os.path.join(temporary_directory, 'model.mps')
+            _, variable_names, constraint_names, _ = model.writeMPS(mps_file, rename=1)
+            with open(mps_file, 'rb') as source, gzip.open(os.path.join(temporary_directory, MODEL_FILE),
+                                                           'wb') as target:
+                shutil.copyfileobj(source, target)
+            os.remove(mps_file)
+
+            index = {'FORMAT_VERSION': FORMAT_VERSION,
+                     'SENSE': model.sense,
+                     'NUMBER_OF_CONSTRAINTS': len(constraint_names),
+                     'NUMBER_OF_VARIABLES': len(variable_names),
+                     'PARAMETERS': parameters or {},
+                     'OBJECTIVE': {variable_names[variable.name]: coefficient
+                                   for variable, coefficient in model.objective.items()},
+                     'OBJECTIVE_CONSTANT': model.objective.constant,
+                     'VARIABLES': {group: [[variable_names[variable.name], _json_key(key)]
+                                           for key, variable in variables.items() if variable.name in variable_names]
+                                   for group, variables in variable_groups.items() if variables is not None}}
+            with open(os.path.join(temporary_directory, INDEX_FILE), 'w') as index_file:
+                json.dump(index, index_file, default=str)
+
+            try:
+                os.rename(temporary_directory, directory)
+            except OSError:
+                # written by another run in the meantime
+                shutil.rmtree(temporary_directory)
+        except Exception:
+            shutil.rmtree(temporary_directory, ignore_errors=True)
+            raise
+        return cls(directory)
+
+    def variables(self):
+        '''
+        Variables of the model, without its constraints
+        :return: dictionary of group name to variable dictionary keyed like the formulation
+        '''
+        return {group: {tuple(key) if isinstance(key, list) else key: pulp.LpVariable(column)
+                        for column, key in columns}
+                for group, columns in self.index['VARIABLES'].items()}
+
+    def write_mps(self, file_name):
+        '''
+        Decompress the MPS file, e.g. to hand it to another solver
+        :param file_name:
+        :return:
+        '''
+        with gzip.open(self.model_file, 'rb') as source, open(file_name, 'wb') as target:
+            shutil.copyfileobj(source, target)
+
+    def solve(self,
+              variable_groups,
+              mip_gap=0.001,
+              solver_time_limit_minutes=10,
+              enable_solution_messaging=0,
+              solver_path=None):
+        '''
+        Solve the MPS file with CBC and set the values of the variables
+        :param variable_groups: variables of the index, as returned by variables
+        :param mip_gap:
+        :param solver_time_limit_minutes:
+        :param enable_solution_messaging:
+        :param solver_path: CBC executable, defaults to the one shipped with PuLP
+        :return: status, solution status
+        '''
+        if solver_path is None:
+            solver_path = pulp.PULP_CBC_CMD().path
+
+        temporary_directory = tempfile.mkdtemp()
+        try:
+            mps_file = os.path.join(temporary_directory, 'model.mps')
+            solution_file = os.path.join(temporary_directory, 'model.sol')
+            self.write_mps(mps_file)
+
+            arguments = [solver_path, mps_file]
+            if self.index['SENSE'] == pulp.LpMaximize:
+                arguments.append('max')
+            arguments += ['ratio', str(mip_gap), 'sec', str(60 * solver_time_limit_minutes),
+                          'branch', 'printingOptions', 'all', 'solution', solution_file]
+            output = None if enable_solution_messaging else subprocess.DEVNULL
+            if subprocess.call(arguments, stdout=output, stderr=output) != 0 or not os.path.exists(solution_file):
+                raise Exception('Error while solving {} with {}'.format(self.model_file, solver_path))
+
+            with open(solution_file) as solution:
+                status_line = solution.readline().split()
+                values = {}
+                for line in solution:
+                    line = line.split()
+                    if len(line) < 3:
+                        break
+                    if line[0] == '**':
+                        # infeasible rows and columns
+                        line = line[1:]
+                    values[line[1]] = float(line[2])
+        finally:
+            shutil.rmtree(temporary_directory, ignore_errors=True)
+
+        status, solution_status = CBC_STATUS.get(status_line[0], (pulp.LpStatusUndefined,
+                                                                  pulp.LpSolutionNoSolutionFound))
+        if 'objective' in status_line and status == pulp.LpStatusNotSolved:
+            # stopped with a solution
+            status, solution_status = pulp.LpStatusOptimal, pulp.LpSolutionIntegerFeasible
+        # the solution file rounds the objective
+        self.objective = self.index['OBJECTIVE_CONSTANT'] + sum(coefficient * values.get(column, 0)
+                                                                for column, coefficient in
+                                                                self.index['OBJECTIVE'].items())
+
+        for group, columns in self.index['VARIABLES'].items():
+            variables = variable_groups[group]
+            for column, key in columns:
+                variables[tuple(key) if isinstance(key, list) else key].varValue = values.get(column, 0)
+        return status, solution_status
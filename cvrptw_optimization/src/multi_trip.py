@@ -0,0 +1,284 @@
+'''
+Multi-trip column generation
+Trips are columns shared by the vehicles of a shift class, the master problem assigns trips to vehicles and limits
+the total duration of the trips of every vehicle to its shift
+'''
+import pulp
+import numpy as np
+import pandas as pd
+
+from cvrptw_optimization.src.instrumentation import track_phase
+
+
+def shift_classes(vehicles, depot_time_window_start, depot_time_window_end):
+    '''
+    Function to group the vehicles by shift window and capacity, the trips of a class are priced once for all its
+    vehicles. SHIFT_START and SHIFT_END default to the depot time window and are limited to it
+    :param vehicles:
+    :param depot_time_window_start:
+    :param depot_time_window_end:
+    :return: vehicles with SHIFT_START, SHIFT_END and SHIFT_CLASS, shift classes with their number of vehicles
+    '''
+    vehicles = vehicles.copy()
+    for column, default in (('SHIFT_START', depot_time_window_start), ('SHIFT_END', depot_time_window_end)):
+        if column not in vehicles.columns:
+            vehicles[column] = default
+        vehicles[column] = vehicles[column].fillna(default).astype(float)
+    vehicles['SHIFT_START'] = vehicles['SHIFT_START'].clip(lower=depot_time_window_start)
+    vehicles['SHIFT_END'] = vehicles['SHIFT_END'].clip(upper=depot_time_window_end)
+
+    invalid = vehicles[vehicles['SHIFT_END'] <= vehicles['SHIFT_START']]
+    if len(invalid):
+        raise Exception('Vehicles without shift time within the depot time window: {}'.format(
+            invalid['VEHICLE_NAME'].tolist()))
+
+    classes = vehicles.groupby(['SHIFT_START', 'SHIFT_END', 'CAPACITY']).size().reset_index(
+        name='NUMBER_OF_VEHICLES')
+    classes.insert(0, 'SHIFT_CLASS', ['SHIFT ' + str(idx) for idx in range(len(classes))])
+    vehicles = vehicles.merge(classes[['SHIFT_CLASS', 'SHIFT_START', 'SHIFT_END', 'CAPACITY']],
+                              on=['SHIFT_START', 'SHIFT_END', 'CAPACITY'], how='left')
+    return vehicles, classes
+
+
+class TripScheduler:
+    '''
+    Schedules a trip within a shift window.
+    A trip may leave the depot later than its earliest departure to save waiting at the customers, its duration is
+    the shortest time from leaving to entering the depot that keeps the customer time windows
+    '''
+
+    def __init__(self, route_evaluator):
+        self.route_evaluator = route_evaluator
+
+    def schedule(self, trip, shift_start, shift_end, capacity=np.inf, earliest_departure=None):
+        '''
+        Schedule a trip
+        :param trip: location names from the depot leave to the depot enter vertex
+        :param shift_start:
+        :param shift_end:
+        :param capacity:
+        :param earliest_departure: the vehicle is back from its previous trip, defaults to the shift start
+        :return: dictionary with EARLIEST_DEPARTURE, LATEST_DEPARTURE, DEPARTURE, RETURN, DURATION, LOAD, COST and
+        the START_TIME of every stop when leaving at DEPARTURE, None if the trip does not fit the shift
+        '''
+        evaluator = self.route_evaluator
+        stops = [evaluator.location_index[location] for location in trip]
+        load = evaluator.demand[stops].sum()
+        if load > capacity:
+            return None
+
+        departure = max(float(shift_start), evaluator.time_window_start[stops[0]])
+        if earliest_departure is not None:
+            departure = max(departure, float(earliest_departure))
+        start_times = [departure]
+        cost = 0.0
+        waiting = 0.0
+        # largest delay of the departure that keeps every time window
+        slack = min(float(shift_end), evaluator.time_window_end[stops[0]]) - departure
+        for previous_stop, stop in zip(stops[:-1], stops[1:]):
+            drive = evaluator.drive_minutes[previous_stop, stop]
+            if np.isnan(drive):
+                return None
+            cost += evaluator.transportation_cost[previous_stop, stop]
+            arrival = start_times[-1] + evaluator.stop_time[previous_stop] + drive
+            window_end = evaluator.time_window_end[stop]
+            if stop == evaluator.location_index[evaluator.depot_enter]:
+                window_end = min(window_end, float(shift_end))
+            if arrival > window_end:
+                return None
+            slack = min(slack, waiting + window_end - arrival)
+            start = max(arrival, evaluator.time_window_start[stop])
+            waiting += start - arrival
+            start_times.append(start)
+        if slack < 0:
+            return None
+
+        # the waiting absorbs the delay, the trip returns at the same time
+        delay = min(waiting, slack)
+        return_time = start_times[-1]
+        start_times = self._start_times(stops, departure + delay)
+        return {'EARLIEST_DEPARTURE': departure,
+                'LATEST_DEPARTURE': departure + slack,
+                'DEPARTURE': departure + delay,
+                'RETURN': return_time,
+                'DURATION': return_time - departure - delay,
+                'LOAD': load,
+                'COST': cost,
+                'START_TIME': start_times}
+
+    def _start_times(self, stops, departure):
+        evaluator = self.route_evaluator
+        start_times = [departure]
+        for previous_stop, stop in zip(stops[:-1], stops[1:]):
+            arrival = start_times[-1] + evaluator.stop_time[previous_stop] + evaluator.drive_minutes[previous_stop, stop]
+            start_times.append(max(arrival, evaluator.time_window_start[stop]))
+        return start_times
+
+    def sequence(self, trips, shift_start, shift_end, capacity=np.inf, reload_minutes=0):
+        '''
+        Order the trips of a vehicle by latest departure and leave for every trip once back from the previous one
+        :param trips: list of trips
+        :param shift_start:
+        :param shift_end:
+        :param capacity:
+        :param reload_minutes: time at the depot between two trips
+        :return: schedules in trip order, whether all trips fit the shift one after another
+        '''
+        schedules = [self.schedule(trip, shift_start, shift_end, capacity) for trip in trips]
+        order = sorted(range(len(trips)), key=lambda idx: (schedules[idx]['LATEST_DEPARTURE'],
+                                                           schedules[idx]['EARLIEST_DEPARTURE']))
+        sequenced = []
+        feasible = True
+        available = float(shift_start)
+        for idx in order:
+            schedule = self.schedule(trips[idx], shift_start, shift_end, capacity, earliest_departure=available)
+            if schedule is None:
+                # reported where the trip can start on its own
+                feasible = False
+                schedule = schedules[idx]
+            schedule['TRIP'] = idx
+            sequenced.append(schedule)
+            available = max(available, schedule['RETURN']) + reload_minutes
+        return sequenced, feasible
+
+
+class MultiTripFormulation:
+    '''
+    Master problem over trip and vehicle pairs. Every customer is served by one trip, the durations of the trips of
+    a vehicle plus the reload time between them fit its shift and a vehicle makes at most max_trips trips.
+    The duration constraint is a relaxation of the trip sequencing, the solution is sequenced afterwards and trip
+    sets a vehicle can not make one after another are forbidden with no-good cuts.
+    Artificial single customer trips without a vehicle keep the master feasible whatever the fleet
+    '''
+
+    def __init__(self, customers_dict):
+        self.customers_dict = customers_dict
+        self.shift_price = {}
+        self.trips_price = {}
+
+    def formulate_and_solve_master_problem(self,
+                                           trips_dict,
+                                           trips_cost_dict,
+                                           trips_duration_dict,
+                                           vehicle_trips_dict,
+                                           vehicles_dict,
+                                           artificial_dict=None,
+                                           artificial_cost_dict=None,
+                                           reload_minutes=0,
+                                           max_trips=None,
+                                           forbidden_trips=None,
+                                           binary_model=False,
+                                           lp_file_name=None,
+                                           mip_gap=0.001,
+                                           solver_time_limit_minutes=10,
+                                           enable_solution_messaging=1,
+                                           solver_type='PULP_CBC_CMD',
+                                           instrumentation=None):
+        '''
+        Formulate and solve master problem
+        :param trips_dict:
+        :param trips_cost_dict:
+        :param trips_duration_dict: duration of every trip and shift class
+        :param vehicle_trips_dict: trips every vehicle can make
+        :param vehicles_dict: vehicle parameters with SHIFT_START, SHIFT_END and SHIFT_CLASS
+        :param artificial_dict: artificial trips without a vehicle
+        :param artificial_cost_dict:
+        :param reload_minutes: time at the depot between two trips
+        :param max_trips: maximum number of trips per vehicle, None for no limit
+        :param forbidden_trips: list of vehicle and trip names, the vehicle makes at most all but one of the trips
+        :param binary_model:
+        :param lp_file_name:
+        :param mip_gap:
+        :param solver_time_limit_minutes:
+        :param enable_solution_messaging:
+        :param solver_type:
+        :param instrumentation: RunInstrumentation to record build, write, solve and extract phases
+        :return: customer duals, objective, solution trips with their vehicle, the shift and trip limit duals
+        are stored in shift_price and trips_price
+        '''
+        artificial_dict = artificial_dict or {}
+        category = pulp.LpBinary if binary_model else pulp.LpContinuous
+
+        with track_phase(instrumentation, 'master_build'):
+            master_model = pulp.LpProblem("MA_MT_CVRPTW", pulp.LpMinimize)
+            trip_keys = [(trip, vehicle) for vehicle, trips in vehicle_trips_dict.items() for trip in trips]
+            trip_var = pulp.LpVariable.dicts("Trip", trip_keys, 0, 1, category)
+            artificial_var = pulp.LpVariable.dicts("Artificial", artificial_dict.keys(), 0, 1, category)
+
+            print('Master model objective function')
+            master_model += pulp.lpSum(trips_cost_dict[trip] * trip_var[trip, vehicle]
+                                       for trip, vehicle in trip_keys) + \
+                pulp.lpSum(artificial_cost_dict[path] * artificial_var[path] for path in artificial_dict.keys())
+
+            print('Each customer belongs to one trip')
+            customer_columns = {customer: [] for customer in self.customers_dict['DEMAND'].keys()}
+            for trip, vehicle in trip_keys:
+                for customer in trips_dict[trip]:
+                    if customer in customer_columns:
+                        customer_columns[customer].append(trip_var[trip, vehicle])
+            for path, trip in artificial_dict.items():
+                for customer in trip:
+                    if customer in customer_columns:
+                        customer_columns[customer].append(artificial_var[path])
+            for customer, columns in customer_columns.items():
+                master_model += pulp.lpSum(columns) == 1, "Customer" + str(customer)
+
+            print('Trips of every vehicle fit its shift')
+            for vehicle, trips in vehicle_trips_dict.items():
+                shift_class = vehicles_dict['SHIFT_CLASS'][vehicle]
+                shift_minutes = vehicles_dict['SHIFT_END'][vehicle] - vehicles_dict['SHIFT_START'][vehicle]
+                master_model += pulp.lpSum(
+                    (trips_duration_dict[trip, shift_class] + reload_minutes) * trip_var[trip, vehicle]
+                    for trip in trips) <= shift_minutes + reload_minutes, "Shift" + str(vehicle)
+                if max_trips is not None:
+                    master_model += pulp.lpSum(
+                        trip_var[trip, vehicle] for trip in trips) <= max_trips, "Trips" + str(vehicle)
+
+            for cut_idx, (vehicle, trips) in enumerate(forbidden_trips or []):
+                master_model += pulp.lpSum(trip_var[trip, vehicle] for trip in trips) <= len(trips) - 1, \
+                    "NoGood" + str(cut_idx)
+
+        if lp_file_name is not None:
+            with track_phase(instrumentation, 'master_write_lp'):
+                master_model.writeLP('{}.lp'.format(str(lp_file_name)))
+
+        with track_phase(instrumentation, 'master_solve'):
+            if solver_type == 'PULP_CBC_CMD':
+                master_model.solve(pulp.PULP_CBC_CMD(
+                    msg=enable_solution_messaging,
+                    maxSeconds=60 * solver_time_limit_minutes,
+                    fracGap=mip_gap)
+                )
+
+        if master_model.status != 1:
+            raise Exception('No Solution Exists')
+
+        with track_phase(instrumentation, 'master_extract'):
+            solution_master_model_objective = pulp.value(master_model.objective)
+            print('Master model objective = {}'.format(str(solution_master_model_objective)))
+
+            def dual(constraint_name):
+                return float(master_model.constraints[constraint_name.replace(" ", "_")].pi or 0)
+
+            price = {customer: dual("Customer" + str(customer)) for customer in self.customers_dict['DEMAND'].keys()}
+            self.shift_price = {vehicle: dual("Shift" + str(vehicle)) for vehicle in vehicle_trips_dict.keys()}
+            self.trips_price = {vehicle: dual("Trips" + str(vehicle)) if max_trips is not None else 0.0
+                                for vehicle in vehicle_trips_dict.keys()}
+
+            solution_master_path = []
+            for trip, vehicle in trip_keys:
+                if trip_var[trip, vehicle].value() > 0:
+                    solution_master_path.append({'PATH_NAME': trip,
+                                                 'VEHICLE_NAME': vehicle,
+                                                 'VALUE': trip_var[trip, vehicle].value(),
+                                                 'PATH': trips_dict[trip]})
+            for path in artificial_dict.keys():
+                if artificial_var[path].value() > 0:
+                    solution_master_path.append({'PATH_NAME': path,
+                                                 'VEHICLE_NAME': None,
+                                                 'VALUE': artificial_var[path].value(),
+                                                 'PATH': artificial_dict[path]})
+            solution_master_path = pd.DataFrame(solution_master_path)
+            solution_master_path['OBJECTIVE'] = solution_master_model_objective
+
+        return price, solution_master_model_objective, solution_master_path
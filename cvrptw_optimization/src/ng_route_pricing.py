@@ -0,0 +1,481 @@
+'''
+Ng-route pricing
+Labeling algorithm for the column generation sub-problem with partial elementarity over ng neighbourhoods
+'''
+import heapq
+import numpy as np
+
+
+class _Label:
+    '''
+    Partial path. Forward labels hold the start time at their last vertex and the duals of all their customers,
+    backward labels the latest start time at their first vertex and the duals of all but their first customer.
+    memory is the bit set of customers the path can not visit again,
+    cut_state the bit set of subset row cuts visited an odd number of times within their memory
+    '''
+
+    __slots__ = ('vertex', 'reduced_cost', 'load', 'time', 'memory', 'parent', 'dominated', 'cut_state')
+
+    def __init__(self, vertex, reduced_cost, load, time, memory, parent, cut_state=0):
+        self.vertex = vertex
+        self.reduced_cost = reduced_cost
+        self.load = load
+        self.time = time
+        self.memory = memory
+        self.parent = parent
+        self.dominated = False
+        self.cut_state = cut_state
+
+    def __lt__(self, other):
+        return self.time < other.time
+
+    def vertices(self):
+        label = self
+        vertices = []
+        while label is not None:
+            vertices.append(label.vertex)
+            label = label.parent
+        return vertices
+
+
+def _state_penalty(cut_state, cut_penalties):
+    penalty = 0.0
+    cut_idx = 0
+    while cut_state:
+        if cut_state & 1:
+            penalty += cut_penalties[cut_idx]
+        cut_state >>= 1
+        cut_idx += 1
+    return penalty
+
+
+class _Columns:
+    '''
+    Best routes found so far, the threshold tightens to the worst kept route once max_columns are found
+    '''
+
+    def __init__(self, max_columns, reduced_cost_tolerance):
+        self.max_columns = max_columns
+        self.threshold = -reduced_cost_tolerance
+        self.routes = {}
+
+    def add(self, reduced_cost, vertices):
+        if reduced_cost >= self.threshold:
+            return
+        key = tuple(vertices)
+        if reduced_cost < self.routes.get(key, np.inf):
+            self.routes[key] = reduced_cost
+        if len(self.routes) >= 2 * self.max_columns:
+            self.prune()
+
+    def prune(self):
+        best = sorted(self.routes.items(), key=lambda route: route[1])[:self.max_columns]
+        self.routes = dict(best)
+        if len(best) == self.max_columns:
+            self.threshold = best[-1][1]
+
+
+class NgRoutePricing:
+    '''
+    Prices routes over the ng-route relaxation. A route may only revisit a customer after leaving its ng
+    neighbourhood, the nearest customers by DRIVE_MINUTES, so cycles are short lived and the label count stays small.
+    Columns of the master with cycles are removed by adding the cycle customers to the neighbourhoods.
+
+    Vertices use the RouteEvaluator indices, 0 is the depot leave vertex, 1 the depot enter vertex.
+
+    Duals of rounded capacity cuts are arc costs of the arcs entering the cut customers. Subset row cuts are a
+    label resource, a route pays the dual on every second visit to the cut customers; with subset row cuts
+    the labeling is mono-directional.
+
+    With nearest_successors a label only extends to its nearest customers, the pricing is then a heuristic.
+
+    With a lateness_penalty the customer time windows are soft, a label pays the penalty of its lateness and
+    waiting and a label with an earlier time only dominates after paying the waiting it may add. The labeling is then
+    mono-directional.
+    '''
+
+    def __init__(self, route_evaluator, neighbourhood_size=8, bidirectional=False, completion_bounds=True,
+                 max_labels=200000, reduced_cost_tolerance=0.000001, nearest_successors=None,
+                 lateness_penalty=None, earliness_penalty=0):
+        self.route_evaluator = route_evaluator
+        self.neighbourhood_size = neighbourhood_size
+        self.bidirectional = bidirectional
+        self.completion_bounds = completion_bounds
+        self.max_labels = max_labels
+        self.reduced_cost_tolerance = reduced_cost_tolerance
+        self.lateness_penalty = lateness_penalty
+        self.earliness_penalty = earliness_penalty
+
+        self.number_of_vertices = len(route_evaluator.location_names)
+        self.customers = list(range(2, self.number_of_vertices))
+        self.demand = route_evaluator.demand.tolist()
+        self.stop_time = route_evaluator.stop_time.tolist()
+        self.time_window_start = route_evaluator.time_window_start.tolist()
+        self.time_window_end = route_evaluator.time_window_end.tolist()
+        self.drive_minutes = route_evaluator.drive_minutes
+        self.transportation_cost = route_evaluator.transportation_cost
+
+        # with soft time windows a customer is served at the latest when the depot closes
+        self.latest_service = list(self.time_window_end)
+        if lateness_penalty is not None:
+            for customer in self.customers:
+                self.latest_service[customer] = max(self.latest_service[customer], self.time_window_end[1])
+
+        # arcs that can be used by a route, time windows allowing
+        self.successors = [[] for _ in range(self.number_of_vertices)]
+        self.predecessors = [[] for _ in range(self.number_of_vertices)]
+        for from_idx in [0] + self.customers:
+            for to_idx in self.customers + [1]:
+                drive = self.drive_minutes[from_idx, to_idx]
+                if from_idx == to_idx or np.isnan(drive):
+                    continue
+                earliest_arrival = self.time_window_start[from_idx] + self.stop_time[from_idx] + drive
+                if from_idx == 0 and to_idx == 1:
+                    continue
+                if earliest_arrival <= self.latest_service[to_idx]:
+                    self.successors[from_idx].append(to_idx)
+
+        if nearest_successors is not None:
+            # restricted arc set, the nearest customers by drive time and the depot
+            for from_idx in [0] + self.customers:
+                customers = [to_idx for to_idx in self.successors[from_idx] if to_idx != 1]
+                customers.sort(key=lambda to_idx: self.drive_minutes[from_idx, to_idx])
+                self.successors[from_idx] = customers[:nearest_successors] + \
+                    [to_idx for to_idx in self.successors[from_idx] if to_idx == 1]
+
+        for from_idx in [0] + self.customers:
+            for to_idx in self.successors[from_idx]:
+                self.predecessors[to_idx].append(from_idx)
+
+        self.neighbourhoods = self.create_neighbourhoods(neighbourhood_size)
+        self.number_of_augmentations = 0
+
+    def create_neighbourhoods(self, neighbourhood_size):
+        '''
+        Ng neighbourhood of every customer, the customer and its nearest customers by drive time
+        :param neighbourhood_size:
+        :return: bit set per vertex
+        '''
+        neighbourhoods = [0] * self.number_of_vertices
+        customers = np.array(self.customers)
+        for customer in self.customers:
+            drive = self.drive_minutes[customer, customers]
+            drive = np.where(np.isnan(drive), np.inf, drive)
+            drive[customers == customer] = -1
+            nearest = customers[np.argsort(drive, kind='stable')[:max(neighbourhood_size, 1)]]
+            for neighbour in nearest:
+                neighbourhoods[customer] |= 1 << int(neighbour)
+        return neighbourhoods
+
+    def augment_neighbourhoods(self, path):
+        '''
+        Forbid the cycles of a path, the repeated customer joins the neighbourhoods of the customers on its cycle
+        :param path: location names
+        :return: whether a neighbourhood changed
+        '''
+        location_index = self.route_evaluator.location_index
+        stops = [location_index[location] for location in path]
+        changed = False
+        last_position = {}
+        for position, stop in enumerate(stops):
+            if stop >= 2 and stop in last_position:
+                for cycle_stop in stops[last_position[stop] + 1:position]:
+                    if not self.neighbourhoods[cycle_stop] >> stop & 1:
+                        self.neighbourhoods[cycle_stop] |= 1 << stop
+                        changed = True
+            last_position[stop] = position
+        if changed:
+            self.number_of_augmentations += 1
+        return changed
+
+    def _arc_reduced_costs(self, price):
+        '''
+        Transportation cost minus the dual of the arc head
+        :param price:
+        :return:
+        '''
+        duals = np.zeros(self.number_of_vertices)
+        duals[2:] = [price.get(customer, 0.0) for customer in self.route_evaluator.customer_names]
+        return self.transportation_cost - duals[None, :]
+
+    def _cut_reduced_costs(self, arc_reduced_cost, cuts, cut_price):
+        '''
+        Add the capacity cut duals to the arc reduced costs and collect the subset row cuts with a negative dual
+        :param arc_reduced_cost:
+        :param cuts:
+        :param cut_price: cut duals by cut name
+        :return: arc reduced costs, subset row cuts as (customers bit set, memory bit set, penalty)
+        '''
+        location_index = self.route_evaluator.location_index
+        subset_rows = []
+        for cut in cuts:
+            dual = cut_price.get(cut.name, 0.0)
+            vertices = [location_index[customer] for customer in cut.customers if customer in location_index]
+            if cut.sense == '>=':
+                if dual <= self.reduced_cost_tolerance:
+                    continue
+                in_set = np.full(self.number_of_vertices, False)
+                in_set[vertices] = True
+                arc_reduced_cost = arc_reduced_cost - dual * (~in_set[:, None] & in_set[None, :])
+            else:
+                if dual >= -self.reduced_cost_tolerance:
+                    continue
+                customers = sum(1 << vertex for vertex in vertices)
+                if cut.memory is None:
+                    memory = sum(1 << vertex for vertex in self.customers)
+                else:
+                    memory = sum(1 << location_index[customer] for customer in cut.memory
+                                 if customer in location_index)
+                subset_rows.append((customers, memory, -dual))
+        return arc_reduced_cost, subset_rows
+
+    def _subset_row_resources(self, subset_rows):
+        '''
+        Per vertex subset row cuts containing the vertex and cuts whose memory the vertex leaves
+        :param subset_rows:
+        :return: cut indices per vertex, reset bit set per vertex, penalty per cut
+        '''
+        cut_members = [[] for _ in range(self.number_of_vertices)]
+        cut_resets = [0] * self.number_of_vertices
+        for cut_idx, (customers, memory, penalty) in enumerate(subset_rows):
+            for vertex in range(self.number_of_vertices):
+                if customers >> vertex & 1:
+                    cut_members[vertex].append(cut_idx)
+                if not memory >> vertex & 1:
+                    cut_resets[vertex] |= 1 << cut_idx
+        return cut_members, cut_resets, [penalty for customers, memory, penalty in subset_rows]
+
+    def _completion_bounds(self, arc_reduced_cost, capacity):
+        '''
+        Lower bound on the reduced cost from a vertex to the depot with the remaining capacity,
+        relaxing time windows and elementarity
+        :param arc_reduced_cost:
+        :param capacity:
+        :return: bound per vertex and integer remaining capacity, None if demands are not positive
+        '''
+        demand = np.floor(np.array(self.demand[2:])).astype(int)
+        if len(demand) == 0 or demand.min() < 1:
+            return None
+        maximum_load = int(np.floor(capacity))
+        costs = np.where(np.isnan(arc_reduced_cost), np.inf, arc_reduced_cost)
+        successor_mask = np.full(costs.shape, False)
+        for from_idx, successors in enumerate(self.successors):
+            successor_mask[from_idx, successors] = True
+        costs = np.where(successor_mask, costs, np.inf)
+        to_depot = costs[:, 1]
+        to_customers = costs[:, 2:]
+
+        bounds = np.full((self.number_of_vertices, maximum_load + 1), np.inf)
+        customer_idx = np.arange(len(demand)) + 2
+        for remaining in range(maximum_load + 1):
+            previous = remaining - demand
+            fits = previous >= 0
+            completion = np.full(len(demand), np.inf)
+            completion[fits] = bounds[customer_idx[fits], previous[fits]]
+            bounds[:, remaining] = np.minimum(to_depot, (to_customers + completion[None, :]).min(axis=1))
+        return bounds.tolist()
+
+    def solve(self, price, capacity, fixed_cost=0, vehicle_type_price=0, max_columns=10, cuts=None, cut_price=None):
+        '''
+        Find routes with negative reduced cost
+        :param price: customer duals
+        :param capacity: vehicle capacity
+        :param fixed_cost: vehicle fixed cost
+        :param vehicle_type_price: dual of the vehicle type availability constraint
+        :param max_columns: maximum number of routes returned
+        :param cuts: cuts of the master problem
+        :param cut_price: cut duals by cut name
+        :return: list of (reduced cost, path) sorted by reduced cost, whether the label limit was reached
+        '''
+        arc_reduced_cost = self._arc_reduced_costs(price)
+        subset_rows = []
+        if cuts:
+            arc_reduced_cost, subset_rows = self._cut_reduced_costs(arc_reduced_cost, cuts, cut_price or {})
+        subset_row_resources = self._subset_row_resources(subset_rows) if subset_rows else None
+        bidirectional = self.bidirectional and not subset_rows and self.lateness_penalty is None
+        constant = float(fixed_cost) - float(vehicle_type_price)
+        bounds = self._completion_bounds(arc_reduced_cost, capacity) if self.completion_bounds else None
+        arc_reduced_cost = arc_reduced_cost.tolist()
+        capacity = float(capacity)
+
+        if bidirectional:
+            midpoint = (self.time_window_start[0] + self.time_window_end[1]) / 2.0
+        else:
+            midpoint = np.inf
+
+        columns = _Columns(max_columns, self.reduced_cost_tolerance)
+        forward_labels, forward_truncated = self._forward_labeling(arc_reduced_cost, capacity, constant, bounds,
+                                                                   midpoint, columns, subset_row_resources)
+        truncated = forward_truncated
+        if bidirectional:
+            backward_labels, backward_truncated = self._backward_labeling(arc_reduced_cost, capacity, midpoint,
+                                                                          constant, columns)
+            truncated = truncated or backward_truncated
+            self._join(forward_labels, backward_labels, arc_reduced_cost, capacity, constant, columns)
+        columns.prune()
+
+        location_names = self.route_evaluator.location_names
+        return sorted(((reduced_cost, [location_names[vertex] for vertex in vertices])
+                       for vertices, reduced_cost in columns.routes.items()), key=lambda column: column[0]), truncated
+
+    @staticmethod
+    def _insert(labels, label, backward=False, cut_penalties=None, earliness_penalty=0):
+        '''
+        Insert a label into the non dominated labels of its vertex.
+        With subset row cuts a label dominates only after paying the penalties of the cuts it may still
+        complete and the other label may not. With an earliness penalty a forward label dominates only after paying
+        the waiting of its earlier time
+        :return: whether the label was kept
+        '''
+        kept = []
+        for other in labels:
+            if backward:
+                other_dominates = other.time >= label.time
+                label_dominates = label.time >= other.time
+            else:
+                other_dominates = other.time <= label.time
+                label_dominates = label.time <= other.time
+            other_reduced_cost = other.reduced_cost
+            label_reduced_cost = label.reduced_cost
+            if cut_penalties is not None:
+                other_reduced_cost += _state_penalty(other.cut_state & ~label.cut_state, cut_penalties)
+                label_reduced_cost += _state_penalty(label.cut_state & ~other.cut_state, cut_penalties)
+            if earliness_penalty:
+                other_reduced_cost += earliness_penalty * abs(label.time - other.time)
+                label_reduced_cost += earliness_penalty * abs(label.time - other.time)
+            if other_dominates and other_reduced_cost <= label.reduced_cost and other.load <= label.load and \
+                    other.memory & label.memory == other.memory:
+                return False
+            if label_dominates and label_reduced_cost <= other.reduced_cost and label.load <= other.load and \
+                    label.memory & other.memory == label.memory:
+                other.dominated = True
+            else:
+                kept.append(other)
+        kept.append(label)
+        labels[:] = kept
+        return True
+
+    def _forward_labeling(self, arc_reduced_cost, capacity, constant, bounds, midpoint, columns,
+                          subset_row_resources=None):
+        labels = [[] for _ in range(self.number_of_vertices)]
+        start = _Label(0, 0.0, 0.0, self.time_window_start[0], 0, None)
+        labels[0].append(start)
+        queue = [start]
+        number_of_labels = 1
+        truncated = False
+        cut_penalties = None
+        if subset_row_resources is not None:
+            cut_members, cut_resets, cut_penalties = subset_row_resources
+
+        while queue:
+            label = heapq.heappop(queue)
+            if label.dominated:
+                continue
+            vertex = label.vertex
+            for successor in self.successors[vertex]:
+                reduced_cost = label.reduced_cost + arc_reduced_cost[vertex][successor]
+                arrival = label.time + self.stop_time[vertex] + self.drive_minutes[vertex, successor]
+                if successor == 1:
+                    if vertex != 0 and arrival <= self.time_window_end[1]:
+                        columns.add(reduced_cost + constant, label.vertices()[::-1] + [1])
+                    continue
+                if label.memory >> successor & 1:
+                    continue
+                load = label.load + self.demand[successor]
+                if load > capacity:
+                    continue
+                time = max(arrival, self.time_window_start[successor])
+                if time > self.latest_service[successor] or time > midpoint:
+                    # beyond the midpoint the route is completed by a backward label
+                    continue
+                if self.lateness_penalty is not None:
+                    reduced_cost += self.lateness_penalty * max(0.0, arrival - self.time_window_end[successor]) + \
+                        self.earliness_penalty * (time - arrival if vertex != 0 else 0.0)
+                if bounds is not None and \
+                        reduced_cost + bounds[successor][int(capacity - load)] + constant >= columns.threshold:
+                    continue
+                cut_state = 0
+                if cut_penalties is not None:
+                    cut_state = label.cut_state & ~cut_resets[successor]
+                    for cut_idx in cut_members[successor]:
+                        if cut_state >> cut_idx & 1:
+                            reduced_cost += cut_penalties[cut_idx]
+                            cut_state &= ~(1 << cut_idx)
+                        else:
+                            cut_state |= 1 << cut_idx
+                memory = (label.memory & self.neighbourhoods[successor]) | (1 << successor)
+                new_label = _Label(successor, reduced_cost, load, time, memory, label, cut_state)
+                if self._insert(labels[successor], new_label, cut_penalties=cut_penalties,
+                                earliness_penalty=self.earliness_penalty if self.lateness_penalty is not None else 0):
+                    heapq.heappush(queue, new_label)
+                    number_of_labels += 1
+                    if number_of_labels >= self.max_labels:
+                        truncated = True
+                        queue = []
+                        break
+        return labels, truncated
+
+    def _backward_labeling(self, arc_reduced_cost, capacity, midpoint, constant, columns):
+        labels = [[] for _ in range(self.number_of_vertices)]
+        start = _Label(1, 0.0, 0.0, self.time_window_end[1], 0, None)
+        labels[1].append(start)
+        # latest start times first
+        queue = [(-start.time, id(start), start)]
+        number_of_labels = 1
+        truncated = False
+
+        while queue:
+            label = heapq.heappop(queue)[2]
+            if label.dominated:
+                continue
+            vertex = label.vertex
+            for predecessor in self.predecessors[vertex]:
+                reduced_cost = label.reduced_cost + arc_reduced_cost[predecessor][vertex]
+                if predecessor == 0:
+                    if vertex != 1 and self.time_window_start[0] + self.drive_minutes[0, vertex] <= label.time:
+                        columns.add(reduced_cost + constant, [0] + label.vertices())
+                    continue
+                if label.memory >> predecessor & 1:
+                    continue
+                load = label.load + self.demand[predecessor]
+                if load > capacity:
+                    continue
+                time = min(label.time - self.drive_minutes[predecessor, vertex] - self.stop_time[predecessor],
+                           self.time_window_end[predecessor])
+                if time < self.time_window_start[predecessor] or time < midpoint:
+                    continue
+                memory = (label.memory & self.neighbourhoods[predecessor]) | (1 << predecessor)
+                new_label = _Label(predecessor, reduced_cost, load, time, memory, label)
+                if self._insert(labels[predecessor], new_label, backward=True):
+                    heapq.heappush(queue, (-time, id(new_label), new_label))
+                    number_of_labels += 1
+                    if number_of_labels >= self.max_labels:
+                        truncated = True
+                        queue = []
+                        break
+        return labels, truncated
+
+    def _join(self, forward_labels, backward_labels, arc_reduced_cost, capacity, constant, columns):
+        '''
+        Concatenate forward and backward labels over an arc
+        :return:
+        '''
+        for labels in backward_labels:
+            labels.sort(key=lambda label: label.reduced_cost)
+
+        for vertex in self.customers:
+            for forward_label in forward_labels[vertex]:
+                departure = forward_label.time + self.stop_time[vertex]
+                for successor in self.successors[vertex]:
+                    if successor == 1:
+                        continue
+                    arrival = departure + self.drive_minutes[vertex, successor]
+                    base_cost = forward_label.reduced_cost + arc_reduced_cost[vertex][successor] + constant
+                    for backward_label in backward_labels[successor]:
+                        if base_cost + backward_label.reduced_cost >= columns.threshold:
+                            break
+                        if arrival > backward_label.time or forward_label.load + backward_label.load > capacity or \
+                                forward_label.memory & backward_label.memory:
+                            continue
+                        columns.add(base_cost + backward_label.reduced_cost,
+                                    forward_label.vertices()[::-1] + backward_label.vertices())
@@ -0,0 +1,252 @@
+'''
+Route evaluation
+Cost, load, arrival times, waiting and time window violations for batches of routes
+'''
+import numpy as np
+import pandas as pd
+
+
+class RouteEvaluation:
+    '''
+    Evaluation results, one entry per route.
+    Per stop arrays have one column per route position and are nan after the end of a route.
+    Earliness is the waiting at customers after the first one, whose waiting is saved by leaving the depot later.
+    With soft time windows it is penalized together with the lateness of the customers, the depot time windows
+    stay hard.
+    '''
+
+    def __init__(self, stops, lengths, cost, load, arrival_time, start_time, waiting, lateness,
+                 capacity_excess, missing_arcs, repeated_customers):
+        self.stops = stops
+        self.lengths = lengths
+        self.cost = cost
+        self.load = load
+        self.arrival_time = arrival_time
+        self.start_time = start_time
+        self.waiting = waiting
+        self.lateness = lateness
+        self.capacity_excess = capacity_excess
+        self.missing_arcs = missing_arcs
+        self.repeated_customers = repeated_customers
+
+        self.total_waiting = np.nansum(waiting, axis=1)
+        self.total_lateness = np.nansum(lateness, axis=1)
+        self.time_window_violations = (np.nan_to_num(lateness) > 0).sum(axis=1)
+        self.duration = np.nanmax(start_time, axis=1) - start_time[:, 0]
+        self.feasible = (self.time_window_violations == 0) & (capacity_excess <= 0) & (missing_arcs == 0) & \
+                        (repeated_customers == 0)
+
+        customer_stops = stops >= 2
+        self.earliness = np.where(customer_stops, waiting, np.nan)
+        self.earliness[:, :2] = np.where(customer_stops[:, :2], 0, np.nan)
+        self.total_earliness = np.nansum(self.earliness, axis=1)
+        self.customer_lateness = np.nansum(np.where(customer_stops, lateness, np.nan), axis=1)
+        depot_lateness = self.total_lateness - self.customer_lateness
+        self.soft_feasible = (depot_lateness <= 0) & (capacity_excess <= 0) & (missing_arcs == 0) & \
+                             (repeated_customers == 0)
+
+    def __len__(self):
+        return len(self.cost)
+
+    def time_window_penalty(self, lateness_penalty, earliness_penalty=0):
+        '''
+        Soft time window penalty of every route
+        :param lateness_penalty: cost per minute of arrival after a customer time window end
+        :param earliness_penalty: cost per minute of waiting for a customer time window start
+        :return:
+        '''
+        return float(lateness_penalty) * self.customer_lateness + float(earliness_penalty) * self.total_earliness
+
+    def to_dataframe(self, route_names=None):
+        '''
+        Route level summary
+        :param route_names:
+        :return:
+        '''
+        summary = pd.DataFrame({'NUMBER_OF_STOPS': self.lengths,
+                                'TRANSPORTATION_COST': self.cost,
+                                'LOAD': self.load,
+                                'DURATION': self.duration,
+                                'WAITING': self.total_waiting,
+                                'LATENESS': self.total_lateness,
+                                'TIME_WINDOW_VIOLATIONS': self.time_window_violations,
+                                'CAPACITY_EXCESS': self.capacity_excess,
+                                'MISSING_ARCS': self.missing_arcs,
+                                'REPEATED_CUSTOMERS': self.repeated_customers,
+                                'FEASIBLE': self.feasible})
+        if route_names is not None:
+            summary.insert(0, 'PATH_NAME', list(route_names))
+        return summary
+
+
+class RouteEvaluator:
+    '''
+    Evaluates routes over indexed matrices.
+    Index 0 is the depot leave vertex, index 1 the depot enter vertex, customers follow.
+    Routes are start to end sequences such as the paths in paths_dict, e.g. [DEPOT_LEAVE, STORE 1, DEPOT_ENTER].
+    '''
+
+    def __init__(self, vertices_dict, customers_dict, transit_dict, depot_name):
+
+        self.depot_leave = depot_name + '_LEAVE'
+        self.depot_enter = depot_name + '_ENTER'
+        self.customer_names = list(customers_dict['DEMAND'].keys())
+        self.location_names = [self.depot_leave, self.depot_enter] + self.customer_names
+        self.location_index = {name: idx for idx, name in enumerate(self.location_names)}
+        number_of_locations = len(self.location_names)
+
+        self.demand = np.zeros(number_of_locations)
+        self.stop_time = np.zeros(number_of_locations)
+        self.demand[2:] = [customers_dict['DEMAND'][customer] for customer in self.customer_names]
+        self.stop_time[2:] = [customers_dict['STOP_TIME'][customer] for customer in self.customer_names]
+        self.time_window_start = np.array([vertices_dict['TIME_WINDOW_START'][name] for name in self.location_names],
+                                          dtype=float)
+        self.time_window_end = np.array([vertices_dict['TIME_WINDOW_END'][name] for name in self.location_names],
+                                        dtype=float)
+
+        self.drive_minutes = np.full((number_of_locations, number_of_locations), np.nan)
+        self.transportation_cost = np.full((number_of_locations, number_of_locations), np.nan)
+        arcs = [(self.location_index.get(from_loc), self.location_index.get(to_loc), drive,
+                 transit_dict['TRANSPORTATION_COST'][from_loc, to_loc])
+                for (from_loc, to_loc), drive in transit_dict['DRIVE_MINUTES'].items()]
+        arcs = np.array([arc for arc in arcs if arc[0] is not None and arc[1] is not None], dtype=float)
+        if len(arcs):
+            from_idx = arcs[:, 0].astype(int)
+            to_idx = arcs[:, 1].astype(int)
+            self.drive_minutes[from_idx, to_idx] = arcs[:, 2]
+            self.transportation_cost[from_idx, to_idx] = arcs[:, 3]
+
+    @classmethod
+    def from_model_inputs(cls, model_inputs):
+        '''
+        Create the evaluator from column generation or general model inputs
+        :param model_inputs:
+        :return:
+        '''
+        return cls(model_inputs.vertices_dict,
+                   model_inputs.customers_dict,
+                   model_inputs.transit_dict,
+                   model_inputs.depot_names[0])
+
+    def encode_routes(self, routes):
+        '''
+        Convert routes of location names to a padded index array
+        :param routes: list of location name lists
+        :return: stops array padded with -1, route lengths
+        '''
+        lengths = np.fromiter((len(route) for route in routes), dtype=np.int64, count=len(routes))
+        max_length = lengths.max() if len(routes) else 0
+        stops = np.full((len(routes), max_length), -1, dtype=np.int64)
+        location_index = self.location_index
+        for route_idx, route in enumerate(routes):
+            stops[route_idx, :len(route)] = [location_index[location] for location in route]
+        return stops, lengths
+
+    def decode_route(self, stops):
+        '''
+        Convert an index route to location names
+        :param stops:
+        :return:
+        '''
+        return [self.location_names[stop] for stop in stops if stop >= 0]
+
+    def evaluate(self, routes, capacity=np.inf, lengths=None):
+        '''
+        Evaluate a batch of routes.
+        Vehicles leave the depot at its time window start, service starts at max(arrival, time window start)
+        :param routes: list of location name lists, or an index array padded with -1
+        :param capacity: scalar or one capacity per route
+        :param lengths: route lengths when routes is an index array
+        :return: RouteEvaluation
+        '''
+        if isinstance(routes, np.ndarray):
+            stops = routes
+            if lengths is None:
+                lengths = (stops >= 0).sum(axis=1)
+        else:
+            stops, lengths = self.encode_routes(routes)
+
+        number_of_routes, max_length = stops.shape
+        positions = np.arange(max_length)
+        in_route = positions[None, :] < lengths[:, None]
+        safe_stops = np.where(in_route, stops, 0)
+
+        load = np.where(in_route, self.demand[safe_stops], 0).sum(axis=1)
+
+        arrival_time = np.full((number_of_routes, max_length), np.nan)
+        start_time = np.full((number_of_routes, max_length), np.nan)
+        waiting = np.full((number_of_routes, max_length), np.nan)
+        lateness = np.full((number_of_routes, max_length), np.nan)
+        cost = np.zeros(number_of_routes)
+        missing_arcs = np.zeros(number_of_routes, dtype=np.int64)
+
+        if max_length:
+            arrival_time[:, 0] = self.time_window_start[safe_stops[:, 0]]
+            start_time[:, 0] = arrival_time[:, 0]
+            waiting[:, 0] = 0
+            lateness[:, 0] = 0
+
+        for position in range(1, max_length):
+            active = in_route[:, position]
+            previous_stop = safe_stops[:, position - 1]
+            stop = safe_stops[:, position]
+
+            drive = self.drive_minutes[previous_stop, stop]
+            arc_cost = self.transportation_cost[previous_stop, stop]
+            missing = active & np.isnan(drive)
+            missing_arcs += missing
+            cost += np.where(active & ~missing, arc_cost, 0)
+
+            arrival = start_time[:, position - 1] + self.stop_time[previous_stop] + np.where(missing, 0, drive)
+            start = np.maximum(arrival, self.time_window_start[stop])
+            arrival_time[:, position] = np.where(active, arrival, np.nan)
+            start_time[:, position] = np.where(active, start, np.nan)
+            waiting[:, position] = np.where(active, start - arrival, np.nan)
+            lateness[:, position] = np.where(active, np.maximum(0, arrival - self.time_window_end[stop]), np.nan)
+
+        # customers visited more than once
+        customer_stops = np.sort(np.where(in_route & (safe_stops >= 2), safe_stops, -1 - positions[None, :]), axis=1)
+        repeated_customers = (customer_stops[:, 1:] == customer_stops[:, :-1]).sum(axis=1)
+
+        capacity_excess = load - np.asarray(capacity, dtype=float)
+
+        return RouteEvaluation(stops, lengths, cost, load, arrival_time, start_time, waiting, lateness,
+                               capacity_excess, missing_arcs, repeated_customers)
+
+    def path_costs(self, paths_dict, lateness_penalty=None, earliness_penalty=0):
+        '''
+        Transportation cost of every path in paths_dict
+        :param paths_dict:
+        :param lateness_penalty: if given, time windows are soft and the cost includes the time window penalty
+        :param earliness_penalty: cost per minute of waiting at customers with soft time windows
+        :return: paths cost dictionary
+        '''
+        evaluation = self.evaluate(list(paths_dict.values()))
+        cost = evaluation.cost
+        if lateness_penalty is not None:
+            cost = cost + evaluation.time_window_penalty(lateness_penalty, earliness_penalty)
+        return dict(zip(paths_dict.keys(), cost.tolist()))
+
+    def time_window_violations(self, evaluation, route_names=None):
+        '''
+        Customers served late or after waiting
+        :param evaluation: RouteEvaluation
+        :param route_names: defaults to the route positions
+        :return: one row per violating stop
+        '''
+        if route_names is None:
+            route_names = range(len(evaluation))
+        route_names = list(route_names)
+        route_idx, position = np.nonzero((np.nan_to_num(evaluation.lateness) > 0) & (evaluation.stops >= 2) |
+                                         (np.nan_to_num(evaluation.earliness) > 0))
+        stops = evaluation.stops[route_idx, position]
+        return pd.DataFrame({'PATH_NAME': [route_names[idx] for idx in route_idx],
+                             'STOP_NUMBER': position + 1,
+                             'LOCATION_NAME': [self.location_names[stop] for stop in stops],
+                             'ARRIVAL_TIME': evaluation.arrival_time[route_idx, position],
+                             'TIME_WINDOW_START': self.time_window_start[stops],
+                             'TIME_WINDOW_END': self.time_window_end[stops],
+                             'LATENESS': evaluation.lateness[route_idx, position],
+                             'EARLINESS': evaluation.earliness[route_idx, position]},
+                            columns=['PATH_NAME', 'STOP_NUMBER', 'LOCATION_NAME', 'ARRIVAL_TIME', 'TIME_WINDOW_START',
+                                     'TIME_WINDOW_END', 'LATENESS', 'EARLINESS'])
@@ -0,0 +1,357 @@
+'''
+Route solution
+Compact solver output, the routes are one integer array of location indices with route offsets. Values repeated on
+every stop are stored once per solution, route or location and the per stop table is built on demand
+'''
+import json
+
+import numpy as np
+import pandas as pd
+
+# stop columns of process_paths, after the columns of the master problem solution
+COLUMN_GENERATION_STOP_COLUMNS = ['STOP_NUMBER', 'LOCATION_NAME', 'PREVIOUS_LOCATION_NAME', 'ORIGINAL_LOCATION_NAME',
+                                  'DRIVE_MINUTES', 'TRANSPORTATION_COST', 'TIME_WINDOW_START', 'STOP_TIME',
+                                  'TIME_WINDOW_END', 'DEMAND', 'START_TIME']
+
+# values of a location, the same on every stop at the location
+LOCATION_COLUMNS = ['DEMAND', 'STOP_TIME', 'TIME_WINDOW_START', 'TIME_WINDOW_END']
+
+# stop columns computed from the routes and the location values
+DERIVED_COLUMNS = ['STOP_NUMBER', 'LOCATION_NAME', 'PREVIOUS_LOCATION_NAME', 'ORIGINAL_LOCATION_NAME', 'PATH',
+                   'END_TIME']
+
+
+def _equal(left, right):
+    left = pd.Series(left).values
+    right = pd.Series(right).values
+    if len(left) != len(right):
+        return False
+    both_missing = pd.isnull(left) & pd.isnull(right)
+    return bool(((left == right) | both_missing).all())
+
+
+def _is_numeric(values):
+    return isinstance(values, np.ndarray) and values.dtype.kind in 'biuf'
+
+
+def _integral(values):
+    # whole numbers keep the integer type of the input tables
+    return values.astype(np.int64) if (values == np.round(values)).all() else values
+
+
+def _json_value(value):
+    return value.item() if hasattr(value, 'item') else value
+
+
+class RouteSolution:
+    '''
+    Routes of a solution with their values.
+    stops holds the location index of every stop, the stops of route i are stops[offsets[i]:offsets[i + 1]].
+    Values are stored at the coarsest level they vary at: solution_values once (e.g. OBJECTIVE), route_values per
+    route (e.g. VALUE, VEHICLE_TYPE), location_values per location (DEMAND, STOP_TIME and time windows) and
+    stop_values per stop (e.g. START_TIME, DRIVE_MINUTES). The location names, previous locations, stop numbers and
+    end times of the stops are computed when accessed
+    '''
+
+    def __init__(self, route_column, route_names, location_names, stops, offsets, columns, location_values=None,
+                 solution_values=None, route_values=None, stop_values=None, first_stop_number=1):
+        self.route_column = route_column
+        self.route_names = list(route_names)
+        self.location_names = list(location_names)
+        self.stops = np.asarray(stops, dtype=np.int32)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.columns = list(columns)
+        self.location_values = location_values or {}
+        self.solution_values = solution_values or {}
+        self.route_values = route_values or {}
+        self.stop_values = stop_values or {}
+        self.first_stop_number = first_stop_number
+        # run level metadata as the attrs of a data frame, e.g. DROPPED_CUSTOMERS
+        self.attrs = {}
+
+    def __len__(self):
+        return len(self.route_names)
+
+    def __iter__(self):
+        for route_idx in range(len(self)):
+            yield self.route(route_idx)
+
+    @property
+    def lengths(self):
+        return np.diff(self.offsets)
+
+    @property
+    def number_of_stops(self):
+        return len(self.stops)
+
+    @property
+    def objective(self):
+        return self.solution_values.get('OBJECTIVE')
+
+    @property
+    def nbytes(self):
+        '''
+        Size of the arrays of the solution
+        :return:
+        '''
+        arrays = [self.stops, self.offsets] + [values for level in (self.location_values, self.route_values,
+                                                                    self.stop_values)
+                                               for values in level.values() if isinstance(values, np.ndarray)]
+        return sum(array.nbytes for array in arrays)
+
+    def route_stops(self, route_idx):
+        return self.stops[self.offsets[route_idx]:self.offsets[route_idx + 1]]
+
+    def route(self, route_idx):
+        '''
+        Location names of a route
+        :param route_idx: position of the route, see route_names
+        :return:
+        '''
+        return [self.location_names[stop] for stop in self.route_stops(route_idx)]
+
+    def routes(self):
+        return list(self)
+
+    def stop_column(self, column):
+        '''
+        Values of a column for every stop, in route order
+        :param column:
+        :return:
+        '''
+        lengths = self.lengths
+        if not self.number_of_stops:
+            return np.empty(0, dtype=object)
+        if column == self.route_column:
+            return np.repeat(np.array(self.route_names, dtype=object), lengths)
+        if column in self.stop_values:
+            return self.stop_values[column]
+        if column in self.route_values:
+            values = self.route_values[column]
+            return np.repeat(values if _is_numeric(values) else np.array(values, dtype=object), lengths)
+        if column in self.solution_values:
+            return np.repeat(np.array([self.solution_values[column]]), self.number_of_stops)
+        if column in self.location_values:
+            return self.location_values[column][self.stops]
+
+        locations = np.array(self.location_names, dtype=object)
+        if column in ('LOCATION_NAME', 'PATH'):
+            return locations[self.stops]
+        if column == 'ORIGINAL_LOCATION_NAME':
+            original_names = pd.Series(self.location_names).str.replace('_ENTER', '').str.replace('_LEAVE', '')
+            return original_names.values[self.stops]
+        if column == 'PREVIOUS_LOCATION_NAME':
+            previous_locations = np.empty(self.number_of_stops, dtype=object)
+            previous_locations[1:] = locations[self.stops[:-1]]
+            previous_locations[self.offsets[:-1][lengths > 0]] = np.nan
+            return previous_locations
+        if column == 'STOP_NUMBER':
+            return np.arange(self.number_of_stops) - np.repeat(self.offsets[:-1], lengths) + self.first_stop_number
+        if column == 'END_TIME':
+            return self.stop_column('START_TIME') + self.stop_column('STOP_TIME')
+        raise Exception('Unknown column {}'.format(column))
+
+    def set_stop_column(self, column, values):
+        '''
+        Set the values of a stop column
+        :param column:
+        :param values: one value per stop, or a route by position array as RouteEvaluation.start_time
+        :return:
+        '''
+        values = np.asarray(values)
+        if values.ndim == 2:
+            lengths = self.lengths
+            values = values[np.repeat(np.arange(len(lengths)), lengths),
+                            np.arange(self.number_of_stops) - np.repeat(self.offsets[:-1], lengths)]
+        self.stop_values[column] = values
+        if column not in self.columns:
+            self.columns.append(column)
+
+    def route_details(self, route_idx):
+        '''
+        Stop table of one route
+        :param route_idx:
+        :return:
+        '''
+        stop_slice = slice(self.offsets[route_idx], self.offsets[route_idx + 1])
+        return pd.DataFrame({column: self.stop_column(column)[stop_slice] for column in self.columns},
+                            columns=self.columns)
+
+    def route_summary(self):
+        '''
+        Number of stops, load and transportation cost of every route
+        :return:
+        '''
+        lengths = self.lengths
+        starts = self.offsets[:-1][lengths > 0]
+        summary = pd.DataFrame({self.route_column: self.route_names, 'NUMBER_OF_STOPS': lengths})
+        for column, summary_column in (('DEMAND', 'LOAD'), ('TRANSPORTATION_COST', 'TRANSPORTATION_COST')):
+            if column in self.location_values or column in self.stop_values:
+                totals = np.zeros(len(self))
+                if len(starts):
+                    totals[lengths > 0] = np.add.reduceat(np.nan_to_num(self.stop_column(column).astype(float)),
+                                                          starts)
+                summary[summary_column] = totals
+        return summary
+
+    def to_dataframe(self):
+        '''
+        Solution in the per stop schema of the solver that produced it
+        :return:
+        '''
+        solution = pd.DataFrame({column: self.stop_column(column) for column in self.columns}, columns=self.columns)
+        solution.attrs.update(self.attrs)
+        return solution
+
+    @classmethod
+    def from_master_path(cls, master_path, route_evaluator):
+        '''
+        Create the solution of column generation from the master problem solution without the per stop table.
+        The START_TIME of the stops is their time window start as in process_paths
+        :param master_path: PATH_NAME and PATH of every route with the route columns, e.g. VALUE and OBJECTIVE
+        :param route_evaluator: RouteEvaluator of the instance
+        :return:
+        '''
+        stops, lengths = route_evaluator.encode_routes(master_path['PATH'].tolist())
+        in_route = np.arange(stops.shape[1])[None, :] < lengths[:, None]
+        flat_stops = stops[in_route]
+        offsets = np.concatenate([[0], np.cumsum(lengths)])
+
+        # the first stop of every route has no previous stop, its values are replaced below
+        previous_stops = np.roll(flat_stops, 1)
+        first_stops = offsets[:-1][lengths > 0]
+        drive_minutes = route_evaluator.drive_minutes[previous_stops, flat_stops]
+        transportation_cost = route_evaluator.transportation_cost[previous_stops, flat_stops]
+        drive_minutes[first_stops] = np.nan
+        transportation_cost[first_stops] = np.nan
+
+        solution = cls('PATH_NAME',
+                       master_path['PATH_NAME'].tolist(),
+                       route_evaluator.location_names,
+                       flat_stops,
+                       offsets,
+                       list(master_path.columns) + COLUMN_GENERATION_STOP_COLUMNS,
+                       location_values={'DEMAND': _integral(route_evaluator.demand),
+                                        'STOP_TIME': _integral(route_evaluator.stop_time),
+                                        'TIME_WINDOW_START': route_evaluator.time_window_start,
+                                        'TIME_WINDOW_END': route_evaluator.time_window_end},
+                       stop_values={'DRIVE_MINUTES': drive_minutes,
+                                    'TRANSPORTATION_COST': transportation_cost,
+                                    'START_TIME': route_evaluator.time_window_start[flat_stops]})
+        solution._set_route_values(master_path, [column for column in master_path.columns
+                                                 if column not in ('PATH_NAME', 'PATH')])
+        return solution
+
+    @classmethod
+    def from_dataframe(cls, solution):
+        '''
+        Create the compact solution of a solver output, the routes of the column generation (PATH_NAME) or general
+        model (VEHICLE) solution
+        :param solution:
+        :return:
+        '''
+        route_column = 'PATH_NAME' if 'PATH_NAME' in solution.columns else 'VEHICLE'
+        columns = list(solution.columns)
+        if not len(solution):
+            return cls(route_column, [], [], [], [0], columns)
+
+        route_codes, route_names = pd.factorize(solution[route_column])
+        order = np.lexsort((solution['STOP_NUMBER'].values, route_codes))
+        solution = solution.iloc[order].reset_index(drop=True)
+        route_codes = route_codes[order]
+        stops, location_names = pd.factorize(solution['LOCATION_NAME'])
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(route_codes, minlength=len(route_names)))])
+        first_stop_number = int(solution['STOP_NUMBER'].min())
+
+        compact = cls(route_column, list(route_names), list(location_names), stops, offsets, columns,
+                      first_stop_number=first_stop_number)
+
+        # location columns with the same value on every stop at a location
+        first_rows = pd.Series(np.arange(len(solution))).groupby(stops).first().values
+        for column in LOCATION_COLUMNS:
+            if column in solution.columns:
+                values = solution[column].values[first_rows]
+                if _is_numeric(values) and _equal(values[stops], solution[column].values):
+                    compact.location_values[column] = values
+
+        stored_columns = [column for column in columns if column != route_column and
+                          column not in compact.location_values]
+        constant_columns = solution[stored_columns].nunique(dropna=False) <= 1
+        route_constant_columns = solution.groupby(route_codes)[stored_columns].nunique(dropna=False).max() <= 1
+        route_columns = []
+        for column in stored_columns:
+            if column in DERIVED_COLUMNS and _equal(compact.stop_column(column), solution[column].values):
+                continue
+            if constant_columns[column]:
+                compact.solution_values[column] = _json_value(solution[column].iloc[0])
+            elif route_constant_columns[column]:
+                route_columns.append(column)
+            else:
+                values = solution[column].values
+                compact.stop_values[column] = values if _is_numeric(values) else values.tolist()
+        compact._set_route_values(solution.groupby(route_codes, sort=True).first(), route_columns)
+        return compact
+
+    def _set_route_values(self, route_rows, route_columns):
+        for column in route_columns:
+            values = route_rows[column].values
+            if len(values) and pd.Series(values).nunique(dropna=False) <= 1 and len(self) > 0:
+                self.solution_values[column] = _json_value(values[0])
+            else:
+                self.route_values[column] = values if _is_numeric(values) else values.tolist()
+
+    def to_bytes(self):
+        '''
+        Serialize the solution, a json header with the names and array layout followed by the raw numeric arrays
+        :return:
+        '''
+        arrays = [('stops', self.stops), ('offsets', self.offsets)]
+        header = {'ROUTE_COLUMN': self.route_column,
+                  'ROUTE_NAMES': [_json_value(name) for name in self.route_names],
+                  'LOCATION_NAMES': self.location_names,
+                  'COLUMNS': self.columns,
+                  'FIRST_STOP_NUMBER': self.first_stop_number,
+                  'SOLUTION_VALUES': {column: _json_value(value) for column, value in self.solution_values.items()}}
+        for level, values in (('LOCATION', self.location_values), ('ROUTE', self.route_values),
+                              ('STOP', self.stop_values)):
+            header[level + '_VALUES'] = {}
+            for column, column_values in values.items():
+                if _is_numeric(column_values):
+                    arrays.append(('{}:{}'.format(level, column), column_values))
+                else:
+                    header[level + '_VALUES'][column] = [None if pd.isnull(value) else _json_value(value)
+                                                         for value in column_values]
+        header['ARRAYS'] = [[name, array.dtype.str, len(array)] for name, array in arrays]
+        header = json.dumps(header).encode()
+        return b''.join([len(header).to_bytes(4, 'little'), header] +
+                        [np.ascontiguousarray(array).tobytes() for name, array in arrays])
+
+    @classmethod
+    def from_bytes(cls, data):
+        '''
+        Read a solution written by to_bytes
+        :param data:
+        :return:
+        '''
+        header_length = int.from_bytes(data[:4], 'little')
+        header = json.loads(data[4:4 + header_length].decode())
+        values = {'LOCATION': dict(header['LOCATION_VALUES']),
+                  'ROUTE': dict(header['ROUTE_VALUES']),
+                  'STOP': dict(header['STOP_VALUES'])}
+        arrays = {}
+        position = 4 + header_length
+        for name, dtype, length in header['ARRAYS']:
+            array = np.frombuffer(data, dtype=dtype, count=length, offset=position).copy()
+            position += array.nbytes
+            if ':' in name:
+                level, column = name.split(':', 1)
+                values[level][column] = array
+            else:
+                arrays[name] = array
+        return cls(header['ROUTE_COLUMN'], header['ROUTE_NAMES'], header['LOCATION_NAMES'], arrays['stops'],
+                   arrays['offsets'], header['COLUMNS'],
+                   location_values=values['LOCATION'],
+                   solution_values=header['SOLUTION_VALUES'],
+                   route_values=values['ROUTE'],
+                   stop_values=values['STOP'],
+                   first_stop_number=header['FIRST_STOP_NUMBER'])
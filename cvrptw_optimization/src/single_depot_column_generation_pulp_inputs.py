@@ -5,6 +5,8 @@ CVRPTW formulation
 import numpy as np
 from itertools import product
 
+from cvrptw_optimization.src import feasibility_tables as feasibility
+
 
 class ModelInputs:
 
@@ -27,6 +29,8 @@ class ModelInputs:
         self.transit_dict = None
         self.transit_starting_customers_dict = None
         self.vehicles_dict = None
+        self.vehicle_types = None
+        self.vehicle_types_dict = None
         self.paths = None
         self.paths_list = None
         self.paths_dict = None
@@ -36,6 +40,7 @@ class ModelInputs:
 
         self.time_variables_dict = None
         self.assignment_variables_dict = None
+        self.feasibility_tables = None
 
         self.update_depot_names()
         self.create_vertices()
@@ -43,6 +48,7 @@ class ModelInputs:
         self.create_depots()
         self.create_transit()
         self.create_vehicles()
+        self.create_vehicle_types()
         self.create_assignment_variables()
         self.create_time_variables()
 
@@ -118,6 +124,17 @@ class ModelInputs:
         self.vehicles_dict = self._create_parameter_dict(self.vehicles, ['VEHICLE_NAME'],
                                                          ['CAPACITY', 'VEHICLE_FIXED_COST'])
 
+    def create_vehicle_types(self):
+        '''
+        Create vehicle types, one type per distinct capacity and fixed cost
+        :return:
+        '''
+        self.vehicle_types = self.vehicles.groupby(['CAPACITY', 'VEHICLE_FIXED_COST']).size().reset_index(
+            name='NUMBER_OF_VEHICLES')
+        self.vehicle_types['VEHICLE_TYPE'] = ['TYPE ' + str(idx) for idx in range(len(self.vehicle_types))]
+        self.vehicle_types_dict = self._create_parameter_dict(self.vehicle_types, ['VEHICLE_TYPE'],
+                                                              ['CAPACITY', 'VEHICLE_FIXED_COST', 'NUMBER_OF_VEHICLES'])
+
     def create_transit(self):
         '''
         Create transit dictionary
@@ -152,6 +169,15 @@ class ModelInputs:
         for tup in self.vertices['LOCATION_NAME']:
             self.time_variables_dict[tup] = 0
 
+    def create_feasibility_tables(self, capacity=None):
+        '''
+        Create feasibility tables, they are only built on request
+        :param capacity: vehicle capacity of the customer pair compatibility, defaults to the largest capacity
+        :return:
+        '''
+        self.feasibility_tables = feasibility.create_feasibility_tables(self, capacity)
+        return self.feasibility_tables
+
     def create_initial_paths(self):
         '''
         Function to create initial paths
@@ -4,6 +4,9 @@ CVRPTW master and sub formulation
 from pulp import *
 import pandas as pd
 
+from cvrptw_optimization.src.instrumentation import track_phase
+from cvrptw_optimization.src.single_depot_general_model_pulp_formulation import demand_coefficients
+
 
 class ColumnGenerationFormulation:
 
@@ -24,6 +27,13 @@ class ColumnGenerationFormulation:
         self.customers_dict = customers_dict
         self.transit_dict = transit_dict
         self.transit_starting_customers_dict = transit_starting_customers_dict
+        self.vehicle_type_price = {}
+        self.cut_price = {}
+
+        # the capacity constraint of every sub-problem has the same terms
+        self.capacity_keys = list(transit_starting_customers_dict['DRIVE_MINUTES'].keys())
+        self.capacity_coefficients = demand_coefficients(customers_dict,
+                                                         [from_loc for from_loc, to_loc in self.capacity_keys])
 
     def formulate_and_solve_master_problem(self,
                                            paths_dict,
@@ -35,7 +45,11 @@ class ColumnGenerationFormulation:
                                            mip_gap=0.001,
                                            solver_time_limit_minutes=10,
                                            enable_solution_messaging=1,
-                                           solver_type='PULP_CBC_CMD'
+                                           solver_type='PULP_CBC_CMD',
+                                           instrumentation=None,
+                                           paths_type_dict=None,
+                                           vehicle_types_dict=None,
+                                           cuts=None
                                            ):
 
         '''
@@ -43,52 +57,88 @@ class ColumnGenerationFormulation:
         :param paths_dict:
         :param paths_cost_dict:
         :param paths_customers_dict:
+        :param number_of_paths:
         :param binary_model:
         :param lp_file_name:
         :param mip_gap:
         :param solver_time_limit_minutes:
         :param enable_solution_messaging:
         :param solver_type:
+        :param instrumentation: RunInstrumentation to record build, write, solve and extract phases
+        :param paths_type_dict: vehicle type of every path, None for untyped paths
+        :param vehicle_types_dict: vehicle types with NUMBER_OF_VEHICLES, adds one availability constraint per type,
+        the duals are stored in vehicle_type_price
+        :param cuts: CapacityCut and SubsetRowCut rows, the duals are stored in cut_price
         :return:
         '''
 
-        master_model = pulp.LpProblem("MA_CVRPTW", pulp.LpMinimize)
-        if binary_model:
-            path_var = pulp.LpVariable.dicts("Path", paths_dict.keys(), 0, 1, pulp.LpBinary)
-        else:
-            path_var = pulp.LpVariable.dicts("Path", paths_dict.keys(), 0, 1, pulp.LpContinuous)
-        print('Master model objective function')
-        master_model += pulp.lpSum(paths_cost_dict[path] * path_var[path] for path in paths_dict.keys())
-
-        print('Each customer belongs to one path')
-        for customer in self.customers_dict['DEMAND'].keys():
-            master_model += pulp.lpSum(
-                [paths_customers_dict[path, customer] * path_var[path] for path in
-                 paths_dict.keys()]) == 1, "Customer" + str(customer)
-
-        if number_of_paths is not None:
-            master_model += pulp.lpSum(
-                [path_var[path] for path in
-                 paths_dict.keys()]) == number_of_paths, "No of Vehicles"
+        with track_phase(instrumentation, 'master_build'):
+            master_model = pulp.LpProblem("MA_CVRPTW", pulp.LpMinimize)
+            if binary_model:
+                path_var = pulp.LpVariable.dicts("Path", paths_dict.keys(), 0, 1, pulp.LpBinary)
+            else:
+                path_var = pulp.LpVariable.dicts("Path", paths_dict.keys(), 0, 1, pulp.LpContinuous)
+            print('Master model objective function')
+            master_model += pulp.lpSum(paths_cost_dict[path] * path_var[path] for path in paths_dict.keys())
 
-        if lp_file_name is not None:
-            master_model.writeLP('{}.lp'.format(str(lp_file_name)))
-
-        if solver_type == 'PULP_CBC_CMD':
-            master_model.solve(PULP_CBC_CMD(
-                msg=enable_solution_messaging,
-                maxSeconds=60 * solver_time_limit_minutes,
-                fracGap=mip_gap)
-            )
+            print('Each customer belongs to one path')
+            for customer in self.customers_dict['DEMAND'].keys():
+                master_model += pulp.lpSum(
+                    [paths_customers_dict[path, customer] * path_var[path] for path in
+                     paths_dict.keys()]) == 1, "Customer" + str(customer)
+
+            if number_of_paths is not None:
+                master_model += pulp.lpSum(
+                    [path_var[path] for path in
+                     paths_dict.keys()]) == number_of_paths, "No of Vehicles"
+
+            if vehicle_types_dict is not None:
+                for vehicle_type, number_of_vehicles in vehicle_types_dict['NUMBER_OF_VEHICLES'].items():
+                    master_model += pulp.lpSum(
+                        [path_var[path] for path in paths_dict.keys()
+                         if paths_type_dict[path] == vehicle_type]) <= number_of_vehicles, "VehicleType" + str(
+                        vehicle_type)
+
+            for cut in cuts or []:
+                cut_expression = pulp.lpSum([cut.coefficient(paths_dict[path]) * path_var[path]
+                                             for path in paths_dict.keys()])
+                if cut.sense == '>=':
+                    master_model += cut_expression >= cut.rhs, cut.name
+                else:
+                    master_model += cut_expression <= cut.rhs, cut.name
 
-        if master_model.status == 1:
+        if lp_file_name is not None:
+            with track_phase(instrumentation, 'master_write_lp'):
+                master_model.writeLP('{}.lp'.format(str(lp_file_name)))
+
+        with track_phase(instrumentation, 'master_solve'):
+            if solver_type == 'PULP_CBC_CMD':
+                master_model.solve(PULP_CBC_CMD(
+                    msg=enable_solution_messaging,
+                    maxSeconds=60 * solver_time_limit_minutes,
+                    fracGap=mip_gap)
+                )
+
+        if master_model.status != 1:
+            raise Exception('No Solution Exists')
 
+        with track_phase(instrumentation, 'master_extract'):
             solution_master_model_objective = value(master_model.objective)
             print('Master model objective = {}'.format(str(solution_master_model_objective)))
 
             price = {}
             for customer in self.customers_dict['DEMAND'].keys():
                 price[customer] = float(master_model.constraints["Customer" + str(customer).replace(" ", "_")].pi)
+
+            self.vehicle_type_price = {}
+            if vehicle_types_dict is not None:
+                for vehicle_type in vehicle_types_dict['NUMBER_OF_VEHICLES'].keys():
+                    self.vehicle_type_price[vehicle_type] = float(
+                        master_model.constraints["VehicleType" + str(vehicle_type).replace(" ", "_")].pi or 0)
+
+            self.cut_price = {}
+            for cut in cuts or []:
+                self.cut_price[cut.name] = float(master_model.constraints[cut.name].pi or 0)
             #print("Dual values: ", price)
 
             #for name, c in list(master_model.constraints.items()):
@@ -101,13 +151,12 @@ class ColumnGenerationFormulation:
                                                  'VALUE': path_var[path].value(),
                                                  'PATH': paths_dict[path]
                                                  })
+                    if paths_type_dict is not None:
+                        solution_master_path[-1]['VEHICLE_TYPE'] = paths_type_dict[path]
             solution_master_path = pd.DataFrame(solution_master_path)
             solution_master_path['OBJECTIVE'] = solution_master_model_objective
 
-            return price, solution_master_model_objective, solution_master_path
-
-        else:
-            raise Exception('No Solution Exists')
+        return price, solution_master_model_objective, solution_master_path
 
     def formulate_and_solve_subproblem(self,
                                        price,
@@ -118,7 +167,16 @@ class ColumnGenerationFormulation:
                                        mip_gap=0.001,
                                        solver_time_limit_minutes=10,
                                        enable_solution_messaging=1,
-                                       solver_type='PULP_CBC_CMD'
+                                       solver_type='PULP_CBC_CMD',
+                                       instrumentation=None,
+                                       fixed_cost=0,
+                                       vehicle_type_price=0,
+                                       cuts=None,
+                                       soft_time_windows=False,
+                                       lateness_penalty=1,
+                                       earliness_penalty=0,
+                                       duration_price=0,
+                                       depot_time_window=None
                                        ):
         '''
         Formulate and solve subproblem
@@ -126,98 +184,199 @@ class ColumnGenerationFormulation:
         :param capacity:
         :param path_name:
         :param lp_file_name:
-        :param bigm:
+        :param bigm: upper limit of the time window big-M, every arc uses the smallest valid value below it
         :param mip_gap:
         :param solver_time_limit_minutes:
         :param enable_solution_messaging:
         :param solver_type:
+        :param instrumentation: RunInstrumentation to record build, write, solve and extract phases
+        :param fixed_cost: vehicle fixed cost added to the path cost
+        :param vehicle_type_price: dual of the vehicle type availability constraint
+        :param cuts: master cuts, their duals are read from cut_price. Subset row cuts are priced with their memory
+        :param soft_time_windows: customers may be served after their time window end until the depot closes
+        :param lateness_penalty: cost per minute of lateness with soft time windows
+        :param earliness_penalty: cost per minute of waiting for a customer time window start with soft time windows
+        :param duration_price: cost per minute from leaving to entering the depot, e.g. the negated shift duration
+        dual of the multi-trip master problem
+        :param depot_time_window: start and end limiting the depot time window, e.g. a vehicle shift
         :return:
         '''
 
         # sub problem
-        sub_model = pulp.LpProblem("SU_CVRPTW", pulp.LpMinimize)
-        time_var = pulp.LpVariable.dicts("Time", self.time_variables_dict.keys(), 0, None, pulp.LpContinuous)
-        assignment_var = pulp.LpVariable.dicts("Assign", self.assignment_variables_dict.keys(), 0, 1, pulp.LpBinary)
-
-        #print('objective function')
-        objective_keys = []
-        for from_loc, to_loc in self.assignment_variables_dict.keys():
-            if from_loc != self.depot_leave:
-                objective_keys.append([from_loc, to_loc])
-
-        sub_model += pulp.lpSum(
-            self.transit_dict['TRANSPORTATION_COST'][from_loc, to_loc] * assignment_var[from_loc, to_loc]
-            for from_loc, to_loc in self.assignment_variables_dict.keys())\
-            - pulp.lpSum(
-                price[from_loc] * assignment_var[from_loc, to_loc]
-            for from_loc, to_loc in objective_keys)
-
-        # Each vehicle should leave from a depot
-        #print('Each vehicle should leave from a depot')
-        sub_model += pulp.lpSum([assignment_var[self.depot_leave, customer]
-                                 for customer in
-                                 self.customers_dict['DEMAND'].keys()]) == 1, "entryDepotConnection"
-
-        # Flow in Flow Out
-        #print('Flow in Flow out')
-        for customer in self.customers_dict['DEMAND'].keys():
-            incoming_arcs = []
-            outgoing_arcs = []
+        with track_phase(instrumentation, 'sub_problem_build'):
+            sub_model = pulp.LpProblem("SU_CVRPTW", pulp.LpMinimize)
+            time_var = pulp.LpVariable.dicts("Time", self.time_variables_dict.keys(), 0, None, pulp.LpContinuous)
+            assignment_var = pulp.LpVariable.dicts("Assign", self.assignment_variables_dict.keys(), 0, 1, pulp.LpBinary)
 
+            #print('objective function')
+            objective_keys = []
             for from_loc, to_loc in self.assignment_variables_dict.keys():
-                if to_loc == customer:
-                    incoming_arcs.append(from_loc)
-                if from_loc == customer:
-                    outgoing_arcs.append(to_loc)
+                if from_loc != self.depot_leave:
+                    objective_keys.append([from_loc, to_loc])
 
             sub_model += pulp.lpSum(
-                [assignment_var[from_loc, customer] for from_loc in incoming_arcs]) - pulp.lpSum(
-                [assignment_var[customer, to_loc] for to_loc in outgoing_arcs]) == 0, "forTrip" + str(
-                customer)
-
-        # Each vehicle should enter a depot
-        #print('Each vehicle should enter a depot')
-        sub_model += pulp.lpSum([assignment_var[customer, self.depot_enter]
-                                 for customer in
-                                 self.customers_dict['DEMAND'].keys()]) == 1, "exitDepotConnection"
-
-        # vehicle Capacity
-        #print('vehicle Capacity')
-        sub_model += pulp.lpSum(
-            [float(self.customers_dict['DEMAND'][from_loc]) * assignment_var[from_loc, to_loc]
-             for from_loc, to_loc in
-             self.transit_starting_customers_dict['DRIVE_MINUTES'].keys()]) <= float(capacity), "Capacity"
-
-        # Time intervals
-        #print('time intervals')
-        for from_loc, to_loc in self.assignment_variables_dict.keys():
-            stop_time = 0
-            if from_loc != self.depot_leave:
-                stop_time = self.customers_dict['STOP_TIME'][from_loc]
-            sub_model += time_var[to_loc] - time_var[from_loc] >= \
-                         self.transit_dict['DRIVE_MINUTES'][
-                             from_loc, to_loc] + stop_time + bigm * assignment_var[
-                             from_loc, to_loc] - bigm, "timewindow" + str(
-                from_loc) + 'p' + str(to_loc)
-
-        # Time Windows
-        #print('time windows')
-        for vertex in self.time_variables_dict.keys():
-            time_var[vertex].bounds(float(self.vertices_dict['TIME_WINDOW_START'][vertex]),
-                                    float(self.vertices_dict['TIME_WINDOW_END'][vertex]))
+                self.transit_dict['TRANSPORTATION_COST'][from_loc, to_loc] * assignment_var[from_loc, to_loc]
+                for from_loc, to_loc in self.assignment_variables_dict.keys())\
+                - pulp.lpSum(
+                    price[from_loc] * assignment_var[from_loc, to_loc]
+                for from_loc, to_loc in objective_keys) + float(fixed_cost) - float(vehicle_type_price)
+
+            if duration_price:
+                sub_model.objective += float(duration_price) * (time_var[self.depot_enter] -
+                                                                time_var[self.depot_leave])
+
+            # with soft time windows a customer is served at the latest when the depot closes
+            earliest_service = dict(self.vertices_dict['TIME_WINDOW_START'])
+            latest_service = dict(self.vertices_dict['TIME_WINDOW_END'])
+            if depot_time_window is not None:
+                for depot_vertex in (self.depot_leave, self.depot_enter):
+                    earliest_service[depot_vertex] = max(earliest_service[depot_vertex], depot_time_window[0])
+                    latest_service[depot_vertex] = min(latest_service[depot_vertex], depot_time_window[1])
+            if soft_time_windows:
+                customers = list(self.customers_dict['DEMAND'].keys())
+                for customer in customers:
+                    latest_service[customer] = max(latest_service[customer],
+                                                   self.vertices_dict['TIME_WINDOW_END'][self.depot_enter])
+                lateness_var = pulp.LpVariable.dicts("Late", customers, 0, None, pulp.LpContinuous)
+                sub_model.objective += float(lateness_penalty) * pulp.lpSum(lateness_var.values())
+                for customer in customers:
+                    sub_model += lateness_var[customer] >= time_var[customer] - \
+                        float(self.vertices_dict['TIME_WINDOW_END'][customer]), "lateness" + str(customer)
+                if earliness_penalty:
+                    earliness_var = pulp.LpVariable.dicts("Early", customers, 0, None, pulp.LpContinuous)
+                    sub_model.objective += float(earliness_penalty) * pulp.lpSum(earliness_var.values())
+                    # the waiting is measured on the earliest schedule as by the RouteEvaluator, the route leaves
+                    # the depot at its time window start and every service starts at the arrival or at the time
+                    # window start, whichever is later. The waiting for the first customer is saved by leaving later
+                    window_start_var = pulp.LpVariable.dicts("WindowStart", customers, 0, 1, pulp.LpBinary)
+                    latest_service[self.depot_leave] = earliest_service[self.depot_leave]
+                    for customer in customers:
+                        sub_model += time_var[customer] <= self.vertices_dict['TIME_WINDOW_START'][customer] + \
+                            (latest_service[customer] - self.vertices_dict['TIME_WINDOW_START'][customer]) * \
+                            (1 - window_start_var[customer]), "serviceStart" + str(customer)
+
+            # master cut duals
+            for cut_idx, cut in enumerate(cuts or []):
+                cut_dual = self.cut_price.get(cut.name, 0.0)
+                if (cut_dual if cut.sense == '>=' else -cut_dual) < 0.000000001:
+                    continue
+                if cut.sense == '>=':
+                    sub_model.objective -= cut_dual * pulp.lpSum(
+                        assignment_var[from_loc, to_loc] for from_loc, to_loc in self.assignment_variables_dict.keys()
+                        if from_loc not in cut.customers and to_loc in cut.customers)
+                elif cut.memory is None:
+                    # one for two or three visits to the cut customers
+                    cut_var = pulp.LpVariable("SubsetRow" + str(cut_idx), 0, 1, pulp.LpBinary)
+                    sub_model.objective -= cut_dual * cut_var
+                    sub_model += 2 * cut_var >= pulp.lpSum(
+                        assignment_var[from_loc, to_loc] for from_loc, to_loc in self.assignment_variables_dict.keys()
+                        if from_loc in cut.customers) - 1, "subsetRow" + str(cut_idx)
+                else:
+                    # one for two visits to the cut customers without leaving the memory in between, the state of
+                    # a memory vertex is one once the route visited a cut customer since it entered the memory
+                    cut_var = pulp.LpVariable("SubsetRow" + str(cut_idx), 0, 1, pulp.LpBinary)
+                    sub_model.objective -= cut_dual * cut_var
+                    memory = [vertex for vertex in cut.memory if vertex in time_var]
+                    state_var = pulp.LpVariable.dicts("SubsetRowState" + str(cut_idx), memory, 0, 1,
+                                                      pulp.LpContinuous)
+                    for from_loc, to_loc in self.assignment_variables_dict.keys():
+                        if to_loc in cut.customers:
+                            sub_model += state_var[to_loc] >= assignment_var[from_loc, to_loc], \
+                                "subsetRowVisit" + str(cut_idx) + str(from_loc) + 'p' + str(to_loc)
+                        if from_loc not in cut.memory or to_loc not in cut.memory:
+                            continue
+                        sub_model += state_var[to_loc] >= state_var[from_loc] + assignment_var[from_loc, to_loc] - \
+                            1, "subsetRowState" + str(cut_idx) + str(from_loc) + 'p' + str(to_loc)
+                        if to_loc in cut.customers:
+                            sub_model += cut_var >= state_var[from_loc] + assignment_var[from_loc, to_loc] - 1, \
+                                "subsetRow" + str(cut_idx) + str(from_loc) + 'p' + str(to_loc)
+
+            # Each vehicle should leave from a depot
+            #print('Each vehicle should leave from a depot')
+            sub_model += pulp.lpSum([assignment_var[self.depot_leave, customer]
+                                     for customer in
+                                     self.customers_dict['DEMAND'].keys()]) == 1, "entryDepotConnection"
+
+            # Flow in Flow Out
+            #print('Flow in Flow out')
+            for customer in self.customers_dict['DEMAND'].keys():
+                incoming_arcs = []
+                outgoing_arcs = []
+
+                for from_loc, to_loc in self.assignment_variables_dict.keys():
+                    if to_loc == customer:
+                        incoming_arcs.append(from_loc)
+                    if from_loc == customer:
+                        outgoing_arcs.append(to_loc)
+
+                sub_model += pulp.lpSum(
+                    [assignment_var[from_loc, customer] for from_loc in incoming_arcs]) - pulp.lpSum(
+                    [assignment_var[customer, to_loc] for to_loc in outgoing_arcs]) == 0, "forTrip" + str(
+                    customer)
+
+            # Each vehicle should enter a depot
+            #print('Each vehicle should enter a depot')
+            sub_model += pulp.lpSum([assignment_var[customer, self.depot_enter]
+                                     for customer in
+                                     self.customers_dict['DEMAND'].keys()]) == 1, "exitDepotConnection"
+
+            # vehicle Capacity
+            #print('vehicle Capacity')
+            sub_model += pulp.LpAffineExpression(zip([assignment_var[arc] for arc in self.capacity_keys],
+                                                     self.capacity_coefficients)) <= float(capacity), "Capacity"
+
+            # Time intervals
+            #print('time intervals')
+            for from_loc, to_loc in self.assignment_variables_dict.keys():
+                stop_time = 0
+                if from_loc != self.depot_leave:
+                    stop_time = self.customers_dict['STOP_TIME'][from_loc]
+                travel_time = self.transit_dict['DRIVE_MINUTES'][from_loc, to_loc] + stop_time
+                arc_bigm = min(bigm, max(0, latest_service[from_loc] + travel_time -
+                                         self.vertices_dict['TIME_WINDOW_START'][to_loc]))
+                sub_model += time_var[to_loc] - time_var[from_loc] >= \
+                             travel_time + arc_bigm * assignment_var[
+                                 from_loc, to_loc] - arc_bigm, "timewindow" + str(
+                    from_loc) + 'p' + str(to_loc)
+
+                if soft_time_windows and earliness_penalty and to_loc in self.customers_dict['DEMAND']:
+                    # the service starts at the arrival from from_loc unless it waits for the time window start
+                    arrival_bigm = max(0, latest_service[to_loc] - earliest_service[from_loc] - travel_time)
+                    sub_model += time_var[to_loc] <= time_var[from_loc] + travel_time + arrival_bigm * (
+                        window_start_var[to_loc] + 1 - assignment_var[from_loc, to_loc]), \
+                        "arrival" + str(from_loc) + 'p' + str(to_loc)
+                if soft_time_windows and earliness_penalty and to_loc in self.customers_dict['DEMAND'] and \
+                        from_loc != self.depot_leave:
+                    # waiting for the time window start after arriving from from_loc
+                    earliness_bigm = max(0, self.vertices_dict['TIME_WINDOW_START'][to_loc] -
+                                         self.vertices_dict['TIME_WINDOW_START'][from_loc] - travel_time)
+                    sub_model += earliness_var[to_loc] >= self.vertices_dict['TIME_WINDOW_START'][to_loc] - \
+                        time_var[from_loc] - travel_time - earliness_bigm * (1 - assignment_var[from_loc, to_loc]), \
+                        "earliness" + str(from_loc) + 'p' + str(to_loc)
+
+            # Time Windows
+            #print('time windows')
+            for vertex in self.time_variables_dict.keys():
+                time_var[vertex].bounds(float(earliest_service[vertex]),
+                                        float(latest_service[vertex]))
 
         if lp_file_name is not None:
-            sub_model.writeLP('{}.lp'.format(str(lp_file_name)))
-
-        if solver_type == 'PULP_CBC_CMD':
-            sub_model.solve(PULP_CBC_CMD(
-                msg=enable_solution_messaging,
-                maxSeconds=60 * solver_time_limit_minutes,
-                fracGap=mip_gap)
-            )
-
-        if pulp.LpStatus[sub_model.status] in ('Optimal', 'Undefined'):
+            with track_phase(instrumentation, 'sub_problem_write_lp'):
+                sub_model.writeLP('{}.lp'.format(str(lp_file_name)))
+
+        with track_phase(instrumentation, 'sub_problem_solve'):
+            if solver_type == 'PULP_CBC_CMD':
+                sub_model.solve(PULP_CBC_CMD(
+                    msg=enable_solution_messaging,
+                    maxSeconds=60 * solver_time_limit_minutes,
+                    fracGap=mip_gap)
+                )
+
+        if pulp.LpStatus[sub_model.status] not in ('Optimal', 'Undefined'):
+            print('Model Status = {}'.format(pulp.LpStatus[sub_model.status]))
+            raise Exception('No Solution Exists for the Sub problem')
 
+        with track_phase(instrumentation, 'sub_problem_extract'):
             print('Sub Model Status = {}'.format(pulp.LpStatus[sub_model.status]))
             print("Sub model optimized objective function= ", value(sub_model.objective))
 
@@ -242,7 +401,7 @@ class ColumnGenerationFormulation:
             #print('getting solution for time variables')
             solution_time = []
             for loc in time_var.keys():
-                if time_var[loc].value() > 0:
+                if time_var[loc].value() is not None:
                     demand = 0
                     stop_time = 0
                     if loc in self.customers_dict['DEMAND'].keys():
@@ -282,8 +441,4 @@ class ColumnGenerationFormulation:
             solution_path['PATH_NAME'] = path_name
             solution_path['OBJECTIVE'] = solution_objective
 
-            return solution_objective, solution_path, sub_model
-
-        else:
-            print('Model Status = {}'.format(pulp.LpStatus[sub_model.status]))
-            raise Exception('No Solution Exists for the Sub problem')
+        return solution_objective, solution_path, sub_model
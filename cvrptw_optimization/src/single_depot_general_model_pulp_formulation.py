@@ -3,8 +3,23 @@ Input data sets
 CVRPTW formulation
 '''
 from pulp import *
+import math
+import numpy as np
 import pandas as pd
 
+from cvrptw_optimization.src.model_cache import ModelExport
+
+
+def demand_coefficients(customers_dict, locations):
+    '''
+    Function to get the demand of every location as capacity constraint coefficients, built once for all vehicles
+    :param customers_dict:
+    :param locations: customer of every term of the constraint
+    :return: list of float coefficients
+    '''
+    demand = pd.Series(customers_dict['DEMAND'], dtype=float)
+    return demand.reindex(pd.Index(locations, dtype=object)).to_numpy(dtype=np.float64).tolist()
+
 
 class ModelFormulation:
 
@@ -26,49 +41,142 @@ class ModelFormulation:
         self.transit_starting_customers_dict = transit_starting_customers_dict
         self.depot_name = depot_name
 
+        # the capacity constraint of every vehicle has the same terms, arcs leaving a customer without demand have none
+        capacity_keys = list(transit_starting_customers_dict['DRIVE_MINUTES'].keys())
+        capacity_coefficients = demand_coefficients(customers_dict, [from_loc for from_loc, to_loc in capacity_keys])
+        self.capacity_keys = [key for key, coefficient in zip(capacity_keys, capacity_coefficients) if coefficient]
+        self.capacity_coefficients = [coefficient for coefficient in capacity_coefficients if coefficient]
+
         # model variables
         self.time_var = None
         self.assignment_var = None
+        self.vehicle_var = None
+        self.lateness_var = None
+        self.earliness_var = None
+        self.visit_var = None
         self.model = None
+        self.fleet_objective = None
+        self.fleet_size_objective = None
+        self.cost_objective = None
+        self.soft_time_windows = False
+        self.model_export = None
 
         # model results
         self.solution_objective = None
         self.solution_assignment = None
         self.solution_time = None
         self.solution_path = None
+        self.solution_number_of_vehicles = None
+        self.solution_time_window_violations = None
 
     def formulate_problem(self,
-                          bigm=100000000):
+                          bigm=100000000,
+                          optional_vehicles=False,
+                          fleet_objective='weighted',
+                          fleet_size_weight=0,
+                          valid_inequalities=True,
+                          soft_time_windows=False,
+                          lateness_penalty=1,
+                          earliness_penalty=0,
+                          capacity_formulation='arc'):
         '''
         Formulate problem
-        :param bigm:
+        :param bigm: upper limit of the time window big-M, every arc uses the smallest valid value below it
+        :param optional_vehicles: if True vehicles may stay at the depot and used vehicles pay VEHICLE_FIXED_COST,
+        otherwise every vehicle leaves the depot
+        :param fleet_objective: 'weighted' minimizes cost plus fleet_size_weight per used vehicle,
+        'hierarchical' minimizes the number of vehicles first and then the cost
+        :param fleet_size_weight: cost of every used vehicle on top of its fixed cost in the weighted objective
+        :param valid_inequalities: add the vehicle count lower bound, capacity cover, vehicle use, arc elimination
+        and symmetry breaking constraints for optional vehicles
+        :param soft_time_windows: customers may be served after their time window end, the depot time windows stay hard
+        :param lateness_penalty: cost per minute of lateness with soft time windows
+        :param earliness_penalty: cost per minute of waiting for a customer time window start with soft time windows
+        :param capacity_formulation: 'arc' sums the demand over the arcs leaving every customer in the capacity
+        constraint of a vehicle, 'node' adds the visit of every customer by every vehicle, the out-flow of the
+        customer, so the capacity and customer visit constraints have one term per customer
         :return:
         '''
+        if fleet_objective not in ('weighted', 'hierarchical'):
+            raise Exception('Unknown fleet objective {}'.format(fleet_objective))
+        if capacity_formulation not in ('arc', 'node'):
+            raise Exception('Unknown capacity formulation {}'.format(capacity_formulation))
+
         self.time_var = pulp.LpVariable.dicts("Time", self.time_variables_dict.keys(), 0, None, pulp.LpContinuous)
         self.assignment_var = pulp.LpVariable.dicts("Assign", self.assignment_variables_dict.keys(), 0, 1,
                                                     pulp.LpBinary)  # Binary
+        if optional_vehicles:
+            self.vehicle_var = pulp.LpVariable.dicts("Use", self.vehicles_dict['CAPACITY'].keys(), 0, 1,
+                                                     pulp.LpBinary)
+        else:
+            self.vehicle_var = None
+        self.fleet_objective = fleet_objective if optional_vehicles else 'weighted'
+        self.soft_time_windows = soft_time_windows
+
+        customer_vehicles = [(customer, vehicle) for customer in self.customers_dict['DEMAND'].keys()
+                             for vehicle in self.vehicles_dict['CAPACITY'].keys()]
+        if soft_time_windows:
+            self.lateness_var = pulp.LpVariable.dicts("Late", customer_vehicles, 0, None, pulp.LpContinuous)
+            self.earliness_var = pulp.LpVariable.dicts("Early", customer_vehicles, 0, None, pulp.LpContinuous) \
+                if earliness_penalty else None
+        else:
+            self.lateness_var = None
+            self.earliness_var = None
+        if capacity_formulation == 'node':
+            self.visit_var = pulp.LpVariable.dicts("Visit", customer_vehicles, 0, 1, pulp.LpContinuous)
+        else:
+            self.visit_var = None
 
         self.model = pulp.LpProblem("CVRPTW", pulp.LpMinimize)
 
         # objective function
         print('objective function')
-        self.model += pulp.lpSum(
+        self.cost_objective = pulp.lpSum(
             self.transit_dict['TRANSPORTATION_COST'][from_loc, to_loc] * self.assignment_var[from_loc, to_loc, vehicle]
             for
             from_loc, to_loc, vehicle in self.assignment_variables_dict.keys())
+        if soft_time_windows:
+            self.cost_objective += float(lateness_penalty) * pulp.lpSum(self.lateness_var.values())
+            if earliness_penalty:
+                self.cost_objective += float(earliness_penalty) * pulp.lpSum(self.earliness_var.values())
+        if optional_vehicles:
+            self.fleet_size_objective = pulp.lpSum(self.vehicle_var.values())
+            self.cost_objective += pulp.lpSum(float(self.vehicles_dict['VEHICLE_FIXED_COST'][vehicle]) *
+                                              self.vehicle_var[vehicle] for vehicle in self.vehicle_var.keys())
+            if self.fleet_objective == 'hierarchical':
+                self.model += self.fleet_size_objective
+            else:
+                self.model += self.cost_objective + float(fleet_size_weight) * self.fleet_size_objective
+        else:
+            self.model += self.cost_objective
 
         # Each vehicle can only be used at most once
         print('Each vehicle can only be used at most once')
-        for customer in self.customers_dict['DEMAND'].keys():
-            outgoing_arcs = []
+        if self.visit_var is None:
+            for customer in self.customers_dict['DEMAND'].keys():
+                outgoing_arcs = []
+                for from_loc, to_loc in self.transit_dict['DRIVE_MINUTES'].keys():
+                    if from_loc == customer:
+                        outgoing_arcs.append(to_loc)
+
+                self.model += pulp.lpSum(
+                    [self.assignment_var[customer, to_loc, vehicle] for to_loc in outgoing_arcs for vehicle in
+                     self.vehicles_dict['CAPACITY'].keys()]) == 1, "customerVisit" + str(
+                    customer) + 'k'
+        else:
+            outgoing_arcs = {customer: [] for customer in self.customers_dict['DEMAND'].keys()}
             for from_loc, to_loc in self.transit_dict['DRIVE_MINUTES'].keys():
-                if from_loc == customer:
-                    outgoing_arcs.append(to_loc)
+                if from_loc in outgoing_arcs:
+                    outgoing_arcs[from_loc].append(to_loc)
 
-            self.model += pulp.lpSum(
-                [self.assignment_var[customer, to_loc, vehicle] for to_loc in outgoing_arcs for vehicle in
-                 self.vehicles_dict['CAPACITY'].keys()]) == 1, "customerVisit" + str(
-                customer) + 'k'
+            for customer in self.customers_dict['DEMAND'].keys():
+                self.model += pulp.lpSum([self.visit_var[customer, vehicle] for vehicle in
+                                          self.vehicles_dict['CAPACITY'].keys()]) == 1, "customerVisit" + str(
+                    customer) + 'k'
+                for vehicle in self.vehicles_dict['CAPACITY'].keys():
+                    self.model += self.visit_var[customer, vehicle] == pulp.lpSum(
+                        [self.assignment_var[customer, to_loc, vehicle] for to_loc in outgoing_arcs[customer]]), \
+                        "visit" + str(customer) + 'k' + str(vehicle)
 
         # Each vehicle should leave from a depot
         print('Each vehicle should leave from a depot')
@@ -76,8 +184,8 @@ class ModelFormulation:
         for vehicle in self.vehicles_dict['CAPACITY'].keys():
             self.model += pulp.lpSum([self.assignment_var[depot_leave, customer, vehicle]
                                       for customer in
-                                      self.customers_dict['DEMAND'].keys()]) == 1, "entryDepotConnection" + str(
-                vehicle)
+                                      self.customers_dict['DEMAND'].keys()]) == self._vehicle_use(
+                vehicle), "entryDepotConnection" + str(vehicle)
 
         # Flow in Flow Out
         print('Flow in Flow out')
@@ -103,17 +211,42 @@ class ModelFormulation:
         for vehicle in self.vehicles_dict['CAPACITY'].keys():
             self.model += pulp.lpSum([self.assignment_var[customer, depot_enter, vehicle]
                                       for customer in
-                                      self.customers_dict['DEMAND'].keys()]) == 1, "exitDepotConnection" + str(
-                vehicle)
+                                      self.customers_dict['DEMAND'].keys()]) == self._vehicle_use(
+                vehicle), "exitDepotConnection" + str(vehicle)
 
         # vehicle Capacity
         print('vehicle Capacity')
+        if self.visit_var is None:
+            capacity_keys = self.capacity_keys
+            capacity_coefficients = self.capacity_coefficients
+        else:
+            capacity_keys = list(self.customers_dict['DEMAND'].keys())
+            capacity_coefficients = demand_coefficients(self.customers_dict, capacity_keys)
         for vehicle in self.vehicles_dict['CAPACITY'].keys():
-            self.model += pulp.lpSum(
-                [float(self.customers_dict['DEMAND'][from_loc]) * self.assignment_var[from_loc, to_loc, vehicle]
-                 for from_loc, to_loc in
-                 self.transit_starting_customers_dict['DRIVE_MINUTES'].keys()]) <= float(
-                self.vehicles_dict['CAPACITY'][vehicle]), "Capacity" + str(vehicle)
+            if self.visit_var is None:
+                capacity_var = (self.assignment_var[from_loc, to_loc, vehicle] for from_loc, to_loc in capacity_keys)
+            else:
+                capacity_var = (self.visit_var[customer, vehicle] for customer in capacity_keys)
+            self.model += pulp.LpAffineExpression(zip(capacity_var, capacity_coefficients)) <= float(
+                self.vehicles_dict['CAPACITY'][vehicle]) * self._vehicle_use(vehicle), "Capacity" + str(vehicle)
+
+        if optional_vehicles and valid_inequalities:
+            self._add_valid_inequalities()
+
+        # with soft time windows a customer is served at the latest when the depot closes
+        latest_service = self._latest_service()
+
+        if soft_time_windows and earliness_penalty:
+            # the waiting is measured on the earliest schedule as by the RouteEvaluator, a vehicle leaves the depot
+            # at its time window start and every service starts at the arrival or at the time window start,
+            # whichever is later. The waiting for the first customer is saved by leaving later
+            print('earliest service')
+            window_start_var = pulp.LpVariable.dicts("WindowStart", customer_vehicles, 0, 1, pulp.LpBinary)
+            latest_service[depot_leave] = self.vertices_dict['TIME_WINDOW_START'][depot_leave]
+            for customer, vehicle in customer_vehicles:
+                self.model += self.time_var[customer, vehicle] <= self.vertices_dict['TIME_WINDOW_START'][customer] + \
+                    (latest_service[customer] - self.vertices_dict['TIME_WINDOW_START'][customer]) * \
+                    (1 - window_start_var[customer, vehicle]), "serviceStart" + str(customer) + 'k' + str(vehicle)
 
         # Time intervals
         print('time intervals')
@@ -121,51 +254,234 @@ class ModelFormulation:
             stop_time = 0
             if from_loc != depot_leave:
                 stop_time = self.customers_dict['STOP_TIME'][from_loc]
+            travel_time = self.transit_dict['DRIVE_MINUTES'][from_loc, to_loc] + stop_time
+            arc_bigm = min(bigm, max(0, latest_service[from_loc] + travel_time -
+                                     self.vertices_dict['TIME_WINDOW_START'][to_loc]))
             self.model += self.time_var[to_loc, vehicle] - self.time_var[from_loc, vehicle] >= \
-                          self.transit_dict['DRIVE_MINUTES'][
-                              from_loc, to_loc] + stop_time + bigm * self.assignment_var[
-                              from_loc, to_loc, vehicle] - bigm, "timewindow" + str(vehicle) + 'p' + str(
+                          travel_time + arc_bigm * self.assignment_var[
+                              from_loc, to_loc, vehicle] - arc_bigm, "timewindow" + str(vehicle) + 'p' + str(
                 from_loc) + 'p' + str(to_loc)
 
+            if soft_time_windows and earliness_penalty and to_loc in self.customers_dict['DEMAND']:
+                # the service starts at the arrival from from_loc unless it waits for the time window start
+                arrival_bigm = max(0, latest_service[to_loc] - self.vertices_dict['TIME_WINDOW_START'][from_loc] -
+                                   travel_time)
+                self.model += self.time_var[to_loc, vehicle] <= self.time_var[from_loc, vehicle] + travel_time + \
+                    arrival_bigm * (window_start_var[to_loc, vehicle] + 1 -
+                                    self.assignment_var[from_loc, to_loc, vehicle]), "arrival" + str(
+                    vehicle) + 'p' + str(from_loc) + 'p' + str(to_loc)
+            if soft_time_windows and earliness_penalty and to_loc in self.customers_dict['DEMAND'] and \
+                    from_loc != depot_leave:
+                # waiting for the time window start after arriving from from_loc
+                earliness_bigm = max(0, self.vertices_dict['TIME_WINDOW_START'][to_loc] -
+                                     self.vertices_dict['TIME_WINDOW_START'][from_loc] - travel_time)
+                self.model += self.earliness_var[to_loc, vehicle] >= \
+                    self.vertices_dict['TIME_WINDOW_START'][to_loc] - self.time_var[from_loc, vehicle] - travel_time - \
+                    earliness_bigm * (1 - self.assignment_var[from_loc, to_loc, vehicle]), "earliness" + str(
+                    vehicle) + 'p' + str(from_loc) + 'p' + str(to_loc)
+
         # Time Windows
         print('time windows')
         for vertex, vehicle in self.time_variables_dict.keys():
             self.time_var[vertex, vehicle].bounds(float(self.vertices_dict['TIME_WINDOW_START'][vertex]),
-                                                  float(self.vertices_dict['TIME_WINDOW_END'][vertex]))
+                                                  float(latest_service[vertex]))
+
+        if soft_time_windows:
+            print('time window lateness')
+            for customer, vehicle in customer_vehicles:
+                self.model += self.lateness_var[customer, vehicle] >= self.time_var[customer, vehicle] - \
+                    float(self.vertices_dict['TIME_WINDOW_END'][customer]), "lateness" + str(customer) + 'k' + str(
+                    vehicle)
+
+    def _latest_service(self):
+        '''
+        Latest service start of every vertex, the time window end or with soft time windows the depot closing time
+        :return:
+        '''
+        latest_service = dict(self.vertices_dict['TIME_WINDOW_END'])
+        if self.soft_time_windows:
+            depot_closing = self.vertices_dict['TIME_WINDOW_END'][self.depot_name + '_ENTER']
+            for customer in self.customers_dict['DEMAND'].keys():
+                latest_service[customer] = max(latest_service[customer], depot_closing)
+        return latest_service
+
+    def _vehicle_use(self, vehicle):
+        if self.vehicle_var is None:
+            return 1
+        return self.vehicle_var[vehicle]
+
+    def _add_valid_inequalities(self):
+        '''
+        Valid inequalities for optional vehicles
+        :return:
+        '''
+        total_demand = float(sum(self.customers_dict['DEMAND'].values()))
+        capacities = self.vehicles_dict['CAPACITY']
+
+        # number of vehicles is at least the total demand over the largest capacity
+        print('Vehicle count lower bound')
+        self.model += pulp.lpSum(self.vehicle_var.values()) >= math.ceil(
+            total_demand / float(max(capacities.values())) - 0.000001), "vehicleCountLowerBound"
+
+        # used vehicles cover the total demand
+        print('Capacity cover')
+        self.model += pulp.lpSum(float(capacities[vehicle]) * self.vehicle_var[vehicle]
+                                 for vehicle in self.vehicle_var.keys()) >= total_demand, "capacityCover"
+
+        # a customer is only served by a used vehicle
+        print('Vehicle use')
+        for customer in self.customers_dict['DEMAND'].keys():
+            outgoing_arcs = [to_loc for from_loc, to_loc in self.transit_dict['DRIVE_MINUTES'].keys()
+                             if from_loc == customer]
+            for vehicle in self.vehicle_var.keys():
+                self.model += pulp.lpSum([self.assignment_var[customer, to_loc, vehicle] for to_loc in outgoing_arcs]) \
+                    <= self.vehicle_var[vehicle], "vehicleUse" + str(customer) + 'k' + str(vehicle)
+
+        # arcs that break a time window or the capacity of the vehicle
+        print('Arc elimination')
+        latest_service = self._latest_service()
+        for from_loc, to_loc, vehicle in self.assignment_variables_dict.keys():
+            if from_loc not in self.customers_dict['DEMAND'] or to_loc not in self.customers_dict['DEMAND']:
+                continue
+            earliest_arrival = self.vertices_dict['TIME_WINDOW_START'][from_loc] + \
+                self.customers_dict['STOP_TIME'][from_loc] + self.transit_dict['DRIVE_MINUTES'][from_loc, to_loc]
+            load = self.customers_dict['DEMAND'][from_loc] + self.customers_dict['DEMAND'][to_loc]
+            if earliest_arrival > latest_service[to_loc] or load > capacities[vehicle]:
+                self.assignment_var[from_loc, to_loc, vehicle].upBound = 0
+
+        # identical vehicles are used in order
+        print('Symmetry breaking')
+        vehicle_classes = {}
+        for vehicle in self.vehicle_var.keys():
+            vehicle_class = (capacities[vehicle], self.vehicles_dict['VEHICLE_FIXED_COST'][vehicle])
+            vehicle_classes.setdefault(vehicle_class, []).append(vehicle)
+        for vehicles in vehicle_classes.values():
+            for vehicle, next_vehicle in zip(vehicles[:-1], vehicles[1:]):
+                self.model += self.vehicle_var[vehicle] >= self.vehicle_var[next_vehicle], "symmetry" + str(
+                    next_vehicle)
+
+    def _variable_groups(self):
+        return {'time_var': self.time_var,
+                'assignment_var': self.assignment_var,
+                'vehicle_var': self.vehicle_var,
+                'lateness_var': self.lateness_var,
+                'earliness_var': self.earliness_var,
+                'visit_var': self.visit_var}
+
+    def export_model(self, directory, parameters=None):
+        '''
+        Write the formulated model as compressed MPS with the index of its variables, the model is solved from the
+        file afterwards
+        :param directory: new directory of the model files
+        :param parameters: formulation parameters stored with the index
+        :return:
+        '''
+        if self.fleet_objective == 'hierarchical':
+            raise Exception('Models with the hierarchical fleet objective can not be exported')
+        self.model_export = ModelExport.write(self.model, self._variable_groups(), directory, parameters)
+
+    def load_model(self, directory):
+        '''
+        Load an exported model instead of formulating the problem, only its variables are created
+        :param directory:
+        :return:
+        '''
+        self.model_export = ModelExport(directory)
+        variables = self.model_export.variables()
+        self.time_var = variables['time_var']
+        self.assignment_var = variables['assignment_var']
+        self.vehicle_var = variables.get('vehicle_var')
+        self.lateness_var = variables.get('lateness_var')
+        self.earliness_var = variables.get('earliness_var')
+        self.visit_var = variables.get('visit_var')
+        self.soft_time_windows = self.lateness_var is not None
+        self.fleet_objective = 'weighted'
+        self.model = pulp.LpProblem("CVRPTW", pulp.LpMinimize)
+
+    def _objective_value(self):
+        if self.model_export is not None:
+            return self.model_export.objective
+        return value(self.model.objective)
 
     def solve_model(self,
                     mip_gap=0.001,
                     solver_time_limit_minutes=10,
                     enable_solution_messaging=1,
-                    solver_type='PULP_CBC_CMD'):
+                    solver_type='PULP_CBC_CMD',
+                    time_budget=None):
         '''
         Solve model
         :param mip_gap:
         :param solver_time_limit_minutes:
         :param enable_solution_messaging:
         :param solver_type:
+        :param time_budget: TimeBudget of the run, the hierarchical objective gives half of the budget left to
+        each stage
         :return:
         '''
+        hierarchical = self.fleet_objective == 'hierarchical'
+        time_limit_minutes = solver_time_limit_minutes
+        if time_budget is not None:
+            time_limit_minutes = time_budget.solve_minutes(
+                solver_time_limit_minutes, time_budget.remaining_seconds() / 2 if hierarchical else 0)
 
         print('solving model')
-        if solver_type == 'PULP_CBC_CMD':
+        if self.model_export is not None:
+            status, solution_status = self.model_export.solve(self._variable_groups(),
+                                                              mip_gap,
+                                                              time_limit_minutes,
+                                                              enable_solution_messaging)
+            self.model.assignStatus(status, solution_status)
+        elif solver_type == 'PULP_CBC_CMD':
             self.model.solve(PULP_CBC_CMD(
                 msg=enable_solution_messaging,
-                maxSeconds=60 * solver_time_limit_minutes,
+                maxSeconds=60 * time_limit_minutes,
                 fracGap=mip_gap)
             )
 
-    def get_model_solution(self):
+        if hierarchical and self.model.status == 1:
+            number_of_vehicles = int(round(value(self.fleet_size_objective)))
+            print('Minimum number of vehicles = {}, minimizing cost'.format(number_of_vehicles))
+            # the first stage solution is kept if the second stage finds none in time
+            first_stage_values = {variable.name: variable.varValue for variable in self.model.variables()}
+            self.model += self.fleet_size_objective <= number_of_vehicles, "fleetSize"
+            self.model.setObjective(self.cost_objective)
+            if time_budget is not None:
+                time_limit_minutes = time_budget.solve_minutes(solver_time_limit_minutes)
+            if solver_type == 'PULP_CBC_CMD':
+                self.model.solve(PULP_CBC_CMD(
+                    msg=enable_solution_messaging,
+                    maxSeconds=60 * time_limit_minutes,
+                    fracGap=mip_gap)
+                )
+            if self.model.status != 1:
+                print('No solution of the second stage, keeping the minimum number of vehicles solution')
+                for variable in self.model.variables():
+                    variable.varValue = first_stage_values.get(variable.name)
+                self.model.assignStatus(1, LpSolutionIntegerFeasible)
+
+        if self.model.status == 1:
+            print('Solution status = {}'.format(LpSolution[self.model.sol_status]))
+
+    def get_model_solution(self, time_budget=None):
         '''
         Get model results
+        :param time_budget: TimeBudget of the run, if the budget ran out without a solution the objective is None
+        and the solution empty instead of raising
         :return:
         '''
+        if self.model.status != 1 and time_budget is not None and time_budget.exhausted():
+            print('No solution found within the time budget')
+            self.solution_objective = None
+            self.solution_path = pd.DataFrame()
+            self.solution_number_of_vehicles = 0
+            return
+
         if self.model.status == 1:
 
             print('problem is feasible')
-            print("The optimised objective function= ", value(self.model.objective))
-
-            self.solution_objective = value(self.model.objective)
+            self.solution_objective = self._objective_value()
+            print("The optimised objective function= ", self.solution_objective)
 
             # get assignment variable values
             print('getting solution for assignment variables')
@@ -204,6 +520,11 @@ class ModelFormulation:
                                           'TIME_WINDOW_END': self.vertices_dict['TIME_WINDOW_END'][loc],
                                           'VEHICLE_CAPACITY': self.vehicles_dict['CAPACITY'][vehicle]
                                           })
+                    if self.soft_time_windows:
+                        customer = loc in self.customers_dict['DEMAND'].keys()
+                        solution_time[-1]['LATENESS'] = self.lateness_var[loc, vehicle].value() if customer else 0
+                        solution_time[-1]['EARLINESS'] = self.earliness_var[loc, vehicle].value() \
+                            if customer and self.earliness_var is not None else 0
 
             self.solution_time = pd.DataFrame(solution_time)
 
@@ -228,6 +549,15 @@ class ModelFormulation:
                 times.drop(['VALUE'], 1, inplace=True)
                 solution_path.append(times)
             self.solution_path = pd.concat(solution_path)
+            self.solution_number_of_vehicles = len(vehicles_list)
+
+            if self.soft_time_windows:
+                # solver tolerance
+                self.solution_path[['LATENESS', 'EARLINESS']] = self.solution_path[['LATENESS', 'EARLINESS']].round(6)
+                self.solution_time_window_violations = self.solution_path[
+                    (self.solution_path['LATENESS'] > 0) | (self.solution_path['EARLINESS'] > 0)]
+                print('Time window violations: ', self.solution_time_window_violations[
+                    ['VEHICLE', 'LOCATION_NAME', 'LATENESS', 'EARLINESS']].to_dict('records'))
 
         else:
             raise Exception('No Solution Exists')
@@ -5,6 +5,8 @@ CVRPTW formulation
 import numpy as np
 from itertools import product
 
+from cvrptw_optimization.src import feasibility_tables as feasibility
+
 
 class ModelInputs:
 
@@ -33,6 +35,7 @@ class ModelInputs:
 
         self.time_variables_dict = None
         self.assignment_variables_dict = None
+        self.feasibility_tables = None
 
         self.update_depot_names()
         self.create_vertices()
@@ -146,3 +149,12 @@ class ModelInputs:
         self.time_variables_dict = {}
         for tup in product(self.vertices['LOCATION_NAME'], self.vehicles_dict['CAPACITY'].keys()):
             self.time_variables_dict[tup[0], tup[1]] = 0
+
+    def create_feasibility_tables(self, capacity=None):
+        '''
+        Create feasibility tables, they are only built on request
+        :param capacity: vehicle capacity of the customer pair compatibility, defaults to the largest capacity
+        :return:
+        '''
+        self.feasibility_tables = feasibility.create_feasibility_tables(self, capacity)
+        return self.feasibility_tables
@@ -0,0 +1,51 @@
+'''
+Time budget
+Global wall clock budget of a solver run shared by all its master, pricing and MIP solves
+'''
+import time
+
+
+class TimeBudget:
+    '''
+    Wall clock budget started at creation. Every solve gets the smaller of its own time limit and the budget left
+    after the time reserved for the later phases, a solve gets at least min_solve_seconds so the solver can
+    return a solution.
+    '''
+
+    def __init__(self, minutes, min_solve_seconds=1):
+        self.seconds = 60.0 * minutes
+        self.min_solve_seconds = min_solve_seconds
+        self.start = time.perf_counter()
+
+    def elapsed_seconds(self):
+        return time.perf_counter() - self.start
+
+    def remaining_seconds(self, reserve_seconds=0):
+        '''
+        Budget left after the reserved time
+        :param reserve_seconds: time kept for later phases
+        :return:
+        '''
+        return max(0.0, self.seconds - self.elapsed_seconds() - reserve_seconds)
+
+    def exhausted(self, reserve_seconds=0):
+        return self.remaining_seconds(reserve_seconds) <= 0
+
+    def allows(self, expected_seconds, reserve_seconds=0):
+        '''
+        Whether a phase expected to take expected_seconds ends within the budget left after the reserved time
+        :param expected_seconds:
+        :param reserve_seconds:
+        :return:
+        '''
+        return self.remaining_seconds(reserve_seconds) >= expected_seconds
+
+    def solve_minutes(self, limit_minutes, reserve_seconds=0):
+        '''
+        Time limit of the next solve
+        :param limit_minutes: time limit of the solve without a budget
+        :param reserve_seconds: time kept for later phases
+        :return: minutes
+        '''
+        seconds = max(self.min_solve_seconds, self.remaining_seconds(reserve_seconds))
+        return min(limit_minutes, seconds / 60.0)
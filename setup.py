@@ -39,6 +39,9 @@ setup(
     ],
     packages=["cvrptw_optimization", "cvrptw_optimization/data", "cvrptw_optimization/src"],
     include_package_data=True,
+    entry_points={
+        "console_scripts": ["cvrptw-optimization=cvrptw_optimization.cli:main"],
+    },
     install_requires=["setuptools", "Pathlib", "numpy", "pulp",
                       "pandas"] + reqs,
 )
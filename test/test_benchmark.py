@@ -0,0 +1,65 @@
+'''
+Test class for testing the benchmark suite
+'''
+
+import os
+import sys
+import tempfile
+import unittest
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from cvrptw_optimization.data import data as dat
+
+
+class BenchmarkTest(unittest.TestCase):
+
+    def test_benchmark_against_baseline(self):
+        '''
+        Benchmark results are compared against the shipped baseline
+        :return:
+        '''
+        from cvrptw_optimization import benchmark
+
+        instances = benchmark.load_bundled_instances(['unit_test'])
+        results = benchmark.run_benchmark(instances, modes=['column_generation'])
+        self.assertEqual(results['STATUS'].tolist(), ['OK'])
+        self.assertTrue(results['ITERATIONS'].iloc[0] > 0)
+        self.assertTrue(results['LOWER_BOUND'].notnull().all())
+
+        # runtimes depend on the machine, the objective, gap and status do not
+        comparison = benchmark.compare_with_baseline(results)
+        self.assertEqual(len(comparison), 1)
+        self.assertTrue((comparison['OBJECTIVE_CHANGE'].abs() <= 0.0001).all())
+        self.assertTrue(((comparison['GAP'] - comparison['GAP_BASELINE'].astype(float)).abs() <= 0.0001).all())
+        self.assertFalse(comparison['OBJECTIVE_REGRESSION'].any())
+        self.assertFalse(comparison['STATUS_REGRESSION'].any())
+
+        with tempfile.TemporaryDirectory() as directory:
+            baseline_file = os.path.join(directory, 'baseline.json')
+            benchmark.save_baseline(results, baseline_file)
+            comparison = benchmark.compare_with_baseline(results, baseline_file)
+        self.assertFalse(comparison['REGRESSION'].any())
+
+    def test_unconverged_lower_bound(self):
+        '''
+        Column generation stopped by max_iteration proves no lower bound
+        :return:
+        '''
+        from cvrptw_optimization import single_depot_column_generation_pulp as cg
+        from cvrptw_optimization.src import lower_bounds as lb
+
+        solution, solution_statistics = cg.run_single_depot_column_generation(dat.depots_unit_test,
+                                                                              dat.customers_unit_test,
+                                                                              dat.transportation_matrix_unit_test,
+                                                                              dat.vehicles_unit_test,
+                                                                              enable_solution_messaging=0,
+                                                                              max_iteration=1)
+        self.assertIsNone(lb.column_generation_lower_bound(solution_statistics))
+        self.assertIsNone(lb.column_generation_lower_bound([]))
+
+        # a converged run whose last sub-problem was stopped by the solver time limit proves no bound either
+        statistics = {'MASTER_PROBLEM_OBJECTIVE': 100.0, 'SUB_PROBLEM_OBJECTIVE': 0.0, 'SKIPPED_VEHICLE_TYPES': 0}
+        self.assertEqual(lb.column_generation_lower_bound([dict(statistics, EXACT_PRICING=True)]), 100.0)
+        self.assertIsNone(lb.column_generation_lower_bound([dict(statistics, EXACT_PRICING=False)]))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+'''
+Test class for testing the command line interface
+'''
+
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+import pandas as pd
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from cvrptw_optimization.data import data as dat
+
+
+class CommandLineTest(unittest.TestCase):
+
+    def test_batch_run(self):
+        '''
+        A directory with a Solomon file, a csv instance and a broken instance is solved in parallel
+        :return:
+        '''
+        from cvrptw_optimization import cli
+
+        with tempfile.TemporaryDirectory() as directory:
+            instance_dir = os.path.join(directory, 'instances')
+            os.makedirs(os.path.join(instance_dir, 'unit_test'))
+            os.makedirs(os.path.join(instance_dir, 'broken'))
+            shutil.copy(dat.solomon_unit_test_file, os.path.join(instance_dir, 'solomon.txt'))
+            tables = [dat.depots_unit_test, dat.customers_unit_test, dat.transportation_matrix_unit_test,
+                      dat.vehicles_unit_test]
+            for table, data_frame in zip(cli.INSTANCE_TABLES, tables):
+                data_frame.to_csv(os.path.join(instance_dir, 'unit_test', table + '.csv'), index=False)
+                data_frame.head(0).to_csv(os.path.join(instance_dir, 'broken', table + '.csv'), index=False)
+
+            self.assertEqual([name for name, path in cli.find_instances([instance_dir])],
+                             ['broken', 'solomon', 'unit_test'])
+
+            output_dir = os.path.join(directory, 'results')
+            exit_code = cli.main([instance_dir, '--output-dir', output_dir, '--workers', '2', '--time-budget', '1',
+                                 '--solver', 'column_generation_ng_route'])
+            self.assertEqual(exit_code, 1)
+
+            with open(os.path.join(output_dir, 'summary.json')) as summary_file:
+                summary = json.load(summary_file)
+            results = {statistics['INSTANCE']: statistics for statistics in summary['RESULTS']}
+            self.assertEqual(summary['FAILED_INSTANCES'], 1)
+            self.assertEqual(results['broken']['STATUS'], 'FAILED')
+            self.assertEqual(results['solomon']['STATUS'], 'OK')
+            self.assertAlmostEqual(results['unit_test']['LOWER_BOUND'], 225.8702563, places=4)
+
+            routes = pd.read_csv(results['unit_test']['ROUTES_FILE'])
+            self.assertEqual(sorted(routes['LOCATION_NAME'][routes['DEMAND'] > 0]),
+                             sorted(dat.customers_unit_test['LOCATION_NAME']))
+
+            # solved instances are skipped on a rerun
+            results = cli.run_batch(cli.find_instances([instance_dir]), output_dir, solver='general_model',
+                                    skip_existing=True, number_of_vehicles=2)
+            self.assertEqual([statistics['INSTANCE'] for statistics in results], ['broken'])
+
+
+if __name__ == '__main__':
+    unittest.main()
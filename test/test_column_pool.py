@@ -0,0 +1,66 @@
+'''
+Test class for testing the column pool
+'''
+
+import os
+import sys
+import unittest
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from cvrptw_optimization.data import data as dat
+
+
+class ColumnPoolTest(unittest.TestCase):
+
+    def test_deduplication_and_aging(self):
+        '''
+        Duplicate columns are rejected and unused columns retire
+        :return:
+        '''
+        from cvrptw_optimization.src.column_pool import ColumnPool
+
+        pool = ColumnPool(['A', 'B', 'C'], max_age=1, max_active_columns=4)
+        for customer in ['A', 'B', 'C']:
+            pool.add(['D_LEAVE', customer, 'D_ENTER'], 10, protected=True)
+
+        path_name, changed = pool.add(['D_LEAVE', 'A', 'B', 'D_ENTER'], 15)
+        self.assertTrue(changed)
+        self.assertEqual(pool.add(['D_LEAVE', 'B', 'A', 'D_ENTER'], 16), (path_name, False))
+        self.assertEqual(pool.add(['D_LEAVE', 'B', 'A', 'D_ENTER'], 12), (path_name, True))
+        self.assertEqual(pool.paths[path_name], ['D_LEAVE', 'B', 'A', 'D_ENTER'])
+        self.assertEqual(pool.number_of_duplicates, 2)
+        self.assertEqual(pool.paths_customers_dict()[path_name, 'C'], 0)
+
+        # reduced cost 12 - 5 - 5 > 0 for two iterations
+        price = {'A': 5, 'B': 5, 'C': 10}
+        self.assertEqual(pool.update(price), [])
+        self.assertEqual(pool.update(price), [path_name])
+        self.assertEqual(len(pool), 3)
+
+        # size limit retires the most expensive unprotected column not used by the master
+        pool.add(['D_LEAVE', 'A', 'C', 'D_ENTER'], 15)
+        pool.add(['D_LEAVE', 'B', 'C', 'D_ENTER'], 30)
+        retired = pool.update({'A': 10, 'B': 10, 'C': 10})
+        self.assertEqual(retired, ['PATH 5'])
+
+    def test_column_generation_with_pool_limits(self):
+        '''
+        Column generation solves with a capped pool
+        :return:
+        '''
+        from cvrptw_optimization import single_depot_column_generation_pulp as cg
+
+        solution, solution_statistics = cg.run_single_depot_column_generation(dat.depots_unit_test,
+                                                                              dat.customers_unit_test,
+                                                                              dat.transportation_matrix_unit_test,
+                                                                              dat.vehicles_unit_test,
+                                                                              capacity=100,
+                                                                              max_iteration=10,
+                                                                              column_max_age=1,
+                                                                              max_active_columns=7)
+        self.assertTrue(all(statistics['NUMBER_OF_ACTIVE_PATHS'] <= 7 for statistics in solution_statistics))
+        self.assertEqual(sorted(solution['LOCATION_NAME'][solution['LOCATION_NAME'].str.startswith('STORE')]),
+                         sorted(dat.customers_unit_test['LOCATION_NAME']))
+
+
+if __name__ == '__main__':
+    unittest.main()
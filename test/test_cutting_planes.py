@@ -0,0 +1,131 @@
+'''
+Test class for testing cutting planes in column generation
+'''
+
+import os
+import sys
+import unittest
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from cvrptw_optimization.data import data as dat
+
+
+class CuttingPlanesTest(unittest.TestCase):
+
+    def test_cut_coefficients(self):
+        '''
+        Capacity cuts count entries into the customer set, subset row cuts every second visit within their memory
+        :return:
+        '''
+        from cvrptw_optimization.src.cutting_planes import CapacityCut, SubsetRowCut
+
+        path = ['D_LEAVE', 'A', 'B', 'E', 'C', 'D_ENTER']
+        self.assertEqual(CapacityCut(['A', 'B'], 1).coefficient(path), 1)
+        self.assertEqual(CapacityCut(['A', 'C'], 1).coefficient(path), 2)
+
+        self.assertEqual(SubsetRowCut(['A', 'B', 'C']).coefficient(path), 1)
+        self.assertEqual(SubsetRowCut(['A', 'C', 'F']).coefficient(path), 1)
+        # E is not in the memory, the visit to A is forgotten
+        self.assertEqual(SubsetRowCut(['A', 'C', 'F'], memory=['B']).coefficient(path), 0)
+        self.assertEqual(SubsetRowCut(['A', 'C', 'F'], memory=['B', 'E']).coefficient(path), 1)
+
+    def test_labeling_with_cuts_matches_sub_problem(self):
+        '''
+        Ng-route labeling with full neighbourhoods and the sub-problem formulation price the same cut duals
+        :return:
+        '''
+        from cvrptw_optimization import single_depot_column_generation_pulp as cg
+        from cvrptw_optimization.src.route_evaluation import RouteEvaluator
+        from cvrptw_optimization.src.ng_route_pricing import NgRoutePricing
+        from cvrptw_optimization.src.cutting_planes import CapacityCut, SubsetRowCut
+
+        model_inputs, model_formulation = cg.initiate_single_depot_column_generation(dat.depots0,
+                                                                                     dat.customers0,
+                                                                                     dat.transportation_matrix0,
+                                                                                     dat.vehicles0)
+        route_evaluator = RouteEvaluator.from_model_inputs(model_inputs)
+        customer_names = route_evaluator.customer_names
+        price = {customer: 80.0 + 5 * idx for idx, customer in enumerate(customer_names)}
+
+        cuts = [CapacityCut(customer_names[:3], 2), SubsetRowCut(['STORE 3', 'STORE 8', 'STORE 9']),
+                SubsetRowCut(['STORE 2', 'STORE 5', 'STORE 8']),
+                SubsetRowCut(['STORE 1', 'STORE 4', 'STORE 6'], memory=['STORE 7'])]
+        for idx, cut in enumerate(cuts):
+            cut.name = 'Cut' + str(idx)
+        model_formulation.cut_price = {'Cut0': 30.0, 'Cut1': -60.0, 'Cut2': -45.0, 'Cut3': -70.0}
+
+        objective, solution_path, sub_model = model_formulation.formulate_and_solve_subproblem(
+            price, 60, 'PATH', enable_solution_messaging=0, cuts=cuts)
+
+        pricing = NgRoutePricing(route_evaluator, neighbourhood_size=len(customer_names))
+        columns, truncated = pricing.solve(price, 60, max_columns=5, cuts=cuts,
+                                           cut_price=model_formulation.cut_price)
+        self.assertFalse(truncated)
+        self.assertAlmostEqual(columns[0][0], objective, places=4)
+
+        # the reduced costs of the columns include the cut duals
+        for reduced_cost, path in columns:
+            path_reduced_cost = route_evaluator.path_costs({'PATH': path})['PATH'] - \
+                sum(price.get(location, 0) for location in path) - \
+                sum(model_formulation.cut_price[cut.name] * cut.coefficient(path) for cut in cuts)
+            self.assertAlmostEqual(reduced_cost, path_reduced_cost, places=4)
+
+    def test_limited_memory_sub_problem(self):
+        '''
+        The sub-problem formulation forgets a visit to the cut customers when the route leaves the cut memory
+        :return:
+        '''
+        from cvrptw_optimization import single_depot_column_generation_pulp as cg
+        from cvrptw_optimization.src.route_evaluation import RouteEvaluator
+        from cvrptw_optimization.src.ng_route_pricing import NgRoutePricing
+        from cvrptw_optimization.src.cutting_planes import SubsetRowCut
+
+        model_inputs, model_formulation = cg.initiate_single_depot_column_generation(dat.depots0,
+                                                                                     dat.customers0,
+                                                                                     dat.transportation_matrix0,
+                                                                                     dat.vehicles0)
+        route_evaluator = RouteEvaluator.from_model_inputs(model_inputs)
+        customer_names = route_evaluator.customer_names
+        price = {customer: 80.0 + 5 * idx for idx, customer in enumerate(customer_names)}
+        objective, solution_path, sub_model = model_formulation.formulate_and_solve_subproblem(
+            price, 60, 'PATH', enable_solution_messaging=0)
+        path = solution_path['LOCATION_NAME'].tolist()
+        self.assertTrue(len(path) > 4)
+
+        # the first cut skips the second customer of the path, which is not in its memory
+        other = [customer for customer in customer_names if customer not in path][0]
+        cuts = [SubsetRowCut([path[1], path[3], other], memory=[]), SubsetRowCut([path[1], path[2], other], memory=[])]
+        for idx, cut in enumerate(cuts):
+            cut.name = 'Cut' + str(idx)
+        self.assertEqual([cut.coefficient(path) for cut in cuts], [0, 1])
+        model_formulation.cut_price = {'Cut0': -50.0, 'Cut1': -40.0}
+
+        objective, solution_path, sub_model = model_formulation.formulate_and_solve_subproblem(
+            price, 60, 'PATH', enable_solution_messaging=0, cuts=cuts)
+        pricing = NgRoutePricing(route_evaluator, neighbourhood_size=len(customer_names))
+        columns, truncated = pricing.solve(price, 60, max_columns=1, cuts=cuts, cut_price=model_formulation.cut_price)
+        self.assertAlmostEqual(columns[0][0], objective, places=4)
+
+    def test_column_generation_with_cutting_planes(self):
+        '''
+        Cuts raise the lower bound of the master problem up to the binary master objective
+        :return:
+        '''
+        from cvrptw_optimization import single_depot_column_generation_pulp as cg
+
+        for pricing in ['mip', 'ng_route']:
+            solution, solution_statistics = cg.run_single_depot_column_generation(dat.depots_unit_test,
+                                                                                  dat.customers_unit_test,
+                                                                                  dat.transportation_matrix_unit_test,
+                                                                                  dat.vehicles_unit_test,
+                                                                                  capacity=30,
+                                                                                  enable_solution_messaging=0,
+                                                                                  pricing=pricing,
+                                                                                  cutting_planes=True)
+            self.assertTrue(solution_statistics[-1]['CUTS'] > 0)
+            self.assertTrue(solution_statistics[-1]['BOUND_IMPROVEMENT'] > 0)
+            self.assertAlmostEqual(solution_statistics[-1]['MASTER_PROBLEM_OBJECTIVE'],
+                                   solution['TRANSPORTATION_COST'].sum(), places=4)
+
+
+if __name__ == '__main__':
+    unittest.main()
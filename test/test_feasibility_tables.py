@@ -0,0 +1,67 @@
+'''
+Test class for testing the feasibility tables
+'''
+
+import os
+import sys
+import unittest
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from cvrptw_optimization.data import data as dat
+
+
+class FeasibilityTablesTest(unittest.TestCase):
+
+    def test_insertion_checks_match_route_evaluation(self):
+        '''
+        Constant time insertion checks agree with the evaluation of the route with the inserted customer
+        :return:
+        '''
+        from cvrptw_optimization.src import single_depot_column_generation_pulp_inputs as inputs
+
+        model_inputs = inputs.ModelInputs(dat.transportation_matrix1, dat.customers1, dat.depots1, dat.vehicles1)
+        tables = model_inputs.create_feasibility_tables(capacity=60)
+        route_evaluator = tables.route_evaluator
+        self.assertTrue(sum(tables.memory_bytes().values()) > 0)
+
+        location_names = route_evaluator.location_names
+        for from_idx in [0] + list(range(2, tables.number_of_vertices)):
+            for to_idx in range(1, tables.number_of_vertices):
+                if from_idx != to_idx and (from_idx, to_idx) != (0, 1):
+                    evaluation = route_evaluator.evaluate([[location_names[from_idx], location_names[to_idx]]])
+                    self.assertEqual(tables.can_follow(from_idx, to_idx), bool(evaluation.feasible[0]))
+
+        route = [0, 5, 12, 20, 1]
+        route_slack = tables.route_slack(route)
+        self.assertTrue(route_slack.feasible)
+        self.assertTrue((route_slack.backward_slack >= 0).all())
+        self.assertTrue((route_slack.earliest - route_slack.backward_slack ==
+                         route_evaluator.time_window_start[route]).all())
+        feasible_insertions = 0
+        for vertex in range(2, tables.number_of_vertices):
+            if vertex in route:
+                continue
+            for position in range(len(route) - 1):
+                candidate = route[:position + 1] + [vertex] + route[position + 1:]
+                evaluation = route_evaluator.evaluate([[location_names[stop] for stop in candidate]], capacity=60)
+                self.assertEqual(tables.can_insert(route_slack, position, vertex), bool(evaluation.feasible[0]))
+                feasible_insertions += bool(evaluation.feasible[0])
+        self.assertTrue(feasible_insertions > 0)
+
+        # removals and replacements of every customer
+        feasible_replacements = 0
+        for position in range(1, len(route) - 1):
+            candidate = route[:position] + route[position + 1:]
+            evaluation = route_evaluator.evaluate([[location_names[stop] for stop in candidate]], capacity=60)
+            self.assertEqual(tables.can_remove(route_slack, position), bool(evaluation.feasible[0]))
+            for vertex in range(2, tables.number_of_vertices):
+                if vertex in route:
+                    continue
+                candidate = route[:position] + [vertex] + route[position + 1:]
+                evaluation = route_evaluator.evaluate([[location_names[stop] for stop in candidate]], capacity=60)
+                self.assertEqual(tables.can_replace(route_slack, position, vertex), bool(evaluation.feasible[0]))
+                feasible_replacements += bool(evaluation.feasible[0])
+        self.assertTrue(feasible_replacements > 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+'''
+Test class for testing heterogeneous fleet column generation
+'''
+
+import os
+import sys
+import unittest
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from cvrptw_optimization.data import data as dat
+
+
+class HeterogeneousFleetTest(unittest.TestCase):
+
+    def test_pricing_waves_and_bound(self):
+        '''
+        Dominated vehicle types are priced in the second wave, the knapsack bound skips small vehicles
+        :return:
+        '''
+        from cvrptw_optimization import single_depot_column_generation_pulp as cg
+
+        vehicle_types_dict = {'CAPACITY': {'SMALL': 20, 'LARGE': 40, 'EXPENSIVE': 20},
+                              'VEHICLE_FIXED_COST': {'SMALL': 5, 'LARGE': 10, 'EXPENSIVE': 10}}
+        first_wave, dominated = cg.pricing_waves(vehicle_types_dict, {})
+        self.assertEqual(first_wave, ['SMALL', 'LARGE'])
+        self.assertEqual(dominated, {'EXPENSIVE': ['SMALL', 'LARGE']})
+
+        customers_dict = {'DEMAND': {'A': 10, 'B': 20}}
+        price = {'A': 30, 'B': 20}
+        self.assertEqual(cg.pricing_lower_bound(price, customers_dict, 20, fixed_cost=5), 5 - 30 - 10)
+        self.assertEqual(cg.pricing_lower_bound(price, customers_dict, 15, fixed_cost=5), 5 - 30)
+
+    def test_heterogeneous_column_generation(self):
+        '''
+        Columns carry their vehicle type and the solution respects the number of vehicles of each type
+        :return:
+        '''
+        from cvrptw_optimization import single_depot_column_generation_pulp as cg
+
+        vehicles = dat.vehicles_unit_test.copy()
+        vehicle_classes = [(40, 10, 2), (60, 20, 10), (5, 1, 5), (40, 15, 10)]
+        vehicles = vehicles.head(sum(number for capacity, fixed_cost, number in vehicle_classes)).copy()
+        vehicles['CAPACITY'] = [capacity for capacity, fixed_cost, number in vehicle_classes for _ in range(number)]
+        vehicles['VEHICLE_FIXED_COST'] = [fixed_cost for capacity, fixed_cost, number in vehicle_classes
+                                          for _ in range(number)]
+
+        solution, solution_statistics = cg.run_single_depot_column_generation(dat.depots_unit_test,
+                                                                              dat.customers_unit_test,
+                                                                              dat.transportation_matrix_unit_test,
+                                                                              vehicles,
+                                                                              max_iteration=10,
+                                                                              heterogeneous_fleet=True)
+
+        # capacity 5 is below every demand and capacity 40 at cost 15 is dominated
+        self.assertTrue(all(statistics['SKIPPED_VEHICLE_TYPES'] >= 1 for statistics in solution_statistics))
+        routes = solution.drop_duplicates('PATH_NAME')
+        self.assertFalse(routes['VEHICLE_TYPE'].isnull().any())
+        self.assertTrue((routes['VEHICLE_CAPACITY'] >= 40).all())
+        self.assertTrue((solution.groupby('PATH_NAME')['DEMAND'].sum() <=
+                         routes.set_index('PATH_NAME')['VEHICLE_CAPACITY']).all())
+        self.assertTrue(routes['VEHICLE_CAPACITY'].value_counts().get(40, 0) <= 2)
+        self.assertEqual(sorted(solution['LOCATION_NAME'][solution['LOCATION_NAME'].str.startswith('STORE')]),
+                         sorted(dat.customers_unit_test['LOCATION_NAME']))
+
+
+if __name__ == '__main__':
+    unittest.main()
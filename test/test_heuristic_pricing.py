@@ -0,0 +1,111 @@
+'''
+Test class for testing the heuristic pricing cascade
+'''
+
+import os
+import sys
+import unittest
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from cvrptw_optimization.data import data as dat
+
+
+class HeuristicPricingTest(unittest.TestCase):
+
+    def test_heuristic_stages(self):
+        '''
+        Every stage returns feasible routes with the reduced costs of the master duals
+        :return:
+        '''
+        from cvrptw_optimization import single_depot_column_generation_pulp as cg
+        from cvrptw_optimization.src.route_evaluation import RouteEvaluator
+        from cvrptw_optimization.src.heuristic_pricing import HeuristicPricing
+
+        model_inputs, model_formulation = cg.initiate_single_depot_column_generation(dat.depots0,
+                                                                                     dat.customers0,
+                                                                                     dat.transportation_matrix0,
+                                                                                     dat.vehicles0)
+        route_evaluator = RouteEvaluator.from_model_inputs(model_inputs)
+        price = {customer: 80.0 + 5 * idx for idx, customer in enumerate(route_evaluator.customer_names)}
+
+        heuristic_pricing = HeuristicPricing(route_evaluator, nearest_neighbours=3)
+        for successors in heuristic_pricing.restricted_labeling.successors:
+            self.assertTrue(len([successor for successor in successors if successor != 1]) <= 3)
+
+        for stage in HeuristicPricing.stages:
+            heuristic_pricing.stages = (stage,)
+            found_stage, columns = heuristic_pricing.solve(price, 60, seed_paths=list(model_inputs.paths_dict.values()))
+            self.assertEqual(found_stage, stage)
+            evaluation = route_evaluator.evaluate([path for reduced_cost, path in columns], capacity=60)
+            self.assertTrue(evaluation.feasible.all())
+            for (reduced_cost, path), cost in zip(columns, evaluation.cost):
+                self.assertAlmostEqual(reduced_cost, cost - sum(price.get(location, 0) for location in path))
+
+        # the randomized constructions only depend on the seed
+        heuristic_pricing.stages = ('greedy',)
+        self.assertEqual(heuristic_pricing.solve(price, 60, seed=3), heuristic_pricing.solve(price, 60, seed=3))
+
+    def test_soft_time_window_penalties(self):
+        '''
+        With soft time windows the reduced costs include the lateness and waiting penalties and the cascade reaches
+        the bound of the exact pricing
+        :return:
+        '''
+        from cvrptw_optimization import single_depot_column_generation_pulp as cg
+        from cvrptw_optimization.src.route_evaluation import RouteEvaluator
+        from cvrptw_optimization.src.heuristic_pricing import HeuristicPricing
+
+        customers = dat.customers_unit_test.copy()
+        customers['TIME_WINDOW_START'] = [540, 760, 660, 540, 860]
+        customers['TIME_WINDOW_END'] = [600, 900, 900, 600, 900]
+        model_inputs, model_formulation = cg.initiate_single_depot_column_generation(dat.depots_unit_test,
+                                                                                     customers,
+                                                                                     dat.transportation_matrix_unit_test,
+                                                                                     dat.vehicles_unit_test)
+        route_evaluator = RouteEvaluator.from_model_inputs(model_inputs)
+        price = {customer: 100.0 for customer in route_evaluator.customer_names}
+
+        heuristic_pricing = HeuristicPricing(route_evaluator, lateness_penalty=0.5, earliness_penalty=0.2)
+        for stage in HeuristicPricing.stages:
+            heuristic_pricing.stages = (stage,)
+            found_stage, columns = heuristic_pricing.solve(price, 60, seed_paths=list(model_inputs.paths_dict.values()))
+            self.assertEqual(found_stage, stage)
+            paths_dict = dict(enumerate(path for reduced_cost, path in columns))
+            costs = route_evaluator.path_costs(paths_dict, lateness_penalty=0.5, earliness_penalty=0.2)
+            for idx, (reduced_cost, path) in enumerate(columns):
+                self.assertAlmostEqual(reduced_cost, costs[idx] - sum(price.get(location, 0) for location in path))
+
+        bounds = []
+        for pricing_cascade in (False, True):
+            solution, solution_statistics = cg.run_single_depot_column_generation(dat.depots_unit_test,
+                                                                                  customers,
+                                                                                  dat.transportation_matrix_unit_test,
+                                                                                  dat.vehicles_unit_test,
+                                                                                  enable_solution_messaging=0,
+                                                                                  pricing_cascade=pricing_cascade,
+                                                                                  soft_time_windows=True,
+                                                                                  lateness_penalty=0.5,
+                                                                                  earliness_penalty=0.2)
+            bounds.append(solution_statistics[-1]['MASTER_PROBLEM_OBJECTIVE'])
+        self.assertAlmostEqual(bounds[0], bounds[1], places=4)
+
+    def test_column_generation_with_pricing_cascade(self):
+        '''
+        The cascade ends with the exact pricing and reaches the same bound
+        :return:
+        '''
+        from cvrptw_optimization import single_depot_column_generation_pulp as cg
+
+        solution, solution_statistics = cg.run_single_depot_column_generation(dat.depots_unit_test,
+                                                                              dat.customers_unit_test,
+                                                                              dat.transportation_matrix_unit_test,
+                                                                              dat.vehicles_unit_test,
+                                                                              enable_solution_messaging=0,
+                                                                              pricing_cascade=True)
+        self.assertAlmostEqual(solution_statistics[-1]['MASTER_PROBLEM_OBJECTIVE'], 225.8702563, places=4)
+        self.assertEqual(solution_statistics[-1]['PRICING_STAGE'], 'mip')
+        self.assertTrue(solution_statistics[0]['PRICING_STAGE'] in ('greedy', 'local_search', 'restricted_labeling'))
+        self.assertFalse(solution['PRICING_STAGE'].isnull().any())
+
+
+if __name__ == '__main__':
+    unittest.main()
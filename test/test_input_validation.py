@@ -0,0 +1,121 @@
+'''
+Test class for testing the input validation
+'''
+
+import os
+import sys
+import unittest
+import pandas as pd
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from cvrptw_optimization.data import data as dat
+
+
+def infeasible_inputs():
+    '''
+    Unit test data with a customer above the vehicle capacity, a customer whose time window closes before the depot
+    opens and a customer missing its depot arc. The new customers are copies of STORE 3
+    :return: customers, transportation matrix
+    '''
+    customers = dat.customers_unit_test.copy()
+    copies = {'STORE 6': (100, 900), 'STORE 7': (10, 380), 'STORE 8': (10, 900)}
+    for name, (demand, time_window_end) in copies.items():
+        customer = dat.customers_unit_test[dat.customers_unit_test['LOCATION_NAME'] == 'STORE 3'].copy()
+        customer['LOCATION_NAME'] = name
+        customer['DEMAND'] = demand
+        customer['TIME_WINDOW_END'] = time_window_end
+        customers = customers.append(customer, ignore_index=True)
+
+    arcs = dat.transportation_matrix_unit_test.set_index(['FROM_LOCATION_NAME', 'TO_LOCATION_NAME'])
+    locations = ['DEPOT'] + customers['LOCATION_NAME'].tolist()
+    rows = []
+    for from_loc in locations:
+        for to_loc in locations:
+            if from_loc == to_loc or (from_loc, to_loc) == ('DEPOT', 'STORE 8'):
+                continue
+            original = ('STORE 3' if from_loc in copies else from_loc, 'STORE 3' if to_loc in copies else to_loc)
+            if original[0] == original[1]:
+                original = ('STORE 3', 'STORE 1')
+            row = arcs.loc[original].to_dict()
+            row['FROM_LOCATION_NAME'] = from_loc
+            row['TO_LOCATION_NAME'] = to_loc
+            rows.append(row)
+    return customers, pd.DataFrame(rows)
+
+
+class InputValidationTest(unittest.TestCase):
+
+    def test_diagnostic_report(self):
+        '''
+        Every offending customer is reported, missing arcs between customers are warnings
+        :return:
+        '''
+        from cvrptw_optimization.src import single_depot_column_generation_pulp_inputs as inputs
+        from cvrptw_optimization.src.input_validation import validate_model_inputs
+
+        customers, transportation_matrix = infeasible_inputs()
+        model_inputs = inputs.ModelInputs(transportation_matrix, customers, dat.depots_unit_test,
+                                          dat.vehicles_unit_test.head(1))
+        diagnostics = validate_model_inputs(model_inputs)
+        issues = diagnostics.to_dataframe().set_index('LOCATION_NAME')['ISSUE'].to_dict()
+        self.assertEqual(issues['STORE 6'], 'DEMAND_ABOVE_CAPACITY')
+        self.assertEqual(issues['STORE 7'], 'UNREACHABLE_TIME_WINDOW')
+        self.assertEqual(issues['STORE 8'], 'MISSING_DEPOT_ARC')
+        self.assertEqual(sorted(diagnostics.offending_customers), ['STORE 6', 'STORE 7', 'STORE 8'])
+        self.assertEqual(diagnostics.instance_errors['ISSUE'].tolist(), ['FLEET_CAPACITY'])
+        self.assertFalse(diagnostics.feasible)
+
+        transportation_matrix = dat.transportation_matrix_unit_test
+        transportation_matrix = transportation_matrix[~((transportation_matrix['FROM_LOCATION_NAME'] == 'STORE 1') &
+                                                        (transportation_matrix['TO_LOCATION_NAME'] == 'STORE 2'))]
+        model_inputs = inputs.ModelInputs(transportation_matrix, dat.customers_unit_test, dat.depots_unit_test,
+                                          dat.vehicles_unit_test)
+        diagnostics = validate_model_inputs(model_inputs, soft_time_windows=True)
+        self.assertTrue(diagnostics.feasible)
+        self.assertEqual(diagnostics.issues[['ISSUE', 'SEVERITY', 'LOCATION_NAME']].values.tolist(),
+                         [['MISSING_CUSTOMER_ARCS', 'warning', 'STORE 1']])
+
+    def test_drop_infeasible_customers(self):
+        '''
+        The solvers raise before solving, or drop the offending customers and solve the others
+        :return:
+        '''
+        from cvrptw_optimization import single_depot_column_generation_pulp as cg
+        from cvrptw_optimization import single_depot_general_model_pulp as gm
+
+        customers, transportation_matrix = infeasible_inputs()
+        with self.assertRaises(Exception):
+            cg.run_single_depot_column_generation(dat.depots_unit_test, customers, transportation_matrix,
+                                                  dat.vehicles_unit_test, validate_inputs=True)
+
+        solution, solution_statistics = cg.run_single_depot_column_generation(dat.depots_unit_test,
+                                                                              customers,
+                                                                              transportation_matrix,
+                                                                              dat.vehicles_unit_test,
+                                                                              enable_solution_messaging=0,
+                                                                              validate_inputs=True,
+                                                                              drop_infeasible_customers=True)
+        self.assertEqual(sorted(solution_statistics[-1]['DROPPED_CUSTOMERS']), ['STORE 6', 'STORE 7', 'STORE 8'])
+        self.assertAlmostEqual(solution_statistics[-1]['MASTER_PROBLEM_OBJECTIVE'], 225.8702563, places=4)
+        self.assertFalse(solution['LOCATION_NAME'].isin(['STORE 6', 'STORE 7', 'STORE 8']).any())
+
+        # every one of the 30 vehicles has to serve one of 5 customers
+        with self.assertRaises(Exception):
+            gm.run_single_depot_general_model(dat.depots_unit_test, customers, transportation_matrix,
+                                              dat.vehicles_unit_test, validate_inputs=True,
+                                              drop_infeasible_customers=True)
+        objective, solution_path = gm.run_single_depot_general_model(dat.depots_unit_test,
+                                                                     customers,
+                                                                     transportation_matrix,
+                                                                     dat.vehicles_unit_test.head(2),
+                                                                     enable_solution_messaging=0,
+                                                                     validate_inputs=True,
+                                                                     drop_infeasible_customers=True,
+                                                                     compact_solution=True)
+        self.assertEqual(sorted(solution_path.attrs['DROPPED_CUSTOMERS']), ['STORE 6', 'STORE 7', 'STORE 8'])
+        solution_path = solution_path.to_dataframe()
+        self.assertEqual(sorted(solution_path['LOCATION_NAME'][solution_path['DEMAND'] > 0]),
+                         sorted(dat.customers_unit_test['LOCATION_NAME']))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+'''
+Test class for testing instance readers and the instance generator
+'''
+
+import os
+import sys
+import unittest
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from cvrptw_optimization.data import data as dat
+
+
+class InstancesTest(unittest.TestCase):
+
+    def test_read_solomon_instance(self):
+        '''
+        Solomon files are parsed into the solver data frames
+        :return:
+        '''
+        from cvrptw_optimization.src import instances as inst
+
+        depots, customers, transportation_matrix, vehicles = inst.read_solomon_instance(dat.solomon_unit_test_file)
+
+        self.assertEqual(len(depots), 1)
+        self.assertEqual(len(customers), 8)
+        self.assertEqual(len(transportation_matrix), 81)
+        self.assertEqual(len(vehicles), 4)
+        self.assertEqual(vehicles['CAPACITY'].iloc[0], 100)
+        drive = transportation_matrix.set_index(['FROM_LOCATION_NAME', 'TO_LOCATION_NAME'])['DRIVE_MINUTES']
+        self.assertAlmostEqual(drive['DEPOT', 'CUSTOMER 1'], (5 ** 2 + 18 ** 2) ** 0.5)
+
+        depots, customers, transportation_matrix, vehicles = inst.read_solomon_instance(dat.solomon_unit_test_file,
+                                                                                        number_of_vehicles=2,
+                                                                                        number_of_customers=5,
+                                                                                        distance_decimals=1)
+        self.assertEqual(len(customers), 5)
+        self.assertEqual(len(vehicles), 2)
+        drive = transportation_matrix.set_index(['FROM_LOCATION_NAME', 'TO_LOCATION_NAME'])['DRIVE_MINUTES']
+        self.assertAlmostEqual(drive['DEPOT', 'CUSTOMER 1'], 18.6)
+
+    def test_generate_instance(self):
+        '''
+        Generated instances are reproducible and every time window is reachable
+        :return:
+        '''
+        from cvrptw_optimization.src import instances as inst
+
+        depots, customers, transportation_matrix, vehicles = inst.generate_instance(40, seed=3, clustering=0.5)
+        _, customers_again, _, _ = inst.generate_instance(40, seed=3, clustering=0.5)
+
+        self.assertTrue(customers.equals(customers_again))
+        self.assertEqual(len(transportation_matrix), 41 * 41)
+        self.assertTrue((customers['TIME_WINDOW_START'] <= customers['TIME_WINDOW_END']).all())
+
+        drive = transportation_matrix.set_index(['FROM_LOCATION_NAME', 'TO_LOCATION_NAME'])['DRIVE_MINUTES']
+        for _, customer in customers.iterrows():
+            from_depot = drive['DEPOT', customer['LOCATION_NAME']]
+            to_depot = drive[customer['LOCATION_NAME'], 'DEPOT']
+            self.assertTrue(from_depot <= customer['TIME_WINDOW_END'])
+            self.assertTrue(max(from_depot, customer['TIME_WINDOW_START']) + customer['STOP_TIME'] + to_depot <=
+                            depots['TIME_WINDOW_END'].iloc[0])
+        self.assertTrue(vehicles['CAPACITY'].sum() >= customers['DEMAND'].sum())
+
+
+if __name__ == '__main__':
+    unittest.main()
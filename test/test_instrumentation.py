@@ -0,0 +1,133 @@
+'''
+Test class for testing run instrumentation
+'''
+
+import os
+import sys
+import json
+import tempfile
+import unittest
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from cvrptw_optimization.data import data as dat
+
+
+class InstrumentationTest(unittest.TestCase):
+
+    def test_nested_phases(self):
+        '''
+        Nested phases inherit tags and are exported
+        :return:
+        '''
+        from cvrptw_optimization.src.instrumentation import RunInstrumentation, track_phase
+
+        instrumentation = RunInstrumentation(trace_memory=True, run_name='test')
+        with instrumentation.phase('iteration', ITERATION=3):
+            with track_phase(instrumentation, 'master_build'):
+                [i for i in range(10000)]
+        with track_phase(None, 'ignored'):
+            pass
+        instrumentation.stop()
+
+        records = instrumentation.to_dataframe()
+        self.assertEqual(records['PHASE'].tolist(), ['master_build', 'iteration'])
+        self.assertEqual(records['ITERATION'].tolist(), [3, 3])
+        self.assertTrue((records['PEAK_MEMORY_MB'] > 0).all())
+
+        exported = json.loads(instrumentation.to_json())
+        self.assertEqual(len(exported['PHASES']), 2)
+        with tempfile.TemporaryDirectory() as directory:
+            instrumentation.to_csv(os.path.join(directory, 'phases.csv'))
+            self.assertTrue(os.path.exists(os.path.join(directory, 'phases.csv')))
+
+    def test_column_generation_statistics(self):
+        '''
+        Column generation reports per iteration timings
+        :return:
+        '''
+        from cvrptw_optimization import single_depot_column_generation_pulp as cg
+        from cvrptw_optimization.src.instrumentation import RunInstrumentation
+
+        instrumentation = RunInstrumentation()
+        solution, solution_statistics = cg.run_single_depot_column_generation(dat.depots_unit_test,
+                                                                              dat.customers_unit_test,
+                                                                              dat.transportation_matrix_unit_test,
+                                                                              dat.vehicles_unit_test,
+                                                                              capacity=100,
+                                                                              max_iteration=2,
+                                                                              instrumentation=instrumentation)
+
+        self.assertTrue(all('SUB_PROBLEM_WALL_SECONDS' in statistics for statistics in solution_statistics))
+        phases = set(instrumentation.summary()['PHASE'])
+        self.assertTrue({'model_inputs', 'master_solve', 'sub_problem_solve', 'process_paths'} <= phases)
+        self.assertEqual(instrumentation.profiles, {})
+
+    def test_profiling(self):
+        '''
+        Profiled phases write one cProfile file each and a hot functions summary
+        :return:
+        '''
+        import pstats
+        from cvrptw_optimization import single_depot_general_model_pulp as general_model
+        from cvrptw_optimization.src.instrumentation import RunInstrumentation, track_phase
+
+        instrumentation = RunInstrumentation(run_name='unit test', profile=True)
+        objective, solution_path = general_model.run_single_depot_general_model(dat.depots_unit_test,
+                                                                                dat.customers_unit_test,
+                                                                                dat.transportation_matrix_unit_test,
+                                                                                dat.vehicles_unit_test.head(2),
+                                                                                enable_solution_messaging=0,
+                                                                                instrumentation=instrumentation)
+        self.assertEqual(set(instrumentation.profiles.keys()),
+                         {'model_inputs', 'formulate_problem', 'solve_model', 'get_model_solution'})
+
+        # a profiled phase inside another one is part of the outer profile
+        with instrumentation.phase('formulate_problem'):
+            with track_phase(instrumentation, 'model_inputs'):
+                [i for i in range(10000)]
+        self.assertEqual(len(instrumentation.profiles), 4)
+
+        summary = instrumentation.profile_summary(top=5)
+        self.assertEqual(set(summary['PHASE']), set(instrumentation.profiles.keys()))
+        self.assertTrue((summary.groupby('PHASE').size() <= 5).all())
+        with tempfile.TemporaryDirectory() as directory:
+            file_names = instrumentation.write_profiles(directory)
+            self.assertEqual(len(file_names), 5)
+            self.assertTrue(os.path.exists(os.path.join(directory, 'unit_test_formulate_problem.prof')))
+            self.assertTrue(pstats.Stats(os.path.join(directory, 'unit_test_solve_model.prof')).total_calls > 0)
+
+
+    def test_profiling_heterogeneous_fleet(self):
+        '''
+        The vehicle types are priced in the profiled thread, so the sub-problem profile includes their pricing
+        :return:
+        '''
+        import pstats
+        from cvrptw_optimization import single_depot_column_generation_pulp as cg
+        from cvrptw_optimization.src.instrumentation import RunInstrumentation
+
+        vehicles = dat.vehicles_unit_test.head(4).copy()
+        vehicles['CAPACITY'] = [40, 40, 60, 60]
+        vehicles['VEHICLE_FIXED_COST'] = [10, 10, 20, 20]
+
+        instrumentation = RunInstrumentation(profile=True, profile_phases=['sub_problem'])
+        solution, solution_statistics = cg.run_single_depot_column_generation(dat.depots_unit_test,
+                                                                              dat.customers_unit_test,
+                                                                              dat.transportation_matrix_unit_test,
+                                                                              vehicles,
+                                                                              enable_solution_messaging=0,
+                                                                              max_iteration=2,
+                                                                              heterogeneous_fleet=True,
+                                                                              instrumentation=instrumentation)
+        self.assertEqual(set(instrumentation.profiles.keys()), {'sub_problem'})
+        profiled_functions = [function_name for file_name, line, function_name in
+                              pstats.Stats(instrumentation.profiles['sub_problem']).stats.keys()]
+        self.assertEqual(profiled_functions.count('solve_vehicle_type'), 1)
+        self.assertEqual(profiled_functions.count('formulate_and_solve_subproblem'), 1)
+
+        # every vehicle type is priced in every iteration and recorded as its own phase
+        records = instrumentation.to_dataframe()
+        self.assertEqual((records['PHASE'] == 'sub_problem_solve').sum(), 2 * len(solution_statistics))
+
+
+if __name__ == '__main__':
+    unittest.main()
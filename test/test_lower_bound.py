@@ -0,0 +1,75 @@
+'''
+Test class for testing the lower bound mode
+'''
+
+import os
+import sys
+import unittest
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from cvrptw_optimization.data import data as dat
+
+
+class LowerBoundTest(unittest.TestCase):
+
+    def run_lower_bound(self, **kwargs):
+        from cvrptw_optimization import single_depot_lower_bound_pulp as lbp
+        return lbp.run_single_depot_lower_bound(dat.depots_unit_test,
+                                                dat.customers_unit_test,
+                                                dat.transportation_matrix_unit_test,
+                                                dat.vehicles_unit_test,
+                                                **kwargs)
+
+    def test_root_relaxation_bound(self):
+        '''
+        The bound reaches the column generation relaxation and the trivial bound is below it
+        :return:
+        '''
+        bound, solution_statistics = self.run_lower_bound()
+        self.assertAlmostEqual(bound['LOWER_BOUND'], 225.8702563, places=3)
+        self.assertTrue(bound['LOWER_BOUND'] <= bound['MASTER_PROBLEM_OBJECTIVE'] + 0.000001)
+        self.assertTrue(0 < bound['TRIVIAL_BOUND'] <= bound['LOWER_BOUND'])
+        self.assertEqual(bound['ITERATIONS'], len(solution_statistics))
+        # the best bound never decreases
+        lower_bounds = [statistics['LOWER_BOUND'] for statistics in solution_statistics]
+        self.assertEqual(lower_bounds, sorted(lower_bounds))
+
+    def test_plan_gap(self):
+        '''
+        Gap of the general model plan, the run stops at the trivial bound once it meets the target gap
+        :return:
+        '''
+        from cvrptw_optimization import single_depot_general_model_pulp as general
+
+        objective, plan = general.run_single_depot_general_model(dat.depots_unit_test,
+                                                                 dat.customers_unit_test,
+                                                                 dat.transportation_matrix_unit_test,
+                                                                 dat.vehicles_unit_test.head(2),
+                                                                 enable_solution_messaging=0)
+
+        bound, solution_statistics = self.run_lower_bound(plan=plan)
+        self.assertTrue(bound['PLAN_FEASIBLE'])
+        self.assertAlmostEqual(bound['PLAN_COST'], 227.3210805, places=3)
+        self.assertAlmostEqual(bound['GAP'], (227.3210805 - 225.8702563) / 227.3210805, places=4)
+
+        bound, solution_statistics = self.run_lower_bound(plan=plan, target_gap=0.5)
+        self.assertEqual(bound['BOUND_TYPE'], 'trivial')
+        self.assertEqual(solution_statistics, [])
+        self.assertTrue(bound['GAP'] <= 0.5)
+
+        # a plan missing a customer is not feasible
+        bound, solution_statistics = self.run_lower_bound(plan=[['STORE 1', 'STORE 2']], trivial_only=True)
+        self.assertFalse(bound['PLAN_FEASIBLE'])
+
+    def test_time_budget_fallback(self):
+        '''
+        An exhausted budget stops after the first iteration with a valid bound
+        :return:
+        '''
+        bound, solution_statistics = self.run_lower_bound(time_budget_minutes=0)
+        self.assertEqual(len(solution_statistics), 1)
+        self.assertTrue(bound['LOWER_BOUND'] >= bound['TRIVIAL_BOUND'])
+        self.assertTrue(bound['LOWER_BOUND'] <= 225.8702563 + 0.000001)
+
+
+if __name__ == '__main__':
+    unittest.main()
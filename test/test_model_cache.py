@@ -0,0 +1,102 @@
+'''
+Test class for testing the model cache
+'''
+
+import os
+import sys
+import tempfile
+import unittest
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from cvrptw_optimization.data import data as dat
+
+vehicles = dat.vehicles_unit_test.head(2)
+
+
+class ModelCacheTest(unittest.TestCase):
+
+    def test_cached_general_model(self):
+        '''
+        The second run of an instance loads the exported model instead of formulating it and finds the same solution
+        :return:
+        '''
+        from cvrptw_optimization import single_depot_general_model_pulp as gm
+        from cvrptw_optimization.src.instrumentation import RunInstrumentation
+
+        objective, solution_path = gm.run_single_depot_general_model(dat.depots_unit_test,
+                                                                     dat.customers_unit_test,
+                                                                     dat.transportation_matrix_unit_test,
+                                                                     vehicles,
+                                                                     enable_solution_messaging=0)
+        with tempfile.TemporaryDirectory() as directory:
+            phases = []
+            for run in range(2):
+                instrumentation = RunInstrumentation()
+                cached_objective, cached_solution_path = gm.run_single_depot_general_model(
+                    dat.depots_unit_test,
+                    dat.customers_unit_test,
+                    dat.transportation_matrix_unit_test,
+                    vehicles,
+                    enable_solution_messaging=0,
+                    instrumentation=instrumentation,
+                    model_cache_dir=directory)
+                phases.append(set(instrumentation.to_dataframe()['PHASE']))
+                self.assertAlmostEqual(cached_objective, objective, places=6)
+                self.assertEqual(cached_solution_path['LOCATION_NAME'].tolist(),
+                                 solution_path['LOCATION_NAME'].tolist())
+
+            self.assertTrue({'formulate_problem', 'export_model'} <= phases[0])
+            self.assertTrue('load_model' in phases[1] and 'formulate_problem' not in phases[1])
+            self.assertEqual(len(os.listdir(directory)), 1)
+
+            # other formulation parameters are another model
+            gm.run_single_depot_general_model(dat.depots_unit_test, dat.customers_unit_test,
+                                              dat.transportation_matrix_unit_test, vehicles,
+                                              enable_solution_messaging=0, soft_time_windows=True,
+                                              model_cache_dir=directory)
+            self.assertEqual(len(os.listdir(directory)), 2)
+
+    def test_export_and_resolve(self):
+        '''
+        An exported model is solved again with another mip gap and handed out as MPS
+        :return:
+        '''
+        from cvrptw_optimization.src import single_depot_general_model_pulp_inputs as inputs
+        from cvrptw_optimization.src import single_depot_general_model_pulp_formulation as formulation
+
+        model_inputs = inputs.ModelInputs(dat.transportation_matrix_unit_test, dat.customers_unit_test,
+                                          dat.depots_unit_test, vehicles)
+        arguments = (model_inputs.time_variables_dict,
+                     model_inputs.assignment_variables_dict,
+                     model_inputs.vertices_dict,
+                     model_inputs.vehicles_dict,
+                     model_inputs.customers_dict,
+                     model_inputs.transit_dict,
+                     model_inputs.transit_starting_customers_dict,
+                     'DEPOT')
+        with tempfile.TemporaryDirectory() as directory:
+            model = formulation.ModelFormulation(*arguments)
+            model.formulate_problem()
+            model.export_model(os.path.join(directory, 'model'))
+
+            loaded_model = formulation.ModelFormulation(*arguments)
+            loaded_model.load_model(os.path.join(directory, 'model'))
+            objectives = []
+            for mip_gap in (0.1, 0):
+                loaded_model.solve_model(mip_gap=mip_gap, enable_solution_messaging=0)
+                loaded_model.get_model_solution()
+                objectives.append(loaded_model.solution_objective)
+            self.assertTrue(objectives[0] >= objectives[1])
+            self.assertAlmostEqual(objectives[1], 227.3210805, places=4)
+
+            mps_file = os.path.join(directory, 'model.mps')
+            loaded_model.model_export.write_mps(mps_file)
+            with open(mps_file) as model_file:
+                self.assertTrue(model_file.readline().startswith('*SENSE:Minimize'))
+
+            model.formulate_problem(optional_vehicles=True, fleet_objective='hierarchical')
+            with self.assertRaises(Exception):
+                model.export_model(os.path.join(directory, 'hierarchical'))
+
+
+if __name__ == '__main__':
+    unittest.main()
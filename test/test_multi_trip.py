@@ -0,0 +1,119 @@
+'''
+Test class for testing the multi-trip column generation
+'''
+
+import os
+import sys
+import unittest
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from cvrptw_optimization.data import data as dat
+
+
+class MultiTripTest(unittest.TestCase):
+
+    def check_trips(self, solution, vehicles, reload_minutes):
+        customers = solution[solution['DEMAND'] > 0]
+        self.assertEqual(sorted(customers['LOCATION_NAME']), sorted(dat.customers_unit_test['LOCATION_NAME']))
+        self.assertTrue((customers.groupby('PATH_NAME')['DEMAND'].sum() <= vehicles['CAPACITY'].max()).all())
+
+        trips = solution.drop_duplicates('PATH_NAME').set_index('PATH_NAME')
+        shifts = vehicles.set_index('VEHICLE_NAME')
+        for vehicle, vehicle_trips in trips.groupby('VEHICLE_NAME'):
+            vehicle_trips = vehicle_trips.sort_values('TRIP_NUMBER')
+            self.assertTrue(vehicle_trips['DEPARTURE_TIME'].iloc[0] >= shifts['SHIFT_START'][vehicle] - 0.000001)
+            self.assertTrue(vehicle_trips['RETURN_TIME'].iloc[-1] <= shifts['SHIFT_END'][vehicle] + 0.000001)
+            # the next trip leaves once the vehicle is back and reloaded
+            self.assertTrue((vehicle_trips['DEPARTURE_TIME'].values[1:] >=
+                             vehicle_trips['RETURN_TIME'].values[:-1] + reload_minutes - 0.000001).all())
+        return trips
+
+    def test_single_vehicle_multiple_trips(self):
+        '''
+        One small vehicle serves all customers with two trips
+        :return:
+        '''
+        from cvrptw_optimization import single_depot_multi_trip_column_generation_pulp as mt
+
+        vehicles = dat.vehicles_unit_test.head(1).copy()
+        vehicles['CAPACITY'] = 40
+        solution, solution_statistics = mt.run_single_depot_multi_trip_column_generation(
+            dat.depots_unit_test, dat.customers_unit_test, dat.transportation_matrix_unit_test, vehicles,
+            reload_minutes=15)
+
+        vehicles['SHIFT_START'] = 360
+        vehicles['SHIFT_END'] = 1020
+        trips = self.check_trips(solution, vehicles, 15)
+        self.assertEqual(list(trips['VEHICLE_NAME'].unique()), ['VEHICLE 0'])
+        self.assertEqual(sorted(trips['TRIP_NUMBER']), [1, 2])
+        self.assertAlmostEqual(solution['OBJECTIVE'].iloc[0], 227.3210805, places=4)
+        self.assertTrue(solution_statistics[-1]['SUB_PROBLEM_OBJECTIVE'] > -1)
+
+    def test_shift_windows(self):
+        '''
+        Vehicles with different shifts, the trips of every vehicle fit its shift
+        :return:
+        '''
+        from cvrptw_optimization import single_depot_multi_trip_column_generation_pulp as mt
+
+        vehicles = dat.vehicles_unit_test.head(3).copy()
+        vehicles['CAPACITY'] = 30
+        vehicles['SHIFT_START'] = [360, 600, 600]
+        vehicles['SHIFT_END'] = [720, 1020, 1020]
+        solution, solution_statistics = mt.run_single_depot_multi_trip_column_generation(
+            dat.depots_unit_test, dat.customers_unit_test, dat.transportation_matrix_unit_test, vehicles,
+            reload_minutes=10, max_trips=2)
+
+        trips = self.check_trips(solution, vehicles, 10)
+        self.assertTrue(trips['VEHICLE_NAME'].notnull().all())
+        self.assertTrue((trips.groupby('VEHICLE_NAME').size() <= 2).all())
+
+    def test_trip_sets_without_sequence(self):
+        '''
+        The trip durations fit the shifts but overlapping time windows leave no order for some trip sets, these are
+        forbidden until every vehicle makes its trips one after another
+        :return:
+        '''
+        from cvrptw_optimization import single_depot_multi_trip_column_generation_pulp as mt
+
+        customers = dat.customers_unit_test.copy()
+        customers['TIME_WINDOW_START'] = 600
+        customers['TIME_WINDOW_END'] = 700
+        vehicles = dat.vehicles_unit_test.head(3).copy()
+        vehicles['CAPACITY'] = 30
+        solution, solution_statistics = mt.run_single_depot_multi_trip_column_generation(
+            dat.depots_unit_test, customers, dat.transportation_matrix_unit_test, vehicles, reload_minutes=10)
+
+        vehicles['SHIFT_START'] = 360
+        vehicles['SHIFT_END'] = 1020
+        trips = self.check_trips(solution, vehicles, 10)
+        self.assertTrue(trips['VEHICLE_NAME'].notnull().all())
+        stops = solution[solution['DEMAND'] > 0]
+        self.assertTrue((stops['START_TIME'] <= stops['TIME_WINDOW_END'] + 0.000001).all())
+
+    def test_trip_schedule(self):
+        '''
+        A trip leaves as late as its waiting allows and does not fit a shift ending before its return
+        :return:
+        '''
+        from cvrptw_optimization.src import single_depot_column_generation_pulp_inputs as inputs
+        from cvrptw_optimization.src.route_evaluation import RouteEvaluator
+        from cvrptw_optimization.src.multi_trip import TripScheduler
+
+        model_inputs = inputs.ModelInputs(dat.transportation_matrix_unit_test, dat.customers_unit_test,
+                                          dat.depots_unit_test, dat.vehicles_unit_test)
+        scheduler = TripScheduler(RouteEvaluator.from_model_inputs(model_inputs))
+        trip = ['DEPOT_LEAVE', 'STORE 1', 'STORE 3', 'DEPOT_ENTER']
+
+        schedule = scheduler.schedule(trip, 360, 1020)
+        self.assertEqual(schedule['EARLIEST_DEPARTURE'], 360)
+        # no waiting at STORE 1, whose time window starts at 540
+        self.assertAlmostEqual(schedule['START_TIME'][1], 540)
+        self.assertAlmostEqual(schedule['DURATION'], schedule['RETURN'] - schedule['DEPARTURE'])
+        self.assertAlmostEqual(schedule['START_TIME'][-1], schedule['RETURN'])
+
+        self.assertIsNone(scheduler.schedule(trip, 360, schedule['RETURN'] - 1))
+        self.assertIsNone(scheduler.schedule(trip, 360, 1020, capacity=30))
+
+
+if __name__ == '__main__':
+    unittest.main()
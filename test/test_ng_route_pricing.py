@@ -0,0 +1,73 @@
+'''
+Test class for testing ng-route pricing
+'''
+
+import os
+import sys
+import unittest
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from cvrptw_optimization.data import data as dat
+
+
+class NgRoutePricingTest(unittest.TestCase):
+
+    def test_labeling_matches_sub_problem(self):
+        '''
+        With full neighbourhoods every labeling variant finds the sub-problem optimum
+        :return:
+        '''
+        from cvrptw_optimization import single_depot_column_generation_pulp as cg
+        from cvrptw_optimization.src.route_evaluation import RouteEvaluator
+        from cvrptw_optimization.src.ng_route_pricing import NgRoutePricing
+
+        model_inputs, model_formulation = cg.initiate_single_depot_column_generation(dat.depots0,
+                                                                                     dat.customers0,
+                                                                                     dat.transportation_matrix0,
+                                                                                     dat.vehicles0)
+        route_evaluator = RouteEvaluator.from_model_inputs(model_inputs)
+        price = {customer: 80.0 + 5 * idx for idx, customer in enumerate(route_evaluator.customer_names)}
+
+        objective, solution_path, sub_model = model_formulation.formulate_and_solve_subproblem(
+            price, 60, 'PATH', enable_solution_messaging=0)
+
+        for bidirectional in [False, True]:
+            for completion_bounds in [False, True]:
+                pricing = NgRoutePricing(route_evaluator,
+                                         neighbourhood_size=len(route_evaluator.customer_names),
+                                         bidirectional=bidirectional,
+                                         completion_bounds=completion_bounds)
+                columns, truncated = pricing.solve(price, 60, max_columns=5)
+                self.assertFalse(truncated)
+                self.assertAlmostEqual(columns[0][0], objective, places=4)
+                evaluation = route_evaluator.evaluate([path for reduced_cost, path in columns], capacity=60)
+                self.assertTrue(evaluation.feasible.all())
+
+        # small neighbourhoods relax elementarity, augmenting with a cycle forbids it
+        pricing = NgRoutePricing(route_evaluator, neighbourhood_size=1)
+        columns, truncated = pricing.solve(price, 60, max_columns=1)
+        self.assertTrue(columns[0][0] <= objective + 0.0001)
+        cycle = ['DEPOT_LEAVE', 'STORE 1', 'STORE 2', 'STORE 1', 'DEPOT_ENTER']
+        self.assertTrue(pricing.augment_neighbourhoods(cycle))
+        self.assertFalse(pricing.augment_neighbourhoods(cycle))
+
+    def test_column_generation_with_ng_route_pricing(self):
+        '''
+        Column generation with ng-route pricing reaches the bound of the sub-problem formulation
+        :return:
+        '''
+        from cvrptw_optimization import single_depot_column_generation_pulp as cg
+
+        solution, solution_statistics = cg.run_single_depot_column_generation(dat.depots_unit_test,
+                                                                              dat.customers_unit_test,
+                                                                              dat.transportation_matrix_unit_test,
+                                                                              dat.vehicles_unit_test,
+                                                                              capacity=100,
+                                                                              pricing='ng_route',
+                                                                              ng_neighbourhood_size=2)
+        self.assertAlmostEqual(solution_statistics[-1]['MASTER_PROBLEM_OBJECTIVE'], 203.5710835, places=3)
+        self.assertEqual(sorted(solution['LOCATION_NAME'][solution['LOCATION_NAME'].str.startswith('STORE')]),
+                         sorted(dat.customers_unit_test['LOCATION_NAME']))
+
+
+if __name__ == '__main__':
+    unittest.main()
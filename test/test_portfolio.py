@@ -0,0 +1,88 @@
+'''
+Test class for testing the portfolio of parallel strategies
+'''
+
+import os
+import sys
+import unittest
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from cvrptw_optimization.data import data as dat
+
+
+class PortfolioTest(unittest.TestCase):
+
+    def run_portfolio(self, **kwargs):
+        from cvrptw_optimization import single_depot_portfolio_pulp as portfolio
+        return portfolio.run_single_depot_portfolio(dat.depots_unit_test,
+                                                    dat.customers_unit_test,
+                                                    dat.transportation_matrix_unit_test,
+                                                    dat.vehicles_unit_test.head(2),
+                                                    **kwargs)
+
+    def test_target_gap(self):
+        '''
+        The race stops once the best plan is within the target gap of the lower bound
+        :return:
+        '''
+        solution, race = self.run_portfolio(target_gap=0.01)
+        self.assertTrue(race['TARGET_REACHED'])
+        self.assertTrue(race['GAP'] <= 0.01)
+        self.assertTrue(race['LOWER_BOUND'] <= race['OBJECTIVE'])
+        self.assertAlmostEqual(race['OBJECTIVE'], 227.3210805, places=3)
+
+        customers = solution[solution['DEMAND'] > 0]
+        self.assertEqual(sorted(customers['LOCATION_NAME']), sorted(dat.customers_unit_test['LOCATION_NAME']))
+        self.assertTrue((solution['STRATEGY'] == race['WINNER']).all())
+        self.assertTrue((solution['ORIGIN'] == race['ORIGIN']).all())
+        # only the heuristic polishes the plans of other strategies
+        for event in race['EVENTS']:
+            if event['EVENT'] == 'incumbent' and event['STRATEGY'] != 'heuristic':
+                self.assertEqual(event['ORIGIN'], event['STRATEGY'])
+        if race['WINNER'] != 'heuristic':
+            self.assertEqual(race['ORIGIN'], race['WINNER'])
+        self.assertAlmostEqual(solution['TRANSPORTATION_COST'].sum(), race['OBJECTIVE'], places=3)
+
+    def test_strategies_finish(self):
+        '''
+        Without a lower bound the race ends when every strategy has finished
+        :return:
+        '''
+        solution, race = self.run_portfolio(strategies=('heuristic', 'general_model'))
+        self.assertEqual(race['STATUS'], {'heuristic': 'done', 'general_model': 'done'})
+        self.assertFalse(race['TARGET_REACHED'])
+        self.assertIsNone(race['LOWER_BOUND'])
+        self.assertIn(race['WINNER'], ('heuristic', 'general_model'))
+        self.assertIn(race['ORIGIN'], ('heuristic', 'general_model'))
+        self.assertAlmostEqual(race['OBJECTIVE'], 227.3210805, places=3)
+
+        with self.assertRaises(Exception):
+            self.run_portfolio(strategies=('simulated_annealing',))
+
+
+    def test_polished_incumbent_origin(self):
+        '''
+        The heuristic returns a polished incumbent with the strategy that found it
+        :return:
+        '''
+        import multiprocessing
+        from cvrptw_optimization import single_depot_portfolio_pulp as portfolio
+
+        tables = (dat.depots_unit_test, dat.customers_unit_test, dat.transportation_matrix_unit_test,
+                  dat.vehicles_unit_test.head(2))
+        connection, child_connection = multiprocessing.Pipe()
+        routes = [['DEPOT_LEAVE'] + dat.customers_unit_test['LOCATION_NAME'].tolist()[:3] + ['DEPOT_ENTER'],
+                  ['DEPOT_LEAVE'] + dat.customers_unit_test['LOCATION_NAME'].tolist()[3:] + ['DEPOT_ENTER']]
+        connection.send(('column_generation', routes))
+        connection.send(None)
+        portfolio._heuristic(tables, 60, child_connection, portfolio.DEFAULT_STRATEGY_PARAMETERS['heuristic'])
+
+        event, value = connection.recv()
+        self.assertEqual(event, 'incumbent')
+        event, (origin, polished_routes) = connection.recv()
+        self.assertEqual((event, origin), ('polished', 'column_generation'))
+        self.assertEqual(sorted(location for route in polished_routes for location in route[1:-1]),
+                         sorted(dat.customers_unit_test['LOCATION_NAME']))
+        self.assertFalse(connection.poll())
+
+if __name__ == '__main__':
+    unittest.main()
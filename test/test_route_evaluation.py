@@ -0,0 +1,49 @@
+'''
+Test class for testing the route evaluator
+'''
+
+import os
+import sys
+import unittest
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from cvrptw_optimization.data import data as dat
+
+
+class RouteEvaluationTest(unittest.TestCase):
+
+    def test_evaluate_routes(self):
+        '''
+        Costs match the transit dictionary and violations are flagged
+        :return:
+        '''
+        from cvrptw_optimization.src import single_depot_column_generation_pulp_inputs as inputs
+        from cvrptw_optimization.src.route_evaluation import RouteEvaluator
+
+        model_inputs = inputs.ModelInputs(dat.transportation_matrix_unit_test, dat.customers_unit_test,
+                                          dat.depots_unit_test, dat.vehicles_unit_test)
+        model_inputs.create_initial_paths()
+        evaluator = RouteEvaluator.from_model_inputs(model_inputs)
+
+        self.assertEqual(evaluator.path_costs(model_inputs.paths_dict),
+                         model_inputs.calculate_path_costs(model_inputs.paths_dict, model_inputs.transit_dict))
+
+        routes = [['DEPOT_LEAVE', 'STORE 1', 'STORE 2', 'DEPOT_ENTER'],
+                  ['DEPOT_LEAVE', 'STORE 1', 'STORE 2', 'STORE 3', 'STORE 4', 'DEPOT_ENTER'],
+                  ['DEPOT_LEAVE', 'STORE 1', 'STORE 1', 'DEPOT_ENTER']]
+        evaluation = evaluator.evaluate(routes, capacity=60)
+
+        transit = model_inputs.transit_dict
+        self.assertAlmostEqual(evaluation.cost[0], transit['TRANSPORTATION_COST']['DEPOT_LEAVE', 'STORE 1'] +
+                               transit['TRANSPORTATION_COST']['STORE 1', 'STORE 2'] +
+                               transit['TRANSPORTATION_COST']['STORE 2', 'DEPOT_ENTER'])
+        arrival = 360 + transit['DRIVE_MINUTES']['DEPOT_LEAVE', 'STORE 1']
+        self.assertAlmostEqual(evaluation.arrival_time[0, 1], arrival)
+        self.assertAlmostEqual(evaluation.waiting[0, 1], 540 - arrival)
+        self.assertEqual(evaluation.load.tolist(), [35, 60, 40])
+        self.assertEqual(evaluation.feasible.tolist(), [True, True, False])
+        self.assertEqual(evaluation.repeated_customers.tolist(), [0, 0, 1])
+        self.assertEqual(len(evaluation.to_dataframe()), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+'''
+Test class for testing the compact route solution
+'''
+
+import os
+import sys
+import pickle
+import unittest
+import pandas as pd
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from cvrptw_optimization.data import data as dat
+
+
+class RouteSolutionTest(unittest.TestCase):
+
+    def test_column_generation_solution(self):
+        '''
+        The compact column generation solution gives the solution table of the default output
+        :return:
+        '''
+        from cvrptw_optimization import single_depot_column_generation_pulp as cg
+        from cvrptw_optimization.src.route_solution import RouteSolution
+
+        for soft_time_windows in (False, True):
+            arguments = dict(pricing='ng_route', soft_time_windows=soft_time_windows, earliness_penalty=0.1)
+            solution, solution_statistics = cg.run_single_depot_column_generation(
+                dat.depots_unit_test, dat.customers_unit_test, dat.transportation_matrix_unit_test,
+                dat.vehicles_unit_test, **arguments)
+            compact_solution, solution_statistics = cg.run_single_depot_column_generation(
+                dat.depots_unit_test, dat.customers_unit_test, dat.transportation_matrix_unit_test,
+                dat.vehicles_unit_test, compact_solution=True, **arguments)
+
+            self.assertIsInstance(compact_solution, RouteSolution)
+            pd.testing.assert_frame_equal(compact_solution.to_dataframe(), solution)
+            self.assertEqual(compact_solution.routes(),
+                             solution.groupby('PATH_NAME', sort=False)['LOCATION_NAME'].apply(list).tolist())
+            self.assertAlmostEqual(compact_solution.objective, solution['OBJECTIVE'].iloc[0])
+            self.assertAlmostEqual(compact_solution.route_summary()['TRANSPORTATION_COST'].sum(),
+                                   solution['TRANSPORTATION_COST'].sum())
+
+    def test_general_model_solution(self):
+        '''
+        The general model solution table is stored compactly, serialized and converted back
+        :return:
+        '''
+        from cvrptw_optimization import single_depot_general_model_pulp as gm
+        from cvrptw_optimization.src.route_solution import RouteSolution
+
+        objective, solution_path = gm.run_single_depot_general_model(dat.depots_unit_test,
+                                                                     dat.customers_unit_test,
+                                                                     dat.transportation_matrix_unit_test,
+                                                                     dat.vehicles_unit_test.head(2),
+                                                                     enable_solution_messaging=0)
+        compact_solution = RouteSolution.from_dataframe(solution_path)
+        solution_path = solution_path.reset_index(drop=True)
+        pd.testing.assert_frame_equal(compact_solution.to_dataframe(), solution_path)
+
+        # the location values and stop numbers are not stored per stop
+        self.assertEqual(set(compact_solution.location_values),
+                         {'DEMAND', 'STOP_TIME', 'TIME_WINDOW_START', 'TIME_WINDOW_END'})
+        self.assertFalse({'STOP_NUMBER', 'LOCATION_NAME', 'END_TIME', 'DEMAND'} & set(compact_solution.stop_values))
+
+        for copy in (RouteSolution.from_bytes(compact_solution.to_bytes()),
+                     pickle.loads(pickle.dumps(compact_solution))):
+            pd.testing.assert_frame_equal(copy.to_dataframe(), solution_path)
+        self.assertTrue(len(compact_solution.to_bytes()) < len(pickle.dumps(solution_path)))
+
+        route = compact_solution.route_details(1)
+        self.assertEqual(route['VEHICLE'].unique().tolist(), [compact_solution.route_names[1]])
+        self.assertEqual(route['LOCATION_NAME'].tolist(), compact_solution.route(1))
+        self.assertEqual(compact_solution.route_summary()['LOAD'].sum(), dat.customers_unit_test['DEMAND'].sum())
+
+        empty_solution = RouteSolution.from_dataframe(pd.DataFrame(columns=solution_path.columns))
+        self.assertEqual(len(empty_solution), 0)
+        self.assertEqual(len(RouteSolution.from_bytes(empty_solution.to_bytes()).to_dataframe()), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+'''
+Test class for testing the solve service
+'''
+
+import os
+import sys
+import unittest
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from cvrptw_optimization.data import data as dat
+
+
+class SolveServiceTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        from cvrptw_optimization.service import SolveService, ServiceClient
+
+        cls.service = SolveService(workers=1, max_queued_jobs=1, job_timeout_grace_seconds=0)
+        port = cls.service.start_in_thread()
+        cls.client = ServiceClient(port=port)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.service.stop_thread()
+
+    def test_solve_jobs(self):
+        '''
+        Jobs are solved by the warm worker, progress is polled and streamed
+        :return:
+        '''
+        from cvrptw_optimization.service import instance_payload
+
+        job_id = self.client.submit('column_generation', {'BUNDLED': 'unit_test'})
+        lines = list(self.client.stream_progress(job_id))
+        self.assertEqual(lines[-1], {'STATUS': 'done'})
+        self.assertTrue(len(lines) > 1)
+
+        job = self.client.wait(job_id)
+        self.assertAlmostEqual(job['RESULT']['LOWER_BOUND'], 225.8702563, places=4)
+        self.assertEqual(len(self.client.progress(job_id)['PROGRESS']), len(lines) - 1)
+        self.assertEqual(len(self.client.progress(job_id, offset=2)['PROGRESS']), len(lines) - 3)
+
+        instance = instance_payload(dat.depots_unit_test, dat.customers_unit_test, dat.transportation_matrix_unit_test,
+                                    dat.vehicles_unit_test.head(2))
+        job = self.client.wait(self.client.submit('general_model', instance, {'mip_gap': 0}))
+        self.assertEqual(job['STATUS'], 'done')
+        self.assertAlmostEqual(job['RESULT']['OBJECTIVE'], 227.3210805, places=4)
+
+        job = self.client.wait(self.client.submit('column_generation', {'BUNDLED': 'unknown'}))
+        self.assertEqual(job['STATUS'], 'failed')
+        with self.assertRaises(Exception):
+            self.client.submit('unknown', {'BUNDLED': 'unit_test'})
+
+    def test_queue_limit_cancellation_and_time_budget(self):
+        '''
+        Submissions beyond the queue limit are rejected, queued and running jobs are cancelled and a job running
+        past its time budget is killed
+        :return:
+        '''
+        running_job_id = self.client.submit('column_generation', {'BUNDLED': 'customers1'})
+        queued_job_id = self.client.submit('column_generation', {'BUNDLED': 'customers1'})
+        with self.assertRaises(Exception):
+            self.client.submit('column_generation', {'BUNDLED': 'unit_test'})
+
+        self.assertEqual(self.client.cancel(queued_job_id)['STATUS'], 'cancelled')
+        next(self.client.stream_progress(running_job_id))
+        self.assertEqual(self.client.cancel(running_job_id)['STATUS'], 'cancelled')
+        self.assertEqual(self.client.status(queued_job_id)['STARTED'], None)
+
+        # the final master problem alone gets at least a second
+        job = self.client.wait(self.client.submit('column_generation', {'BUNDLED': 'customers1'},
+                                                  time_budget_minutes=0.01))
+        self.assertEqual(job['STATUS'], 'timeout')
+
+        job = self.client.wait(self.client.submit('column_generation', {'BUNDLED': 'unit_test'}))
+        self.assertEqual(job['STATUS'], 'done')
+        self.assertEqual(self.client.health()['RUNNING_JOBS'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+'''
+Test class for testing optional vehicles in the general model
+'''
+
+import os
+import sys
+import unittest
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from cvrptw_optimization.data import data as dat
+
+
+class GeneralModelFleetTest(unittest.TestCase):
+
+    def test_optional_vehicles(self):
+        '''
+        Only the needed vehicles are used and their fixed costs are in the objective
+        :return:
+        '''
+        from cvrptw_optimization import single_depot_general_model_pulp as general_model
+
+        vehicles = dat.vehicles_unit_test.head(5).copy()
+        vehicles['VEHICLE_FIXED_COST'] = 100
+
+        weighted_objective, weighted_path = general_model.run_single_depot_general_model(
+            dat.depots_unit_test,
+            dat.customers_unit_test,
+            dat.transportation_matrix_unit_test,
+            vehicles,
+            enable_solution_messaging=0,
+            optional_vehicles=True)
+
+        # 72 units of demand need two vehicles of capacity 60
+        self.assertEqual(weighted_path['VEHICLE'].nunique(), 2)
+        transportation_cost = weighted_path['TRANSPORTATION_COST'].sum()
+        self.assertAlmostEqual(weighted_objective, transportation_cost + 200, places=3)
+
+        hierarchical_objective, hierarchical_path = general_model.run_single_depot_general_model(
+            dat.depots_unit_test,
+            dat.customers_unit_test,
+            dat.transportation_matrix_unit_test,
+            vehicles,
+            enable_solution_messaging=0,
+            optional_vehicles=True,
+            fleet_objective='hierarchical')
+        self.assertEqual(hierarchical_path['VEHICLE'].nunique(), 2)
+        self.assertAlmostEqual(hierarchical_objective, weighted_objective, places=3)
+
+
+if __name__ == '__main__':
+    unittest.main()
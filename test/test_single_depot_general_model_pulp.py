@@ -61,6 +61,86 @@ class SingleDepotTest(unittest.TestCase):
 
         self.assertTrue(len(model.solution_path) > 0)
 
+    def test_node_capacity_formulation(self):
+        '''
+        The node capacity formulation has one capacity term per customer and the same optimum as the arc formulation
+        :return:
+        '''
+
+        from cvrptw_optimization import single_depot_general_model_pulp as general_model
+
+        arc_objective, arc_solution = general_model.run_single_depot_general_model(depots,
+                                                                                   customers,
+                                                                                   transportation_matrix,
+                                                                                   vehicles,
+                                                                                   enable_solution_messaging=0)
+        node_objective, node_solution = general_model.run_single_depot_general_model(depots,
+                                                                                     customers,
+                                                                                     transportation_matrix,
+                                                                                     vehicles,
+                                                                                     enable_solution_messaging=0,
+                                                                                     capacity_formulation='node')
+        self.assertAlmostEqual(node_objective, arc_objective, places=4)
+        self.assertTrue((node_solution.groupby('VEHICLE')['DEMAND'].sum() <= vehicles['CAPACITY'].max()).all())
+
+        from cvrptw_optimization.src import single_depot_general_model_pulp_inputs as inputs
+        from cvrptw_optimization.src import single_depot_general_model_pulp_formulation as formulation
+
+        model_inputs = inputs.ModelInputs(transportation_matrix, customers, depots, vehicles)
+        model = formulation.ModelFormulation(model_inputs.time_variables_dict,
+                                             model_inputs.assignment_variables_dict,
+                                             model_inputs.vertices_dict,
+                                             model_inputs.vehicles_dict,
+                                             model_inputs.customers_dict,
+                                             model_inputs.transit_dict,
+                                             model_inputs.transit_starting_customers_dict,
+                                             depots['LOCATION_NAME'].iloc[0]
+                                             )
+        model.formulate_problem(capacity_formulation='node')
+        capacity_constraints = [constraint for name, constraint in model.model.constraints.items()
+                                if name.startswith('Capacity')]
+        self.assertEqual(len(capacity_constraints), len(vehicles))
+        for constraint in capacity_constraints:
+            self.assertEqual(len([variable for variable in constraint.keys() if variable.name.startswith('Visit')]),
+                             len(customers))
+
+        with self.assertRaises(Exception):
+            model.formulate_problem(capacity_formulation='load')
+
+
+    def test_arc_capacity_formulation(self):
+        '''
+        The arc capacity constraint of every vehicle has one term per arc leaving a customer with demand
+        :return:
+        '''
+        from cvrptw_optimization.src import single_depot_general_model_pulp_inputs as inputs
+        from cvrptw_optimization.src import single_depot_general_model_pulp_formulation as formulation
+
+        pickup_customers = customers.copy()
+        pickup_customers.loc[pickup_customers.index[0], 'DEMAND'] = 0
+        model_inputs = inputs.ModelInputs(transportation_matrix, pickup_customers, depots, vehicles)
+        model = formulation.ModelFormulation(model_inputs.time_variables_dict,
+                                             model_inputs.assignment_variables_dict,
+                                             model_inputs.vertices_dict,
+                                             model_inputs.vehicles_dict,
+                                             model_inputs.customers_dict,
+                                             model_inputs.transit_dict,
+                                             model_inputs.transit_starting_customers_dict,
+                                             depots['LOCATION_NAME'].iloc[0]
+                                             )
+        model.formulate_problem()
+
+        # every customer is left towards the other customers and the depot
+        customer_arcs = len(pickup_customers)
+        demand = dict(zip(pickup_customers['LOCATION_NAME'], pickup_customers['DEMAND']))
+        capacity_constraints = [constraint for name, constraint in model.model.constraints.items()
+                                if name.startswith('Capacity')]
+        self.assertEqual(len(capacity_constraints), len(vehicles))
+        for constraint in capacity_constraints:
+            self.assertEqual(len(constraint), customer_arcs * (len(pickup_customers) - 1))
+            self.assertEqual(sorted(constraint.values()),
+                             sorted([float(value) for value in demand.values() if value] * customer_arcs))
+
 
 if __name__ == '__main__':
     unittest.main()
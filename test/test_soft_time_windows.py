@@ -0,0 +1,132 @@
+'''
+Test class for testing soft time windows
+'''
+
+import os
+import sys
+import unittest
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from cvrptw_optimization.data import data as dat
+
+# time windows too short to serve two customers on time with one vehicle
+customers = dat.customers_unit_test.copy()
+customers['TIME_WINDOW_END'] = 600
+
+
+class SoftTimeWindowsTest(unittest.TestCase):
+
+    def test_route_evaluation_penalty(self):
+        '''
+        Late customers are penalized and reported
+        :return:
+        '''
+        from cvrptw_optimization import single_depot_column_generation_pulp as cg
+        from cvrptw_optimization.src.route_evaluation import RouteEvaluator
+
+        model_inputs, model_formulation = cg.initiate_single_depot_column_generation(dat.depots_unit_test,
+                                                                                     customers,
+                                                                                     dat.transportation_matrix_unit_test,
+                                                                                     dat.vehicles_unit_test)
+        route_evaluator = RouteEvaluator.from_model_inputs(model_inputs)
+        paths_dict = {'LATE': ['DEPOT_LEAVE', 'STORE 1', 'STORE 3', 'STORE 2', 'DEPOT_ENTER'],
+                      'ON_TIME': ['DEPOT_LEAVE', 'STORE 3', 'DEPOT_ENTER']}
+        evaluation = route_evaluator.evaluate(list(paths_dict.values()))
+        self.assertFalse(evaluation.feasible[0])
+        self.assertTrue(evaluation.soft_feasible.all())
+
+        # STORE 3 at 540 + 19 + 47.70, STORE 2 after another 18 + 32.84 minutes
+        lateness = [0, 540 + 19 + 47.704192 - 600, 540 + 19 + 47.704192 + 18 + 32.838658 - 600]
+        self.assertAlmostEqual(evaluation.customer_lateness[0], sum(lateness), places=4)
+        self.assertEqual(evaluation.total_earliness[0], 0)
+
+        costs = route_evaluator.path_costs(paths_dict, lateness_penalty=2)
+        self.assertAlmostEqual(costs['LATE'], evaluation.cost[0] + 2 * sum(lateness), places=4)
+        self.assertAlmostEqual(costs['ON_TIME'], evaluation.cost[1])
+
+        violations = route_evaluator.time_window_violations(evaluation, paths_dict.keys())
+        self.assertEqual(violations['LOCATION_NAME'].tolist(), ['STORE 3', 'STORE 2'])
+        self.assertEqual(violations['PATH_NAME'].unique().tolist(), ['LATE'])
+
+    def test_column_generation_with_soft_time_windows(self):
+        '''
+        Soft time windows lower the cost, both pricing methods reach the same bound and the general model the
+        same objective
+        :return:
+        '''
+        from cvrptw_optimization import single_depot_column_generation_pulp as cg
+        from cvrptw_optimization import single_depot_general_model_pulp as gm
+
+        hard_solution, hard_statistics = cg.run_single_depot_column_generation(dat.depots_unit_test,
+                                                                               customers,
+                                                                               dat.transportation_matrix_unit_test,
+                                                                               dat.vehicles_unit_test,
+                                                                               enable_solution_messaging=0)
+        bounds = []
+        for pricing in ('mip', 'ng_route'):
+            solution, solution_statistics = cg.run_single_depot_column_generation(dat.depots_unit_test,
+                                                                                  customers,
+                                                                                  dat.transportation_matrix_unit_test,
+                                                                                  dat.vehicles_unit_test,
+                                                                                  enable_solution_messaging=0,
+                                                                                  pricing=pricing,
+                                                                                  soft_time_windows=True,
+                                                                                  lateness_penalty=0.5,
+                                                                                  earliness_penalty=0.2)
+            bounds.append(solution_statistics[-1]['MASTER_PROBLEM_OBJECTIVE'])
+            self.assertTrue(solution['LATENESS'].sum() > 0)
+            self.assertTrue(solution['OBJECTIVE'].iloc[0] < hard_solution['OBJECTIVE'].iloc[0])
+        self.assertAlmostEqual(bounds[0], bounds[1], places=4)
+
+        objective, solution_path = gm.run_single_depot_general_model(dat.depots_unit_test,
+                                                                     customers,
+                                                                     dat.transportation_matrix_unit_test,
+                                                                     dat.vehicles_unit_test.head(2),
+                                                                     enable_solution_messaging=0,
+                                                                     soft_time_windows=True,
+                                                                     lateness_penalty=0.5,
+                                                                     earliness_penalty=0.2)
+        self.assertAlmostEqual(objective, bounds[0], places=4)
+        transportation_cost = solution_path['TRANSPORTATION_COST'].sum()
+        self.assertAlmostEqual(objective, transportation_cost + 0.5 * solution_path['LATENESS'].sum() +
+                               0.2 * solution_path['EARLINESS'].sum(), places=4)
+
+    def test_earliness_on_earliest_schedule(self):
+        '''
+        The models measure the waiting on the earliest schedule like the route evaluation, a service is not delayed
+        to wait less at the next customer
+        :return:
+        '''
+        from cvrptw_optimization import single_depot_column_generation_pulp as cg
+        from cvrptw_optimization import single_depot_general_model_pulp as gm
+        from cvrptw_optimization.src.route_evaluation import RouteEvaluator
+        from cvrptw_optimization.src import lower_bounds as lb
+
+        staggered_customers = dat.customers_unit_test.copy()
+        staggered_customers['TIME_WINDOW_START'] = [540, 760, 660, 540, 860]
+        model_inputs, model_formulation = cg.initiate_single_depot_column_generation(
+            dat.depots_unit_test, staggered_customers, dat.transportation_matrix_unit_test, dat.vehicles_unit_test)
+        route_evaluator = RouteEvaluator.from_model_inputs(model_inputs)
+
+        price = {customer: 100 for customer in model_inputs.customers_dict['DEMAND'].keys()}
+        objective, solution_path, sub_model = model_formulation.formulate_and_solve_subproblem(
+            price, 60, 'PATH', enable_solution_messaging=0, soft_time_windows=True, lateness_penalty=1,
+            earliness_penalty=1)
+        path = solution_path['LOCATION_NAME'].tolist()
+        path_cost = route_evaluator.path_costs({'PATH': path}, lateness_penalty=1, earliness_penalty=1)['PATH']
+        self.assertAlmostEqual(objective, path_cost - 100 * (len(path) - 2), places=4)
+
+        objective, solution_path = gm.run_single_depot_general_model(dat.depots_unit_test,
+                                                                     staggered_customers,
+                                                                     dat.transportation_matrix_unit_test,
+                                                                     dat.vehicles_unit_test.head(2),
+                                                                     enable_solution_messaging=0,
+                                                                     soft_time_windows=True,
+                                                                     lateness_penalty=1,
+                                                                     earliness_penalty=1)
+        routes = lb.plan_routes(solution_path, 'DEPOT')
+        plan_cost = route_evaluator.path_costs(dict(enumerate(routes)), lateness_penalty=1, earliness_penalty=1)
+        self.assertAlmostEqual(objective, sum(plan_cost.values()), places=4)
+
+
+if __name__ == '__main__':
+    unittest.main()
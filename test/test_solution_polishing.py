@@ -0,0 +1,93 @@
+'''
+Test class for testing solution polishing
+'''
+
+import os
+import sys
+import unittest
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from cvrptw_optimization.data import data as dat
+
+
+class SolutionPolishingTest(unittest.TestCase):
+
+    def test_local_search_moves(self):
+        '''
+        Relocate and 2-opt* merge single customer routes and keep them feasible
+        :return:
+        '''
+        from cvrptw_optimization import single_depot_column_generation_pulp as cg
+        from cvrptw_optimization.src.route_evaluation import RouteEvaluator
+        from cvrptw_optimization.src.local_search import LocalSearch
+
+        model_inputs, model_formulation = cg.initiate_single_depot_column_generation(dat.depots0,
+                                                                                     dat.customers0,
+                                                                                     dat.transportation_matrix0,
+                                                                                     dat.vehicles0)
+        route_evaluator = RouteEvaluator.from_model_inputs(model_inputs)
+        location_names = route_evaluator.location_names
+        routes = [[0, customer, 1] for customer in range(2, len(location_names))]
+        initial_cost = route_evaluator.evaluate([[location_names[vertex] for vertex in route]
+                                                 for route in routes]).cost.sum()
+
+        local_search = LocalSearch(route_evaluator, time_limit_seconds=5)
+        improved_routes = [route for route in local_search.improve(routes, [60] * len(routes)) if len(route) > 2]
+        evaluation = route_evaluator.evaluate([[location_names[vertex] for vertex in route]
+                                               for route in improved_routes], capacity=60)
+        self.assertTrue(evaluation.feasible.all())
+        self.assertTrue(evaluation.cost.sum() < initial_cost)
+        self.assertTrue(len(improved_routes) < len(routes))
+        self.assertEqual(sorted(vertex for route in improved_routes for vertex in route[1:-1]),
+                         list(range(2, len(location_names))))
+
+    def test_polish_column_generation_solution(self):
+        '''
+        Polishing keeps the solution columns and does not increase the cost
+        :return:
+        '''
+        from cvrptw_optimization import single_depot_column_generation_pulp as cg
+        from cvrptw_optimization.solution_polishing import polish_solution
+
+        solution, solution_statistics = cg.run_single_depot_column_generation(dat.depots_unit_test,
+                                                                              dat.customers_unit_test,
+                                                                              dat.transportation_matrix_unit_test,
+                                                                              dat.vehicles_unit_test,
+                                                                              enable_solution_messaging=0,
+                                                                              max_iteration=1)
+        polished, statistics = polish_solution(solution,
+                                               dat.depots_unit_test,
+                                               dat.customers_unit_test,
+                                               dat.transportation_matrix_unit_test,
+                                               dat.vehicles_unit_test,
+                                               time_limit_seconds=1)
+        self.assertEqual(list(polished.columns), list(solution.columns))
+        self.assertAlmostEqual(statistics['INITIAL_COST'], solution['TRANSPORTATION_COST'].sum())
+        self.assertAlmostEqual(statistics['FINAL_COST'], polished['TRANSPORTATION_COST'].sum())
+        self.assertTrue(statistics['FINAL_COST'] <= statistics['INITIAL_COST'])
+        self.assertEqual(sorted(polished[polished['DEMAND'] > 0]['LOCATION_NAME']),
+                         sorted(dat.customers_unit_test['LOCATION_NAME']))
+        self.assertTrue((polished['START_TIME'] <= polished['TIME_WINDOW_END']).all())
+
+    def test_polish_with_capacity(self):
+        '''
+        Routes are polished within the capacity column generation was run with, soft time windows are refused
+        :return:
+        '''
+        from cvrptw_optimization import single_depot_column_generation_pulp as cg
+        from cvrptw_optimization.solution_polishing import polish_solution
+
+        tables = (dat.depots_unit_test, dat.customers_unit_test, dat.transportation_matrix_unit_test,
+                  dat.vehicles_unit_test)
+        solution, solution_statistics = cg.run_single_depot_column_generation(*tables,
+                                                                              capacity=30,
+                                                                              enable_solution_messaging=0,
+                                                                              max_iteration=1)
+        polished, statistics = polish_solution(solution, *tables, capacity=30, time_limit_seconds=1)
+        self.assertTrue((polished.groupby('PATH_NAME')['DEMAND'].sum() <= 30).all())
+
+        with self.assertRaises(Exception):
+            polish_solution(solution.assign(LATENESS=0.0), *tables)
+
+
+if __name__ == '__main__':
+    unittest.main()
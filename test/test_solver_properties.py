@@ -0,0 +1,237 @@
+'''
+Test class for checking the solutions of the solver modes on random instances
+
+Every solution is checked by a route validator that only uses the input tables: every customer is served once,
+the routes respect the capacity and time windows and the objective is the recomputed cost. The exact modes are
+cross-checked against each other. The defaults keep the run short, a long soak on larger instances is configured
+with environment variables, e.g.
+
+CVRPTW_PROPERTY_INSTANCES=200 CVRPTW_PROPERTY_CUSTOMERS=9 CVRPTW_PROPERTY_SEED=1000 python -m pytest
+test/test_solver_properties.py
+'''
+
+import os
+import sys
+import unittest
+from collections import Counter
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from cvrptw_optimization.data import data as dat
+
+PROPERTY_INSTANCES = int(os.environ.get('CVRPTW_PROPERTY_INSTANCES', 3))
+PROPERTY_CUSTOMERS = int(os.environ.get('CVRPTW_PROPERTY_CUSTOMERS', 6))
+PROPERTY_SEED = int(os.environ.get('CVRPTW_PROPERTY_SEED', 0))
+PROPERTY_TIME_LIMIT_MINUTES = float(os.environ.get('CVRPTW_PROPERTY_TIME_LIMIT', 2))
+
+# larger instances may hit the time limit, their objectives are only compared with the lower bound
+EXACT_CUSTOMERS = 10
+
+TOLERANCE = 0.0001
+
+
+def random_instance(seed, number_of_customers):
+    '''
+    Function to draw the shape of an instance and generate it
+    :param seed:
+    :param number_of_customers:
+    :return: depots, customers, transportation_matrix, vehicles
+    '''
+    import numpy as np
+    from cvrptw_optimization.src import instances as inst
+
+    random_state = np.random.RandomState(seed)
+    return inst.generate_instance(number_of_customers,
+                                  seed=seed,
+                                  clustering=random_state.choice([0.0, 0.5, 1.0]),
+                                  time_window_tightness=random_state.uniform(0.1, 0.6),
+                                  capacity=int(random_state.choice([40, 60, 100])),
+                                  demand_range=(5, 30))
+
+
+def validate_solution(solution, objective, depots, customers, transportation_matrix, vehicles,
+                      fixed_costs=False, schedule=False):
+    '''
+    Function to check a solution without the solver code
+    :param solution: solution with one route per PATH_NAME or VEHICLE
+    :param objective: reported objective
+    :param depots:
+    :param customers:
+    :param transportation_matrix:
+    :param vehicles:
+    :param fixed_costs: the objective includes the VEHICLE_FIXED_COST of every route
+    :param schedule: the START_TIME of the stops is a schedule to check
+    :return: list of violations
+    '''
+    depot = depots['LOCATION_NAME'].iloc[0]
+    depot_start = float(depots['TIME_WINDOW_START'].iloc[0])
+    depot_end = float(depots['TIME_WINDOW_END'].iloc[0])
+    arcs = transportation_matrix.set_index(['FROM_LOCATION_NAME', 'TO_LOCATION_NAME'])
+    drive = arcs['DRIVE_MINUTES'].to_dict()
+    cost = arcs['TRANSPORTATION_COST'].to_dict()
+    stops = customers.set_index('LOCATION_NAME').to_dict('index')
+    fixed_cost = vehicles.set_index('VEHICLE_NAME')['VEHICLE_FIXED_COST'].to_dict()
+
+    violations = []
+    visits = Counter()
+    total_cost = 0.0
+    route_column = 'PATH_NAME' if 'PATH_NAME' in solution.columns else 'VEHICLE'
+    for route_name, route in solution.sort_values([route_column, 'STOP_NUMBER']).groupby(route_column):
+        unknown = [location for location in route['LOCATION_NAME']
+                   if location not in stops and location not in (depot + '_LEAVE', depot + '_ENTER')]
+        if unknown:
+            violations.append('{} visits unknown locations {}'.format(route_name, unknown))
+            continue
+        route = route[route['LOCATION_NAME'].isin(stops.keys())]
+        route_customers = route['LOCATION_NAME'].tolist()
+        visits.update(route_customers)
+
+        capacity = route['VEHICLE_CAPACITY'].iloc[0] if 'VEHICLE_CAPACITY' in route.columns and len(route) \
+            else vehicles['CAPACITY'].max()
+        load = sum(stops[customer]['DEMAND'] for customer in route_customers)
+        if load > capacity + TOLERANCE:
+            violations.append('{} loads {} above its capacity {}'.format(route_name, load, capacity))
+
+        time = depot_start
+        previous, previous_stop_time = depot, 0.0
+        for customer in route_customers + [depot]:
+            time += previous_stop_time + drive[previous, customer]
+            total_cost += cost[previous, customer]
+            if customer == depot:
+                if time > depot_end + TOLERANCE:
+                    violations.append('{} returns at {} after the depot closes'.format(route_name, time))
+                break
+            time = max(time, stops[customer]['TIME_WINDOW_START'])
+            if time > stops[customer]['TIME_WINDOW_END'] + TOLERANCE:
+                violations.append('{} serves {} at {} after its time window'.format(route_name, customer, time))
+            previous, previous_stop_time = customer, stops[customer]['STOP_TIME']
+
+        if schedule:
+            start_times = route['START_TIME'].tolist()
+            for customer, start_time in zip(route_customers, start_times):
+                if not stops[customer]['TIME_WINDOW_START'] - TOLERANCE <= start_time <= \
+                        stops[customer]['TIME_WINDOW_END'] + TOLERANCE:
+                    violations.append('{} starts {} at {} outside its time window'.format(route_name, customer,
+                                                                                        start_time))
+            for (customer, start_time), (next_customer, next_start_time) in zip(
+                    zip(route_customers[:-1], start_times[:-1]), zip(route_customers[1:], start_times[1:])):
+                if next_start_time < start_time + stops[customer]['STOP_TIME'] + drive[customer, next_customer] - \
+                        TOLERANCE:
+                    violations.append('{} starts {} before arriving from {}'.format(route_name, next_customer,
+                                                                                  customer))
+
+        if fixed_costs and route_customers:
+            total_cost += fixed_cost[route_name]
+
+    for customer in stops.keys():
+        if visits[customer] != 1:
+            violations.append('{} is served {} times'.format(customer, visits[customer]))
+    if abs(total_cost - objective) > TOLERANCE * max(1.0, abs(total_cost)):
+        violations.append('Objective {} differs from the route cost {}'.format(objective, total_cost))
+    return violations
+
+
+class SolverPropertiesTest(unittest.TestCase):
+
+    def assertValid(self, mode, solution, objective, tables, **kwargs):
+        violations = validate_solution(solution, objective, *tables, **kwargs)
+        self.assertEqual(violations, [], '{} returned an invalid solution'.format(mode))
+
+    def solve_modes(self, tables, exact):
+        '''
+        Solve an instance with every mode and check the solutions
+        :param tables: depots, customers, transportation_matrix, vehicles
+        :param exact: the general model is solved to optimality
+        :return: objective of every mode
+        '''
+        from cvrptw_optimization import single_depot_general_model_pulp as general_model
+        from cvrptw_optimization import single_depot_column_generation_pulp as column_generation
+        from cvrptw_optimization import single_depot_lower_bound_pulp as lower_bound
+
+        objectives = {}
+        for capacity_formulation in ('arc', 'node'):
+            mode = 'general_model_' + capacity_formulation
+            objective, solution = general_model.run_single_depot_general_model(
+                *tables,
+                mip_gap=0 if exact else 0.001,
+                solver_time_limit_minutes=PROPERTY_TIME_LIMIT_MINUTES,
+                enable_solution_messaging=0,
+                optional_vehicles=True,
+                capacity_formulation=capacity_formulation)
+            if objective is not None:
+                self.assertValid(mode, solution, objective, tables, fixed_costs=True, schedule=True)
+                objectives[mode] = objective
+
+        for pricing in ('mip', 'ng_route'):
+            mode = 'column_generation_' + pricing
+            solution, solution_statistics = column_generation.run_single_depot_column_generation(
+                *tables,
+                solver_time_limit_minutes=PROPERTY_TIME_LIMIT_MINUTES,
+                pricing=pricing)
+            self.assertValid(mode, solution, solution['OBJECTIVE'].iloc[0], tables)
+            objectives[mode] = solution['OBJECTIVE'].iloc[0]
+            objectives[mode + '_routes'] = solution['PATH_NAME'].nunique()
+
+        bound, solution_statistics = lower_bound.run_single_depot_lower_bound(
+            *tables,
+            solver_time_limit_minutes=PROPERTY_TIME_LIMIT_MINUTES)
+        objectives['lower_bound'] = bound['LOWER_BOUND']
+        return objectives
+
+    def test_bundled_instance(self):
+        '''
+        Solutions of the bundled unit test data, with the fixed costs of the optional vehicles
+        :return:
+        '''
+        tables = (dat.depots_unit_test, dat.customers_unit_test, dat.transportation_matrix_unit_test,
+                  dat.vehicles_unit_test)
+        objectives = self.solve_modes(tables, exact=True)
+        self.assertAlmostEqual(objectives['general_model_arc'], objectives['general_model_node'], places=4)
+        # every route of the general model pays a fixed cost of 1
+        self.assertTrue(objectives['lower_bound'] <= objectives['general_model_arc'] + TOLERANCE)
+
+        from cvrptw_optimization import single_depot_general_model_pulp as general_model
+
+        # every vehicle is used without fixed costs
+        objective, solution = general_model.run_single_depot_general_model(*tables[:3],
+                                                                           dat.vehicles_unit_test.head(2),
+                                                                           enable_solution_messaging=0)
+        self.assertValid('general_model', solution, objective, tables, schedule=True)
+
+        # the validator finds a missing customer, an overloaded vehicle and a wrong objective
+        missing = solution[solution['LOCATION_NAME'] != 'STORE 1']
+        self.assertIn('STORE 1 is served 0 times', validate_solution(missing, objective, *tables))
+        overloaded = solution.assign(VEHICLE_CAPACITY=10)
+        self.assertTrue(any('above its capacity' in violation
+                            for violation in validate_solution(overloaded, objective, *tables)))
+        self.assertTrue(any('differs from the route cost' in violation
+                            for violation in validate_solution(solution, objective + 1, *tables)))
+
+    def test_random_instances(self):
+        '''
+        Solutions of random instances are valid and the exact modes agree
+        :return:
+        '''
+        exact = PROPERTY_CUSTOMERS <= EXACT_CUSTOMERS
+        for seed in range(PROPERTY_SEED, PROPERTY_SEED + PROPERTY_INSTANCES):
+            with self.subTest(seed=seed):
+                tables = random_instance(seed, PROPERTY_CUSTOMERS)
+                tables[3]['VEHICLE_FIXED_COST'] = 0
+                objectives = self.solve_modes(tables, exact)
+
+                general_objectives = [objectives[mode] for mode in ('general_model_arc', 'general_model_node')
+                                      if mode in objectives]
+                for objective in general_objectives + [objectives['column_generation_mip'],
+                                                       objectives['column_generation_ng_route']]:
+                    self.assertTrue(objectives['lower_bound'] <= objective + TOLERANCE * abs(objective))
+
+                if exact:
+                    self.assertEqual(len(general_objectives), 2)
+                    self.assertAlmostEqual(general_objectives[0], general_objectives[1], places=4)
+                    # column generation is a heuristic, it is not better than the optimum with the same fleet
+                    for pricing in ('mip', 'ng_route'):
+                        if objectives['column_generation_{}_routes'.format(pricing)] <= len(tables[3]):
+                            self.assertTrue(objectives['column_generation_' + pricing] >=
+                                            general_objectives[0] - TOLERANCE * abs(general_objectives[0]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+'''
+Test class for testing the global time budget
+'''
+
+import os
+import sys
+import time
+import unittest
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from cvrptw_optimization.data import data as dat
+
+
+class TimeBudgetTest(unittest.TestCase):
+
+    def test_time_budget(self):
+        '''
+        Solves get the budget left after the reserved time, at least min_solve_seconds
+        :return:
+        '''
+        from cvrptw_optimization.src.time_budget import TimeBudget
+
+        time_budget = TimeBudget(1)
+        self.assertTrue(time_budget.allows(30, reserve_seconds=20))
+        self.assertFalse(time_budget.allows(30, reserve_seconds=40))
+        self.assertAlmostEqual(time_budget.solve_minutes(10, reserve_seconds=30), 0.5, places=2)
+        self.assertEqual(time_budget.solve_minutes(0.1), 0.1)
+
+        time_budget = TimeBudget(0)
+        self.assertTrue(time_budget.exhausted())
+        self.assertEqual(time_budget.solve_minutes(10), 1 / 60.0)
+
+    def test_column_generation_within_budget(self):
+        '''
+        Column generation stops within the budget and returns a solution serving every customer, the incumbent
+        never gets worse
+        :return:
+        '''
+        from cvrptw_optimization import single_depot_column_generation_pulp as cg
+
+        start = time.perf_counter()
+        solution, solution_statistics = cg.run_single_depot_column_generation(dat.depots1,
+                                                                              dat.customers1,
+                                                                              dat.transportation_matrix1,
+                                                                              dat.vehicles1,
+                                                                              enable_solution_messaging=0,
+                                                                              time_budget_minutes=0.1)
+        self.assertLess(time.perf_counter() - start, 20)
+        self.assertEqual(sorted(solution['LOCATION_NAME'][solution['DEMAND'] > 0].unique()),
+                         sorted(dat.customers1['LOCATION_NAME']))
+        incumbents = [statistics['INCUMBENT_OBJECTIVE'] for statistics in solution_statistics]
+        self.assertEqual(incumbents, sorted(incumbents, reverse=True))
+        self.assertTrue(solution['OBJECTIVE'].iloc[0] <= incumbents[-1] + 1e-6)
+
+        # without a budget the results are unchanged
+        solution, solution_statistics = cg.run_single_depot_column_generation(dat.depots_unit_test,
+                                                                              dat.customers_unit_test,
+                                                                              dat.transportation_matrix_unit_test,
+                                                                              dat.vehicles_unit_test,
+                                                                              enable_solution_messaging=0)
+        self.assertAlmostEqual(solution_statistics[-1]['MASTER_PROBLEM_OBJECTIVE'], 225.8702563, places=4)
+
+
+if __name__ == '__main__':
+    unittest.main()